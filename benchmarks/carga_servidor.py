@@ -0,0 +1,205 @@
+"""
+Prueba de carga: perfil WSGI (workers síncronos) contra perfil ASGI (workers de uvicorn)
+
+Arranca gunicorn con cada perfil de start.sh sobre la misma base de datos temporal y simula
+el piso: varios escáneres que registran, consultan los últimos registros, paginan activos y
+piden imágenes QR, mientras otros clientes generan lotes pesados de etiquetas en PDF.
+Reporta peticiones de escáner por segundo y latencias (p50/p95/máx) de cada endpoint.
+
+Sólo usa la biblioteca estándar como cliente (un hilo y una conexión keep-alive por cliente).
+
+Uso:
+    python benchmarks/carga_servidor.py
+    python benchmarks/carga_servidor.py --duracion 30 --escaneres 10 --pesados 2 --workers 2
+    python benchmarks/carga_servidor.py --perfiles asgi
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from entorno import RAIZ, crear_sesion, percentil, preparar_django, sembrar_activos
+
+# Comando de cada perfil (los mismos argumentos que start.sh)
+PERFILES = {
+    'wsgi': ['pagTickets.wsgi:application'],
+    'asgi': ['pagTickets.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+ENDPOINTS_ESCANER = ('registrar', 'ultimos', 'activos', 'imagen_qr')
+CODIGOS_POR_LOTE_PESADO = 400
+
+
+def puerto_libre():
+    with socket.socket() as conexion:
+        conexion.bind(('127.0.0.1', 0))
+        return conexion.getsockname()[1]
+
+
+def iniciar_servidor(perfil, puerto, workers, ruta_bd):
+    """Arranca gunicorn en su propio grupo de procesos y espera a que responda"""
+    entorno = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'pagTickets.settings',
+        'SISEG_SQLITE_PATH': str(ruta_bd),
+        'DEBUG': 'False',
+    }
+    comando = [
+        sys.executable, '-m', 'gunicorn', *PERFILES[perfil],
+        '--bind', f'127.0.0.1:{puerto}', '--workers', str(workers), '--timeout', '120', '--log-level', 'warning',
+    ]
+    # La salida de gunicorn va a un archivo junto a la base de datos temporal
+    with open(ruta_bd.parent / f'gunicorn_{perfil}.log', 'ab') as bitacora:
+        proceso = subprocess.Popen(
+            comando, cwd=RAIZ, env=entorno, stdout=bitacora, stderr=subprocess.STDOUT, start_new_session=True
+        )
+    limite = time.time() + 60
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f'gunicorn ({perfil}) terminó con código {proceso.returncode}')
+        try:
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=5)
+            conexion.request('GET', '/login/')
+            conexion.getresponse().read()
+            conexion.close()
+            return proceso
+        except OSError:
+            time.sleep(0.3)
+    detener_servidor(proceso)
+    raise RuntimeError(f'gunicorn ({perfil}) no respondió en 60 s')
+
+
+def detener_servidor(proceso):
+    """Termina gunicorn, sus workers y los procesos de render que hayan creado"""
+    try:
+        os.killpg(proceso.pid, signal.SIGTERM)
+        proceso.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(proceso.pid, signal.SIGKILL)
+        proceso.wait()
+    except ProcessLookupError:
+        pass
+
+
+class Cliente:
+    """Conexión keep-alive con la cookie de sesión; reconecta si el servidor la cierra"""
+
+    def __init__(self, puerto, sesion):
+        self.puerto = puerto
+        self.cabeceras = {'Cookie': f'sessionid={sesion}'}
+        self.conexion = None
+
+    def pedir(self, metodo, ruta, cuerpo=None):
+        cabeceras = dict(self.cabeceras)
+        if cuerpo is not None:
+            cuerpo = json.dumps(cuerpo).encode()
+            cabeceras['Content-Type'] = 'application/json'
+        for intento in range(2):
+            if self.conexion is None:
+                self.conexion = http.client.HTTPConnection('127.0.0.1', self.puerto, timeout=120)
+            try:
+                self.conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+                respuesta = self.conexion.getresponse()
+                respuesta.read()
+                return respuesta.status
+            except (http.client.HTTPException, OSError):
+                self.conexion.close()
+                self.conexion = None
+                if intento:
+                    raise
+
+
+def ejecutar_carga(puerto, sesion, duracion, escaneres, pesados):
+    latencias = {nombre: [] for nombre in (*ENDPOINTS_ESCANER, 'lote_pdf')}
+    errores = []
+    fin = time.time() + duracion
+
+    def medir(cliente, nombre, metodo, ruta, cuerpo=None):
+        inicio = time.perf_counter()
+        try:
+            status = cliente.pedir(metodo, ruta, cuerpo)
+            if status != 200:
+                errores.append(f'{nombre}: HTTP {status}')
+        except (http.client.HTTPException, OSError) as e:
+            errores.append(f'{nombre}: {e}')
+        latencias[nombre].append(time.perf_counter() - inicio)
+
+    def escaner():
+        cliente = Cliente(puerto, sesion)
+        while time.time() < fin:
+            codigo = json.dumps({
+                'nombre': f'Carga {uuid.uuid4().hex[:8]}', 'ubicacion': 'Almacén',
+                'marca': 'HP', 'modelo': 'Z', 'no_serie': uuid.uuid4().hex[:10],
+            })
+            medir(cliente, 'registrar', 'POST', '/registrar_qr/', {'codigo_qr': codigo})
+            medir(cliente, 'ultimos', 'GET', '/qr/ultimos_registros/')
+            medir(cliente, 'activos', 'GET', '/obtener_activos_escaneados/?limit=50')
+            medir(cliente, 'imagen_qr', 'GET', f'/qr/generar_qr_imagen/?texto={uuid.uuid4().hex}')
+
+    def pesado():
+        cliente = Cliente(puerto, sesion)
+        while time.time() < fin:
+            codigos = [uuid.uuid4().hex for _ in range(CODIGOS_POR_LOTE_PESADO)]
+            medir(cliente, 'lote_pdf', 'POST', '/qr/etiquetas/', {'codigos': codigos, 'salida': 'pdf'})
+
+    hilos = [threading.Thread(target=escaner) for _ in range(escaneres)]
+    hilos += [threading.Thread(target=pesado) for _ in range(pesados)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return latencias, errores
+
+
+def imprimir_resultados(perfil, latencias, errores, duracion):
+    peticiones_escaner = sum(len(latencias[nombre]) for nombre in ENDPOINTS_ESCANER)
+    print(f"\n{perfil}: {peticiones_escaner / duracion:.1f} peticiones de escáner/s, "
+          f"{len(latencias['lote_pdf'])} lotes PDF, {len(errores)} errores")
+    for nombre, tiempos in latencias.items():
+        if not tiempos:
+            continue
+        milisegundos = [tiempo * 1000 for tiempo in tiempos]
+        print(f"  {nombre:10s} n={len(milisegundos):5d}  p50={percentil(milisegundos, 0.5):8.1f} ms  "
+              f"p95={percentil(milisegundos, 0.95):8.1f} ms  max={max(milisegundos):8.1f} ms")
+    for error in sorted(set(errores))[:5]:
+        print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--perfiles', nargs='+', choices=list(PERFILES), default=list(PERFILES))
+    parser.add_argument('--duracion', type=float, default=20, help='segundos de carga por perfil')
+    parser.add_argument('--escaneres', type=int, default=10)
+    parser.add_argument('--pesados', type=int, default=2, help='clientes generando lotes de etiquetas en PDF')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--activos', type=int, default=3000, help='activos en la base antes de la carga')
+    opciones = parser.parse_args()
+
+    ruta = preparar_django()
+    sembrar_activos(opciones.activos)
+    sesion = crear_sesion()
+    print(f"Base de datos temporal: {ruta} ({opciones.activos} activos)")
+    print(f"{opciones.workers} workers, {opciones.escaneres} escáneres, {opciones.pesados} clientes pesados, "
+          f"{opciones.duracion:.0f} s por perfil")
+
+    for perfil in opciones.perfiles:
+        puerto = puerto_libre()
+        proceso = iniciar_servidor(perfil, puerto, opciones.workers, ruta)
+        try:
+            latencias, errores = ejecutar_carga(
+                puerto, sesion, opciones.duracion, opciones.escaneres, opciones.pesados
+            )
+        finally:
+            detener_servidor(proceso)
+        imprimir_resultados(perfil, latencias, errores, opciones.duracion)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Micro-benchmark del clasificador de tipo de producto
+
+Compara ClasificadorTipoProducto (una expresión regular compilada con toda la tabla)
+contra la función anterior, que revisaba tipo por tipo con any(palabra in texto).
+También cuenta los textos en que ambos difieren (sólo deberían ser palabras sin acento,
+como "portatil" o "movil", que la tabla nueva sí reconoce).
+
+Uso:
+    python benchmarks/clasificador.py
+    python benchmarks/clasificador.py --textos 20000 --repeticiones 5
+"""
+
+import argparse
+import random
+import statistics
+import time
+from collections import Counter
+
+from entorno import preparar_django
+
+# Textos típicos de nombre y modelo de un activo
+NOMBRES = [
+    'laptop', 'notebook', 'portátil', 'portatil', 'computadora', 'equipo', 'pc de escritorio', 'torre',
+    'monitor', 'pantalla', 'impresora', 'multifuncional', 'teléfono ip', 'celular', 'movil', 'silla',
+    'escritorio', 'proyector', 'no break', 'switch', 'access point', 'scanner', 'tablet',
+]
+MODELOS = [
+    'latitude 5520', 'thinkpad t14', 'elitebook 840', 'optiplex 7090', 'prodesk 400', 'p2422h',
+    '24mk430', 'laserjet pro m404', 'g3110', 'cisco 7841', 'galaxy a54', 'iphone 13', '', 'sin modelo',
+    'smart-ups 1500', 'catalyst 2960', 'ergonómica negra', 'powershot',
+]
+
+
+def tipo_anterior(nombre, modelo):
+    """Copia de SisegAPIService._determinar_tipo_producto antes del clasificador compilado"""
+    texto = f"{nombre} {modelo}".lower()
+
+    if any(word in texto for word in ['laptop', 'notebook', 'portátil', 'thinkpad']):
+        return 'laptops'
+    elif any(word in texto for word in ['desktop', 'torre', 'pc', 'optiplex']):
+        return 'desktop'
+    elif any(word in texto for word in ['monitor', 'pantalla', 'display']):
+        return 'monitor'
+    elif any(word in texto for word in ['impresora', 'printer', 'laserjet']):
+        return 'impresora'
+    elif any(word in texto for word in ['teléfono', 'telefono', 'celular', 'móvil']):
+        return 'telefono'
+    else:
+        return 'equipo'
+
+
+def medir_funcion(funcion, textos, repeticiones):
+    """Mejor tiempo por llamada (microsegundos) entre varias pasadas sobre todos los textos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for nombre, modelo in textos:
+            funcion(nombre, modelo)
+        tiempos.append((time.perf_counter() - inicio) / len(textos) * 1e6)
+    return min(tiempos), statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--textos', type=int, default=50000)
+    parser.add_argument('--repeticiones', type=int, default=7)
+    opciones = parser.parse_args()
+
+    preparar_django(migrar=False)
+    from pagTickets.api_services import siseg_api
+
+    generador = random.Random(2025)
+    textos = [(generador.choice(NOMBRES), generador.choice(MODELOS)) for _ in range(opciones.textos)]
+
+    diferencias = sorted({
+        (nombre, modelo, tipo_anterior(nombre, modelo), siseg_api._determinar_tipo_producto(nombre, modelo))
+        for nombre, modelo in textos
+        if tipo_anterior(nombre, modelo) != siseg_api._determinar_tipo_producto(nombre, modelo)
+    })
+
+    print(f"{len(textos)} textos, {opciones.repeticiones} pasadas (µs por llamada)")
+    for etiqueta, funcion in (
+        ('función anterior', tipo_anterior),
+        ('clasificador compilado', siseg_api._determinar_tipo_producto),
+    ):
+        mejor, mediana = medir_funcion(funcion, textos, opciones.repeticiones)
+        print(f"  {etiqueta:24s} mejor={mejor:6.3f}  mediana={mediana:6.3f}")
+
+    print(f"\nCombinaciones con distinto resultado: {len(diferencias)}")
+    por_nombre = Counter(nombre for nombre, *_ in diferencias)
+    for nombre, cantidad in sorted(por_nombre.items()):
+        nuevo = next(nuevo for otro, _, _, nuevo in diferencias if otro == nombre)
+        print(f"  {nombre!r} ({cantidad} modelos) -> {nuevo}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark de registrar_qr con la detección de duplicados indexada
+
+Llena una base de datos temporal hasta cada tamaño de inventario y mide el registro de
+activos nuevos y repetidos (petición completa a /registrar_qr/). Con la huella de identidad
+indexada el tiempo por registro no depende del tamaño de la tabla.
+Con --comparar-hasta también mide la búsqueda anterior (recorrer y parsear todos los registros).
+
+Uso:
+    python benchmarks/duplicados.py
+    python benchmarks/duplicados.py --tamanos 1000 10000 100000 --registros 200 --comparar-hasta 10000
+"""
+
+import argparse
+import contextvars
+import gc
+import json
+
+from entorno import codigo_activo, crear_sesion, medir, preparar_django, resumen_tiempos, sembrar_activos
+
+
+def buscar_duplicado_recorriendo(activo_info):
+    """Búsqueda anterior a la huella de identidad: parsea cada registro guardado (O(N))"""
+    from pagTickets.formatos_qr import extraer_informacion_qr
+    from pagTickets.models import RegistroQR
+
+    def igual(campo, existente):
+        return activo_info.get(campo, '').strip().lower() == existente.get(campo, '').strip().lower()
+
+    for registro in RegistroQR.objects.all():
+        existente = extraer_informacion_qr(registro.codigo)
+        if not all(igual(campo, existente) for campo in ('nombre', 'ubicacion', 'marca', 'modelo')):
+            continue
+        no_serie_nuevo = activo_info.get('no_serie', '').strip()
+        no_serie_existente = existente.get('no_serie', '').strip()
+        if no_serie_nuevo and no_serie_existente and no_serie_nuevo.lower() != 'sin número de serie':
+            if no_serie_nuevo.lower() != no_serie_existente.lower():
+                continue
+        return registro
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--registros', type=int, default=200, help='registros medidos por tamaño')
+    parser.add_argument('--comparar-hasta', type=int, default=0,
+                        help='medir también la búsqueda anterior hasta este tamaño (0 = no medir)')
+    opciones = parser.parse_args()
+
+    ruta = preparar_django()
+    from django.conf import settings
+    from django.test import Client
+    from pagTickets.formatos_qr import extraer_informacion_qr
+    from pagTickets.models import RegistroQR
+
+    cliente = Client()
+    cliente.cookies[settings.SESSION_COOKIE_NAME] = crear_sesion()
+    print(f"Base de datos temporal: {ruta}")
+
+    def registrar(codigo):
+        # Cada petición en una copia del contexto, como en un servidor: el Client llama a la vista
+        # asíncrona con async_to_sync y algunas versiones de asgiref dejan variables de contexto
+        # acumuladas en el hilo que llama, lo que haría crecer el tiempo con cada petición
+        respuesta = contextvars.copy_context().run(
+            cliente.post, '/registrar_qr/', json.dumps({'codigo_qr': codigo}), content_type='application/json'
+        )
+        datos = respuesta.json()
+        assert datos.get('success'), datos
+        return datos
+
+    sembrados = 0
+    siguiente = 10 ** 7  # Índices de los activos medidos, fuera del rango sembrado
+    for tamano in sorted(opciones.tamanos):
+        sembrar_activos(tamano - sembrados, desde=sembrados)
+        sembrados = tamano
+        # Los objetos del sembrado no deben sumar pausas del recolector a las mediciones
+        gc.collect()
+        total = RegistroQR.objects.count()
+
+        nuevos = [codigo_activo(siguiente + numero) for numero in range(opciones.registros)]
+        siguiente += opciones.registros
+        cola = iter(nuevos)
+        tiempos_nuevos = medir(lambda: registrar(next(cola)), opciones.registros)
+        # Los mismos códigos otra vez: todos son duplicados
+        cola = iter(nuevos)
+        tiempos_repetidos = medir(lambda: registrar(next(cola)), opciones.registros)
+
+        print(f"\n{total:>8} activos")
+        print(f"  registro nuevo       {resumen_tiempos(tiempos_nuevos)}")
+        print(f"  registro duplicado   {resumen_tiempos(tiempos_repetidos)}")
+
+        if tamano <= opciones.comparar_hasta:
+            activo_info = extraer_informacion_qr(nuevos[-1])
+            tiempos = medir(lambda: buscar_duplicado_recorriendo(activo_info), 3)
+            print(f"  búsqueda anterior    {resumen_tiempos(tiempos)}")
+
+
+if __name__ == '__main__':
+    main()
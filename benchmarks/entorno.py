@@ -0,0 +1,118 @@
+"""
+Utilidades comunes de los benchmarks de SISEG
+Cada benchmark trabaja sobre una base de datos SQLite temporal (nunca sobre db.sqlite3)
+con el mismo perfil que producción (pagTickets/base_datos.py).
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Valores de los activos generados
+NOMBRES = ['Laptop', 'Monitor', 'Impresora', 'Teléfono', 'Equipo de escritorio', 'Silla', 'Proyector']
+UBICACIONES = ['Almacén', 'Oficina 1', 'Oficina 2', 'Recepción', 'Sala de juntas', 'Bodega']
+MARCAS = ['Dell', 'HP', 'Lenovo', 'LG', 'Samsung', 'Canon', 'Epson', 'Acer']
+
+
+def preparar_django(ruta_bd=None, migrar=True, base_datos=None):
+    """
+    Configura Django con una base de datos temporal (o `ruta_bd`) y aplica las migraciones.
+    `base_datos` reemplaza la entrada DATABASES['default'] del settings (otro perfil de SQLite).
+    Debe llamarse antes de importar modelos o vistas. Devuelve la ruta de la base de datos.
+    """
+    if ruta_bd is None:
+        ruta_bd = Path(tempfile.mkdtemp(prefix='siseg-bench-')) / 'db.sqlite3'
+    os.environ['SISEG_SQLITE_PATH'] = str(ruta_bd)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pagTickets.settings')
+    os.environ.setdefault('DEBUG', 'False')
+    if str(RAIZ) not in sys.path:
+        sys.path.insert(0, str(RAIZ))
+
+    import django
+    if base_datos is not None:
+        from django.conf import settings
+        settings.DATABASES['default'] = base_datos
+    django.setup()
+    from django.test.utils import setup_test_environment
+    # Permite usar django.test.Client sin servidor
+    setup_test_environment()
+    if migrar:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+    return Path(ruta_bd)
+
+
+def codigo_activo(indice, formato='json', no_serie=None):
+    """Texto de un QR de activo; el índice decide nombre, ubicación y marca"""
+    datos = {
+        'nombre': f'{NOMBRES[indice % len(NOMBRES)]} {indice}',
+        'ubicacion': UBICACIONES[indice % len(UBICACIONES)],
+        'marca': MARCAS[indice % len(MARCAS)],
+        'modelo': f'M-{indice % 97}',
+        'no_serie': no_serie or uuid.uuid4().hex[:12],
+    }
+    if formato == 'texto':
+        return (
+            f"Activo: {datos['nombre']} Ubicación: {datos['ubicacion']} Marca: {datos['marca']} "
+            f"Modelo: {datos['modelo']} Serie: {datos['no_serie']}"
+        )
+    return json.dumps(datos, ensure_ascii=False)
+
+
+def sembrar_activos(cantidad, desde=0, formato='json', lote=5000):
+    """Inserta `cantidad` activos con bulk_create (datos extraídos y secuencias incluidos)"""
+    from django.db import transaction
+    from pagTickets.cambios import asignar_secuencias
+    from pagTickets.formatos_qr import extraer_informacion_qr
+    from pagTickets.models import RegistroQR
+    from pagTickets.views import asignar_datos_extraidos
+
+    for inicio in range(desde, desde + cantidad, lote):
+        registros = []
+        for indice in range(inicio, min(inicio + lote, desde + cantidad)):
+            codigo = codigo_activo(indice, formato)
+            registro = RegistroQR(codigo=codigo, usuario='benchmark', ubicacion='benchmark')
+            asignar_datos_extraidos(registro, extraer_informacion_qr(codigo))
+            registros.append(registro)
+        with transaction.atomic():
+            asignar_secuencias(registros)
+            RegistroQR.objects.bulk_create(registros)
+
+
+def crear_sesion():
+    """Clave de una sesión autenticada (para enviar como cookie sessionid)"""
+    from django.contrib.sessions.backends.db import SessionStore
+    sesion = SessionStore()
+    sesion['autenticado'] = True
+    sesion.save()
+    return sesion.session_key
+
+
+def medir(funcion, repeticiones):
+    """Ejecuta `funcion` varias veces y devuelve los tiempos en milisegundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def percentil(valores, fraccion):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * fraccion))]
+
+
+def resumen_tiempos(tiempos):
+    """Texto con mediana, p95 y máximo de una lista de tiempos en ms"""
+    return (
+        f"p50={statistics.median(tiempos):8.2f} ms  p95={percentil(tiempos, 0.95):8.2f} ms  "
+        f"max={max(tiempos):8.2f} ms"
+    )
@@ -0,0 +1,173 @@
+"""
+Benchmark de escritores concurrentes sobre SQLite: perfil anterior contra perfil de producción
+
+Simula varios workers de gunicorn (un proceso por worker, una petición a la vez) registrando
+escaneos en /registrar_qr/ y /registrar_qr_lote/, mientras otros workers leen páginas de
+activos. Cada perfil trabaja sobre su propia copia de la misma base de datos:
+
+- anterior: SQLite sin opciones (journal DELETE, BEGIN DEFERRED, timeout de 5 s, sin
+  conexiones persistentes), como settings.py antes de pagTickets/base_datos.py
+- produccion: configuracion_sqlite() (WAL, pragmas, BEGIN IMMEDIATE, busy_timeout y
+  conexiones persistentes)
+
+Reporta escrituras confirmadas por segundo, errores ("database is locked") y latencias.
+
+Uso:
+    python benchmarks/escritores.py
+    python benchmarks/escritores.py --escritores 16 --lotes 4 --lectores 4 --duracion 20
+"""
+
+import argparse
+import contextvars
+import json
+import multiprocessing
+import sqlite3
+import time
+import uuid
+from collections import Counter
+
+from entorno import crear_sesion, percentil, preparar_django, sembrar_activos
+
+PERFILES = ('anterior', 'produccion')
+ESCANEOS_POR_LOTE = 25
+
+
+def configuracion_perfil(perfil, ruta):
+    """Entrada de DATABASES del perfil"""
+    if perfil == 'anterior':
+        return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ruta}
+    from pagTickets.base_datos import configuracion_sqlite
+    return configuracion_sqlite(ruta)
+
+
+def codigo_nuevo(prefijo):
+    return json.dumps({
+        'nombre': f'{prefijo} {uuid.uuid4().hex[:8]}', 'ubicacion': 'Almacén',
+        'marca': 'HP', 'modelo': 'Z', 'no_serie': uuid.uuid4().hex[:10],
+    })
+
+
+def trabajador(tipo, base_datos, sesion, duracion, barrera, resultados):
+    """Proceso de un worker: repite su petición durante `duracion` segundos y devuelve lo medido por la cola"""
+    preparar_django(base_datos['NAME'], migrar=False, base_datos=base_datos)
+    from django.conf import settings
+    from django.test import Client
+
+    cliente = Client()
+    cliente.cookies[settings.SESSION_COOKIE_NAME] = sesion
+    escrituras = 0
+    errores = Counter()
+    latencias = []
+    # Una petición de calentamiento (importaciones y primera conexión) fuera de la medición;
+    # todos los workers empiezan a medir al mismo tiempo
+    contextvars.copy_context().run(cliente.get, '/obtener_activos_escaneados/?limit=1')
+    barrera.wait()
+    fin = time.time() + duracion
+
+    def post(ruta_vista, cuerpo):
+        # Cada petición en una copia del contexto (ver benchmarks/duplicados.py)
+        return contextvars.copy_context().run(
+            cliente.post, ruta_vista, json.dumps(cuerpo), content_type='application/json'
+        )
+
+    while time.time() < fin:
+        antes = time.perf_counter()
+        try:
+            if tipo == 'escritor':
+                datos = post('/registrar_qr/', {'codigo_qr': codigo_nuevo('W')}).json()
+                if datos.get('success'):
+                    escrituras += 1
+                else:
+                    errores[str(datos.get('error'))[:60]] += 1
+            elif tipo == 'lote':
+                escaneos = [
+                    {'codigo_qr': codigo_nuevo('L'), 'clave_idempotencia': str(uuid.uuid4())}
+                    for _ in range(ESCANEOS_POR_LOTE)
+                ]
+                datos = post('/registrar_qr_lote/', {'escaneos': escaneos}).json()
+                if datos.get('success'):
+                    fallidos = sum(1 for resultado in datos['resultados'] if resultado['estado'] == 'error')
+                    escrituras += ESCANEOS_POR_LOTE - fallidos
+                    errores.update(
+                        'lote: ' + str(resultado.get('error'))[:54]
+                        for resultado in datos['resultados'] if resultado['estado'] == 'error'
+                    )
+                else:
+                    errores['lote: ' + str(datos.get('error'))[:54]] += 1
+            else:
+                respuesta = contextvars.copy_context().run(cliente.get, '/obtener_activos_escaneados/?limit=1000')
+                if respuesta.status_code != 200:
+                    errores[f'lectura: HTTP {respuesta.status_code}'] += 1
+        except Exception as e:
+            errores[f'{type(e).__name__}: {str(e)[:50]}'] += 1
+        latencias.append((time.perf_counter() - antes) * 1000)
+
+    resultados.put((tipo, escrituras, dict(errores), latencias))
+
+
+def copiar_base(origen, destino, perfil):
+    """Copia la base sembrada; el perfil anterior usa el journal por defecto (DELETE) en lugar de WAL"""
+    with sqlite3.connect(origen) as fuente, sqlite3.connect(destino) as copia:
+        fuente.backup(copia)
+        copia.execute(f"PRAGMA journal_mode={'DELETE' if perfil == 'anterior' else 'WAL'}")
+
+
+def ejecutar_perfil(perfil, ruta, sesion, opciones):
+    contexto = multiprocessing.get_context('spawn')
+    resultados = contexto.Queue()
+    tipos = ['escritor'] * opciones.escritores + ['lote'] * opciones.lotes + ['lector'] * opciones.lectores
+    base_datos = configuracion_perfil(perfil, str(ruta))
+    barrera = contexto.Barrier(len(tipos))
+    procesos = [
+        contexto.Process(
+            target=trabajador, args=(tipo, base_datos, sesion, opciones.duracion, barrera, resultados)
+        )
+        for tipo in tipos
+    ]
+    for proceso in procesos:
+        proceso.start()
+    medidos = [resultados.get() for _ in procesos]
+    for proceso in procesos:
+        proceso.join()
+
+    escrituras = sum(escritas for _, escritas, _, _ in medidos)
+    errores = Counter()
+    for _, _, errores_proceso, _ in medidos:
+        errores.update(errores_proceso)
+    print(f"\n{perfil}: {escrituras / opciones.duracion:.1f} escaneos guardados/s, {sum(errores.values())} errores")
+    for tipo in ('escritor', 'lote', 'lector'):
+        latencias = [latencia for tipo_proceso, _, _, lista in medidos if tipo_proceso == tipo for latencia in lista]
+        if latencias:
+            print(f"  {tipo:9s} n={len(latencias):5d}  p50={percentil(latencias, 0.5):8.1f} ms  "
+                  f"p95={percentil(latencias, 0.95):8.1f} ms  max={max(latencias):8.1f} ms")
+    for error, cantidad in errores.most_common(5):
+        print(f"  {cantidad:5d} × {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--perfiles', nargs='+', choices=PERFILES, default=list(PERFILES))
+    parser.add_argument('--escritores', type=int, default=16, help='workers registrando un escaneo por petición')
+    parser.add_argument('--lotes', type=int, default=4, help=f'workers enviando lotes de {ESCANEOS_POR_LOTE} escaneos')
+    parser.add_argument('--lectores', type=int, default=4, help='workers leyendo páginas de 1000 activos')
+    parser.add_argument('--duracion', type=float, default=20, help='segundos de carga por perfil')
+    parser.add_argument('--activos', type=int, default=3000, help='activos en la base antes de la carga')
+    opciones = parser.parse_args()
+
+    ruta = preparar_django()
+    sembrar_activos(opciones.activos)
+    sesion = crear_sesion()
+    from django.db import connection
+    connection.close()
+    print(f"Base de datos temporal: {ruta} ({opciones.activos} activos)")
+    print(f"{opciones.escritores} escritores, {opciones.lotes} workers de lotes, {opciones.lectores} lectores, "
+          f"{opciones.duracion:.0f} s por perfil")
+
+    for perfil in opciones.perfiles:
+        ruta_perfil = ruta.with_name(f'{perfil}.sqlite3')
+        copiar_base(ruta, ruta_perfil, perfil)
+        ejecutar_perfil(perfil, ruta_perfil, sesion, opciones)
+
+
+if __name__ == '__main__':
+    main()
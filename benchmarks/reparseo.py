@@ -0,0 +1,85 @@
+"""
+Benchmark del reparseo masivo de la tabla con el tokenizador de texto estructurado
+
+Llena una base de datos temporal con QR de texto ("Activo: ... Ubicación: ... Marca: ...") y mide:
+1) Parsear todos los códigos con el algoritmo anterior (find por etiqueta y barrido anidado
+   para encontrar el fin de cada valor) y con parsear_texto_estructurado, comprobando que
+   ambos extraen los mismos valores. El tokenizador además resuelve el código de ubicación,
+   así que la comparación favorece al algoritmo anterior.
+2) El reparseo completo con guardado: manage.py rellenar_datos_activos --todos.
+
+Uso:
+    python benchmarks/reparseo.py
+    python benchmarks/reparseo.py --activos 100000 --lote 2000
+"""
+
+import argparse
+import io
+import time
+
+from entorno import preparar_django, sembrar_activos
+
+
+def campos_anteriores(texto_qr, patrones):
+    """Extracción de campos de parsear_texto_estructurado antes del tokenizador (una búsqueda por etiqueta)"""
+    resultado = {}
+    texto_busqueda = texto_qr.lower()
+    for campo, palabras_clave in patrones.items():
+        for palabra_clave in palabras_clave:
+            inicio = texto_busqueda.find(palabra_clave)
+            if inicio == -1:
+                continue
+            inicio_valor = inicio + len(palabra_clave)
+            fin_valor = len(texto_qr)
+            for otro_campo, otras_palabras in patrones.items():
+                if otro_campo != campo:
+                    for otra_palabra in otras_palabras:
+                        pos_siguiente = texto_busqueda.find(otra_palabra, inicio_valor)
+                        if pos_siguiente != -1 and pos_siguiente < fin_valor:
+                            fin_valor = pos_siguiente
+            valor = texto_qr[inicio_valor:fin_valor].strip().rstrip('.,;:').strip()
+            if valor:
+                resultado[campo] = valor
+            break
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--activos', type=int, default=20000)
+    parser.add_argument('--lote', type=int, default=1000, help='tamaño de lote de rellenar_datos_activos')
+    opciones = parser.parse_args()
+
+    preparar_django()
+    from django.core.management import call_command
+    from pagTickets.formatos_qr import PATRONES_TEXTO_ESTRUCTURADO, parsear_texto_estructurado
+    from pagTickets.models import RegistroQR
+
+    sembrar_activos(opciones.activos, formato='texto')
+    codigos = list(RegistroQR.objects.values_list('codigo', flat=True))
+    print(f"{len(codigos)} códigos de texto estructurado")
+
+    inicio = time.perf_counter()
+    anteriores = [campos_anteriores(codigo, PATRONES_TEXTO_ESTRUCTURADO) for codigo in codigos]
+    segundos_anterior = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    nuevos = [parsear_texto_estructurado(codigo) for codigo in codigos]
+    segundos_nuevo = time.perf_counter() - inicio
+
+    diferentes = sum(
+        1 for anterior, nuevo in zip(anteriores, nuevos)
+        if any(nuevo[campo] != valor for campo, valor in anterior.items())
+    )
+    print(f"  parser anterior        {segundos_anterior:7.3f} s  ({len(codigos) / segundos_anterior:9.0f} códigos/s)")
+    print(f"  tokenizador            {segundos_nuevo:7.3f} s  ({len(codigos) / segundos_nuevo:9.0f} códigos/s)")
+    print(f"  códigos con valores distintos: {diferentes}")
+
+    inicio = time.perf_counter()
+    call_command('rellenar_datos_activos', todos=True, lote=opciones.lote, stdout=io.StringIO())
+    segundos = time.perf_counter() - inicio
+    print(f"  rellenar_datos_activos --todos: {segundos:.2f} s ({len(codigos) / segundos:.0f} registros/s)")
+
+
+if __name__ == '__main__':
+    main()
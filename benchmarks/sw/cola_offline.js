@@ -0,0 +1,260 @@
+// Benchmark de la cola offline y la sincronización del Service Worker (pagTickets/static/sw.js)
+//
+// Ejecuta sw.js en Node dentro de un contexto vm, con IndexedDB en memoria
+// (indexeddb_memoria.js), Cache API en memoria y un servidor falso para /registrar_qr_lote/.
+// No necesita navegador, Django ni paquetes de npm (Node 18 o posterior).
+//
+// Mide:
+// 1) Encolar escaneos sin conexión con handleRegistrarQR (un registro de IndexedDB por escaneo)
+//    contra la cola anterior (todo el arreglo como un blob JSON en la Cache API, releído y
+//    reescrito en cada escaneo).
+// 2) Sincronizar la cola con lotes concurrentes contra el envío anterior, una petición por
+//    operación. El servidor falso tarda --latencia ms en cada respuesta.
+//
+// Uso:
+//     node benchmarks/sw/cola_offline.js
+//     node benchmarks/sw/cola_offline.js --escaneos 10000 --comparar-hasta 2000 --latencia 20
+
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+const { parseArgs } = require('util');
+const { indexedDB, IDBKeyRange, registros } = require('./indexeddb_memoria');
+
+const RUTA_SW = path.join(__dirname, '..', '..', 'pagTickets', 'static', 'sw.js');
+const BLOQUE = 1000;
+
+const { values: opciones } = parseArgs({
+  options: {
+    escaneos: { type: 'string', default: '10000' },
+    'comparar-hasta': { type: 'string', default: '2000' },
+    latencia: { type: 'string', default: '20' }
+  }
+});
+const ESCANEOS = Number(opciones.escaneos);
+const COMPARAR_HASTA = Math.min(Number(opciones['comparar-hasta']), ESCANEOS);
+const LATENCIA_MS = Number(opciones.latencia);
+
+// ============================================================================
+// 🌐 ENTORNO DEL SERVICE WORKER
+// ============================================================================
+
+let conexion = false;
+const peticiones = {};
+let siguienteIdServidor = 1;
+
+const esperar = milisegundos => new Promise(resolve => setTimeout(resolve, milisegundos));
+
+function respuestaJSON(datos, status = 200) {
+  return new Response(JSON.stringify(datos), { status, headers: { 'Content-Type': 'application/json' } });
+}
+
+// Servidor falso: registra los escaneos de un lote (o uno solo) con ids consecutivos
+async function fetchFalso(recurso, opcionesFetch = {}) {
+  const url = new URL(typeof recurso === 'string' ? recurso : recurso.url, 'http://localhost');
+  peticiones[url.pathname] = (peticiones[url.pathname] || 0) + 1;
+  if (!conexion) {
+    throw new TypeError('Failed to fetch');
+  }
+  await esperar(LATENCIA_MS);
+
+  const cuerpo = JSON.parse(opcionesFetch.body || '{}');
+  if (url.pathname === '/registrar_qr_lote/') {
+    return respuestaJSON({
+      success: true,
+      resultados: cuerpo.escaneos.map((escaneo, indice) => ({
+        indice,
+        estado: 'created',
+        activo: { id: siguienteIdServidor++, codigo: escaneo.codigo_qr }
+      }))
+    });
+  }
+  if (url.pathname === '/registrar_qr/') {
+    return respuestaJSON({ success: true, activo: { id: siguienteIdServidor++, codigo: cuerpo.codigo_qr } });
+  }
+  return respuestaJSON({ success: false, error: 'No encontrado' }, 404);
+}
+
+// Cache API en memoria: guarda el texto de cada respuesta, como el navegador guarda el cuerpo
+const cacheMemoria = new Map();
+const cache = {
+  match: async peticion => {
+    const llave = typeof peticion === 'string' ? peticion : new URL(peticion.url, 'http://localhost').pathname;
+    return cacheMemoria.has(llave) ? new Response(cacheMemoria.get(llave)) : undefined;
+  },
+  put: async (peticion, respuesta) => {
+    const llave = typeof peticion === 'string' ? peticion : new URL(peticion.url, 'http://localhost').pathname;
+    cacheMemoria.set(llave, await respuesta.text());
+  },
+  delete: async llave => cacheMemoria.delete(llave),
+  addAll: async () => {}
+};
+const caches = { open: async () => cache, keys: async () => [], delete: async () => true };
+
+const contexto = {
+  self: {
+    addEventListener() {},
+    registration: { sync: { register: async () => {} } },
+    clients: { matchAll: async () => [], claim: async () => {} },
+    skipWaiting() {}
+  },
+  caches,
+  indexedDB,
+  IDBKeyRange,
+  fetch: fetchFalso,
+  location: { hostname: 'localhost', origin: 'http://localhost' },
+  Request: class extends Request {
+    constructor(recurso, init) {
+      super(new URL(recurso, 'http://localhost'), init);
+    }
+  },
+  Response,
+  Headers,
+  URL,
+  URLSearchParams,
+  crypto: globalThis.crypto,
+  structuredClone,
+  console: { log() {}, warn() {}, error: console.error },
+  // Los reintentos programados no deben dispararse durante la medición
+  setTimeout: () => 0,
+  clearTimeout() {}
+};
+vm.createContext(contexto);
+vm.runInContext(fs.readFileSync(RUTA_SW, 'utf8'), contexto, { filename: RUTA_SW });
+const sw = expresion => vm.runInContext(expresion, contexto);
+
+function peticionEscaneo(indice) {
+  return new contexto.Request('/registrar_qr/', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      codigo_qr: JSON.stringify({ nombre: `Laptop ${indice}`, ubicacion: 'Almacén', marca: 'Dell', no_serie: `SN-${indice}` }),
+      usuario: 'benchmark',
+      ubicacion: 'Escáner Web'
+    })
+  });
+}
+
+// ============================================================================
+// 🗄️ COLA ANTERIOR (copia de sw.js antes de IndexedDB)
+// ============================================================================
+
+async function saveOfflineData(key, data) {
+  const cacheApi = await caches.open('siseg-api');
+  await cacheApi.put(new contexto.Request(`/offline-data/${key}`), new Response(JSON.stringify(data)));
+}
+
+async function getOfflineData(key) {
+  const cacheApi = await caches.open('siseg-api');
+  const response = await cacheApi.match(`/offline-data/${key}`);
+  return response ? await response.json() : null;
+}
+
+async function addPendingOperation(type, data) {
+  const pending = await getOfflineData('pendingOperations') || [];
+  pending.push({ type: type, data: data, timestamp: Date.now() });
+  await saveOfflineData('pendingOperations', pending);
+}
+
+// Parte de handleRegistrarQR que guardaba el activo y la operación
+async function encolarAnterior(request) {
+  const datos = await request.clone().json();
+  const newActivo = {
+    id: Date.now(),
+    codigo: datos.codigo_qr,
+    usuario: datos.usuario,
+    ubicacion: datos.ubicacion,
+    clave_idempotencia: crypto.randomUUID(),
+    fecha_registro: new Date().toISOString(),
+    offline: true
+  };
+  const activos = await getOfflineData('activos') || [];
+  activos.push(newActivo);
+  await saveOfflineData('activos', activos);
+  await addPendingOperation('create', newActivo);
+}
+
+// syncPendingData anterior: una petición por operación, en serie
+async function sincronizarAnterior() {
+  const pendingOperations = await getOfflineData('pendingOperations') || [];
+  for (const operation of pendingOperations) {
+    try {
+      await fetchFalso('/registrar_qr/', {
+        method: 'POST',
+        body: JSON.stringify({ codigo_qr: operation.data.codigo, usuario: operation.data.usuario })
+      });
+    } catch (error) {
+      console.error('Error sincronizando operación:', error);
+    }
+  }
+  await saveOfflineData('pendingOperations', []);
+}
+
+// ============================================================================
+// ⏱️ MEDICIONES
+// ============================================================================
+
+// Encola `cantidad` escaneos; devuelve el tiempo total y el promedio de cada bloque de 1000 (ms)
+async function medirEncolado(cantidad, encolar) {
+  const bloques = [];
+  const inicio = performance.now();
+  let inicioBloque = inicio;
+  for (let indice = 0; indice < cantidad; indice++) {
+    await encolar(peticionEscaneo(indice));
+    if ((indice + 1) % BLOQUE === 0 || indice + 1 === cantidad) {
+      const ahora = performance.now();
+      bloques.push((ahora - inicioBloque) / ((indice % BLOQUE) + 1));
+      inicioBloque = ahora;
+    }
+  }
+  return { total: performance.now() - inicio, bloques };
+}
+
+function describirEncolado(etiqueta, cantidad, { total, bloques }) {
+  const primero = bloques[0].toFixed(3);
+  const ultimo = bloques[bloques.length - 1].toFixed(3);
+  console.log(`  ${etiqueta.padEnd(26)} ${cantidad} escaneos en ${(total / 1000).toFixed(2)} s` +
+    `  (ms por escaneo: primeros ${Math.min(BLOQUE, cantidad)} = ${primero}, últimos = ${ultimo})`);
+}
+
+async function main() {
+  console.log(`sw.js: ${RUTA_SW}`);
+  console.log(`\nEncolar sin conexión`);
+  const handleRegistrarQR = sw('handleRegistrarQR');
+  const nuevo = await medirEncolado(ESCANEOS, handleRegistrarQR);
+  describirEncolado('IndexedDB (actual)', ESCANEOS, nuevo);
+  if (COMPARAR_HASTA > 0) {
+    const anterior = await medirEncolado(COMPARAR_HASTA, encolarAnterior);
+    describirEncolado('blob en Cache API', COMPARAR_HASTA, anterior);
+  }
+  const encoladas = registros('siseg-offline', 'operaciones').length;
+  console.log(`  operaciones en IndexedDB: ${encoladas}, activos offline: ${registros('siseg-offline', 'activos').length}`);
+
+  console.log(`\nSincronizar al recuperar la conexión (latencia del servidor ${LATENCIA_MS} ms)`);
+  conexion = true;
+  let inicio = performance.now();
+  await sw('syncPendingData()');
+  const segundosNuevo = (performance.now() - inicio) / 1000;
+  const restantes = registros('siseg-offline', 'operaciones').length;
+  console.log(`  lotes concurrentes (actual) ${encoladas} operaciones en ${segundosNuevo.toFixed(2)} s,` +
+    ` ${peticiones['/registrar_qr_lote/'] || 0} peticiones, quedan ${restantes}`);
+
+  if (COMPARAR_HASTA > 0) {
+    inicio = performance.now();
+    await sincronizarAnterior();
+    const segundosAnterior = (performance.now() - inicio) / 1000;
+    console.log(`  una petición por operación  ${COMPARAR_HASTA} operaciones en ${segundosAnterior.toFixed(2)} s,` +
+      ` ${peticiones['/registrar_qr/'] || 0} peticiones` +
+      ` (${encoladas} operaciones ≈ ${(segundosAnterior * encoladas / COMPARAR_HASTA).toFixed(0)} s)`);
+  }
+
+  if (restantes !== 0) {
+    console.error('La sincronización dejó operaciones pendientes');
+    process.exit(1);
+  }
+}
+
+main().catch(error => {
+  console.error(error);
+  process.exit(1);
+});
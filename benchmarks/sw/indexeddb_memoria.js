@@ -0,0 +1,246 @@
+// IndexedDB mínimo en memoria para ejecutar sw.js en Node (sin navegador ni dependencias)
+// Implementa sólo lo que usa el Service Worker: object stores con keyPath/autoIncrement,
+// índices con count(), cursores con lowerBound y transacciones que se completan solas.
+// Los valores se copian con structuredClone, como en el navegador.
+
+class Peticion {
+  constructor() {
+    this.result = undefined;
+    this.error = null;
+    this.onsuccess = null;
+    this.onerror = null;
+  }
+}
+
+class RangoLlaves {
+  constructor(inferior, abierto) {
+    this.inferior = inferior;
+    this.abierto = abierto;
+  }
+
+  includes(llave) {
+    return this.abierto ? llave > this.inferior : llave >= this.inferior;
+  }
+
+  static lowerBound(inferior, abierto = false) {
+    return new RangoLlaves(inferior, abierto);
+  }
+}
+
+function compararLlaves(a, b) {
+  return a < b ? -1 : a > b ? 1 : 0;
+}
+
+// Datos de un object store (compartidos por todas las transacciones)
+class Almacen {
+  constructor(opciones) {
+    this.keyPath = opciones.keyPath;
+    this.autoIncrement = Boolean(opciones.autoIncrement);
+    this.siguiente = 1;
+    this.datos = new Map();
+    this.indices = {};
+  }
+
+  llavesOrdenadas() {
+    return [...this.datos.keys()].sort(compararLlaves);
+  }
+
+  guardar(valor, soloNuevo) {
+    valor = structuredClone(valor);
+    let llave = valor[this.keyPath];
+    if (llave === undefined && this.autoIncrement) {
+      llave = this.siguiente++;
+      valor[this.keyPath] = llave;
+    }
+    if (soloNuevo && this.datos.has(llave)) {
+      throw new Error('ConstraintError');
+    }
+    if (typeof llave === 'number' && llave >= this.siguiente) {
+      this.siguiente = llave + 1;
+    }
+    this.datos.set(llave, valor);
+    return llave;
+  }
+}
+
+// Vista de un object store dentro de una transacción: cada operación se encola en ella
+class AlmacenTransaccion {
+  constructor(transaccion, almacen) {
+    this.transaccion = transaccion;
+    this.almacen = almacen;
+  }
+
+  _peticion(operacion) {
+    const peticion = new Peticion();
+    this.transaccion._encolar(() => {
+      peticion.result = operacion();
+      if (peticion.onsuccess) {
+        peticion.onsuccess({ target: peticion });
+      }
+    });
+    return peticion;
+  }
+
+  createIndex(nombre, keyPath) {
+    this.almacen.indices[nombre] = keyPath;
+  }
+
+  add(valor) {
+    return this._peticion(() => this.almacen.guardar(valor, true));
+  }
+
+  put(valor) {
+    return this._peticion(() => this.almacen.guardar(valor, false));
+  }
+
+  get(llave) {
+    return this._peticion(() => structuredClone(this.almacen.datos.get(llave)));
+  }
+
+  getAll() {
+    return this._peticion(() => this.almacen.llavesOrdenadas().map(llave => structuredClone(this.almacen.datos.get(llave))));
+  }
+
+  delete(llave) {
+    return this._peticion(() => {
+      this.almacen.datos.delete(llave);
+    });
+  }
+
+  clear() {
+    return this._peticion(() => {
+      this.almacen.datos.clear();
+    });
+  }
+
+  index(nombre) {
+    const keyPath = this.almacen.indices[nombre];
+    return {
+      count: valor => this._peticion(() => [...this.almacen.datos.values()].filter(registro => registro[keyPath] === valor).length)
+    };
+  }
+
+  openCursor(rango) {
+    const peticion = new Peticion();
+    const almacen = this.almacen;
+    const transaccion = this.transaccion;
+    const llaves = almacen.llavesOrdenadas().filter(llave => !rango || rango.includes(llave));
+    let posicion = -1;
+
+    const avanzar = () => {
+      posicion++;
+      // Saltar los registros eliminados después de abrir el cursor
+      while (posicion < llaves.length && !almacen.datos.has(llaves[posicion])) {
+        posicion++;
+      }
+      if (posicion >= llaves.length) {
+        peticion.result = null;
+      } else {
+        const llave = llaves[posicion];
+        peticion.result = {
+          key: llave,
+          value: structuredClone(almacen.datos.get(llave)),
+          continue: () => transaccion._encolar(avanzar),
+          delete: () => almacen.datos.delete(llave)
+        };
+      }
+      if (peticion.onsuccess) {
+        peticion.onsuccess({ target: peticion });
+      }
+    };
+
+    transaccion._encolar(avanzar);
+    return peticion;
+  }
+}
+
+// Las operaciones se ejecutan en orden en el siguiente turno del event loop (setImmediate:
+// setTimeout en Node espera al menos 1 ms y dominaría la medición); al vaciarse
+// la cola la transacción se completa (oncomplete) o, si una operación falla, se aborta
+class Transaccion {
+  constructor(db) {
+    this.db = db;
+    this.cola = [];
+    this.error = null;
+    this.oncomplete = null;
+    this.onerror = null;
+    this.onabort = null;
+    setImmediate(() => this._ejecutar());
+  }
+
+  objectStore(nombre) {
+    return new AlmacenTransaccion(this, this.db.almacenes[nombre]);
+  }
+
+  _encolar(operacion) {
+    this.cola.push(operacion);
+  }
+
+  _ejecutar() {
+    while (this.cola.length) {
+      const operacion = this.cola.shift();
+      try {
+        operacion();
+      } catch (error) {
+        this.error = error;
+        if (this.onerror) {
+          this.onerror();
+        }
+        return;
+      }
+    }
+    if (this.oncomplete) {
+      this.oncomplete();
+    }
+  }
+}
+
+class BaseDatos {
+  constructor() {
+    this.almacenes = {};
+    this.objectStoreNames = { contains: nombre => nombre in this.almacenes };
+    this.onversionchange = null;
+  }
+
+  createObjectStore(nombre, opciones) {
+    this.almacenes[nombre] = new Almacen(opciones || {});
+    // Durante onupgradeneeded las operaciones se aplican de inmediato
+    return new AlmacenTransaccion({ _encolar: operacion => operacion() }, this.almacenes[nombre]);
+  }
+
+  transaction() {
+    return new Transaccion(this);
+  }
+
+  close() {}
+}
+
+const basesDatos = {};
+
+const indexedDB = {
+  open(nombre) {
+    const peticion = new Peticion();
+    setImmediate(() => {
+      const nueva = !basesDatos[nombre];
+      if (nueva) {
+        basesDatos[nombre] = new BaseDatos();
+      }
+      peticion.result = basesDatos[nombre];
+      if (nueva && peticion.onupgradeneeded) {
+        peticion.onupgradeneeded();
+      }
+      if (peticion.onsuccess) {
+        peticion.onsuccess();
+      }
+    });
+    return peticion;
+  }
+};
+
+// Registros de un object store (para revisar el estado desde el benchmark)
+function registros(nombreBase, nombreAlmacen) {
+  const base = basesDatos[nombreBase];
+  return base ? [...base.almacenes[nombreAlmacen].datos.values()] : [];
+}
+
+module.exports = { indexedDB, IDBKeyRange: RangoLlaves, registros };
@@ -3,22 +3,214 @@ Servicios de API para SISEG - Versión Railway Optimizada
 Sistema de precios y catálogos sin dependencias complejas
 """
 
+import hashlib
 import json
 import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
 from django.core.cache import cache
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+# Palabras clave por tipo de producto, en orden de prioridad (el primer tipo que coincide gana).
+# Se comparan sin acentos, así que "portátil" también reconoce "portatil".
+# Se puede extender con settings.SISEG_PALABRAS_TIPO_PRODUCTO = {'tipo': ['palabra', ...]}
+PALABRAS_TIPO_PRODUCTO = [
+    ('laptops', ['laptop', 'notebook', 'portátil', 'thinkpad']),
+    ('desktop', ['desktop', 'torre', 'pc', 'optiplex']),
+    ('monitor', ['monitor', 'pantalla', 'display']),
+    ('impresora', ['impresora', 'printer', 'laserjet']),
+    ('telefono', ['teléfono', 'celular', 'móvil']),
+]
+
+
+def quitar_acentos(texto):
+    """Elimina acentos y diacríticos ("teléfono" -> "telefono")"""
+    if texto.isascii():
+        return texto
+    # NFKD separa la letra de su acento; el acento (no ASCII) se descarta al codificar
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+class ClasificadorTipoProducto:
+    """
+    Clasificador de tipo de producto compilado una sola vez.
+    Una sola expresión regular con todas las palabras clave recorre el texto en una
+    pasada; en cada posición la alternancia prueba primero las palabras del tipo de
+    mayor prioridad, así que el resultado es el mismo que revisar tipo por tipo.
+    """
+    
+    def __init__(self, tabla, tipo_default='equipo'):
+        self.tipo_default = tipo_default
+        self.tipos = [tipo for tipo, _ in tabla]
+        self.prioridad_palabra = {}
+        for prioridad, (tipo, palabras) in enumerate(tabla):
+            for palabra in palabras:
+                palabra = quitar_acentos(palabra.lower())
+                self.prioridad_palabra.setdefault(palabra, prioridad)
+        
+        # Orden: prioridad del tipo y, dentro del tipo, palabras más largas primero
+        palabras_ordenadas = sorted(self.prioridad_palabra, key=lambda p: (self.prioridad_palabra[p], -len(p)))
+        alternancia = '|'.join(re.escape(palabra) for palabra in palabras_ordenadas)
+        self.patron = re.compile(alternancia) if alternancia else None
+    
+    def clasificar(self, nombre, modelo=''):
+        if self.patron is None:
+            return self.tipo_default
+        texto = quitar_acentos(f"{nombre} {modelo}".lower())
+        
+        mejor = None
+        coincidencia = self.patron.search(texto)
+        while coincidencia:
+            prioridad = self.prioridad_palabra[coincidencia.group()]
+            if prioridad == 0:
+                return self.tipos[0]
+            if mejor is None or prioridad < mejor:
+                mejor = prioridad
+            # Continuar desde el siguiente carácter: una palabra puede empezar dentro de otra
+            coincidencia = self.patron.search(texto, coincidencia.start() + 1)
+        return self.tipos[mejor] if mejor is not None else self.tipo_default
+
+
+def cargar_tabla_tipos_producto():
+    """Tabla de palabras clave base más las extensiones definidas en settings"""
+    tabla = [(tipo, list(palabras)) for tipo, palabras in PALABRAS_TIPO_PRODUCTO]
+    extensiones = getattr(settings, 'SISEG_PALABRAS_TIPO_PRODUCTO', {}) or {}
+    for tipo, palabras in extensiones.items():
+        for existente, lista in tabla:
+            if existente == tipo:
+                lista.extend(palabras)
+                break
+        else:
+            # Los tipos nuevos quedan con la menor prioridad
+            tabla.append((tipo, list(palabras)))
+    return tabla
+
+class MemoPrecios:
+    """
+    Memo de dos niveles para las búsquedas de precio:
+    1) LRU en memoria del proceso con expiración (TTL)
+    2) Caché configurado de Django, compartido entre procesos si el backend lo permite
+    Las claves incluyen la versión de la tabla de precios, así que al cambiar la
+    tabla las entradas anteriores dejan de usarse sin tener que borrarlas una por una.
+    """
+    
+    PREFIJO = 'siseg:precio:'
+    
+    def __init__(self, timeout, maximo_entradas=2048):
+        self.timeout = timeout
+        self.maximo_entradas = maximo_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos_memoria = 0
+        self.aciertos_cache = 0
+        self.fallos = 0
+    
+    def obtener(self, clave):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                expira, valor = entrada
+                if expira > ahora:
+                    self._entradas.move_to_end(clave)
+                    self.aciertos_memoria += 1
+                    return valor
+                del self._entradas[clave]
+        
+        try:
+            valor = cache.get(self.PREFIJO + clave)
+        except Exception as e:
+            # Si el caché de Django no responde, se sigue con el nivel local
+            logger.warning(f"Caché de precios no disponible: {e}")
+            valor = None
+        
+        with self._lock:
+            if valor is not None:
+                self.aciertos_cache += 1
+            else:
+                self.fallos += 1
+        if valor is not None:
+            self._guardar_local(clave, valor)
+        return valor
+    
+    def guardar(self, clave, valor):
+        self._guardar_local(clave, valor)
+        try:
+            cache.set(self.PREFIJO + clave, valor, timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f"Caché de precios no disponible: {e}")
+    
+    def _guardar_local(self, clave, valor):
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.timeout, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo_entradas:
+                self._entradas.popitem(last=False)
+    
+    def limpiar(self):
+        """Vacía el nivel local (el nivel de Django se invalida cambiando la versión)"""
+        with self._lock:
+            self._entradas.clear()
+    
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos_memoria + self.aciertos_cache + self.fallos
+            return {
+                'entradas_memoria': len(self._entradas),
+                'maximo_entradas': self.maximo_entradas,
+                'ttl_segundos': self.timeout,
+                'aciertos_memoria': self.aciertos_memoria,
+                'aciertos_cache': self.aciertos_cache,
+                'fallos': self.fallos,
+                'tasa_aciertos': round((self.aciertos_memoria + self.aciertos_cache) / consultas, 3) if consultas else 0,
+            }
+
+
 class SisegAPIService:
     """
     Servicio de API para precios y catálogos - Versión Railway
     Sin dependencias externas complejas para máxima compatibilidad
     """
     
+    # Precio genérico cuando no hay datos para el tipo y la marca
+    PRECIO_GENERICO = {'promedio': 300, 'min': 100, 'max': 800}
+    
     def __init__(self):
         self.cache_timeout = 3600  # 1 hora
-        self.precio_database = self._cargar_base_precios()
+        self.clasificador = ClasificadorTipoProducto(cargar_tabla_tipos_producto())
+        self.memo_precios = MemoPrecios(self.cache_timeout)
+        self.actualizar_base_precios(self._cargar_base_precios())
+    
+    def actualizar_base_precios(self, precio_database):
+        """
+        Reemplaza la base de precios y recalcula su versión.
+        Los resultados memorizados con la versión anterior quedan invalidados.
+        """
+        self.precio_database = precio_database
+        self.tabla_precios = self._construir_tabla_precios()
+        contenido = json.dumps(
+            [precio_database, self.clasificador.prioridad_palabra, self.clasificador.tipos],
+            sort_keys=True
+        )
+        self.version_precios = hashlib.sha1(contenido.encode('utf-8')).hexdigest()[:12]
+        self.memo_precios.limpiar()
+    
+    def estadisticas_cache_precios(self):
+        """Contadores del memo de precios para monitoreo"""
+        return {'version_precios': self.version_precios, **self.memo_precios.estadisticas()}
+    
+    def _construir_tabla_precios(self):
+        """Tabla plana (tipo, marca) -> rango de precios, precalculada una sola vez"""
+        return {
+            (tipo, marca): rango
+            for tipo, marcas in self.precio_database.items()
+            for marca, rango in marcas.items()
+        }
     
     def _cargar_base_precios(self):
         """Base de datos de precios interna - sin APIs externas por ahora"""
@@ -63,19 +255,35 @@ class SisegAPIService:
     
     def buscar_precio_rapido(self, producto_info):
         """
-        Búsqueda rápida de precio usando base interna
+        Búsqueda rápida de precio usando base interna (memorizada por nombre, marca y modelo)
         """
         try:
             nombre = producto_info.get('nombre', '').lower()
             marca = producto_info.get('marca', '').lower()
             modelo = producto_info.get('modelo', '').lower()
-            
+        except Exception as e:
+            logger.error(f"Error en búsqueda rápida: {e}")
+            return {'exito': False, 'error': str(e)}
+        
+        base = '\x1f'.join([self.version_precios, nombre, marca, modelo])
+        clave = hashlib.sha1(base.encode('utf-8')).hexdigest()
+        resultado = self.memo_precios.obtener(clave)
+        if resultado is None:
+            resultado = self._calcular_precio(nombre, marca, modelo)
+            if resultado.get('exito'):
+                self.memo_precios.guardar(clave, resultado)
+        # Copia para que quien llama no modifique el valor memorizado
+        return dict(resultado)
+    
+    def _calcular_precio(self, nombre, marca, modelo):
+        """Calcula el precio de un producto con la base interna"""
+        try:
             # Determinar tipo de producto
             tipo = self._determinar_tipo_producto(nombre, modelo)
             
             # Buscar en base de precios
-            if tipo in self.precio_database and marca in self.precio_database[tipo]:
-                rango = self.precio_database[tipo][marca]
+            rango = self.tabla_precios.get((tipo, marca))
+            if rango is not None:
                 return {
                     'exito': True,
                     'precio_estimado': rango['promedio'],
@@ -106,113 +314,91 @@ class SisegAPIService:
             return {'exito': False, 'error': str(e)}
     
     def _determinar_tipo_producto(self, nombre, modelo):
-        """Determinar tipo de producto basado en nombre y modelo"""
-        texto = f"{nombre} {modelo}".lower()
-        
-        if any(word in texto for word in ['laptop', 'notebook', 'portátil', 'thinkpad']):
-            return 'laptops'
-        elif any(word in texto for word in ['desktop', 'torre', 'pc', 'optiplex']):
-            return 'desktop'
-        elif any(word in texto for word in ['monitor', 'pantalla', 'display']):
-            return 'monitor'
-        elif any(word in texto for word in ['impresora', 'printer', 'laserjet']):
-            return 'impresora'
-        elif any(word in texto for word in ['teléfono', 'telefono', 'celular', 'móvil']):
-            return 'telefono'
-        else:
-            return 'equipo'
+        """Determinar tipo de producto basado en nombre y modelo (clasificador compilado)"""
+        return self.clasificador.clasificar(nombre, modelo)
     
     def generar_reporte_inventario(self, activos):
         """
-        Generar reporte completo de inventario con precios
+        Generar reporte completo de inventario con precios.
+        Clasifica y valora todo el lote en una pasada: cada combinación (nombre, modelo)
+        se clasifica una sola vez y los totales por categoría y marca se acumulan en bloque.
         """
         try:
             if not activos:
                 return {'exito': False, 'error': 'No hay activos para procesar'}
             
+            tabla_precios = self.tabla_precios
+            generico = self.PRECIO_GENERICO
+            tipos_por_texto = {}
+            
             activos_procesados = []
-            estadisticas = {
-                'total_activos': len(activos),
-                'valor_total_min': 0,
-                'valor_total_max': 0,
-                'valor_total_estimado': 0,
-                'por_categoria': {},
-                'por_marca': {}
-            }
+            # Columnas del lote valorado: categoría, marca del reporte y rango de precio de cada activo
+            categorias = []
+            marcas_reporte = []
+            rangos = []
             
             for activo in activos:
-                precio_info = self.buscar_precio_rapido(activo)
+                if not isinstance(activo, dict):
+                    continue  # Un elemento que no es un activo no invalida el reporte completo
+                nombre = activo.get('nombre', '')
+                marca = activo.get('marca', '')
+                modelo = activo.get('modelo', '')
+                if not (isinstance(nombre, str) and isinstance(marca, str) and isinstance(modelo, str)):
+                    continue  # Igual que buscar_precio_rapido: datos inválidos no se valoran
                 
-                if precio_info['exito']:
-                    activo_procesado = {
-                        'id': activo.get('id', 'N/A'),
-                        'nombre': activo.get('nombre', 'Sin nombre'),
-                        'marca': activo.get('marca', 'Sin marca'),
-                        'modelo': activo.get('modelo', 'Sin modelo'),
-                        'ubicacion': activo.get('ubicacion', 'Sin ubicación'),
-                        'tipo': precio_info['tipo_producto'],
-                        'valor_estimado': precio_info['precio_estimado'],
-                        'valor_min': precio_info['precio_min'],
-                        'valor_max': precio_info['precio_max'],
-                        'fuente': precio_info['fuente']
-                    }
-                    
-                    activos_procesados.append(activo_procesado)
-                    
-                    # Actualizar estadísticas
-                    estadisticas['valor_total_min'] += precio_info['precio_min']
-                    estadisticas['valor_total_max'] += precio_info['precio_max']
-                    estadisticas['valor_total_estimado'] += precio_info['precio_estimado']
-                    
-                    # Por categoría
-                    categoria = precio_info['tipo_producto']
-                    if categoria not in estadisticas['por_categoria']:
-                        estadisticas['por_categoria'][categoria] = {
-                            'cantidad': 0,
-                            'valor_total': 0
-                        }
-                    estadisticas['por_categoria'][categoria]['cantidad'] += 1
-                    estadisticas['por_categoria'][categoria]['valor_total'] += precio_info['precio_estimado']
-                    
-                    # Por marca
-                    marca = activo.get('marca', 'Sin marca').upper()
-                    if marca not in estadisticas['por_marca']:
-                        estadisticas['por_marca'][marca] = {
-                            'cantidad': 0,
-                            'valor_total': 0
-                        }
-                    estadisticas['por_marca'][marca]['cantidad'] += 1
-                    estadisticas['por_marca'][marca]['valor_total'] += precio_info['precio_estimado']
-            
-            # Calcular porcentajes
-            if estadisticas['valor_total_estimado'] > 0:
-                for categoria in estadisticas['por_categoria']:
-                    valor = estadisticas['por_categoria'][categoria]['valor_total']
-                    porcentaje = (valor / estadisticas['valor_total_estimado']) * 100
-                    estadisticas['por_categoria'][categoria]['porcentaje'] = round(porcentaje, 1)
+                # Clasificación memorizada por combinación (nombre, modelo)
+                clave_tipo = (nombre, modelo)
+                tipo = tipos_por_texto.get(clave_tipo)
+                if tipo is None:
+                    tipo = self._determinar_tipo_producto(nombre.lower(), modelo.lower())
+                    tipos_por_texto[clave_tipo] = tipo
                 
-                for marca in estadisticas['por_marca']:
-                    valor = estadisticas['por_marca'][marca]['valor_total']
-                    porcentaje = (valor / estadisticas['valor_total_estimado']) * 100
-                    estadisticas['por_marca'][marca]['porcentaje'] = round(porcentaje, 1)
+                rango = tabla_precios.get((tipo, marca.lower()))
+                fuente = 'Base Interna SISEG'
+                if rango is None:
+                    rango = generico
+                    fuente = 'Estimación Genérica'
+                
+                activos_procesados.append({
+                    'id': activo.get('id', 'N/A'),
+                    'nombre': activo.get('nombre', 'Sin nombre'),
+                    'marca': activo.get('marca', 'Sin marca'),
+                    'modelo': activo.get('modelo', 'Sin modelo'),
+                    'ubicacion': activo.get('ubicacion', 'Sin ubicación'),
+                    'tipo': tipo,
+                    'valor_estimado': rango['promedio'],
+                    'valor_min': rango['min'],
+                    'valor_max': rango['max'],
+                    'fuente': fuente
+                })
+                categorias.append(tipo)
+                marcas_reporte.append(activo.get('marca', 'Sin marca').upper())
+                rangos.append(rango)
+            
+            # Totales del lote completo
+            valores = [rango['promedio'] for rango in rangos]
+            valor_total_estimado = sum(valores)
+            valor_total_min = sum(rango['min'] for rango in rangos)
+            valor_total_max = sum(rango['max'] for rango in rangos)
+            
+            por_categoria = self._agrupar_valores(categorias, valores, valor_total_estimado)
+            por_marca = self._agrupar_valores(marcas_reporte, valores, valor_total_estimado)
             
             # Estadísticas adicionales
-            estadisticas['promedio_valor_activo'] = (
-                estadisticas['valor_total_estimado'] / estadisticas['total_activos']
-                if estadisticas['total_activos'] > 0 else 0
-            )
+            total_activos = len(activos)
+            promedio_valor_activo = valor_total_estimado / total_activos if total_activos > 0 else 0
             
             return {
                 'exito': True,
-                'total_activos': estadisticas['total_activos'],
-                'valor_total_estimado': estadisticas['valor_total_estimado'],
-                'valor_total_min': estadisticas['valor_total_min'],
-                'valor_total_max': estadisticas['valor_total_max'],
+                'total_activos': total_activos,
+                'valor_total_estimado': valor_total_estimado,
+                'valor_total_min': valor_total_min,
+                'valor_total_max': valor_total_max,
                 'activos_detallados': activos_procesados,
-                'activos_por_categoria': estadisticas['por_categoria'],
-                'activos_por_marca': estadisticas['por_marca'],
+                'activos_por_categoria': por_categoria,
+                'activos_por_marca': por_marca,
                 'resumen_estadisticas': {
-                    'promedio_valor_activo': round(estadisticas['promedio_valor_activo'], 2)
+                    'promedio_valor_activo': round(promedio_valor_activo, 2)
                 }
             }
             
@@ -220,6 +406,22 @@ class SisegAPIService:
             logger.error(f"Error generando reporte de inventario: {e}")
             return {'exito': False, 'error': str(e)}
     
+    def _agrupar_valores(self, claves, valores, valor_total):
+        """Agrupa cantidad, valor total y porcentaje por clave (categoría o marca)"""
+        grupos = {}
+        for clave, valor in zip(claves, valores):
+            grupo = grupos.get(clave)
+            if grupo is None:
+                grupo = grupos[clave] = {'cantidad': 0, 'valor_total': 0}
+            grupo['cantidad'] += 1
+            grupo['valor_total'] += valor
+        
+        # Calcular porcentajes
+        if valor_total > 0:
+            for grupo in grupos.values():
+                grupo['porcentaje'] = round((grupo['valor_total'] / valor_total) * 100, 1)
+        return grupos
+    
     def obtener_catalogo_marca(self, marca):
         """
         Obtener información de catálogo de una marca específica
@@ -8,3 +8,7 @@ class PagTicketsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     # Nombre de la aplicación (debe coincidir con el nombre de la carpeta)
     name = 'pagTickets'
+
+    # Conecta las señales cuando la aplicación está lista
+    def ready(self):
+        from . import signals  # noqa: F401
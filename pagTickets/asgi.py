@@ -17,4 +17,12 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pagTickets.settings')
 
 # Crea la aplicación ASGI que servirá tu proyecto Django (para aplicaciones asíncronas)
+# Los eventos en vivo (/eventos/, Server-Sent Events) sólo están disponibles con esta aplicación,
+# p. ej.: uvicorn pagTickets.asgi:application --host 0.0.0.0 --port 8000
+# En producción: SISEG_SERVIDOR=asgi bash start.sh (gunicorn con workers de uvicorn)
+# Con varios workers, SISEG_EVENTOS_REDIS_URL reparte los eventos entre ellos
 application = get_asgi_application()
+
+# Arranca los procesos de renderizado de qrweb (ya con qrcode y barcode importados) antes de la primera imagen
+from qrweb.procesos_render import servicio_render  # noqa: E402
+servicio_render.iniciar()
@@ -0,0 +1,33 @@
+"""
+Utilidades para servir SISEG con ASGI (uvicorn bajo gunicorn, ver start.sh)
+Bajo ASGI, Django consume completos en memoria los iteradores síncronos de StreamingHttpResponse
+antes de enviar el primer byte; adaptar_streaming() los entrega parte por parte desde un hilo.
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+# Marca de fin del iterador (next() con valor por defecto, sin StopIteration entre hilos)
+_FIN = object()
+
+
+async def iterar_en_hilo(iterable):
+    """
+    Recorre un iterador síncrono sin bloquear el event loop. Cada parte se pide en el hilo de la
+    petición (thread_sensitive), el mismo que usa el ORM: los cursores de .iterator() siguen válidos.
+    """
+    iterador = iter(iterable)
+    siguiente = sync_to_async(next)
+    while True:
+        parte = await siguiente(iterador, _FIN)
+        if parte is _FIN:
+            return
+        yield parte
+
+
+def adaptar_streaming(request, response):
+    """Bajo ASGI convierte el contenido síncrono de una respuesta en streaming en asíncrono"""
+    if isinstance(request, ASGIRequest) and response.streaming and not response.is_async:
+        # Los generadores originales siguen registrados para cerrarse con response.close()
+        response.streaming_content = iterar_en_hilo(response.streaming_content)
+    return response
@@ -0,0 +1,61 @@
+"""
+Perfil de SQLite para producción (lo usan settings.py y settings_railway.py)
+Base de datos en un archivo con journal WAL: los escáneres leen mientras otro escribe, y las
+escrituras esperan su turno en lugar de fallar con "database is locked".
+"""
+
+import os
+from pathlib import Path
+
+# Pragmas aplicados a cada conexión nueva (OPTIONS['init_command'])
+# - journal_mode=WAL: lectores y un escritor al mismo tiempo (queda guardado en el archivo)
+# - synchronous=NORMAL: con WAL no se corrompe ante una caída; un corte de energía puede perder la última transacción
+# - cache_size: ~20 MB de páginas en caché por conexión (valor negativo = KiB)
+# - mmap_size: lecturas mapeadas en memoria, hasta 128 MB
+# - temp_store=MEMORY: tablas temporales de ORDER BY / GROUP BY en memoria
+PRAGMAS_SQLITE = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA cache_size=-20000;'
+    'PRAGMA mmap_size=134217728;'
+    'PRAGMA temp_store=MEMORY;'
+)
+
+# Segundos que una conexión espera a que se libere el bloqueo de escritura (busy_timeout)
+SEGUNDOS_ESPERA_BLOQUEO = 20
+
+# Segundos que se reutiliza una conexión entre peticiones con WSGI
+CONN_MAX_AGE_DEFAULT = 600
+
+
+def ruta_base_datos(base_dir):
+    """
+    Archivo de la base de datos: SISEG_SQLITE_PATH, o el volumen de Railway (RAILWAY_VOLUME_MOUNT_PATH)
+    para que los datos sobrevivan a cada despliegue, o db.sqlite3 junto al proyecto.
+    """
+    if os.environ.get('SISEG_SQLITE_PATH'):
+        return Path(os.environ['SISEG_SQLITE_PATH'])
+    if os.environ.get('RAILWAY_VOLUME_MOUNT_PATH'):
+        return Path(os.environ['RAILWAY_VOLUME_MOUNT_PATH']) / 'db.sqlite3'
+    return Path(base_dir) / 'db.sqlite3'
+
+
+def configuracion_sqlite(ruta):
+    """Entrada de DATABASES para el archivo `ruta` con WAL, pragmas y conexiones persistentes"""
+    if os.environ.get('SISEG_SERVIDOR') == 'asgi':
+        # Con ASGI cada petición abre su propia conexión: Django recomienda no hacerlas persistentes
+        conn_max_age = 0
+    else:
+        conn_max_age = int(os.environ.get('SISEG_SQLITE_CONN_MAX_AGE', CONN_MAX_AGE_DEFAULT))
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ruta,
+        'CONN_MAX_AGE': conn_max_age,
+        'OPTIONS': {
+            'init_command': PRAGMAS_SQLITE,
+            # BEGIN IMMEDIATE: la transacción toma el bloqueo de escritura al empezar y, si está ocupado,
+            # espera `timeout`; con BEGIN DEFERRED dos escritores simultáneos fallan sin esperar
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SEGUNDOS_ESPERA_BLOQUEO,
+        },
+    }
@@ -0,0 +1,125 @@
+"""
+Secuencia de cambios del inventario para la sincronización incremental de la PWA
+Cada alta (o modificación) de RegistroQR recibe un número creciente en secuencia_cambio y cada
+eliminación deja una lápida (EliminacionRegistro) con el suyo. El cliente guarda la versión
+(el último número que recibió) y pide sólo lo que cambió después.
+
+El contador es una sola fila que se incrementa dentro de la misma transacción que el cambio:
+la fila queda bloqueada hasta el commit, así que los números se confirman en orden y una versión
+nunca deja atrás un cambio que todavía no era visible.
+"""
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import EliminacionRegistro, RegistroQR, SecuenciaCambios
+
+# Id de la única fila del contador
+ID_CONTADOR = 1
+
+
+def reservar_secuencias(cantidad=1):
+    """
+    Reserva `cantidad` números consecutivos y devuelve el primero.
+    Se debe llamar dentro de la transacción que guarda los cambios.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        raise transaction.TransactionManagementError('reservar_secuencias requiere transaction.atomic()')
+    if not SecuenciaCambios.objects.filter(pk=ID_CONTADOR).update(valor=F('valor') + cantidad):
+        SecuenciaCambios.objects.create(pk=ID_CONTADOR, valor=cantidad)
+    valor = SecuenciaCambios.objects.values_list('valor', flat=True).get(pk=ID_CONTADOR)
+    return valor - cantidad + 1
+
+
+def secuencia_actual():
+    """Último número confirmado (0 si todavía no hay cambios)"""
+    return SecuenciaCambios.objects.filter(pk=ID_CONTADOR).values_list('valor', flat=True).first() or 0
+
+
+def asignar_secuencias(registros):
+    """Da a cada registro un número nuevo (altas con bulk_create o modificaciones con bulk_update)"""
+    if not registros:
+        return
+    primera = reservar_secuencias(len(registros))
+    for desplazamiento, registro in enumerate(registros):
+        registro.secuencia_cambio = primera + desplazamiento
+
+
+def registrar_eliminaciones(ids):
+    """
+    Deja una lápida por cada id eliminado (dentro de la transacción que los elimina)
+    y devuelve el número de secuencia de la primera.
+    """
+    ids = list(ids)
+    if not ids:
+        return None
+    primera = reservar_secuencias(len(ids))
+    EliminacionRegistro.objects.bulk_create([
+        EliminacionRegistro(secuencia=primera + desplazamiento, tipo='activo', registro_id=registro_id)
+        for desplazamiento, registro_id in enumerate(ids)
+    ])
+    return primera
+
+
+def registrar_reinicio():
+    """
+    Marca la eliminación de todos los activos. Las lápidas anteriores ya no hacen falta:
+    un cliente con una versión anterior al reinicio vacía su copia y vuelve a descargar.
+    Devuelve el número de secuencia del reinicio.
+    """
+    secuencia = reservar_secuencias()
+    EliminacionRegistro.objects.all().delete()
+    EliminacionRegistro.objects.create(secuencia=secuencia, tipo='reinicio')
+    return secuencia
+
+
+def obtener_cambios(desde, limite, campos):
+    """
+    Cambios posteriores a la versión `desde` (None para un cliente sin datos), en orden de secuencia.
+
+    Devuelve un diccionario con:
+    - reiniciar: el cliente debe vaciar su copia antes de aplicar los cambios
+    - altas: filas .values(*campos) creadas o modificadas
+    - eliminados: ids de los registros eliminados
+    - version: la versión que el cliente debe guardar para la siguiente petición
+    - hay_mas: quedan cambios después de `version`
+    """
+    # Sólo se leen cambios ya confirmados hasta este número
+    hasta = secuencia_actual()
+    reiniciar = desde is None or desde > hasta
+    if reiniciar:
+        # Cliente nuevo, o una versión que este servidor no emitió (base de datos reemplazada)
+        desde = 0
+
+    ultimo_reinicio = EliminacionRegistro.objects.filter(
+        tipo='reinicio', secuencia__gt=desde, secuencia__lte=hasta
+    ).order_by('-secuencia').values_list('secuencia', flat=True).first()
+    if ultimo_reinicio is not None:
+        reiniciar = True
+        desde = ultimo_reinicio
+
+    cambios = [
+        (fila['secuencia_cambio'], 'alta', fila)
+        for fila in RegistroQR.objects.filter(
+            secuencia_cambio__gt=desde, secuencia_cambio__lte=hasta
+        ).order_by('secuencia_cambio').values(*campos, 'secuencia_cambio')[:limite + 1]
+    ]
+    # Tras un reinicio el cliente parte de cero: las lápidas se refieren a filas que no recibirá
+    if not reiniciar:
+        cambios.extend(
+            (secuencia, 'eliminado', registro_id)
+            for secuencia, registro_id in EliminacionRegistro.objects.filter(
+                tipo='activo', secuencia__gt=desde, secuencia__lte=hasta
+            ).order_by('secuencia').values_list('secuencia', 'registro_id')[:limite + 1]
+        )
+    cambios.sort(key=lambda cambio: cambio[0])
+
+    hay_mas = len(cambios) > limite
+    cambios = cambios[:limite]
+    return {
+        'reiniciar': reiniciar,
+        'altas': [dato for _, tipo, dato in cambios if tipo == 'alta'],
+        'eliminados': [dato for _, tipo, dato in cambios if tipo == 'eliminado'],
+        'version': cambios[-1][0] if hay_mas else hasta,
+        'hay_mas': hay_mas,
+    }
@@ -0,0 +1,185 @@
+"""
+Motor de depreciación de activos para SISEG
+Calcula valor_depreciado, depreciacion_anual y anos_vida_util por bloques y los guarda en RegistroQR.
+Sólo se reescriben los registros cuyo periodo (mes) o datos de entrada cambiaron.
+"""
+
+import hashlib
+import json
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .resumenes import reconstruir_resumenes
+from .models import RegistroQR
+
+# Política por tipo de producto:
+# - metodo: 'linea_recta' o 'saldo_decreciente'
+# - vida_util: años de vida útil
+# - residual: fracción del valor base que se conserva al final de la vida útil
+# - factor: multiplicador de la tasa en saldo decreciente (2 = doble saldo decreciente)
+# Se puede reemplazar por tipo con settings.SISEG_POLITICAS_DEPRECIACION
+POLITICAS_DEPRECIACION = {
+    'laptops': {'metodo': 'saldo_decreciente', 'vida_util': 3, 'residual': 0.10, 'factor': 2},
+    'desktop': {'metodo': 'linea_recta', 'vida_util': 5, 'residual': 0.10},
+    'monitor': {'metodo': 'linea_recta', 'vida_util': 5, 'residual': 0.05},
+    'impresora': {'metodo': 'linea_recta', 'vida_util': 4, 'residual': 0.05},
+    'telefono': {'metodo': 'saldo_decreciente', 'vida_util': 3, 'residual': 0.10, 'factor': 2},
+    'equipo': {'metodo': 'linea_recta', 'vida_util': 5, 'residual': 0.10},
+}
+
+TAMANO_LOTE_DEPRECIACION = 1000
+
+# Columnas que escribe el motor
+CAMPOS_DEPRECIACION = [
+    'valor_depreciado',
+    'depreciacion_anual',
+    'anos_vida_util',
+    'periodo_depreciacion',
+    'huella_depreciacion',
+    # auto_now no aplica con bulk_update: se asigna a mano para que las exportaciones detecten el cambio
+    'fecha_actualizacion',
+]
+
+CENTAVOS = Decimal('0.01')
+
+
+def cargar_politicas():
+    politicas = {tipo: dict(politica) for tipo, politica in POLITICAS_DEPRECIACION.items()}
+    for tipo, politica in (getattr(settings, 'SISEG_POLITICAS_DEPRECIACION', {}) or {}).items():
+        politicas[tipo] = {**politicas.get(tipo, politicas['equipo']), **politica}
+    return politicas
+
+
+def periodo_actual(ahora=None):
+    """Periodo de cálculo: el mes en curso (AAAA-MM)"""
+    ahora = timezone.localtime(ahora or timezone.now())
+    return f"{ahora.year:04d}-{ahora.month:02d}"
+
+
+def meses_transcurridos(fecha, periodo):
+    """Meses completos entre la fecha de alta y el periodo"""
+    anio, mes = (int(parte) for parte in periodo.split('-'))
+    fecha = timezone.localtime(fecha)
+    return max(0, (anio - fecha.year) * 12 + (mes - fecha.month))
+
+
+def calcular_depreciacion(base, politica, meses):
+    """
+    Devuelve (valor_depreciado, depreciacion_anual) para un valor base y una edad en meses.
+    El valor nunca baja del valor residual de la política.
+    """
+    vida_util = politica['vida_util']
+    residual = base * politica['residual']
+    anios = meses / 12
+
+    if politica['metodo'] == 'saldo_decreciente':
+        tasa = min(1.0, politica.get('factor', 2) / vida_util)
+        valor = max(residual, base * (1 - tasa) ** anios)
+        # Depreciación del año en curso: tasa sobre el saldo al inicio del año
+        saldo_inicio_anio = max(residual, base * (1 - tasa) ** (meses // 12))
+        anual = min(saldo_inicio_anio * tasa, saldo_inicio_anio - residual)
+    else:
+        anual = (base - residual) / vida_util
+        valor = max(residual, base - anual * anios)
+        if anios >= vida_util:
+            anual = 0.0
+
+    return (
+        Decimal(str(valor)).quantize(CENTAVOS, rounding=ROUND_HALF_UP),
+        Decimal(str(anual)).quantize(CENTAVOS, rounding=ROUND_HALF_UP),
+    )
+
+
+class MotorDepreciacion:
+    """Calcula la depreciación de todo el inventario de forma incremental"""
+
+    def __init__(self, politicas=None):
+        self.politicas = politicas or cargar_politicas()
+        # Cambiar las políticas invalida todas las huellas
+        contenido = json.dumps(self.politicas, sort_keys=True)
+        self.version_politicas = hashlib.sha1(contenido.encode('utf-8')).hexdigest()[:12]
+
+    def politica(self, tipo_producto):
+        return self.politicas.get(tipo_producto) or self.politicas['equipo']
+
+    def huella(self, base, tipo_producto, fecha_registro):
+        datos = f"{self.version_politicas}|{base}|{tipo_producto}|{fecha_registro.isoformat()}"
+        return hashlib.sha1(datos.encode('utf-8')).hexdigest()
+
+    def calcular_bloque(self, filas, periodo, forzar=False):
+        """
+        Recibe filas (id, precio_compra, precio_actual, tipo_producto, fecha_registro,
+        periodo_depreciacion, huella_depreciacion) y devuelve los registros a actualizar.
+        """
+        cambios = []
+        for id_, precio_compra, precio_actual, tipo, fecha, periodo_guardado, huella_guardada in filas:
+            # El valor base es el precio de compra; si no existe, el precio actual de mercado
+            base = precio_compra if precio_compra is not None else precio_actual
+            huella = self.huella(base, tipo, fecha)
+            if not forzar and periodo_guardado == periodo and huella_guardada == huella:
+                continue
+
+            politica = self.politica(tipo)
+            registro = RegistroQR(id=id_, periodo_depreciacion=periodo, huella_depreciacion=huella)
+            registro.anos_vida_util = politica['vida_util']
+            if base is None:
+                registro.valor_depreciado = None
+                registro.depreciacion_anual = None
+            else:
+                registro.valor_depreciado, registro.depreciacion_anual = calcular_depreciacion(
+                    float(base), politica, meses_transcurridos(fecha, periodo)
+                )
+            cambios.append(registro)
+        return cambios
+
+    def actualizar(self, tamano_lote=None, forzar=False, ahora=None, progreso=None):
+        """
+        Recorre la tabla por id y guarda sólo los registros que cambiaron,
+        un bloque por transacción. Devuelve un resumen con totales y tiempo.
+        """
+        tamano_lote = tamano_lote or getattr(settings, 'SISEG_DEPRECIACION_LOTE', TAMANO_LOTE_DEPRECIACION)
+        periodo = periodo_actual(ahora)
+        inicio = time.monotonic()
+
+        filas = RegistroQR.objects.order_by('id').values_list(
+            'id', 'precio_compra', 'precio_actual', 'tipo_producto', 'fecha_registro',
+            'periodo_depreciacion', 'huella_depreciacion'
+        )
+
+        revisados = actualizados = 0
+        ultimo_id = 0
+        while True:
+            bloque = list(filas.filter(id__gt=ultimo_id)[:tamano_lote])
+            if not bloque:
+                break
+            cambios = self.calcular_bloque(bloque, periodo, forzar)
+            if cambios:
+                modificado = timezone.now()
+                for registro in cambios:
+                    registro.fecha_actualizacion = modificado
+                with transaction.atomic():
+                    RegistroQR.objects.bulk_update(cambios, CAMPOS_DEPRECIACION)
+            revisados += len(bloque)
+            actualizados += len(cambios)
+            ultimo_id = bloque[-1][0]
+            if progreso:
+                progreso(revisados, actualizados)
+
+        # Proceso masivo: los resúmenes se reconstruyen desde cero (GROUP BY) en lugar de aplicar deltas
+        if actualizados:
+            reconstruir_resumenes()
+        return {
+            'periodo': periodo,
+            'revisados': revisados,
+            'actualizados': actualizados,
+            'segundos': round(time.monotonic() - inicio, 3),
+        }
+
+
+def tick_depreciacion(**opciones):
+    """Punto de entrada para un programador de tareas (cron, scheduler, etc.)"""
+    return MotorDepreciacion().actualizar(**opciones)
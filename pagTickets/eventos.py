@@ -0,0 +1,186 @@
+"""
+Canal de eventos en vivo para SISEG (Server-Sent Events en /eventos/)
+Las vistas publican las altas y eliminaciones después del commit y cada proceso reparte los eventos
+a sus conexiones abiertas, una cola de asyncio por conexión. Con SISEG_EVENTOS_REDIS_URL (Redis o un
+servidor compatible como Valkey o KeyDB, p. ej. en la misma máquina) los eventos también llegan a las
+conexiones de los demás procesos o workers.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+# Librería opcional para repartir los eventos entre procesos
+try:
+    import redis
+    import redis.asyncio as redis_async
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CANAL_REDIS = 'siseg:eventos'
+# Eventos en espera por conexión; un cliente que no alcanza a leerlos recibe 'recargar'
+TAMANO_COLA_CONEXION = 256
+# Segundos sin eventos antes de enviar un comentario para mantener viva la conexión
+SEGUNDOS_LATIDO = getattr(settings, 'SISEG_EVENTOS_LATIDO_SEGUNDOS', 15)
+# Una vista no espera más que esto a Redis para publicar
+SEGUNDOS_TIMEOUT_REDIS = 1
+# Milisegundos que espera el navegador antes de reconectar
+MILISEGUNDOS_RECONEXION = 5000
+
+# Tipos de evento que se envían sin sesión iniciada (los mismos datos que /qr/ultimos_registros/)
+TIPOS_PUBLICOS = {'codigo_qr', 'activos_reiniciados'}
+
+
+def formato_sse(tipo, datos, id_evento=None):
+    """Un evento en el formato text/event-stream"""
+    lineas = []
+    if id_evento is not None:
+        lineas.append(f'id: {id_evento}')
+    lineas.append(f'event: {tipo}')
+    lineas.append(f'data: {json.dumps(datos, cls=DjangoJSONEncoder)}')
+    return '\n'.join(lineas) + '\n\n'
+
+
+class CanalEventos:
+    """
+    Pub/sub dentro del proceso. publicar() se puede llamar desde cualquier hilo (las vistas
+    síncronas corren en hilos bajo ASGI); cada evento se entrega con call_soon_threadsafe
+    en el event loop de la conexión.
+    """
+
+    def __init__(self, url_redis=None):
+        self.url_redis = url_redis if REDIS_AVAILABLE else None
+        if url_redis and not REDIS_AVAILABLE:
+            logger.warning('SISEG_EVENTOS_REDIS_URL configurado pero el paquete redis no está instalado')
+        # Identifica a este proceso para no repartir dos veces sus propios eventos
+        self.origen = uuid.uuid4().hex
+        self._conexiones = set()  # (loop, cola)
+        self._lock = threading.Lock()
+        self._cliente_redis = None
+        self._escucha_redis = None
+        self.publicados = 0
+        self.desbordados = 0
+
+    # ------------------------------------------------------------------ publicación
+
+    def publicar(self, tipo, datos, id_evento=None):
+        evento = {'tipo': tipo, 'datos': datos, 'id': id_evento}
+        self.publicados += 1
+        self._repartir(evento)
+        if self.url_redis:
+            try:
+                if self._cliente_redis is None:
+                    self._cliente_redis = redis.Redis.from_url(
+                        self.url_redis, socket_timeout=SEGUNDOS_TIMEOUT_REDIS, socket_connect_timeout=SEGUNDOS_TIMEOUT_REDIS
+                    )
+                mensaje = json.dumps({**evento, 'origen': self.origen}, cls=DjangoJSONEncoder)
+                self._cliente_redis.publish(CANAL_REDIS, mensaje)
+            except redis.RedisError as e:
+                # Las conexiones de este proceso ya recibieron el evento
+                logger.warning(f"Evento sin repartir a otros procesos: {e}")
+
+    async def publicar_async(self, tipo, datos, id_evento=None):
+        """publicar() desde una vista asíncrona: la publicación en Redis no bloquea el event loop"""
+        await sync_to_async(self.publicar, thread_sensitive=False)(tipo, datos, id_evento)
+
+    def publicar_al_confirmar(self, tipo, datos, id_evento=None):
+        """Publica cuando la transacción actual se confirma (de inmediato fuera de una transacción)"""
+        transaction.on_commit(lambda: self.publicar(tipo, datos, id_evento))
+
+    def _repartir(self, evento):
+        with self._lock:
+            conexiones = list(self._conexiones)
+        for loop, cola in conexiones:
+            try:
+                loop.call_soon_threadsafe(self._entregar, cola, evento)
+            except RuntimeError:
+                # El event loop de la conexión ya se cerró
+                with self._lock:
+                    self._conexiones.discard((loop, cola))
+
+    def _entregar(self, cola, evento):
+        if cola.full():
+            # Cliente lento: en lugar de acumular eventos se le pide volver a cargar
+            self.desbordados += 1
+            while not cola.empty():
+                cola.get_nowait()
+            evento = {'tipo': 'recargar', 'datos': {}, 'id': None}
+        cola.put_nowait(evento)
+
+    # ------------------------------------------------------------------ conexiones
+
+    def conectar(self):
+        """Registra una conexión en el event loop actual y devuelve su cola"""
+        loop = asyncio.get_running_loop()
+        cola = asyncio.Queue(maxsize=TAMANO_COLA_CONEXION)
+        with self._lock:
+            self._conexiones.add((loop, cola))
+        if self.url_redis and (self._escucha_redis is None or self._escucha_redis.done()):
+            self._escucha_redis = loop.create_task(self._escuchar_redis())
+        return cola
+
+    def desconectar(self, cola):
+        with self._lock:
+            self._conexiones = {(loop, c) for loop, c in self._conexiones if c is not cola}
+
+    async def _escuchar_redis(self):
+        """Reparte en este proceso los eventos publicados por los demás (una tarea por proceso)"""
+        cliente = redis_async.Redis.from_url(self.url_redis)
+        pubsub = cliente.pubsub()
+        try:
+            await pubsub.subscribe(CANAL_REDIS)
+            async for mensaje in pubsub.listen():
+                if mensaje['type'] != 'message':
+                    continue
+                evento = json.loads(mensaje['data'])
+                if evento.pop('origen', None) != self.origen:
+                    self._repartir(evento)
+        except redis.RedisError as e:
+            # La siguiente conexión vuelve a iniciar la escucha
+            logger.warning(f"Escucha de eventos en Redis interrumpida: {e}")
+        finally:
+            await pubsub.aclose()
+            await cliente.aclose()
+
+    async def transmitir(self, cola, tipos=None, iniciales=()):
+        """
+        Generador asíncrono de text/event-stream para una conexión: primero los eventos
+        `iniciales` (p. ej. los cambios perdidos durante una reconexión) y luego los publicados.
+        Sólo envía los tipos en `tipos` (None = todos).
+        """
+        try:
+            yield f'retry: {MILISEGUNDOS_RECONEXION}\n\n'
+            for evento in iniciales:
+                yield formato_sse(evento['tipo'], evento['datos'], evento['id'])
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), SEGUNDOS_LATIDO)
+                except asyncio.TimeoutError:
+                    yield ': latido\n\n'
+                    continue
+                if tipos is None or evento['tipo'] in tipos or evento['tipo'] == 'recargar':
+                    yield formato_sse(evento['tipo'], evento['datos'], evento['id'])
+        finally:
+            self.desconectar(cola)
+
+    def estadisticas(self):
+        return {
+            'conexiones': len(self._conexiones),
+            'publicados': self.publicados,
+            'desbordados': self.desbordados,
+            'redis': bool(self.url_redis),
+        }
+
+
+# Instancia global del canal de eventos
+canal_eventos = CanalEventos(getattr(settings, 'SISEG_EVENTOS_REDIS_URL', None))
@@ -0,0 +1,133 @@
+"""
+Motor de exportación de activos para SISEG
+Genera Excel en modo write_only (memoria constante) y formatos de streaming CSV/NDJSON
+"""
+
+import csv
+import json
+import tempfile
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+
+# Encabezados de las columnas exportadas
+ENCABEZADOS_EXPORTACION = ['Código QR', 'Activo', 'Ubicación', 'Marca', 'Modelo', 'No. de Serie', 'Fecha de Registro']
+
+# Tipos de contenido por formato
+CONTENT_TYPE_EXCEL = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CONTENT_TYPE_CSV = 'text/csv; charset=utf-8'
+CONTENT_TYPE_NDJSON = 'application/x-ndjson; charset=utf-8'
+
+# Nombres de los estilos compartidos del libro
+ESTILO_ENCABEZADO = 'siseg_encabezado'
+ESTILO_CELDA = 'siseg_celda'
+
+
+def fila_exportacion(activo_info):
+    """Convierte la información de un activo en la lista de valores de una fila exportada"""
+    # Combinar código QR con código de ubicación
+    codigo_completo = activo_info['codigo']
+    if activo_info.get('codigo_ubicacion'):
+        codigo_completo += f" ({activo_info['codigo_ubicacion']})"
+
+    return [
+        codigo_completo,
+        activo_info['nombre'],
+        activo_info['ubicacion'],
+        activo_info['marca'],
+        activo_info['modelo'],
+        activo_info['no_serie'],
+        activo_info['fecha_registro'],
+    ]
+
+
+def _registrar_estilos(wb):
+    """Registra una sola vez los estilos con nombre que comparten todas las celdas"""
+    borde = Side(style='thin')
+    border = Border(left=borde, right=borde, top=borde, bottom=borde)
+
+    encabezado = NamedStyle(name=ESTILO_ENCABEZADO)
+    encabezado.font = Font(bold=True, color="FFFFFF")
+    encabezado.fill = PatternFill(start_color="DC2626", end_color="DC2626", fill_type="solid")
+    encabezado.alignment = Alignment(horizontal="center", vertical="center")
+    encabezado.border = border
+    wb.add_named_style(encabezado)
+
+    celda = NamedStyle(name=ESTILO_CELDA)
+    celda.border = border
+    wb.add_named_style(celda)
+
+
+def escribir_excel_activos(activos, destino, progreso=None, cada=500):
+    """
+    Escribe los activos en un libro Excel usando el modo write_only de openpyxl.
+
+    - activos: iterable de diccionarios de activo (se consume una sola vez)
+    - destino: ruta o archivo binario donde guardar el libro
+    - progreso: función opcional que recibe el número de filas escritas cada `cada` filas
+    Devuelve el número de filas escritas.
+    """
+    wb = Workbook(write_only=True)
+    _registrar_estilos(wb)
+    ws = wb.create_sheet("Activos Escaneados")
+
+    # Ajustar ancho de columnas (debe hacerse antes de escribir filas)
+    for col in range(1, len(ENCABEZADOS_EXPORTACION) + 1):
+        ws.column_dimensions[get_column_letter(col)].width = 20
+
+    def celdas(valores, estilo):
+        fila = []
+        for valor in valores:
+            cell = WriteOnlyCell(ws, value=valor)
+            cell.style = estilo
+            fila.append(cell)
+        return fila
+
+    ws.append(celdas(ENCABEZADOS_EXPORTACION, ESTILO_ENCABEZADO))
+
+    total = 0
+    for activo_info in activos:
+        ws.append(celdas(fila_exportacion(activo_info), ESTILO_CELDA))
+        total += 1
+        if progreso and total % cada == 0:
+            progreso(total)
+
+    wb.save(destino)
+    if progreso:
+        progreso(total)
+    return total
+
+
+def excel_activos_temporal(activos):
+    """Genera el Excel en un archivo temporal y lo devuelve posicionado al inicio"""
+    archivo = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        escribir_excel_activos(activos, archivo)
+    except Exception:
+        archivo.close()
+        raise
+    archivo.seek(0)
+    return archivo
+
+
+class _BufferEco:
+    """Pseudo-archivo que devuelve lo escrito, para usar csv.writer en streaming"""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv_activos(activos):
+    """Generador de líneas CSV (con BOM para que Excel respete los acentos)"""
+    writer = csv.writer(_BufferEco())
+    yield '\ufeff' + writer.writerow(ENCABEZADOS_EXPORTACION)
+    for activo_info in activos:
+        yield writer.writerow(fila_exportacion(activo_info))
+
+
+def generar_ndjson_activos(activos):
+    """Generador de líneas NDJSON: un activo JSON por línea"""
+    for activo_info in activos:
+        yield json.dumps(activo_info, ensure_ascii=False) + '\n'
@@ -0,0 +1,391 @@
+"""
+Formatos de contenido de códigos QR para SISEG
+Cada formato registra una detección barata (prefijo, primer carácter o delimitador) y su parser.
+extraer_informacion_qr usa el primer formato cuya detección coincide y cuenta los códigos por formato.
+"""
+
+import base64
+import bisect
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+# Para desencriptar los QR de SISEG (AES)
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from .ubicaciones import resolutor_ubicaciones
+
+logger = logging.getLogger(__name__)
+
+# Mismos valores que static/js/qr-scanner.js (encriptarParaSISEG / desencriptarCodigoSISEG)
+FIRMA_SISEG = 'SISEG_ENCRYPTED_QR_'
+CLAVE_SISEG = getattr(settings, 'SISEG_CLAVE_QR', 'SISEG2025_SECURITY_INTEGRAL_SYSTEM_SAFE_QR')
+
+
+def activo_sin_datos(codigo, nombre):
+    """Información mínima de un activo cuando el QR no trae más campos"""
+    return {
+        'codigo': codigo,
+        'nombre': nombre,
+        'ubicacion': 'Sin ubicación',
+        'marca': 'Sin marca',
+        'modelo': 'Sin modelo',
+        'no_serie': 'Sin número de serie',
+        'codigo_ubicacion': resolutor_ubicaciones.resolver('Sin ubicación')
+    }
+
+
+# ================================================================================================
+# 📋 REGISTRO DE FORMATOS
+# ================================================================================================
+
+class FormatoQR:
+    """
+    detectar(texto, limpio) devuelve None si el código no es de este formato; cualquier otro valor
+    se entrega a parsear(texto, detectado) para no repetir trabajo (p. ej. el texto en minúsculas).
+    """
+
+    def __init__(self, nombre, detectar, parsear):
+        self.nombre = nombre
+        self.detectar = detectar
+        self.parsear = parsear
+
+
+# Formatos en orden de prueba
+FORMATOS_QR = []
+
+
+def registrar_formato(nombre, detectar, antes_de=None):
+    """Decorador que agrega un parser al registro (al final o antes de otro formato)"""
+    def decorador(parsear):
+        formato = FormatoQR(nombre, detectar, parsear)
+        posiciones = [indice for indice, existente in enumerate(FORMATOS_QR) if existente.nombre == antes_de]
+        FORMATOS_QR.insert(posiciones[0] if posiciones else len(FORMATOS_QR), formato)
+        return parsear
+    return decorador
+
+
+class ContadorFormatos:
+    """Códigos procesados y errores por formato (por proceso)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.detectados = Counter()
+        self.errores = Counter()
+
+    def registrar(self, nombre):
+        with self._lock:
+            self.detectados[nombre] += 1
+
+    def registrar_error(self, nombre):
+        with self._lock:
+            self.errores[nombre] += 1
+
+    def estadisticas(self):
+        with self._lock:
+            total = sum(self.detectados.values())
+            return {
+                'total': total,
+                'formatos': {
+                    nombre: {
+                        'cantidad': cantidad,
+                        'errores': self.errores[nombre],
+                        'porcentaje': round(cantidad * 100 / total, 1),
+                    }
+                    for nombre, cantidad in self.detectados.most_common()
+                },
+            }
+
+
+contador_formatos = ContadorFormatos()
+
+
+def detectar_formato(texto, omitir=()):
+    """Devuelve (formato, detectado) del primer formato que reconoce el texto"""
+    limpio = texto.strip()
+    for formato in FORMATOS_QR:
+        if formato.nombre in omitir:
+            continue
+        detectado = formato.detectar(texto, limpio)
+        if detectado is not None:
+            return formato, detectado
+    return None, None
+
+
+def extraer_informacion_qr(codigo_qr):
+    """
+    Extrae información del código QR soportando múltiples formatos:
+    - QR encriptado de SISEG: SISEG_ENCRYPTED_QR_<AES de CryptoJS>
+    - JSON: {"codigo": "ACT001", "nombre": "Laptop", ...}
+    - Formato de texto estructurado: "Activo: Escritorio en L Ubicación: 1er piso R.H. Marca: Techni mobili Modelo: Havano N. Serie: -."
+    - Texto simple separado por |: ACT001|Laptop Dell|Oficina 1|Dell|Latitude|SN123456
+    - Texto simple: cualquier código
+    """
+    nombre_formato = 'desconocido'
+    try:
+        formato, detectado = detectar_formato(codigo_qr)
+        nombre_formato = formato.nombre
+        contador_formatos.registrar(nombre_formato)
+        return formato.parsear(codigo_qr, detectado)
+    except Exception as e:
+        # Si todo falla, usar el código QR tal como está
+        logger.debug(f"QR con formato {nombre_formato} no se pudo interpretar: {e}")
+        contador_formatos.registrar_error(nombre_formato)
+        return activo_sin_datos(codigo_qr, codigo_qr)
+
+
+def estadisticas_formatos():
+    return contador_formatos.estadisticas()
+
+
+# ================================================================================================
+# 🔒 QR ENCRIPTADO DE SISEG
+# ================================================================================================
+
+def derivar_clave_iv(frase, sal, largo_clave=32, largo_iv=16):
+    """EVP_BytesToKey con MD5 y una iteración (lo que usa CryptoJS con una frase como clave)"""
+    derivado = b''
+    bloque = b''
+    while len(derivado) < largo_clave + largo_iv:
+        bloque = hashlib.md5(bloque + frase + sal).digest()
+        derivado += bloque
+    return derivado[:largo_clave], derivado[largo_clave:largo_clave + largo_iv]
+
+
+def desencriptar_siseg(encriptado, clave=CLAVE_SISEG):
+    """Desencripta la parte posterior a la firma y devuelve el payload (dict) verificado"""
+    datos = base64.b64decode(encriptado)
+    if not datos.startswith(b'Salted__'):
+        raise ValueError('Formato de encriptación no reconocido')
+    llave, iv = derivar_clave_iv(clave.encode('utf-8'), datos[8:16])
+
+    descifrador = Cipher(algorithms.AES(llave), modes.CBC(iv)).decryptor()
+    con_relleno = descifrador.update(datos[16:]) + descifrador.finalize()
+    quitar_relleno = padding.PKCS7(128).unpadder()
+    payload = json.loads((quitar_relleno.update(con_relleno) + quitar_relleno.finalize()).decode('utf-8'))
+
+    # Verificar que es de SISEG - Compatible con formato nuevo y viejo
+    if (payload.get('a') or payload.get('app')) != 'SISEG':
+        raise ValueError('QR no autorizado para SISEG')
+
+    # Verificar expiración (solo para códigos no permanentes)
+    permanente = payload.get('p') or payload.get('permanent')
+    expiracion = payload.get('e') or payload.get('expiracion')
+    if not permanente and expiracion and time.time() * 1000 > expiracion:
+        raise ValueError('QR expirado')
+    return payload
+
+
+def detectar_siseg(texto, limpio):
+    return texto[len(FIRMA_SISEG):] if texto.startswith(FIRMA_SISEG) else None
+
+
+@registrar_formato('siseg', detectar_siseg)
+def parsear_siseg(texto, encriptado):
+    try:
+        payload = desencriptar_siseg(encriptado)
+        datos = payload.get('d') or payload.get('data')
+        if not isinstance(datos, (dict, str)) or not datos:
+            raise ValueError('QR de SISEG sin datos')
+    except Exception as e:
+        # Sin clave válida el código se lee como antes: con los demás formatos
+        logger.debug(f"No se pudo desencriptar el QR de SISEG: {e}")
+        contador_formatos.registrar_error('siseg')
+        formato, detectado = detectar_formato(texto, omitir=('siseg',))
+        return formato.parsear(texto, detectado)
+
+    # Los datos pueden ser un objeto o texto en cualquiera de los otros formatos
+    if isinstance(datos, dict):
+        return activo_desde_dict(datos, texto)
+    formato, detectado = detectar_formato(datos, omitir=('siseg',))
+    return formato.parsear(datos, detectado)
+
+
+# ================================================================================================
+# 🧾 JSON
+# ================================================================================================
+
+def activo_desde_dict(qr_data, codigo_qr):
+    ubicacion = qr_data.get('ubicacion', qr_data.get('location', 'Sin ubicación'))
+    return {
+        'codigo': qr_data.get('codigo', qr_data.get('code', codigo_qr)),
+        'nombre': qr_data.get('nombre', qr_data.get('activo', qr_data.get('asset', 'Activo sin nombre'))),
+        'ubicacion': ubicacion,
+        'marca': qr_data.get('marca', qr_data.get('brand', 'Sin marca')),
+        'modelo': qr_data.get('modelo', qr_data.get('model', 'Sin modelo')),
+        'no_serie': qr_data.get('no_serie', qr_data.get('serial', qr_data.get('serie', 'Sin número de serie'))),
+        'codigo_ubicacion': resolutor_ubicaciones.resolver(ubicacion)
+    }
+
+
+def detectar_json(texto, limpio):
+    return True if limpio[:1] == '{' and limpio[-1:] == '}' else None
+
+
+@registrar_formato('json', detectar_json)
+def parsear_json(texto, detectado):
+    return activo_desde_dict(json.loads(texto), texto)
+
+
+# ================================================================================================
+# 📝 TEXTO ESTRUCTURADO ("Activo: ... Ubicación: ... Marca: ...")
+# ================================================================================================
+
+# Etiquetas del texto estructurado por campo (en orden de prioridad)
+PATRONES_TEXTO_ESTRUCTURADO = {
+    'nombre': ['activo:', 'asset:', 'equipo:', 'item:'],
+    'ubicacion': ['ubicación:', 'ubicacion:', 'location:', 'lugar:'],
+    'marca': ['marca:', 'brand:', 'fabricante:'],
+    'modelo': ['modelo:', 'model:', 'tipo:'],
+    'no_serie': ['n. serie:', 'serie:', 'serial:', 'número de serie:', 'numero de serie:', 'sn:']
+}
+CAMPO_POR_ETIQUETA = {
+    palabra_clave: campo
+    for campo, palabras_clave in PATRONES_TEXTO_ESTRUCTURADO.items()
+    for palabra_clave in palabras_clave
+}
+# Una expresión con todas las etiquetas; la búsqueda anticipada encuentra también etiquetas traslapadas
+# (ninguna etiqueta es prefijo de otra, así que en cada posición coincide a lo más una)
+PATRON_ETIQUETAS_TEXTO = re.compile(
+    '(?=(' + '|'.join(re.escape(palabra_clave) for palabra_clave in CAMPO_POR_ETIQUETA) + '))'
+)
+
+# Etiquetas que identifican el formato (todas terminan en ':')
+ETIQUETAS_DETECCION = ['activo:', 'ubicación:', 'marca:', 'modelo:', 'serie:']
+
+
+def detectar_texto_estructurado(texto, limpio):
+    # Sin ':' no puede haber etiquetas; así se evita convertir a minúsculas el resto de los códigos
+    if ':' not in texto:
+        return None
+    texto_busqueda = texto.lower()
+    return texto_busqueda if any(palabra in texto_busqueda for palabra in ETIQUETAS_DETECCION) else None
+
+
+@registrar_formato('texto_estructurado', detectar_texto_estructurado)
+def parsear_texto_detectado(texto, texto_busqueda):
+    return parsear_texto_estructurado(texto, texto_busqueda)
+
+
+def parsear_texto_estructurado(texto_qr, texto_busqueda=None):
+    """
+    Parsea texto estructurado como:
+    "Activo: Escritorio en L Ubicación: 1er piso R.H. Marca: Techni mobili Modelo: Havano N. Serie: -."
+    """
+    # Inicializar valores por defecto
+    resultado = {
+        'codigo': texto_qr[:20] + '...' if len(texto_qr) > 20 else texto_qr,  # Usar parte del texto como código
+        'nombre': 'Activo sin nombre',
+        'ubicacion': 'Sin ubicación',
+        'marca': 'Sin marca',
+        'modelo': 'Sin modelo',
+        'no_serie': 'Sin número de serie'
+    }
+
+    try:
+        # Convertir texto a minúsculas para búsqueda, pero mantener original para extraer valores
+        if texto_busqueda is None:
+            texto_busqueda = texto_qr.lower()
+
+        # Una sola pasada: posición y campo de cada etiqueta encontrada, en orden
+        posiciones = []
+        campos_en_posicion = []
+        primera_posicion = {}
+        for coincidencia in PATRON_ETIQUETAS_TEXTO.finditer(texto_busqueda):
+            palabra_clave = coincidencia.group(1)
+            posiciones.append(coincidencia.start())
+            campos_en_posicion.append(CAMPO_POR_ETIQUETA[palabra_clave])
+            primera_posicion.setdefault(palabra_clave, coincidencia.start())
+
+        for campo, palabras_clave in PATRONES_TEXTO_ESTRUCTURADO.items():
+            for palabra_clave in palabras_clave:
+                inicio = primera_posicion.get(palabra_clave)
+                if inicio is None:
+                    continue
+
+                # El valor empieza después de la palabra clave
+                inicio_valor = inicio + len(palabra_clave)
+
+                # Y termina en la siguiente etiqueta de otro campo (o al final del texto)
+                fin_valor = len(texto_qr)
+                indice = bisect.bisect_left(posiciones, inicio_valor)
+                while indice < len(posiciones):
+                    if campos_en_posicion[indice] != campo:
+                        fin_valor = min(fin_valor, posiciones[indice])
+                        break
+                    indice += 1
+
+                # Extraer el valor y limpiarlo
+                valor = texto_qr[inicio_valor:fin_valor].strip()
+
+                # Limpiar caracteres innecesarios al final
+                valor = valor.rstrip('.,;:').strip()
+
+                if valor:
+                    resultado[campo] = valor
+                break
+
+        # Si no se encontró nombre, usar la primera parte como nombre
+        if resultado['nombre'] == 'Activo sin nombre' and resultado['codigo']:
+            resultado['nombre'] = resultado['codigo']
+
+        # Generar un código más limpio si es posible
+        if resultado['nombre'] != 'Activo sin nombre':
+            # Tomar las primeras palabras del nombre como código
+            palabras_nombre = resultado['nombre'].split()[:3]
+            codigo_generado = ''.join(palabra[:3].upper() for palabra in palabras_nombre if palabra.isalpha())
+            if len(codigo_generado) >= 3:
+                resultado['codigo'] = codigo_generado
+
+        # Agregar código de ubicación
+        resultado['codigo_ubicacion'] = resolutor_ubicaciones.resolver(resultado['ubicacion'])
+
+        return resultado
+
+    except Exception:
+        # Si hay error en el parsing, devolver el texto original como nombre
+        return activo_sin_datos(texto_qr[:20] + '...' if len(texto_qr) > 20 else texto_qr, texto_qr)
+
+
+# ================================================================================================
+# ✂️ TEXTO SEPARADO POR | Y TEXTO SIMPLE
+# ================================================================================================
+
+def detectar_pipes(texto, limpio):
+    return True if '|' in texto else None
+
+
+@registrar_formato('separado_pipes', detectar_pipes)
+def parsear_pipes(texto, detectado):
+    partes = texto.split('|')
+    ubicacion = partes[2].strip() if len(partes) > 2 else 'Sin ubicación'
+    return {
+        'codigo': partes[0].strip() if len(partes) > 0 else texto,
+        'nombre': partes[1].strip() if len(partes) > 1 else 'Activo sin nombre',
+        'ubicacion': ubicacion,
+        'marca': partes[3].strip() if len(partes) > 3 else 'Sin marca',
+        'modelo': partes[4].strip() if len(partes) > 4 else 'Sin modelo',
+        'no_serie': partes[5].strip() if len(partes) > 5 else 'Sin número de serie',
+        'codigo_ubicacion': resolutor_ubicaciones.resolver(ubicacion)
+    }
+
+
+def detectar_texto_simple(texto, limpio):
+    # Siempre coincide: debe quedar al final del registro
+    return True
+
+
+@registrar_formato('texto_simple', detectar_texto_simple)
+def parsear_texto_simple(texto, detectado):
+    # Si contiene guión, probablemente sea "código - nombre" (p. ej. "ACT001 - Laptop Dell")
+    if ' - ' in texto:
+        codigo, nombre = texto.split(' - ', 1)
+        return activo_sin_datos(codigo.strip(), nombre.strip())
+    return activo_sin_datos(texto, texto)
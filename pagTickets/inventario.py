@@ -0,0 +1,155 @@
+"""
+Operaciones de inventario por lotes para SISEG
+Los precios calculados se guardan en RegistroQR con bulk_update, un bloque por transacción,
+junto con el delta correspondiente de los resúmenes del inventario.
+"""
+
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .api_services import siseg_api
+from .models import RegistroQR
+from .resumenes import CAMPOS_RESUMEN, DeltaResumen
+
+# Tamaño de bloque y vigencia de un precio guardado (configurables en settings)
+TAMANO_LOTE_PRECIOS = getattr(settings, 'SISEG_PRECIOS_LOTE', 500)
+VIGENCIA_PRECIO_HORAS = getattr(settings, 'SISEG_PRECIOS_VIGENCIA_HORAS', 24)
+
+# Columnas que escribe la actualización de precios
+CAMPOS_PRECIO = [
+    'precio_actual',
+    'precio_min_mercado',
+    'precio_max_mercado',
+    'fuentes_precio',
+    'ultima_actualizacion_precio',
+    # auto_now no aplica con bulk_update: se asigna a mano para que las exportaciones detecten el cambio
+    'fecha_actualizacion',
+]
+
+
+def _decimal(valor):
+    if valor is None:
+        return None
+    return Decimal(str(valor)).quantize(Decimal('0.01'))
+
+
+def limite_vigencia(vigencia_horas=None, ahora=None):
+    """Fecha a partir de la cual un precio guardado sigue vigente"""
+    ahora = ahora or timezone.now()
+    return ahora - timedelta(hours=VIGENCIA_PRECIO_HORAS if vigencia_horas is None else vigencia_horas)
+
+
+def precio_vigente(registro, limite):
+    return registro.ultima_actualizacion_precio is not None and registro.ultima_actualizacion_precio >= limite
+
+
+def asignar_precio(registro, precio_info, ahora):
+    """Copia el resultado de buscar_precio_rapido en las columnas de precio del registro"""
+    registro.precio_actual = _decimal(precio_info.get('precio_estimado'))
+    registro.precio_min_mercado = _decimal(precio_info.get('precio_min'))
+    registro.precio_max_mercado = _decimal(precio_info.get('precio_max'))
+    registro.fuentes_precio = precio_info.get('fuente', '')
+    registro.ultima_actualizacion_precio = ahora
+    registro.fecha_actualizacion = ahora
+
+
+def actualizar_precios_bloque(registros, precios, ahora):
+    """
+    Asigna los precios a un bloque de registros y los guarda en una sola transacción
+    junto con el delta de los resúmenes (bulk_update no envía señales).
+    """
+    if not registros:
+        return
+    delta = DeltaResumen()
+    for registro, precio_info in zip(registros, precios):
+        delta.restar(registro)
+        asignar_precio(registro, precio_info, ahora)
+        delta.sumar(registro)
+    with transaction.atomic():
+        RegistroQR.objects.bulk_update(registros, CAMPOS_PRECIO)
+        delta.aplicar()
+
+
+def _bloques(lista, tamano):
+    for inicio in range(0, len(lista), tamano):
+        yield lista[inicio:inicio + tamano]
+
+
+def persistir_precios(precios_por_id, tamano_lote=None, vigencia_horas=None, forzar=False):
+    """
+    Guarda precios ya calculados (id -> precio_info) en bloques de `tamano_lote`.
+    Los registros con precio vigente se omiten salvo que `forzar` sea True.
+    Devuelve los conjuntos de ids persistidos, vigentes y no encontrados.
+    """
+    tamano_lote = tamano_lote or TAMANO_LOTE_PRECIOS
+    ahora = timezone.now()
+    limite = limite_vigencia(vigencia_horas, ahora)
+
+    persistidos, vigentes = set(), set()
+    ids = list(precios_por_id)
+    for bloque in _bloques(ids, tamano_lote):
+        registros = RegistroQR.objects.filter(id__in=bloque).only('id', *CAMPOS_PRECIO, *CAMPOS_RESUMEN)
+        por_guardar = []
+        for registro in registros:
+            if not forzar and precio_vigente(registro, limite):
+                vigentes.add(registro.id)
+                continue
+            por_guardar.append(registro)
+        actualizar_precios_bloque(por_guardar, [precios_por_id[registro.id] for registro in por_guardar], ahora)
+        persistidos.update(registro.id for registro in por_guardar)
+
+    no_encontrados = set(ids) - persistidos - vigentes
+    return {'persistidos': persistidos, 'vigentes': vigentes, 'no_encontrados': no_encontrados}
+
+
+def refrescar_precios_inventario(tamano_lote=None, vigencia_horas=None, forzar=False, progreso=None):
+    """
+    Recalcula y guarda el precio de todos los activos con marca y modelo.
+    Recorre la tabla por id (keyset) para no cargarla completa en memoria.
+    """
+    tamano_lote = tamano_lote or TAMANO_LOTE_PRECIOS
+    ahora = timezone.now()
+    inicio = time.monotonic()
+
+    pendientes = RegistroQR.objects.exclude(marca='').exclude(modelo='')
+    if not forzar:
+        limite = limite_vigencia(vigencia_horas, ahora)
+        pendientes = pendientes.filter(
+            Q(ultima_actualizacion_precio__isnull=True) | Q(ultima_actualizacion_precio__lt=limite)
+        )
+    pendientes = pendientes.order_by('id').only('id', 'marca', 'modelo', *CAMPOS_PRECIO, *CAMPOS_RESUMEN)
+
+    persistidos = 0
+    ultimo_id = 0
+    while True:
+        bloque = list(pendientes.filter(id__gt=ultimo_id)[:tamano_lote])
+        if not bloque:
+            break
+        # Mismos datos que envía el cliente en /api/actualizar-precios/
+        precios = [
+            siseg_api.buscar_precio_rapido({
+                'marca': registro.marca,
+                'modelo': registro.modelo,
+                'nombre': f"{registro.marca} {registro.modelo}"
+            })
+            for registro in bloque
+        ]
+        actualizar_precios_bloque(bloque, precios, ahora)
+        persistidos += len(bloque)
+        ultimo_id = bloque[-1].id
+        if progreso:
+            progreso(persistidos)
+
+    segundos = time.monotonic() - inicio
+    return {
+        'persistidos': persistidos,
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(persistidos / segundos, 1) if segundos > 0 else 0,
+    }
+
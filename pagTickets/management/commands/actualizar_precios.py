@@ -0,0 +1,36 @@
+"""
+Comando para recalcular y guardar el precio de los activos del inventario
+
+Uso:
+    python manage.py actualizar_precios
+    python manage.py actualizar_precios --lote 1000 --vigencia-horas 6
+    python manage.py actualizar_precios --forzar
+"""
+
+from django.core.management.base import BaseCommand
+
+from pagTickets.inventario import TAMANO_LOTE_PRECIOS, VIGENCIA_PRECIO_HORAS, refrescar_precios_inventario
+
+
+class Command(BaseCommand):
+    help = 'Actualiza precio_actual, rango de mercado y fuentes de los activos con marca y modelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_PRECIOS,
+                            help=f'Registros por transacción (default: {TAMANO_LOTE_PRECIOS})')
+        parser.add_argument('--vigencia-horas', type=float, default=VIGENCIA_PRECIO_HORAS,
+                            help=f'Omitir precios actualizados hace menos de N horas (default: {VIGENCIA_PRECIO_HORAS})')
+        parser.add_argument('--forzar', action='store_true', help='Actualizar también los precios vigentes')
+
+    def handle(self, *args, **options):
+        resultado = refrescar_precios_inventario(
+            tamano_lote=max(1, options['lote']),
+            vigencia_horas=options['vigencia_horas'],
+            forzar=options['forzar'],
+            progreso=lambda total: self.stdout.write(f'  {total} precios actualizados...')
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['persistidos']} precios actualizados en {resultado['segundos']} s "
+            f"({resultado['filas_por_segundo']} filas/s)"
+        ))
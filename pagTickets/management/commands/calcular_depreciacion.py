@@ -0,0 +1,42 @@
+"""
+Comando para calcular y guardar la depreciación de los activos
+
+Uso:
+    python manage.py calcular_depreciacion
+    python manage.py calcular_depreciacion --forzar
+    python manage.py calcular_depreciacion --intervalo 60   (repite cada 60 minutos)
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from pagTickets.depreciacion import TAMANO_LOTE_DEPRECIACION, MotorDepreciacion
+
+
+class Command(BaseCommand):
+    help = 'Actualiza valor_depreciado, depreciacion_anual y anos_vida_util (sólo registros que cambiaron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_DEPRECIACION,
+                            help=f'Registros por transacción (default: {TAMANO_LOTE_DEPRECIACION})')
+        parser.add_argument('--forzar', action='store_true', help='Recalcular todos los registros')
+        parser.add_argument('--intervalo', type=float, default=0,
+                            help='Minutos entre ejecuciones; 0 ejecuta una sola vez (default: 0)')
+
+    def handle(self, *args, **options):
+        forzar = options['forzar']
+        while True:
+            # Se crea en cada vuelta para tomar cambios de políticas en settings
+            resultado = MotorDepreciacion().actualizar(tamano_lote=max(1, options['lote']), forzar=forzar)
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Periodo {resultado['periodo']}: {resultado['actualizados']} de "
+                f"{resultado['revisados']} registros actualizados en {resultado['segundos']} s"
+            ))
+
+            if options['intervalo'] <= 0:
+                break
+            forzar = False
+            close_old_connections()
+            time.sleep(options['intervalo'] * 60)
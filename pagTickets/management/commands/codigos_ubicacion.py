@@ -0,0 +1,51 @@
+"""
+Comando para consultar y editar los códigos de ubicación sin desplegar
+
+Uso:
+    python manage.py codigos_ubicacion --listar
+    python manage.py codigos_ubicacion --agregar "3er piso soporte" SOP
+    python manage.py codigos_ubicacion --eliminar "3er piso soporte"
+    python manage.py codigos_ubicacion --probar "Almacén planta baja"
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pagTickets.models import CodigoUbicacion
+from pagTickets.ubicaciones import resolutor_ubicaciones
+
+
+class Command(BaseCommand):
+    help = 'Lista, agrega o elimina códigos de ubicación guardados en la base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listar', action='store_true', help='Mostrar la tabla completa de ubicaciones')
+        parser.add_argument('--agregar', nargs=2, metavar=('UBICACION', 'CODIGO'), help='Agregar o cambiar una ubicación')
+        parser.add_argument('--eliminar', metavar='UBICACION', help='Eliminar una ubicación de la base de datos')
+        parser.add_argument('--probar', metavar='UBICACION', help='Mostrar el código que se asignaría a una ubicación')
+
+    def handle(self, *args, **options):
+        if options['agregar']:
+            nombre, codigo = options['agregar']
+            if len(codigo) > 20:
+                raise CommandError('El código no puede tener más de 20 caracteres')
+            CodigoUbicacion.objects.update_or_create(nombre=nombre.strip(), defaults={'codigo': codigo.strip()})
+            self.stdout.write(self.style.SUCCESS(f'✅ "{nombre}" -> {codigo}'))
+
+        if options['eliminar']:
+            eliminados, _ = CodigoUbicacion.objects.filter(nombre=options['eliminar'].strip()).delete()
+            if not eliminados:
+                raise CommandError(f'No existe la ubicación "{options["eliminar"]}" en la base de datos')
+            self.stdout.write(self.style.SUCCESS(f'✅ "{options["eliminar"]}" eliminada'))
+
+        if options['listar']:
+            resolutor_ubicaciones.recargar()
+            for nombre, codigo in sorted(resolutor_ubicaciones.tabla.items(), key=lambda item: (item[1], item[0])):
+                self.stdout.write(f'  {codigo:<8} {nombre}')
+
+        if options['probar']:
+            resolutor_ubicaciones.recargar()
+            self.stdout.write(f'{options["probar"]} -> {resolutor_ubicaciones.resolver(options["probar"])}')
+
+        if options['agregar'] or options['eliminar']:
+            # Los registros ya guardados conservan su código hasta volver a extraer sus datos
+            self.stdout.write('Para actualizar activos existentes: python manage.py rellenar_datos_activos --todos')
@@ -0,0 +1,40 @@
+"""
+Comando para recalcular desde cero los resúmenes del inventario y verificar su consistencia
+
+Uso:
+    python manage.py rebuild_summaries
+    python manage.py rebuild_summaries --solo-verificar
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pagTickets.resumenes import calcular_resumenes, diferencias_resumenes, leer_resumenes, reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Recalcula ResumenInventario desde RegistroQR y reporta los grupos que no coincidían'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--solo-verificar', action='store_true',
+                            help='Sólo comparar; termina con error si hay diferencias')
+
+    def handle(self, *args, **options):
+        if options['solo_verificar']:
+            diferencias = diferencias_resumenes(calcular_resumenes(), leer_resumenes())
+        else:
+            diferencias = reconstruir_resumenes()
+
+        for diferencia in diferencias:
+            dimension, clave = diferencia['grupo']
+            self.stdout.write(
+                f"  ⚠️ {dimension}={clave or '-'}: guardado {diferencia['guardado']} / esperado {diferencia['esperado']}"
+            )
+
+        if options['solo_verificar']:
+            if diferencias:
+                raise CommandError(f'{len(diferencias)} grupos no coinciden; ejecute rebuild_summaries')
+            self.stdout.write(self.style.SUCCESS('✅ Los resúmenes son consistentes'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Resúmenes reconstruidos ({len(diferencias)} grupos corregidos)'
+            ))
@@ -0,0 +1,67 @@
+"""
+Comando para rellenar las columnas estructuradas de RegistroQR en registros antiguos
+
+Uso:
+    python manage.py rellenar_datos_activos
+    python manage.py rellenar_datos_activos --lote 500 --todos
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from pagTickets.cambios import asignar_secuencias
+from pagTickets.resumenes import reconstruir_resumenes
+from pagTickets.models import RegistroQR
+from pagTickets.views import asignar_datos_extraidos, extraer_informacion_qr
+
+# Columnas que se actualizan en cada lote
+CAMPOS_ACTUALIZADOS = [
+    'codigo_activo', 'nombre_activo', 'ubicacion_activo', 'marca', 'modelo', 'numero_serie',
+    'codigo_ubicacion', 'tipo_producto', 'especificaciones_json', 'datos_extraidos',
+    'nombre_normalizado', 'ubicacion_normalizada', 'marca_normalizada', 'modelo_normalizado',
+    'no_serie_normalizado', 'huella_identidad', 'secuencia_cambio',
+    # auto_now no aplica con bulk_update: se asigna a mano para que las exportaciones detecten el cambio
+    'fecha_actualizacion',
+]
+
+
+class Command(BaseCommand):
+    help = 'Parsea una sola vez los códigos QR antiguos y guarda sus datos en columnas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Registros por lote (default: 1000)')
+        parser.add_argument('--todos', action='store_true', help='Volver a procesar también los registros ya rellenados')
+
+    def handle(self, *args, **options):
+        tamano_lote = max(1, options['lote'])
+        registros = RegistroQR.objects.order_by('id').only('id', 'codigo')
+        if not options['todos']:
+            registros = registros.filter(datos_extraidos=False)
+
+        total = 0
+        ultimo_id = 0
+        while True:
+            # Paginación por id para no recorrer de nuevo lo ya procesado
+            lote = list(registros.filter(id__gt=ultimo_id)[:tamano_lote])
+            if not lote:
+                break
+
+            modificado = timezone.now()
+            for registro in lote:
+                asignar_datos_extraidos(registro, extraer_informacion_qr(registro.codigo))
+                registro.fecha_actualizacion = modificado
+
+            with transaction.atomic():
+                # Número nuevo en la secuencia de cambios: la PWA vuelve a descargar estos activos
+                asignar_secuencias(lote)
+                RegistroQR.objects.bulk_update(lote, CAMPOS_ACTUALIZADOS)
+
+            ultimo_id = lote[-1].id
+            total += len(lote)
+            self.stdout.write(f'  {total} registros procesados...')
+
+        # Cambian marca, tipo y código de ubicación: reconstruir los resúmenes
+        if total:
+            reconstruir_resumenes()
+        self.stdout.write(self.style.SUCCESS(f'✅ {total} registros rellenados'))
@@ -2,6 +2,11 @@
 Middleware personalizado para Railway
 """
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .asincrono import adaptar_streaming
+
 class RailwayMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -16,3 +21,34 @@ class RailwayMiddleware:
         response['X-Railway-Health'] = 'OK'
         
         return response
+
+
+class WhiteNoiseAsincrono(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware que también funciona en modo asíncrono. WhiteNoise sólo es síncrono: bajo ASGI
+    obligaría a Django a correr el resto de la cadena y las vistas asíncronas desde un hilo por petición.
+    Esta versión sirve los archivos estáticos desde un hilo y deja pasar las demás peticiones sin cambiar de modo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        # Mismo criterio que MiddlewareMixin de Django
+        self.async_mode = iscoroutinefunction(self.get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return adaptar_streaming(request, await sync_to_async(self.serve)(static_file, request))
+        return await self.get_response(request)
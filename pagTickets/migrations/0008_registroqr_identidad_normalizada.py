@@ -0,0 +1,198 @@
+# Migración para la identidad normalizada de RegistroQR (detección de duplicados indexada)
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+# ================================================================================================
+# Copia congelada del parser y de la normalización vigentes cuando se creó esta migración.
+# No importar pagTickets.views ni pagTickets.models: ese código sigue cambiando y arrastra
+# los trabajos de exportación, el pool de renderizado y el canal de eventos.
+# Sólo se conservan los campos que forman la identidad (nombre, ubicación, marca, modelo, serie).
+# ================================================================================================
+
+# Palabras clave del texto estructurado, en orden de prioridad
+PATRONES_TEXTO = {
+    'nombre': ['activo:', 'asset:', 'equipo:', 'item:'],
+    'ubicacion': ['ubicación:', 'ubicacion:', 'location:', 'lugar:'],
+    'marca': ['marca:', 'brand:', 'fabricante:'],
+    'modelo': ['modelo:', 'model:', 'tipo:'],
+    'no_serie': ['n. serie:', 'serie:', 'serial:', 'número de serie:', 'numero de serie:', 'sn:'],
+}
+
+
+def _sin_datos(nombre):
+    return {
+        'nombre': nombre,
+        'ubicacion': 'Sin ubicación',
+        'marca': 'Sin marca',
+        'modelo': 'Sin modelo',
+        'no_serie': 'Sin número de serie',
+    }
+
+
+def _comprobar_ubicacion(ubicacion):
+    # El parser original calculaba aquí el código de ubicación; una ubicación que no es texto
+    # lanzaba una excepción y el registro caía en el caso por defecto. Se conserva ese efecto.
+    if ubicacion:
+        ubicacion.lower().strip()
+
+
+def _parsear_texto_estructurado(texto_qr):
+    codigo = texto_qr[:20] + '...' if len(texto_qr) > 20 else texto_qr
+    resultado = _sin_datos('Activo sin nombre')
+    try:
+        texto_busqueda = texto_qr.lower()
+        for campo, palabras_clave in PATRONES_TEXTO.items():
+            for palabra_clave in palabras_clave:
+                inicio = texto_busqueda.find(palabra_clave)
+                if inicio == -1:
+                    continue
+                inicio_valor = inicio + len(palabra_clave)
+                fin_valor = len(texto_qr)
+                for otro_campo, otras_palabras in PATRONES_TEXTO.items():
+                    if otro_campo != campo:
+                        for otra_palabra in otras_palabras:
+                            pos_siguiente = texto_busqueda.find(otra_palabra, inicio_valor)
+                            if pos_siguiente != -1 and pos_siguiente < fin_valor:
+                                fin_valor = pos_siguiente
+                valor = texto_qr[inicio_valor:fin_valor].strip().rstrip('.,;:').strip()
+                if valor:
+                    resultado[campo] = valor
+                break
+        if resultado['nombre'] == 'Activo sin nombre' and codigo:
+            resultado['nombre'] = codigo
+        return resultado
+    except Exception:
+        return _sin_datos(texto_qr)
+
+
+def _extraer_informacion_qr(codigo_qr):
+    try:
+        if codigo_qr.strip().startswith('{') and codigo_qr.strip().endswith('}'):
+            qr_data = json.loads(codigo_qr)
+            ubicacion = qr_data.get('ubicacion', qr_data.get('location', 'Sin ubicación'))
+            info = {
+                'nombre': qr_data.get('nombre', qr_data.get('activo', qr_data.get('asset', 'Activo sin nombre'))),
+                'ubicacion': ubicacion,
+                'marca': qr_data.get('marca', qr_data.get('brand', 'Sin marca')),
+                'modelo': qr_data.get('modelo', qr_data.get('model', 'Sin modelo')),
+                'no_serie': qr_data.get('no_serie', qr_data.get('serial', qr_data.get('serie', 'Sin número de serie'))),
+            }
+            _comprobar_ubicacion(ubicacion)
+            return info
+
+        if any(palabra in codigo_qr.lower() for palabra in ['activo:', 'ubicación:', 'marca:', 'modelo:', 'serie:']):
+            return _parsear_texto_estructurado(codigo_qr)
+
+        if '|' in codigo_qr:
+            partes = codigo_qr.split('|')
+            ubicacion = partes[2].strip() if len(partes) > 2 else 'Sin ubicación'
+            return {
+                'nombre': partes[1].strip() if len(partes) > 1 else 'Activo sin nombre',
+                'ubicacion': ubicacion,
+                'marca': partes[3].strip() if len(partes) > 3 else 'Sin marca',
+                'modelo': partes[4].strip() if len(partes) > 4 else 'Sin modelo',
+                'no_serie': partes[5].strip() if len(partes) > 5 else 'Sin número de serie',
+            }
+
+        nombre = codigo_qr
+        if ' - ' in codigo_qr:
+            nombre = codigo_qr.split(' - ', 1)[1].strip()
+        return _sin_datos(nombre)
+
+    except Exception:
+        return _sin_datos(codigo_qr)
+
+
+def _normalizar(valor):
+    if valor is None:
+        return ''
+    return str(valor).strip().lower()[:255]
+
+
+def _calcular_identidad(activo_info):
+    identidad = {
+        'nombre_normalizado': _normalizar(activo_info.get('nombre')),
+        'ubicacion_normalizada': _normalizar(activo_info.get('ubicacion')),
+        'marca_normalizada': _normalizar(activo_info.get('marca')),
+        'modelo_normalizado': _normalizar(activo_info.get('modelo')),
+        'no_serie_normalizado': _normalizar(activo_info.get('no_serie')),
+    }
+    base_huella = '\x1f'.join([
+        identidad['nombre_normalizado'],
+        identidad['ubicacion_normalizada'],
+        identidad['marca_normalizada'],
+        identidad['modelo_normalizado'],
+    ])
+    identidad['huella_identidad'] = hashlib.sha1(base_huella.encode('utf-8')).hexdigest()
+    return identidad
+
+
+def rellenar_identidad(apps, schema_editor):
+    """Calcula la identidad normalizada de los registros existentes, por lotes"""
+    RegistroQR = apps.get_model('pagTickets', 'RegistroQR')
+    campos = [
+        'nombre_normalizado', 'ubicacion_normalizada', 'marca_normalizada',
+        'modelo_normalizado', 'no_serie_normalizado', 'huella_identidad',
+    ]
+
+    lote = []
+    for registro in RegistroQR.objects.only('id', 'codigo').iterator(chunk_size=2000):
+        identidad = _calcular_identidad(_extraer_informacion_qr(registro.codigo))
+        for campo, valor in identidad.items():
+            setattr(registro, campo, valor)
+        lote.append(registro)
+        if len(lote) >= 1000:
+            RegistroQR.objects.bulk_update(lote, campos)
+            lote = []
+
+    if lote:
+        RegistroQR.objects.bulk_update(lote, campos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagTickets', '0007_registroqr_anos_vida_util_registroqr_api_consultada_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroqr',
+            name='nombre_normalizado',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Nombre Normalizado'),
+        ),
+        migrations.AddField(
+            model_name='registroqr',
+            name='ubicacion_normalizada',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Ubicación Normalizada'),
+        ),
+        migrations.AddField(
+            model_name='registroqr',
+            name='marca_normalizada',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Marca Normalizada'),
+        ),
+        migrations.AddField(
+            model_name='registroqr',
+            name='modelo_normalizado',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Modelo Normalizado'),
+        ),
+        migrations.AddField(
+            model_name='registroqr',
+            name='no_serie_normalizado',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='No. Serie Normalizado'),
+        ),
+        migrations.AddField(
+            model_name='registroqr',
+            name='huella_identidad',
+            field=models.CharField(blank=True, default='', max_length=40, verbose_name='Huella de Identidad'),
+        ),
+        migrations.AddIndex(
+            model_name='registroqr',
+            index=models.Index(fields=['huella_identidad', 'no_serie_normalizado'], name='registroqr_identidad_idx'),
+        ),
+        migrations.RunPython(rellenar_identidad, migrations.RunPython.noop),
+    ]
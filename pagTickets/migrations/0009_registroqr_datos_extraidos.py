@@ -0,0 +1,38 @@
+# Migración para guardar en columnas los datos extraídos del QR (parse-once)
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagTickets', '0008_registroqr_identidad_normalizada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroqr',
+            name='codigo_activo',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Código del Activo'),
+        ),
+        migrations.AddField(
+            model_name='registroqr',
+            name='nombre_activo',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Nombre del Activo'),
+        ),
+        migrations.AddField(
+            model_name='registroqr',
+            name='ubicacion_activo',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Ubicación del Activo'),
+        ),
+        migrations.AddField(
+            model_name='registroqr',
+            name='codigo_ubicacion',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='Código de Ubicación'),
+        ),
+        migrations.AddField(
+            model_name='registroqr',
+            name='datos_extraidos',
+            field=models.BooleanField(default=False, verbose_name='Datos Extraídos'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Migración para el índice de paginación por cursor de RegistroQR
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagTickets', '0009_registroqr_datos_extraidos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registroqr',
+            index=models.Index(fields=['-fecha_registro', '-id'], name='registroqr_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagTickets', '0011_trabajo_exportacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroqr',
+            name='huella_depreciacion',
+            field=models.CharField(blank=True, default='', max_length=40, verbose_name='Huella de Depreciación'),
+        ),
+        migrations.AddField(
+            model_name='registroqr',
+            name='periodo_depreciacion',
+            field=models.CharField(blank=True, default='', max_length=7, verbose_name='Periodo de Depreciación'),
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:37
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+# ================================================================================================
+# Copia congelada de la tabla de precios y de la agregación de resumenes.py vigentes cuando se
+# creó esta migración. No importar pagTickets.resumenes ni pagTickets.api_services: la tabla de
+# precios y la regla de valor pueden cambiar, y esta migración debe dar siempre el mismo resultado.
+# ================================================================================================
+
+# (tipo_producto, marca_normalizada) -> rango de precios
+TABLA_PRECIOS = {
+    ('laptops', 'hp'): {'min': 300, 'max': 1500, 'promedio': 700},
+    ('laptops', 'dell'): {'min': 400, 'max': 2000, 'promedio': 900},
+    ('laptops', 'lenovo'): {'min': 350, 'max': 1800, 'promedio': 800},
+    ('laptops', 'acer'): {'min': 250, 'max': 1200, 'promedio': 600},
+    ('laptops', 'asus'): {'min': 300, 'max': 1600, 'promedio': 750},
+    ('laptops', 'toshiba'): {'min': 200, 'max': 1000, 'promedio': 500},
+    ('laptops', 'gateway'): {'min': 150, 'max': 800, 'promedio': 400},
+    ('laptops', 'samsung'): {'min': 300, 'max': 1400, 'promedio': 700},
+    ('desktop', 'hp'): {'min': 200, 'max': 1200, 'promedio': 500},
+    ('desktop', 'dell'): {'min': 250, 'max': 1500, 'promedio': 600},
+    ('desktop', 'lenovo'): {'min': 200, 'max': 1300, 'promedio': 550},
+    ('desktop', 'acer'): {'min': 150, 'max': 1000, 'promedio': 400},
+    ('desktop', 'asus'): {'min': 200, 'max': 1400, 'promedio': 550},
+    ('monitor', 'hp'): {'min': 100, 'max': 800, 'promedio': 300},
+    ('monitor', 'dell'): {'min': 120, 'max': 1000, 'promedio': 400},
+    ('monitor', 'lg'): {'min': 100, 'max': 900, 'promedio': 350},
+    ('monitor', 'samsung'): {'min': 110, 'max': 950, 'promedio': 380},
+    ('monitor', 'acer'): {'min': 80, 'max': 700, 'promedio': 250},
+    ('impresora', 'hp'): {'min': 50, 'max': 600, 'promedio': 200},
+    ('impresora', 'canon'): {'min': 60, 'max': 700, 'promedio': 250},
+    ('impresora', 'epson'): {'min': 50, 'max': 650, 'promedio': 220},
+    ('impresora', 'brother'): {'min': 80, 'max': 800, 'promedio': 300},
+    ('telefono', 'samsung'): {'min': 100, 'max': 1200, 'promedio': 400},
+    ('telefono', 'apple'): {'min': 200, 'max': 1500, 'promedio': 600},
+    ('telefono', 'xiaomi'): {'min': 80, 'max': 600, 'promedio': 250},
+    ('telefono', 'huawei'): {'min': 90, 'max': 800, 'promedio': 300},
+}
+
+PRECIO_GENERICO = {'promedio': 300, 'min': 100, 'max': 800}
+
+# Dimensión del resumen -> columna de RegistroQR que define el grupo
+DIMENSIONES = {
+    'ubicacion': 'codigo_ubicacion',
+    'marca': 'marca_normalizada',
+    'tipo': 'tipo_producto',
+}
+
+METRICAS = ['valor_total', 'valor_min', 'valor_max', 'valor_depreciado']
+
+CAMPO_MONEDA = models.DecimalField(max_digits=14, decimal_places=2)
+
+
+def _expresion_precio(campo, clave_rango):
+    # El precio guardado o, si no existe, el de la tabla para (tipo, marca), o el genérico
+    casos = [
+        When(tipo_producto=tipo, marca_normalizada=marca, then=Value(rango[clave_rango]))
+        for (tipo, marca), rango in TABLA_PRECIOS.items()
+    ]
+    tabla = Case(*casos, default=Value(PRECIO_GENERICO[clave_rango]), output_field=CAMPO_MONEDA)
+    return Coalesce(F(campo), tabla, output_field=CAMPO_MONEDA)
+
+
+def construir_resumenes(apps, schema_editor):
+    """Calcula los resúmenes iniciales a partir de los registros existentes"""
+    RegistroQR = apps.get_model('pagTickets', 'RegistroQR')
+    ResumenInventario = apps.get_model('pagTickets', 'ResumenInventario')
+
+    agregados = {
+        'cantidad': Count('id'),
+        'valor_total': Sum(_expresion_precio('precio_actual', 'promedio')),
+        'valor_min': Sum(_expresion_precio('precio_min_mercado', 'min')),
+        'valor_max': Sum(_expresion_precio('precio_max_mercado', 'max')),
+        'valor_depreciado': Sum('valor_depreciado'),
+    }
+    resumenes = []
+    for dimension, campo in DIMENSIONES.items():
+        for fila in RegistroQR.objects.order_by().values(campo).annotate(**agregados):
+            valores = [Decimal(fila[metrica] or 0).quantize(Decimal('0.01')) for metrica in METRICAS]
+            resumenes.append(ResumenInventario(
+                dimension=dimension, clave=fila[campo] or '', cantidad=fila['cantidad'],
+                **dict(zip(METRICAS, valores))
+            ))
+    ResumenInventario.objects.all().delete()
+    ResumenInventario.objects.bulk_create(resumenes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagTickets', '0012_registroqr_control_depreciacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('ubicacion', 'Código de ubicación'), ('marca', 'Marca'), ('tipo', 'Tipo de producto')], max_length=20, verbose_name='Dimensión')),
+                ('clave', models.CharField(blank=True, max_length=255, verbose_name='Clave')),
+                ('cantidad', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor Total')),
+                ('valor_min', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor Mínimo')),
+                ('valor_max', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor Máximo')),
+                ('valor_depreciado', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor Depreciado')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Inventario',
+                'verbose_name_plural': 'Resúmenes de Inventario',
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'clave'), name='resumen_dimension_clave_unico')],
+            },
+        ),
+        migrations.RunPython(construir_resumenes, migrations.RunPython.noop),
+    ]
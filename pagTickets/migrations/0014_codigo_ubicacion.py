@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagTickets', '0013_resumen_inventario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodigoUbicacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=200, unique=True, verbose_name='Ubicación')),
+                ('codigo', models.CharField(max_length=20, verbose_name='Código')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de actualización')),
+            ],
+            options={
+                'verbose_name': 'Código de Ubicación',
+                'verbose_name_plural': 'Códigos de Ubicación',
+                'ordering': ['codigo', 'nombre'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagTickets', '0014_codigo_ubicacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registroqr',
+            name='clave_idempotencia',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='Clave de Idempotencia'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:57
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def numerar_registros_existentes(apps, schema_editor):
+    """Los registros existentes toman su id como número de secuencia; el contador sigue desde el mayor"""
+    RegistroQR = apps.get_model('pagTickets', 'RegistroQR')
+    SecuenciaCambios = apps.get_model('pagTickets', 'SecuenciaCambios')
+    RegistroQR.objects.update(secuencia_cambio=F('id'))
+    ultimo = RegistroQR.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+    SecuenciaCambios.objects.update_or_create(pk=1, defaults={'valor': ultimo})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagTickets', '0015_registroqr_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EliminacionRegistro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('secuencia', models.BigIntegerField(unique=True, verbose_name='Secuencia')),
+                ('tipo', models.CharField(choices=[('activo', 'Activo eliminado'), ('reinicio', 'Eliminación de todos los activos')], default='activo', max_length=10, verbose_name='Tipo')),
+                ('registro_id', models.BigIntegerField(blank=True, null=True, verbose_name='Id del Registro')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de eliminación')),
+            ],
+            options={
+                'verbose_name': 'Eliminación de Registro',
+                'verbose_name_plural': 'Eliminaciones de Registros',
+                'ordering': ['secuencia'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SecuenciaCambios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor', models.BigIntegerField(default=0, verbose_name='Valor')),
+            ],
+            options={
+                'verbose_name': 'Secuencia de Cambios',
+                'verbose_name_plural': 'Secuencia de Cambios',
+            },
+        ),
+        migrations.AddField(
+            model_name='registroqr',
+            name='secuencia_cambio',
+            field=models.BigIntegerField(blank=True, null=True, unique=True, verbose_name='Secuencia de Cambio'),
+        ),
+        migrations.RunPython(numerar_registros_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagTickets', '0016_secuencia_cambios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoexportacion',
+            name='fecha_latido',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último avance'),
+        ),
+    ]
@@ -1,7 +1,39 @@
 # Importa las funciones necesarias para crear modelos de base de datos en Django
-from django.db import models
+from django.db import models, transaction
+import hashlib
 import json
 
+
+# Función helper para normalizar un valor de identidad (minúsculas, sin espacios extremos)
+def normalizar_valor_identidad(valor):
+    if valor is None:
+        return ''
+    return str(valor).strip().lower()[:255]
+
+
+# Función helper que calcula los campos de identidad persistidos de un activo
+def calcular_identidad_activo(activo_info):
+    """
+    Devuelve los valores normalizados (nombre, ubicación, marca, modelo, no. de serie)
+    y la huella SHA-1 que identifican a un activo para la detección de duplicados.
+    La huella no incluye el número de serie porque éste sólo se compara cuando existe.
+    """
+    identidad = {
+        'nombre_normalizado': normalizar_valor_identidad(activo_info.get('nombre')),
+        'ubicacion_normalizada': normalizar_valor_identidad(activo_info.get('ubicacion')),
+        'marca_normalizada': normalizar_valor_identidad(activo_info.get('marca')),
+        'modelo_normalizado': normalizar_valor_identidad(activo_info.get('modelo')),
+        'no_serie_normalizado': normalizar_valor_identidad(activo_info.get('no_serie')),
+    }
+    base_huella = '\x1f'.join([
+        identidad['nombre_normalizado'],
+        identidad['ubicacion_normalizada'],
+        identidad['marca_normalizada'],
+        identidad['modelo_normalizado'],
+    ])
+    identidad['huella_identidad'] = hashlib.sha1(base_huella.encode('utf-8')).hexdigest()
+    return identidad
+
 # TODO: Implementar modelo ActivoFijo después de solucionar migraciones
 # Define una clase que representa un activo fijo
 # class ActivoFijo(models.Model):
@@ -27,6 +59,8 @@ class RegistroQR(models.Model):
     codigo = models.CharField(max_length=255, verbose_name="Código QR")
     # Campo de fecha y hora que se llena automáticamente cuando se crea el registro
     fecha_registro = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de registro")
+    # Fecha de la última modificación (parte de la versión del inventario para exportaciones)
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
     # Información adicional del escaneo (opcional)
     usuario = models.CharField(max_length=100, blank=True, verbose_name="Usuario")
     ubicacion = models.CharField(max_length=200, blank=True, verbose_name="Ubicación")
@@ -52,6 +86,9 @@ class RegistroQR(models.Model):
     valor_depreciado = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Valor Depreciado")
     depreciacion_anual = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Depreciación Anual")
     anos_vida_util = models.IntegerField(null=True, blank=True, verbose_name="Años Vida Útil")
+    # Mes (AAAA-MM) y huella de los datos con que se calculó la depreciación (ver depreciacion.py)
+    periodo_depreciacion = models.CharField(max_length=7, blank=True, default='', verbose_name="Periodo de Depreciación")
+    huella_depreciacion = models.CharField(max_length=40, blank=True, default='', verbose_name="Huella de Depreciación")
     
     # Información técnica (JSON para flexibilidad)
     especificaciones_json = models.JSONField(default=dict, blank=True, verbose_name="Especificaciones Técnicas")
@@ -78,13 +115,194 @@ class RegistroQR(models.Model):
     api_consultada = models.BooleanField(default=False, verbose_name="API Consultada")
     api_error = models.TextField(blank=True, verbose_name="Error de API")
     
+    # ================================================================================================
+    # 📋 DATOS DEL ACTIVO EXTRAÍDOS DEL QR (se parsean una sola vez al registrar)
+    # ================================================================================================
+    
+    codigo_activo = models.CharField(max_length=255, blank=True, default='', verbose_name="Código del Activo")
+    nombre_activo = models.CharField(max_length=255, blank=True, default='', verbose_name="Nombre del Activo")
+    ubicacion_activo = models.CharField(max_length=255, blank=True, default='', verbose_name="Ubicación del Activo")
+    codigo_ubicacion = models.CharField(max_length=20, blank=True, default='', verbose_name="Código de Ubicación")
+    # Indica si las columnas anteriores ya fueron llenadas (los registros antiguos se rellenan con un comando)
+    datos_extraidos = models.BooleanField(default=False, verbose_name="Datos Extraídos")
+    
+    # ================================================================================================
+    # 🔎 IDENTIDAD NORMALIZADA PARA DETECCIÓN DE DUPLICADOS
+    # ================================================================================================
+    
+    # Valores en minúsculas calculados al guardar (ver calcular_identidad_activo)
+    nombre_normalizado = models.CharField(max_length=255, blank=True, default='', verbose_name="Nombre Normalizado")
+    ubicacion_normalizada = models.CharField(max_length=255, blank=True, default='', verbose_name="Ubicación Normalizada")
+    marca_normalizada = models.CharField(max_length=255, blank=True, default='', verbose_name="Marca Normalizada")
+    modelo_normalizado = models.CharField(max_length=255, blank=True, default='', verbose_name="Modelo Normalizado")
+    no_serie_normalizado = models.CharField(max_length=255, blank=True, default='', verbose_name="No. Serie Normalizado")
+    # Huella SHA-1 de nombre + ubicación + marca + modelo
+    huella_identidad = models.CharField(max_length=40, blank=True, default='', verbose_name="Huella de Identidad")
+    
+    # Clave generada por el cliente para cada escaneo (p. ej. un UUID); permite reintentar sin duplicar
+    clave_idempotencia = models.CharField(max_length=64, null=True, blank=True, unique=True, verbose_name="Clave de Idempotencia")
+    
+    # Número de la secuencia de cambios con que se dio de alta o se modificó (ver cambios.py)
+    secuencia_cambio = models.BigIntegerField(null=True, blank=True, unique=True, verbose_name="Secuencia de Cambio")
+    
     # ================================================================================================
 
     class Meta:
         verbose_name = "Registro QR"
         verbose_name_plural = "Registros QR"
         ordering = ['-fecha_registro']
+        indexes = [
+            # Índice compuesto para verificar duplicados con una sola búsqueda
+            models.Index(fields=['huella_identidad', 'no_serie_normalizado'], name='registroqr_identidad_idx'),
+            # Índice para la paginación por cursor (fecha_registro, id)
+            models.Index(fields=['-fecha_registro', '-id'], name='registroqr_fecha_id_idx'),
+        ]
+
+    # Asigna los campos de identidad normalizados a partir de la información extraída del QR
+    def asignar_identidad(self, activo_info):
+        for campo, valor in calcular_identidad_activo(activo_info).items():
+            setattr(self, campo, valor)
+
+    # Guarda en columnas la información extraída del QR para no volver a parsear el código
+    def asignar_datos_activo(self, activo_info, tipo_producto='', especificaciones=None):
+        self.codigo_activo = str(activo_info.get('codigo', ''))[:255]
+        self.nombre_activo = str(activo_info.get('nombre', ''))[:255]
+        self.ubicacion_activo = str(activo_info.get('ubicacion', ''))[:255]
+        self.marca = str(activo_info.get('marca', ''))[:100]
+        self.modelo = str(activo_info.get('modelo', ''))[:100]
+        self.numero_serie = str(activo_info.get('no_serie', ''))[:100]
+        self.codigo_ubicacion = str(activo_info.get('codigo_ubicacion', ''))[:20]
+        self.tipo_producto = (tipo_producto or '')[:50]
+        self.especificaciones_json = especificaciones or {}
+        self.datos_extraidos = True
+        self.asignar_identidad(activo_info)
+
+    # Las altas toman su número de la secuencia de cambios en la misma transacción en que se guardan
+    def save(self, *args, **kwargs):
+        if not self._state.adding or self.secuencia_cambio is not None:
+            return super().save(*args, **kwargs)
+        from .cambios import reservar_secuencias
+        with transaction.atomic():
+            self.secuencia_cambio = reservar_secuencias()
+            super().save(*args, **kwargs)
 
     # Función que define cómo se va a mostrar este objeto cuando se imprima
     def __str__(self):
         return f"{self.codigo} - {self.fecha_registro.strftime('%Y-%m-%d %H:%M')}"
+
+
+# Define una clase que representa un trabajo de exportación ejecutado en segundo plano
+class TrabajoExportacion(models.Model):
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+    FORMATO_CHOICES = [
+        ('xlsx', 'Excel'),
+        ('csv', 'CSV'),
+    ]
+
+    formato = models.CharField(max_length=10, choices=FORMATO_CHOICES, default='xlsx', verbose_name="Formato")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', verbose_name="Estado")
+    # Versión del inventario exportado (id máximo + total + última modificación)
+    version_datos = models.CharField(max_length=40, db_index=True, verbose_name="Versión de Datos")
+    # Filas escritas y total de filas a escribir
+    progreso = models.IntegerField(default=0, verbose_name="Progreso")
+    total = models.IntegerField(default=0, verbose_name="Total")
+    # Nombre del archivo generado dentro de la carpeta de exportaciones
+    archivo = models.CharField(max_length=255, blank=True, verbose_name="Archivo")
+    error = models.TextField(blank=True, verbose_name="Error")
+    fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fecha de finalización")
+    # Último avance del trabajo; si deja de avanzar se da por perdido (ver trabajos_exportacion.py)
+    fecha_latido = models.DateTimeField(null=True, blank=True, verbose_name="Último avance")
+
+    class Meta:
+        verbose_name = "Trabajo de Exportación"
+        verbose_name_plural = "Trabajos de Exportación"
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"Exportación {self.id} ({self.formato}) - {self.get_estado_display()}"
+
+
+# Define una clase con los totales del inventario por grupo (se mantiene con deltas, ver resumenes.py)
+class ResumenInventario(models.Model):
+    DIMENSION_CHOICES = [
+        ('ubicacion', 'Código de ubicación'),
+        ('marca', 'Marca'),
+        ('tipo', 'Tipo de producto'),
+    ]
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES, verbose_name="Dimensión")
+    # Valor del grupo tal como está en RegistroQR (codigo_ubicacion, marca_normalizada o tipo_producto)
+    clave = models.CharField(max_length=255, blank=True, verbose_name="Clave")
+    cantidad = models.IntegerField(default=0, verbose_name="Cantidad")
+    valor_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Valor Total")
+    valor_min = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Valor Mínimo")
+    valor_max = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Valor Máximo")
+    valor_depreciado = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Valor Depreciado")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
+
+    class Meta:
+        verbose_name = "Resumen de Inventario"
+        verbose_name_plural = "Resúmenes de Inventario"
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'clave'], name='resumen_dimension_clave_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}={self.clave or '-'}: {self.cantidad}"
+
+
+# Define una clase con los códigos de ubicación editables sin desplegar (ver ubicaciones.py)
+class CodigoUbicacion(models.Model):
+    # Texto de ubicación tal como aparece en los QR (se compara sin acentos ni mayúsculas)
+    nombre = models.CharField(max_length=200, unique=True, verbose_name="Ubicación")
+    codigo = models.CharField(max_length=20, verbose_name="Código")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Fecha de actualización")
+
+    class Meta:
+        verbose_name = "Código de Ubicación"
+        verbose_name_plural = "Códigos de Ubicación"
+        ordering = ['codigo', 'nombre']
+
+    def __str__(self):
+        return f"{self.nombre} -> {self.codigo}"
+
+
+# Define una clase con el contador de la secuencia de cambios del inventario (una sola fila, ver cambios.py)
+class SecuenciaCambios(models.Model):
+    valor = models.BigIntegerField(default=0, verbose_name="Valor")
+
+    class Meta:
+        verbose_name = "Secuencia de Cambios"
+        verbose_name_plural = "Secuencia de Cambios"
+
+    def __str__(self):
+        return f"Secuencia de cambios: {self.valor}"
+
+
+# Define una clase con las lápidas de los activos eliminados para la sincronización incremental
+class EliminacionRegistro(models.Model):
+    TIPO_CHOICES = [
+        ('activo', 'Activo eliminado'),
+        ('reinicio', 'Eliminación de todos los activos'),
+    ]
+
+    # Número de la secuencia de cambios en que ocurrió la eliminación
+    secuencia = models.BigIntegerField(unique=True, verbose_name="Secuencia")
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES, default='activo', verbose_name="Tipo")
+    # Id del RegistroQR eliminado (vacío en un reinicio)
+    registro_id = models.BigIntegerField(null=True, blank=True, verbose_name="Id del Registro")
+    fecha = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de eliminación")
+
+    class Meta:
+        verbose_name = "Eliminación de Registro"
+        verbose_name_plural = "Eliminaciones de Registros"
+        ordering = ['secuencia']
+
+    def __str__(self):
+        return f"{self.secuencia}: {self.get_tipo_display()} {self.registro_id or ''}".rstrip()
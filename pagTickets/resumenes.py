@@ -0,0 +1,281 @@
+"""
+Resúmenes materializados del inventario para SISEG
+ResumenInventario guarda cantidad y valores por código de ubicación, marca y tipo de producto.
+Las vistas aplican deltas al registrar o eliminar; los procesos masivos reconstruyen desde cero.
+Las lecturas del dashboard cuestan O(número de grupos) en lugar de recorrer RegistroQR.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .api_services import siseg_api
+from .models import RegistroQR, ResumenInventario
+
+# Dimensión del resumen -> columna de RegistroQR que define el grupo
+DIMENSIONES = {
+    'ubicacion': 'codigo_ubicacion',
+    'marca': 'marca_normalizada',
+    'tipo': 'tipo_producto',
+}
+
+# Métricas acumuladas por grupo (además de la cantidad)
+METRICAS = ['valor_total', 'valor_min', 'valor_max', 'valor_depreciado']
+
+CLAVE_CACHE_RESUMEN = 'siseg:resumen_inventario'
+# Tiempo máximo en caché; con varios procesos y caché local, limita cuánto puede durar un resumen viejo
+TIMEOUT_CACHE_RESUMEN = getattr(settings, 'SISEG_RESUMEN_CACHE_SEGUNDOS', 300)
+
+CAMPO_MONEDA = DecimalField(max_digits=14, decimal_places=2)
+CERO = Decimal('0')
+
+
+def invalidar_resumen_inventario():
+    """Descarta el resumen en caché"""
+    cache.delete(CLAVE_CACHE_RESUMEN)
+
+
+# ================================================================================================
+# 💰 VALOR DE UN ACTIVO (misma regla en Python y en SQL)
+# ================================================================================================
+
+def valores_registro(registro):
+    """
+    (valor, valor_min, valor_max, valor_depreciado) de un registro: el precio guardado o,
+    si no existe, el de la tabla de precios para (tipo_producto, marca), o el genérico.
+    """
+    rango = siseg_api.tabla_precios.get((registro.tipo_producto, registro.marca_normalizada), siseg_api.PRECIO_GENERICO)
+
+    def precio(guardado, clave):
+        return Decimal(guardado) if guardado is not None else Decimal(rango[clave])
+
+    return (
+        precio(registro.precio_actual, 'promedio'),
+        precio(registro.precio_min_mercado, 'min'),
+        precio(registro.precio_max_mercado, 'max'),
+        Decimal(registro.valor_depreciado) if registro.valor_depreciado is not None else CERO,
+    )
+
+
+def expresion_precio(campo, clave_rango):
+    """Versión SQL de valores_registro para una columna de precio"""
+    casos = [
+        When(tipo_producto=tipo, marca_normalizada=marca, then=Value(rango[clave_rango]))
+        for (tipo, marca), rango in siseg_api.tabla_precios.items()
+    ]
+    tabla = Case(*casos, default=Value(siseg_api.PRECIO_GENERICO[clave_rango]), output_field=CAMPO_MONEDA)
+    return Coalesce(F(campo), tabla, output_field=CAMPO_MONEDA)
+
+
+# Columnas que necesita valores_registro (para usar con .only())
+CAMPOS_RESUMEN = [
+    'codigo_ubicacion', 'marca_normalizada', 'tipo_producto',
+    'precio_actual', 'precio_min_mercado', 'precio_max_mercado', 'valor_depreciado',
+]
+
+
+# ================================================================================================
+# ➕ DELTAS INCREMENTALES
+# ================================================================================================
+
+class DeltaResumen:
+    """
+    Acumula cambios por grupo y los aplica en una sola transacción.
+    Para un registro modificado: restar(antes) y sumar(después).
+    """
+
+    def __init__(self):
+        self.cambios = defaultdict(lambda: [0, CERO, CERO, CERO, CERO])
+
+    def _agregar(self, registro, signo):
+        valores = valores_registro(registro)
+        for dimension, campo in DIMENSIONES.items():
+            cambio = self.cambios[(dimension, getattr(registro, campo) or '')]
+            cambio[0] += signo
+            for indice, valor in enumerate(valores, 1):
+                cambio[indice] += signo * valor
+
+    def sumar(self, registro):
+        self._agregar(registro, 1)
+
+    def restar(self, registro):
+        self._agregar(registro, -1)
+
+    def aplicar(self):
+        cambios = {clave: cambio for clave, cambio in self.cambios.items() if any(cambio)}
+        if not cambios:
+            return
+        with transaction.atomic():
+            for (dimension, clave), (cantidad, *valores) in cambios.items():
+                incrementos = {'cantidad': F('cantidad') + cantidad}
+                incrementos.update({metrica: F(metrica) + valor for metrica, valor in zip(METRICAS, valores)})
+                grupo = ResumenInventario.objects.filter(dimension=dimension, clave=clave)
+                if grupo.update(**incrementos):
+                    continue
+                try:
+                    # Grupo nuevo; el savepoint permite reintentar si otro proceso lo creó primero
+                    with transaction.atomic():
+                        ResumenInventario.objects.create(
+                            dimension=dimension, clave=clave, cantidad=cantidad,
+                            **dict(zip(METRICAS, valores))
+                        )
+                except IntegrityError:
+                    grupo.update(**incrementos)
+            # Los grupos que quedaron vacíos se eliminan
+            ResumenInventario.objects.filter(cantidad__lte=0).delete()
+        self.cambios.clear()
+        invalidar_resumen_inventario()
+
+
+def sumar_registro(registro):
+    delta = DeltaResumen()
+    delta.sumar(registro)
+    delta.aplicar()
+
+
+def restar_registro(registro):
+    delta = DeltaResumen()
+    delta.restar(registro)
+    delta.aplicar()
+
+
+def vaciar_resumenes():
+    """Usar cuando se eliminan todos los registros"""
+    ResumenInventario.objects.all().delete()
+    invalidar_resumen_inventario()
+
+
+# ================================================================================================
+# 🔁 RECONSTRUCCIÓN DESDE CERO
+# ================================================================================================
+
+def calcular_resumenes(modelo_registro=RegistroQR):
+    """
+    Calcula todos los grupos con GROUP BY en la base de datos.
+    Devuelve {(dimension, clave): [cantidad, valor_total, valor_min, valor_max, valor_depreciado]}.
+    Recibe el modelo para poder usarse también desde migraciones.
+    """
+    agregados = {
+        'cantidad': Count('id'),
+        'valor_total': Sum(expresion_precio('precio_actual', 'promedio')),
+        'valor_min': Sum(expresion_precio('precio_min_mercado', 'min')),
+        'valor_max': Sum(expresion_precio('precio_max_mercado', 'max')),
+        'valor_depreciado': Sum('valor_depreciado'),
+    }
+    grupos = {}
+    for dimension, campo in DIMENSIONES.items():
+        for fila in modelo_registro.objects.order_by().values(campo).annotate(**agregados):
+            grupos[(dimension, fila[campo] or '')] = [fila['cantidad']] + [
+                Decimal(fila[metrica] or 0).quantize(Decimal('0.01')) for metrica in METRICAS
+            ]
+    return grupos
+
+
+def leer_resumenes(modelo_resumen=ResumenInventario):
+    return {
+        (fila.dimension, fila.clave): [fila.cantidad] + [getattr(fila, metrica) for metrica in METRICAS]
+        for fila in modelo_resumen.objects.all()
+    }
+
+
+def diferencias_resumenes(esperados, guardados):
+    """Lista de grupos cuyo valor guardado no coincide con el calculado desde cero"""
+    diferencias = []
+    for clave in sorted(set(esperados) | set(guardados)):
+        esperado, guardado = esperados.get(clave), guardados.get(clave)
+        if esperado != guardado:
+            diferencias.append({'grupo': clave, 'esperado': esperado, 'guardado': guardado})
+    return diferencias
+
+
+def reconstruir_resumenes(modelo_registro=RegistroQR, modelo_resumen=ResumenInventario):
+    """
+    Recalcula los resúmenes desde cero y reemplaza la tabla.
+    Devuelve las diferencias que había antes de reconstruir.
+    """
+    with transaction.atomic():
+        # Dentro de la transacción para no perder deltas aplicados mientras se reconstruye
+        esperados = calcular_resumenes(modelo_registro)
+        diferencias = diferencias_resumenes(esperados, leer_resumenes(modelo_resumen))
+        modelo_resumen.objects.all().delete()
+        modelo_resumen.objects.bulk_create([
+            modelo_resumen(dimension=dimension, clave=clave, cantidad=cantidad, **dict(zip(METRICAS, valores)))
+            for (dimension, clave), (cantidad, *valores) in esperados.items()
+        ])
+    invalidar_resumen_inventario()
+    return diferencias
+
+
+# ================================================================================================
+# 📊 LECTURA PARA DASHBOARD Y REPORTES
+# ================================================================================================
+
+ETIQUETAS_DIMENSION = {
+    'tipo': lambda clave: clave or 'equipo',
+    'marca': lambda clave: (clave or 'sin marca').upper(),
+    'ubicacion': lambda clave: clave or 'Sin código',
+}
+
+
+def calcular_resumen_inventario():
+    """Totales del inventario y desglose por categoría, marca y código de ubicación desde ResumenInventario"""
+    grupos = {dimension: {} for dimension in DIMENSIONES}
+    for fila in ResumenInventario.objects.all():
+        etiqueta = ETIQUETAS_DIMENSION[fila.dimension](fila.clave)
+        grupo = grupos[fila.dimension].setdefault(etiqueta, {'cantidad': 0, 'valor_total': 0.0})
+        grupo['cantidad'] += fila.cantidad
+        grupo['valor_total'] += float(fila.valor_total)
+
+    # Cada activo pertenece a exactamente un tipo: los totales salen de esa dimensión
+    totales = ResumenInventario.objects.filter(dimension='tipo').aggregate(
+        total_activos=Sum('cantidad'),
+        valor_total_estimado=Sum('valor_total'),
+        valor_total_min=Sum('valor_min'),
+        valor_total_max=Sum('valor_max'),
+        valor_total_depreciado=Sum('valor_depreciado'),
+    )
+    total_activos = totales['total_activos'] or 0
+    valor_total = float(totales['valor_total_estimado'] or 0)
+
+    for por_dimension in grupos.values():
+        for grupo in por_dimension.values():
+            grupo['valor_total'] = round(grupo['valor_total'], 2)
+            if valor_total > 0:
+                grupo['porcentaje'] = round((grupo['valor_total'] / valor_total) * 100, 1)
+
+    def ordenar(por_dimension):
+        return dict(sorted(por_dimension.items(), key=lambda item: item[1]['valor_total'], reverse=True))
+
+    return {
+        'exito': True,
+        'total_activos': total_activos,
+        'valor_total_estimado': round(valor_total, 2),
+        'valor_total_min': round(float(totales['valor_total_min'] or 0), 2),
+        'valor_total_max': round(float(totales['valor_total_max'] or 0), 2),
+        'valor_total_depreciado': round(float(totales['valor_total_depreciado'] or 0), 2),
+        'activos_por_categoria': ordenar(grupos['tipo']),
+        'activos_por_marca': ordenar(grupos['marca']),
+        'activos_por_ubicacion': ordenar(grupos['ubicacion']),
+        'resumen_estadisticas': {
+            'promedio_valor_activo': round(valor_total / total_activos, 2) if total_activos else 0,
+            'grupos': sum(len(por_dimension) for por_dimension in grupos.values()),
+        },
+        'generado': timezone.now().isoformat(),
+    }
+
+
+def resumen_valor_inventario(usar_cache=True):
+    """Resumen del inventario desde caché; se recalcula si fue invalidado o expiró"""
+    if usar_cache:
+        resumen = cache.get(CLAVE_CACHE_RESUMEN)
+        if resumen is not None:
+            return resumen
+    resumen = calcular_resumen_inventario()
+    cache.set(CLAVE_CACHE_RESUMEN, resumen, timeout=TIMEOUT_CACHE_RESUMEN)
+    return resumen
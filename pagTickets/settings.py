@@ -14,6 +14,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from pagTickets.base_datos import configuracion_sqlite, ruta_base_datos
+
 # Construye rutas dentro del proyecto como: BASE_DIR / 'subdir'.
 # Esta es la ruta base del proyecto (carpeta principal)
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -72,7 +74,7 @@ INSTALLED_APPS = [
 # Lista de middleware (software que procesa peticiones antes de llegar a las vistas)
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',           # Seguridad
-    'whitenoise.middleware.WhiteNoiseMiddleware',              # Para servir archivos estáticos
+    'pagTickets.middleware.WhiteNoiseAsincrono',               # Archivos estáticos (WhiteNoise, también con ASGI)
     'corsheaders.middleware.CorsMiddleware',                   # CORS para producción
     'django.contrib.sessions.middleware.SessionMiddleware',    # Sesiones
     'django.middleware.common.CommonMiddleware',               # Funcionalidad común
@@ -113,22 +115,12 @@ WSGI_APPLICATION = 'pagTickets.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite en archivo con WAL y pragmas de producción (ver base_datos.py). En Railway el archivo va en
+# el volumen montado (RAILWAY_VOLUME_MOUNT_PATH) o en SISEG_SQLITE_PATH para sobrevivir a los despliegues
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': configuracion_sqlite(ruta_base_datos(BASE_DIR)),
 }
 
-# En Railway, usar base de datos en memoria para evitar problemas de escritura
-if 'RAILWAY_ENVIRONMENT' in os.environ:
-    DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': ':memory:',
-        }
-    }
-
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -180,10 +172,48 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Configuración para servir archivos estáticos en producción
 # En Railway, agregar whitenoise para servir archivos estáticos
 if 'RAILWAY_ENVIRONMENT' in os.environ:
-    MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+    MIDDLEWARE.insert(1, 'pagTickets.middleware.WhiteNoiseAsincrono')
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Caché de imágenes renderizadas de qrweb (códigos QR y de barras)
+# Presupuesto de memoria por proceso y alias opcional de CACHES para compartirlas entre procesos
+QRWEB_RENDER_CACHE_BYTES = int(os.environ.get('QRWEB_RENDER_CACHE_BYTES', 32 * 1024 * 1024))
+QRWEB_RENDER_CACHE_ALIAS = os.environ.get('QRWEB_RENDER_CACHE_ALIAS') or None
+
+# Servicio de renderizado en procesos de qrweb: procesos por worker web, imágenes en espera antes
+# de responder 503 (por defecto 8 por proceso), segundos máximos por imagen y tiempos agotados
+# seguidos que reinician los procesos (los trabajos colgados siguen ocupando su proceso)
+QRWEB_RENDER_PROCESOS = int(os.environ.get('QRWEB_RENDER_PROCESOS', max(1, min(4, os.cpu_count() or 1))))
+QRWEB_RENDER_COLA_MAXIMA = int(os.environ.get('QRWEB_RENDER_COLA_MAXIMA', 0)) or None
+QRWEB_RENDER_TIMEOUT_SEGUNDOS = float(os.environ.get('QRWEB_RENDER_TIMEOUT_SEGUNDOS', 10))
+QRWEB_RENDER_AGOTADOS_PARA_REINICIAR = int(os.environ.get('QRWEB_RENDER_AGOTADOS_PARA_REINICIAR', 3))
+
+# Palabras clave adicionales para clasificar el tipo de producto (se suman a las de api_services)
+# Ejemplo: {'laptops': ['chromebook'], 'tablet': ['ipad', 'tableta']}
+SISEG_PALABRAS_TIPO_PRODUCTO = {}
+
+# Actualización masiva de precios: registros por transacción y horas que un precio guardado sigue vigente
+SISEG_PRECIOS_LOTE = int(os.environ.get('SISEG_PRECIOS_LOTE', 500))
+SISEG_PRECIOS_VIGENCIA_HORAS = float(os.environ.get('SISEG_PRECIOS_VIGENCIA_HORAS', 24))
+
+# Políticas de depreciación por tipo de producto (se combinan con las de depreciacion.py)
+# Ejemplo: {'laptops': {'metodo': 'linea_recta', 'vida_util': 4}}
+SISEG_POLITICAS_DEPRECIACION = {}
+
+# Códigos de ubicación adicionales (se suman a los de ubicaciones.py; la tabla CodigoUbicacion tiene prioridad)
+# Ejemplo: {'SOP': ['soporte', '3er piso soporte']}
+SISEG_CODIGOS_UBICACION = {}
+# Segundos entre recargas de la tabla de ubicaciones en cada proceso
+SISEG_UBICACIONES_RECARGA_SEGUNDOS = int(os.environ.get('SISEG_UBICACIONES_RECARGA_SEGUNDOS', 60))
+
+# Frase de los QR encriptados de SISEG (debe coincidir con SISEG_SECRET_KEY de los scripts del navegador)
+SISEG_CLAVE_QR = os.environ.get('SISEG_CLAVE_QR', 'SISEG2025_SECURITY_INTEGRAL_SYSTEM_SAFE_QR')
+
+# Eventos en vivo (/eventos/): URL de Redis o de un servidor compatible (Valkey, KeyDB) para repartirlos
+# entre varios procesos o workers, p. ej. redis://localhost:6379/0. Sin ella sólo llegan dentro del proceso
+SISEG_EVENTOS_REDIS_URL = os.environ.get('SISEG_EVENTOS_REDIS_URL') or None
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
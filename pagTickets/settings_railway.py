@@ -6,6 +6,8 @@ Sin dependencias de settings.py base
 from pathlib import Path
 import os
 
+from pagTickets.base_datos import configuracion_sqlite, ruta_base_datos
+
 # Base directory
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,7 +35,8 @@ INSTALLED_APPS = [
 # MIDDLEWARE MÍNIMO
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise con soporte asíncrono (ASGI, ver start.sh)
+    'pagTickets.middleware.WhiteNoiseAsincrono',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,12 +67,9 @@ TEMPLATES = [
 # WSGI
 WSGI_APPLICATION = 'pagTickets.wsgi.application'
 
-# BASE DE DATOS
+# BASE DE DATOS - SQLite con WAL en el volumen de Railway (ver base_datos.py)
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': configuracion_sqlite(ruta_base_datos(BASE_DIR)),
 }
 
 # ARCHIVOS ESTÁTICOS - SIMPLIFICADO
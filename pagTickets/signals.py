@@ -0,0 +1,26 @@
+"""
+Señales de la aplicación pagTickets
+Mantienen al día los datos derivados del inventario cuando se guarda un registro
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CodigoUbicacion, RegistroQR
+from .resumenes import invalidar_resumen_inventario
+from .ubicaciones import resolutor_ubicaciones
+
+
+# No se usa post_delete: con un receptor conectado, QuerySet.delete() deja de borrar en bloque
+# y carga cada fila. Las vistas que eliminan invalidan el resumen explícitamente.
+@receiver(post_save, sender=RegistroQR)
+def registro_guardado(sender, instance, **kwargs):
+    invalidar_resumen_inventario()
+
+
+# Los cambios a la tabla de ubicaciones se ven de inmediato en este proceso
+# (los demás procesos la recargan cada SISEG_UBICACIONES_RECARGA_SEGUNDOS)
+@receiver(post_save, sender=CodigoUbicacion)
+@receiver(post_delete, sender=CodigoUbicacion)
+def codigo_ubicacion_modificado(sender, instance, **kwargs):
+    resolutor_ubicaciones.invalidar()
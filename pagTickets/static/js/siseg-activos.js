@@ -56,6 +56,18 @@ function manejarRespuestaAuth(response) {
     return true;
 }
 
+/**
+ * Genera una clave única por escaneo (cabecera Idempotency-Key) para que
+ * los reintentos del mismo escaneo no dupliquen el registro en el servidor
+ */
+function generarClaveIdempotencia() {
+    if (window.crypto && typeof crypto.randomUUID === 'function') {
+        return crypto.randomUUID();
+    }
+    // crypto.randomUUID sólo existe en contextos seguros (HTTPS o localhost)
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2) + Math.random().toString(36).slice(2);
+}
+
 /**
  * Función wrapper para fetch que maneja autenticación
  */
@@ -135,6 +147,7 @@ const SCAN_REGION = {
 document.addEventListener('DOMContentLoaded', function() {
     console.log('📦 DOM cargado, iniciando aplicación...');
     cargarActivosEscaneados();
+    conectarEventosEnVivo();
     initializeStatusUpdates();
     
     // Configurar búsqueda con Enter
@@ -3033,7 +3046,8 @@ function registrarCodigo(codigo) {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
-            'X-CSRFToken': csrftoken
+            'X-CSRFToken': csrftoken,
+            'Idempotency-Key': generarClaveIdempotencia()
         },
         body: JSON.stringify({ codigo_qr: datosDesencriptados })
     })
@@ -3057,10 +3071,8 @@ function registrarCodigo(codigo) {
                 navigator.vibrate([200, 100, 200]);
             }
             
-            // Recargar activos después de un breve delay
-            setTimeout(() => {
-                cargarActivosEscaneados();
-            }, 1000);
+            // Recargar activos después de un breve delay (junto con los eventos en vivo que lleguen)
+            programarRecargaActivos();
         } else {
             showMessage('❌ Error: ' + data.error, 'error');
             // Sonido de error
@@ -3204,6 +3216,36 @@ function cargarActivosEscaneados() {
     });
 }
 
+// ============================================
+// EVENTOS EN VIVO (escaneos de otros operadores)
+// ============================================
+
+let recargaActivosPendiente = null;
+
+// Recarga la tabla después de un breve delay; varios avisos seguidos (p. ej. un lote) son una sola recarga
+function programarRecargaActivos() {
+    clearTimeout(recargaActivosPendiente);
+    recargaActivosPendiente = setTimeout(cargarActivosEscaneados, 1000);
+}
+
+// Escucha /eventos/ (Server-Sent Events): la tabla se actualiza cuando cualquier dispositivo registra o
+// elimina activos. Con la PWA la recarga sólo descarga los cambios (ver sw.js, sincronizarCambios)
+function conectarEventosEnVivo() {
+    if (!window.EventSource) {
+        return;
+    }
+    const fuente = new EventSource('/eventos/');
+    ['activo', 'activo_eliminado', 'activos_reiniciados', 'recargar'].forEach(tipo => {
+        fuente.addEventListener(tipo, programarRecargaActivos);
+    });
+    fuente.onerror = () => {
+        // El navegador reconecta solo; CLOSED significa que el servidor no ofrece eventos (p. ej. WSGI)
+        if (fuente.readyState === EventSource.CLOSED) {
+            console.log('📡 Eventos en vivo no disponibles: la tabla se actualiza al escanear');
+        }
+    };
+}
+
 // Función para actualizar la tabla de activos (refrescar después de escanear)
 function actualizarTablaActivos() {
     console.log('🔄 Actualizando tabla de activos...');
@@ -3447,15 +3489,46 @@ function eliminarTodos() {
 // FUNCIONES DE EXPORTACIÓN
 // ============================================
 
-// Función para exportar a Excel
-function exportarExcel() {
+// Función para exportar a Excel (trabajo en segundo plano en el servidor)
+async function exportarExcel() {
     console.log('📊 Exportando activos a Excel...');
     showMessage('📊 Generando archivo Excel...', 'success');
     
-    // Pequeño delay para mostrar el mensaje antes de abrir la descarga
-    setTimeout(() => {
+    try {
+        let data = await fetchSeguro('/exportaciones/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ formato: 'xlsx' })
+        });
+        if (!data) return; // Si hay problemas de auth, ya se manejó
+        if (!data.success) throw new Error(data.error);
+        
+        let trabajo = data.trabajo;
+        
+        // Consultar el progreso hasta que el archivo esté listo
+        while (trabajo.estado === 'pendiente' || trabajo.estado === 'en_proceso') {
+            await new Promise(resolve => setTimeout(resolve, 1500));
+            data = await fetchSeguro(trabajo.url_estado);
+            if (!data) return;
+            if (!data.success) throw new Error(data.error);
+            trabajo = data.trabajo;
+            console.log(`📊 Exportación ${trabajo.porcentaje}% (${trabajo.progreso}/${trabajo.total})`);
+        }
+        
+        if (trabajo.estado !== 'completado') {
+            throw new Error(trabajo.error || 'Error generando exportación');
+        }
+        
+        // Descarga directa (attachment): no abre ventana nueva, evita bloqueadores de pop-ups
+        window.location.href = trabajo.url_descarga;
+    } catch (error) {
+        // Si el servicio de exportaciones falla, usar la descarga directa
+        console.error('❌ Error en exportación en segundo plano:', error);
         window.open('/exportar_activos_excel/', '_blank');
-    }, 500);
+    }
 }
 
 // ============================================
@@ -3783,7 +3856,8 @@ async function procesarCodigoQR(codigoQR) {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-                'X-CSRFToken': getCookie('csrftoken')
+                'X-CSRFToken': getCookie('csrftoken'),
+                'Idempotency-Key': generarClaveIdempotencia()
             },
             body: JSON.stringify({
                 codigo_qr: codigoQR,  // El campo correcto que espera el backend
@@ -3872,7 +3946,8 @@ async function procesarQRSisegOficial(codigoQR) {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-                'X-CSRFToken': getCookie('csrftoken')
+                'X-CSRFToken': getCookie('csrftoken'),
+                'Idempotency-Key': generarClaveIdempotencia()
             },
             body: JSON.stringify({
                 codigo_qr: datosDecifrados.codigo || datosDecifrados,  // Enviar datos desencriptados
@@ -21,8 +21,7 @@ const urlsToCache = [
   // Páginas importantes para offline
   baseURL + '/',
   baseURL + '/login/',
-  // APIs críticas para prefetch
-  '/obtener_activos_escaneados/',
+  // APIs críticas para prefetch (los activos se descargan con sincronizarCambios)
   '/verificar_sesion/',
   // Librerías externas críticas - Versiones específicas para cache
   'https://unpkg.com/html5-qrcode@2.3.8/html5-qrcode.min.js',
@@ -42,20 +41,8 @@ self.addEventListener('install', event => {
         console.log('📦 SISEG PWA: Cacheando archivos principales...');
         return cache.addAll(urlsToCache);
       }),
-      // Cache de APIs para offline
-      caches.open(API_CACHE).then(cache => {
-        console.log('💾 SISEG PWA: Preparando cache offline...');
-        // Pre-cachear respuestas offline
-        return cache.put('/offline-data/activos', new Response(JSON.stringify([])));
-      }),
-      // Pre-fetch datos si está online
-      fetch('/obtener_activos_escaneados/')
-        .then(response => response.json())
-        .then(data => {
-          return caches.open(API_CACHE).then(cache => {
-            return cache.put('/offline-data/activos', new Response(JSON.stringify(data)));
-          });
-        })
+      // Pre-fetch datos si está online (por páginas; si ya hay una versión guardada, sólo los cambios)
+      sincronizarCambios()
         .catch(() => {
           console.log('📱 SISEG PWA: Sin datos iniciales, funcionará offline vacío');
         })
@@ -82,6 +69,9 @@ self.addEventListener('activate', event => {
           }
         })
       );
+    }).then(() => {
+      // Datos offline de versiones anteriores (JSON en la Cache API) -> IndexedDB
+      return migrarDatosCacheAPI();
     }).then(() => {
       console.log('✅ SISEG PWA: Service Worker activado');
       return self.clients.claim();
@@ -98,12 +88,23 @@ self.addEventListener('fetch', event => {
     return;
   }
   
+  // Los eventos en vivo son una respuesta sin fin: van directo a la red, sin caché
+  if (url.pathname === '/eventos/') {
+    return;
+  }
+  
   // Manejar peticiones POST/API offline
   if (event.request.method !== 'GET') {
     event.respondWith(handleAPIRequest(event.request));
     return;
   }
 
+  // Lista completa de activos: se responde desde IndexedDB después de traer sólo los cambios
+  if (url.pathname === '/obtener_activos_escaneados/' && !url.search) {
+    event.respondWith(handleObtenerActivos());
+    return;
+  }
+
   // Estrategia Cache First para recursos estáticos
   if (url.pathname.includes('/static/') || url.pathname.includes('/images/')) {
     event.respondWith(cacheFirst(event.request));
@@ -232,18 +233,12 @@ async function networkFirst(request) {
 // Manejar peticiones de API offline
 async function handleAPIRequest(request) {
   const url = new URL(request.url);
+  // fetch() consume el cuerpo de la petición; la copia se usa si hay que guardarla offline
+  const requestOffline = request.method === 'POST' ? request.clone() : request;
   
   try {
     // Intentar petición de red primero
-    const networkResponse = await fetch(request);
-    
-    // Si es exitosa, sincronizar datos
-    if (networkResponse.ok && url.pathname.includes('/obtener_activos_escaneados/')) {
-      const data = await networkResponse.clone().json();
-      await saveOfflineData('activos', data);
-    }
-    
-    return networkResponse;
+    return await fetch(request);
   } catch (error) {
     console.log('🔄 SISEG PWA: API offline para:', url.pathname);
     
@@ -253,10 +248,10 @@ async function handleAPIRequest(request) {
         return handleGetActivos();
       
       case '/registrar_qr/':
-        return handleRegistrarQR(request);
+        return handleRegistrarQR(requestOffline);
       
       case '/eliminar_activo/':
-        return handleEliminarActivo(request);
+        return handleEliminarActivo(requestOffline);
       
       case '/eliminar_todos_activos/':
         return handleEliminarTodos();
@@ -281,34 +276,73 @@ async function handleAPIRequest(request) {
 // ============================================
 
 async function handleGetActivos() {
-  const data = await getOfflineData('activos') || [];
-  return new Response(JSON.stringify(data), {
+  const activos = ordenarActivos(await leerActivosOffline());
+  return new Response(JSON.stringify({ activos: activos, offline: true }), {
     status: 200,
     headers: { 'Content-Type': 'application/json' }
   });
 }
 
+// Trae del servidor sólo los cambios desde la última versión y responde con la copia local
+async function handleObtenerActivos() {
+  try {
+    await sincronizarCambios();
+  } catch (error) {
+    console.log('🔄 SISEG PWA: Sin conexión, activos desde IndexedDB:', error.message);
+    return handleGetActivos();
+  }
+  const activos = ordenarActivos(await leerActivosOffline());
+  return new Response(JSON.stringify({ activos: activos }), {
+    status: 200,
+    headers: { 'Content-Type': 'application/json' }
+  });
+}
+
+// Mismo orden que el servidor (más reciente primero); las altas offline aún sin enviar van al principio
+function ordenarActivos(activos) {
+  return activos.sort((a, b) => (Number(Boolean(b.offline)) - Number(Boolean(a.offline))) || (b.id - a.id));
+}
+
+// Lee el cuerpo de una petición de la página (JSON) o de un formulario
+async function leerDatosPeticion(request) {
+  try {
+    return await request.clone().json();
+  } catch (error) {
+    return Object.fromEntries(await request.formData());
+  }
+}
+
+// Id local de un activo creado offline. Es la llave del store de activos: dos escaneos en el
+// mismo milisegundo no deben compartirla (uno reemplazaría al otro)
+let ultimoIdOffline = 0;
+
+function nuevoIdOffline() {
+  ultimoIdOffline = Math.max(Date.now(), ultimoIdOffline + 1);
+  return ultimoIdOffline;
+}
+
 async function handleRegistrarQR(request) {
   try {
-    const formData = await request.formData();
+    // La página envía JSON ({codigo_qr, usuario, ubicacion}); se acepta también un formulario
+    const datos = await leerDatosPeticion(request);
+    
     const newActivo = {
-      id: Date.now(),
-      codigo: formData.get('codigo') || '',
-      nombre: formData.get('nombre') || '',
-      ubicacion: formData.get('ubicacion') || '',
-      marca: formData.get('marca') || '',
-      modelo: formData.get('modelo') || '',
-      numero_serie: formData.get('numero_serie') || '',
+      id: nuevoIdOffline(),
+      codigo: datos.codigo_qr || datos.codigo || '',
+      nombre: datos.nombre || '',
+      ubicacion: datos.ubicacion || '',
+      usuario: datos.usuario || '',
+      marca: datos.marca || '',
+      modelo: datos.modelo || '',
+      numero_serie: datos.numero_serie || '',
+      // La misma clave en cada reintento: el servidor devuelve el registro original en lugar de duplicarlo
+      clave_idempotencia: request.headers.get('Idempotency-Key') || datos.clave_idempotencia || crypto.randomUUID(),
       fecha_registro: new Date().toISOString(),
       offline: true
     };
     
-    // Guardar en storage offline
-    const activos = await getOfflineData('activos') || [];
-    activos.push(newActivo);
-    await saveOfflineData('activos', activos);
-    
-    // Agregar a operaciones pendientes
+    // Guardar en storage offline y agregar a operaciones pendientes (una escritura por registro)
+    await guardarActivoOffline(newActivo);
     await addPendingOperation('create', newActivo);
     
     return new Response(JSON.stringify({
@@ -331,16 +365,17 @@ async function handleRegistrarQR(request) {
 
 async function handleEliminarActivo(request) {
   try {
-    const formData = await request.formData();
-    const activoId = formData.get('activo_id');
+    const datos = await leerDatosPeticion(request);
+    const activoId = normalizarIdActivo(datos.id || datos.activo_id);
     
     // Eliminar de storage offline
-    const activos = await getOfflineData('activos') || [];
-    const nuevosActivos = activos.filter(activo => activo.id != activoId);
-    await saveOfflineData('activos', nuevosActivos);
+    const activo = await eliminarActivoOffline(activoId);
     
-    // Agregar a operaciones pendientes
-    await addPendingOperation('delete', { id: activoId });
+    // Si el activo sólo existía offline basta con quitar su alta pendiente
+    const altaCancelada = activo && activo.offline && await cancelarAltaPendiente(activoId);
+    if (!altaCancelada) {
+      await addPendingOperation('delete', { id: activoId });
+    }
     
     return new Response(JSON.stringify({
       success: true,
@@ -362,8 +397,9 @@ async function handleEliminarActivo(request) {
 
 async function handleEliminarTodos() {
   try {
-    await saveOfflineData('activos', []);
-    await addPendingOperation('deleteAll', {});
+    await vaciarActivosOffline();
+    // Las operaciones anteriores ya no importan: el servidor quedará vacío de todas formas
+    await reemplazarOperacionesPorEliminarTodos();
     
     return new Response(JSON.stringify({
       success: true,
@@ -398,58 +434,352 @@ async function handleVerificarSesion() {
 }
 
 // ============================================
-// FUNCIONES DE STORAGE OFFLINE
+// ALMACENAMIENTO OFFLINE (IndexedDB)
 // ============================================
+// Cada operación pendiente y cada activo es un registro propio: encolar un escaneo
+// es una sola escritura, sin leer ni reescribir la lista completa.
 
-async function saveOfflineData(key, data) {
-  try {
-    const cache = await caches.open(API_CACHE);
-    const response = new Response(JSON.stringify(data));
-    await cache.put(new Request(`/offline-data/${key}`), response);
-    console.log('💾 SISEG PWA: Datos guardados offline:', key);
-  } catch (error) {
-    console.error('❌ SISEG PWA: Error guardando offline:', error);
+const DB_NAME = 'siseg-offline';
+const DB_VERSION = 2;
+const STORE_OPERACIONES = 'operaciones';
+const STORE_ACTIVOS = 'activos';
+// Valores sueltos por clave (p. ej. la versión de los activos recibida del servidor)
+const STORE_META = 'meta';
+const CLAVE_VERSION_ACTIVOS = 'version_activos';
+
+// Estados de una operación pendiente
+const ESTADO_PENDIENTE = 'pendiente';
+const ESTADO_REINTENTO = 'reintento';
+const ESTADO_RECHAZADA = 'rechazada';
+
+let dbPromise = null;
+
+function abrirDB() {
+  if (!dbPromise) {
+    dbPromise = new Promise((resolve, reject) => {
+      const peticion = indexedDB.open(DB_NAME, DB_VERSION);
+      peticion.onupgradeneeded = () => {
+        const db = peticion.result;
+        if (!db.objectStoreNames.contains(STORE_OPERACIONES)) {
+          // La llave autoincremental conserva el orden en que se encolaron las operaciones
+          const operaciones = db.createObjectStore(STORE_OPERACIONES, { keyPath: 'id', autoIncrement: true });
+          operaciones.createIndex('timestamp', 'timestamp');
+          operaciones.createIndex('estado', 'estado');
+        }
+        if (!db.objectStoreNames.contains(STORE_ACTIVOS)) {
+          db.createObjectStore(STORE_ACTIVOS, { keyPath: 'id' });
+        }
+        if (!db.objectStoreNames.contains(STORE_META)) {
+          db.createObjectStore(STORE_META, { keyPath: 'clave' });
+        }
+      };
+      peticion.onsuccess = () => {
+        const db = peticion.result;
+        // Una versión nueva del Service Worker necesita actualizar la base: cerrar esta conexión
+        db.onversionchange = () => {
+          db.close();
+          dbPromise = null;
+        };
+        resolve(db);
+      };
+      peticion.onerror = () => {
+        dbPromise = null;
+        reject(peticion.error);
+      };
+    });
   }
+  return dbPromise;
 }
 
-async function getOfflineData(key) {
+// Ejecuta fn(tx) en una transacción; fn puede devolver un valor o una función que lo lee al terminar
+async function conTransaccion(stores, modo, fn) {
+  const db = await abrirDB();
+  return new Promise((resolve, reject) => {
+    const tx = db.transaction(stores, modo);
+    let resultado;
+    tx.oncomplete = () => resolve(typeof resultado === 'function' ? resultado() : resultado);
+    tx.onerror = () => reject(tx.error);
+    tx.onabort = () => reject(tx.error);
+    resultado = fn(tx);
+  });
+}
+
+// Los ids del servidor son números; la página a veces los envía como texto
+function normalizarIdActivo(id) {
+  const numero = Number(id);
+  return Number.isNaN(numero) ? id : numero;
+}
+
+async function leerActivosOffline() {
   try {
-    const cache = await caches.open(API_CACHE);
-    const response = await cache.match(`/offline-data/${key}`);
-    if (response) {
-      return await response.json();
-    }
-    return null;
+    return await conTransaccion([STORE_ACTIVOS], 'readonly', tx => {
+      const peticion = tx.objectStore(STORE_ACTIVOS).getAll();
+      return () => peticion.result;
+    });
   } catch (error) {
     console.error('❌ SISEG PWA: Error leyendo offline:', error);
-    return null;
+    return [];
   }
 }
 
+async function guardarActivoOffline(activo) {
+  await conTransaccion([STORE_ACTIVOS], 'readwrite', tx => {
+    tx.objectStore(STORE_ACTIVOS).put(activo);
+  });
+}
+
+// Elimina un activo y devuelve el registro que había (o undefined)
+async function eliminarActivoOffline(activoId) {
+  return conTransaccion([STORE_ACTIVOS], 'readwrite', tx => {
+    const store = tx.objectStore(STORE_ACTIVOS);
+    const peticion = store.get(activoId);
+    peticion.onsuccess = () => store.delete(activoId);
+    return () => peticion.result;
+  });
+}
+
+async function vaciarActivosOffline() {
+  await conTransaccion([STORE_ACTIVOS], 'readwrite', tx => {
+    tx.objectStore(STORE_ACTIVOS).clear();
+  });
+}
+
 async function addPendingOperation(type, data) {
   try {
-    const pending = await getOfflineData('pendingOperations') || [];
-    pending.push({
-      type: type,
-      data: data,
-      timestamp: Date.now()
+    await conTransaccion([STORE_OPERACIONES], 'readwrite', tx => {
+      tx.objectStore(STORE_OPERACIONES).add({
+        type: type,
+        data: data,
+        timestamp: Date.now(),
+        estado: ESTADO_PENDIENTE,
+        intentos: 0,
+        proximoIntento: 0
+      });
     });
-    await saveOfflineData('pendingOperations', pending);
   } catch (error) {
     console.error('❌ SISEG PWA: Error agregando operación pendiente:', error);
   }
 }
 
+// Quita el alta pendiente de un activo creado offline; devuelve true si la encontró
+async function cancelarAltaPendiente(activoId) {
+  return conTransaccion([STORE_OPERACIONES], 'readwrite', tx => {
+    let encontrada = false;
+    const peticion = tx.objectStore(STORE_OPERACIONES).openCursor();
+    peticion.onsuccess = () => {
+      const cursor = peticion.result;
+      if (!cursor) {
+        return;
+      }
+      if (cursor.value.type === 'create' && cursor.value.data.id === activoId) {
+        cursor.delete();
+        encontrada = true;
+        return;
+      }
+      cursor.continue();
+    };
+    return () => encontrada;
+  });
+}
+
+async function reemplazarOperacionesPorEliminarTodos() {
+  await conTransaccion([STORE_OPERACIONES], 'readwrite', tx => {
+    const store = tx.objectStore(STORE_OPERACIONES);
+    store.clear();
+    store.add({
+      type: 'deleteAll',
+      data: {},
+      timestamp: Date.now(),
+      estado: ESTADO_PENDIENTE,
+      intentos: 0,
+      proximoIntento: 0
+    });
+  });
+}
+
+// Lee con un cursor las siguientes operaciones por enviar (en orden), a partir de la llave desdeId
+async function leerPaginaOperaciones(desdeId, limite) {
+  return conTransaccion([STORE_OPERACIONES], 'readonly', tx => {
+    const operaciones = [];
+    const rango = desdeId ? IDBKeyRange.lowerBound(desdeId, true) : null;
+    const peticion = tx.objectStore(STORE_OPERACIONES).openCursor(rango);
+    peticion.onsuccess = () => {
+      const cursor = peticion.result;
+      if (!cursor || operaciones.length >= limite) {
+        return;
+      }
+      if (cursor.value.estado !== ESTADO_RECHAZADA) {
+        operaciones.push(cursor.value);
+      }
+      cursor.continue();
+    };
+    return () => operaciones;
+  });
+}
+
+async function contarOperaciones(estado) {
+  return conTransaccion([STORE_OPERACIONES], 'readonly', tx => {
+    const peticion = tx.objectStore(STORE_OPERACIONES).index('estado').count(estado);
+    return () => peticion.result;
+  });
+}
+
+async function eliminarOperaciones(ids) {
+  if (ids.length === 0) {
+    return;
+  }
+  await conTransaccion([STORE_OPERACIONES], 'readwrite', tx => {
+    const store = tx.objectStore(STORE_OPERACIONES);
+    ids.forEach(id => store.delete(id));
+  });
+}
+
+async function actualizarOperaciones(operaciones) {
+  if (operaciones.length === 0) {
+    return;
+  }
+  await conTransaccion([STORE_OPERACIONES], 'readwrite', tx => {
+    const store = tx.objectStore(STORE_OPERACIONES);
+    operaciones.forEach(operacion => store.put(operacion));
+  });
+}
+
+async function leerVersionActivos() {
+  return conTransaccion([STORE_META], 'readonly', tx => {
+    const peticion = tx.objectStore(STORE_META).get(CLAVE_VERSION_ACTIVOS);
+    return () => peticion.result && peticion.result.valor;
+  });
+}
+
+// Aplica una página de /cambios_activos/ y guarda su versión en la misma transacción
+async function aplicarCambios(pagina) {
+  await conTransaccion([STORE_ACTIVOS, STORE_META], 'readwrite', tx => {
+    const activos = tx.objectStore(STORE_ACTIVOS);
+    const escribir = () => {
+      pagina.activos.forEach(activo => activos.put(activo));
+      pagina.eliminados.forEach(activoId => activos.delete(activoId));
+      tx.objectStore(STORE_META).put({ clave: CLAVE_VERSION_ACTIVOS, valor: pagina.version });
+    };
+    if (!pagina.reiniciar) {
+      escribir();
+      return;
+    }
+    // Reinicio: se descarta la copia del servidor (se conservan las altas offline sin enviar)
+    // antes de escribir, para que el cursor no recorra los activos recién recibidos
+    const peticion = activos.openCursor();
+    peticion.onsuccess = () => {
+      const cursor = peticion.result;
+      if (!cursor) {
+        escribir();
+        return;
+      }
+      if (!cursor.value.offline) {
+        cursor.delete();
+      }
+      cursor.continue();
+    };
+  });
+}
+
+// Pasa al almacenamiento nuevo los datos que versiones anteriores guardaban como JSON en la Cache API
+async function migrarDatosCacheAPI() {
+  try {
+    const cache = await caches.open(API_CACHE);
+    const respuestaOperaciones = await cache.match('/offline-data/pendingOperations');
+    const respuestaActivos = await cache.match('/offline-data/activos');
+    
+    if (respuestaActivos) {
+      // Los activos del servidor ya se descargaron al instalar; sólo faltan los creados offline
+      const data = await respuestaActivos.json();
+      const activos = Array.isArray(data) ? data : (data && data.activos) || [];
+      for (const activo of activos.filter(activo => activo && activo.offline)) {
+        await guardarActivoOffline(activo);
+      }
+      await cache.delete('/offline-data/activos');
+    }
+    if (respuestaOperaciones) {
+      const pendientes = await respuestaOperaciones.json() || [];
+      for (const operacion of pendientes) {
+        const data = operacion.data || {};
+        if (operacion.type === 'create' && !data.clave_idempotencia) {
+          data.clave_idempotencia = crypto.randomUUID();
+        }
+        await addPendingOperation(operacion.type, data);
+      }
+      await cache.delete('/offline-data/pendingOperations');
+      console.log('📦 SISEG PWA: Operaciones pendientes migradas a IndexedDB:', pendientes.length);
+    }
+  } catch (error) {
+    console.error('❌ SISEG PWA: Error migrando datos offline:', error);
+  }
+}
+
+// ============================================
+// CAMBIOS DEL SERVIDOR (sincronización incremental)
+// ============================================
+// El dispositivo guarda la versión que le dio /cambios_activos/ y en cada actualización
+// sólo recibe los activos creados o eliminados después de ella.
+
+// Cambios por petición a /cambios_activos/ (el servidor acepta hasta 1000)
+const DELTA_TAMANO_PAGINA = 500;
+
+// Una sola descarga de cambios a la vez; las llamadas mientras corre esperan la misma
+let descargaCambiosEnCurso = null;
+
+function sincronizarCambios() {
+  if (!descargaCambiosEnCurso) {
+    descargaCambiosEnCurso = descargarCambios().finally(() => {
+      descargaCambiosEnCurso = null;
+    });
+  }
+  return descargaCambiosEnCurso;
+}
+
+// Pide las páginas de cambios posteriores a la versión guardada; devuelve cuántos cambios llegaron
+async function descargarCambios() {
+  let recibidos = 0;
+  let hayMas = true;
+  
+  while (hayMas) {
+    const version = await leerVersionActivos();
+    const params = new URLSearchParams({ limit: DELTA_TAMANO_PAGINA });
+    if (version !== undefined) {
+      params.set('desde', version);
+    }
+    const response = await fetch(`/cambios_activos/?${params}`);
+    if (!response.ok) {
+      throw new Error('Error descargando cambios: HTTP ' + response.status);
+    }
+    const pagina = await response.json();
+    await aplicarCambios(pagina);
+    recibidos += pagina.activos.length + pagina.eliminados.length;
+    hayMas = pagina.hay_mas;
+  }
+  
+  if (recibidos > 0) {
+    console.log('📥 SISEG PWA: Cambios recibidos del servidor:', recibidos);
+  }
+  return recibidos;
+}
+
 // ============================================
 // SINCRONIZACIÓN
 // ============================================
 
+// Escaneos por petición a /registrar_qr_lote/ (el servidor acepta hasta 500)
+const SYNC_TAMANO_LOTE = 100;
+// Peticiones de lote simultáneas
+const SYNC_CONCURRENCIA = 3;
+// Espera antes de reintentar una operación fallida: se duplica en cada intento, hasta el máximo
+const SYNC_ESPERA_BASE_MS = 5000;
+const SYNC_ESPERA_MAXIMA_MS = 60 * 60 * 1000;
+
 // Manejar mensajes desde la aplicación (SIMPLIFICADO)
 self.addEventListener('message', event => {
   if (event.data && event.data.type === 'SKIP_WAITING') {
     self.skipWaiting();
   } else if (event.data && event.data.type === 'SYNC_DATA') {
-    syncPendingData();
+    event.waitUntil(syncPendingData());
   }
 });
 
@@ -461,81 +791,286 @@ self.addEventListener('sync', event => {
   }
 });
 
-// Función para sincronizar datos pendientes
-async function syncPendingData() {
+// Una sola sincronización a la vez; las llamadas mientras corre esperan la misma
+let sincronizacionEnCurso = null;
+
+function syncPendingData() {
+  if (!sincronizacionEnCurso) {
+    sincronizacionEnCurso = sincronizarOperaciones().finally(() => {
+      sincronizacionEnCurso = null;
+    });
+  }
+  return sincronizacionEnCurso;
+}
+
+// Envía las operaciones pendientes en orden. Las altas consecutivas se agrupan en lotes que se
+// envían en paralelo; las eliminaciones se envían solas, después de las altas anteriores.
+// Si algo falla la sincronización se detiene ahí, para no aplicar operaciones fuera de orden.
+async function sincronizarOperaciones() {
+  const inicio = Date.now();
+  let enviadas = 0;
+  let ultimoId = 0;
+  let esperaReintento = null;
+  
   try {
-    const pendingOperations = await getOfflineData('pendingOperations') || [];
-    
-    if (pendingOperations.length === 0) {
-      console.log('✅ SISEG PWA: No hay operaciones pendientes');
-      return;
-    }
-    
-    console.log('🔄 SISEG PWA: Sincronizando', pendingOperations.length, 'operaciones');
-    
-    for (const operation of pendingOperations) {
-      try {
-        await syncOperation(operation);
-      } catch (error) {
-        console.error('❌ SISEG PWA: Error sincronizando operación:', error);
+    while (esperaReintento === null) {
+      const pagina = await leerPaginaOperaciones(ultimoId, SYNC_TAMANO_LOTE * SYNC_CONCURRENCIA);
+      if (pagina.length === 0) {
+        break;
+      }
+      ultimoId = pagina[pagina.length - 1].id;
+      
+      // La primera operación que todavía espera su reintento detiene el recorrido
+      const ahora = Date.now();
+      const indiceEnEspera = pagina.findIndex(operacion => operacion.proximoIntento > ahora);
+      const listas = indiceEnEspera === -1 ? pagina : pagina.slice(0, indiceEnEspera);
+      if (indiceEnEspera !== -1) {
+        esperaReintento = pagina[indiceEnEspera].proximoIntento - ahora;
+      }
+      
+      for (const segmento of segmentarOperaciones(listas)) {
+        const completo = segmento.type === 'create'
+          ? await sincronizarAltas(segmento.operaciones)
+          : await sincronizarOperacionSola(segmento.operaciones[0]);
+        if (!completo) {
+          esperaReintento = SYNC_ESPERA_BASE_MS;
+          break;
+        }
+        enviadas += segmento.operaciones.length;
       }
     }
     
-    // Limpiar operaciones completadas
-    await saveOfflineData('pendingOperations', []);
-    console.log('✅ SISEG PWA: Sincronización completada');
-    
+    if (esperaReintento !== null) {
+      programarReintento(esperaReintento);
+    }
+    await notificarSincronizacion(enviadas, Date.now() - inicio);
   } catch (error) {
     console.error('❌ SISEG PWA: Error en sincronización:', error);
   }
 }
 
-async function syncOperation(operation) {
-  const { type, data } = operation;
+// [{type: 'create', operaciones: [...]}, {type: 'delete', operaciones: [op]}, ...] respetando el orden
+function segmentarOperaciones(operaciones) {
+  const segmentos = [];
+  for (const operacion of operaciones) {
+    const ultimo = segmentos[segmentos.length - 1];
+    if (operacion.type === 'create' && ultimo && ultimo.type === 'create') {
+      ultimo.operaciones.push(operacion);
+    } else {
+      segmentos.push({ type: operacion.type, operaciones: [operacion] });
+    }
+  }
+  return segmentos;
+}
+
+// Arma lotes de altas; los escaneos del mismo código van en el mismo lote para que el servidor
+// los detecte como repetidos y dos lotes en paralelo no registren dos veces el mismo código
+function agruparEnLotes(operaciones, tamano) {
+  const porCodigo = new Map();
+  for (const operacion of operaciones) {
+    const codigo = operacion.data.codigo;
+    if (!porCodigo.has(codigo)) {
+      porCodigo.set(codigo, []);
+    }
+    porCodigo.get(codigo).push(operacion);
+  }
   
-  switch (type) {
-    case 'create':
-      await syncCreateActivo(data);
-      break;
-    case 'delete':
-      await syncDeleteActivo(data.id);
-      break;
-    case 'deleteAll':
-      await syncDeleteAllActivos();
-      break;
+  const lotes = [];
+  let actual = [];
+  for (const grupo of porCodigo.values()) {
+    if (actual.length > 0 && actual.length + grupo.length > tamano) {
+      lotes.push(actual);
+      actual = [];
+    }
+    actual.push(...grupo);
+  }
+  if (actual.length > 0) {
+    lotes.push(actual);
   }
+  return lotes;
 }
 
-async function syncCreateActivo(activoData) {
-  const formData = new FormData();
-  Object.keys(activoData).forEach(key => {
-    if (key !== 'id' && key !== 'offline') {
-      formData.append(key, activoData[key]);
+// Ejecuta tarea(elemento) para todos los elementos, con a lo más `limite` a la vez
+async function ejecutarConConcurrencia(elementos, limite, tarea) {
+  const resultados = new Array(elementos.length);
+  let siguiente = 0;
+  const trabajadores = Array.from({ length: Math.min(limite, elementos.length) }, async () => {
+    while (siguiente < elementos.length) {
+      const indice = siguiente++;
+      resultados[indice] = await tarea(elementos[indice]);
     }
   });
+  await Promise.all(trabajadores);
+  return resultados;
+}
+
+async function sincronizarAltas(operaciones) {
+  const lotes = agruparEnLotes(operaciones, SYNC_TAMANO_LOTE);
+  const resultados = await ejecutarConConcurrencia(lotes, SYNC_CONCURRENCIA, enviarLoteAltas);
+  return resultados.every(Boolean);
+}
+
+// Envía un lote a /registrar_qr_lote/; devuelve false si hay que reintentarlo más tarde
+async function enviarLoteAltas(lote) {
+  let respuesta;
+  try {
+    const response = await fetch('/registrar_qr_lote/', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        escaneos: lote.map(operacion => ({
+          codigo_qr: operacion.data.codigo,
+          usuario: operacion.data.usuario || 'Usuario Offline',
+          ubicacion: operacion.data.ubicacion || 'Escáner Web',
+          clave_idempotencia: operacion.data.clave_idempotencia
+        }))
+      })
+    });
+    if (!response.ok) {
+      throw new Error('HTTP ' + response.status);
+    }
+    respuesta = await response.json();
+    if (!respuesta.success) {
+      // Sesión vencida u otro error del lote completo: se reintenta
+      throw new Error(respuesta.error || 'Lote rechazado');
+    }
+  } catch (error) {
+    console.warn('⚠️ SISEG PWA: Lote sin sincronizar, se reintentará:', error.message);
+    await marcarParaReintento(lote, error.message);
+    return false;
+  }
   
-  const response = await fetch('/registrar_qr/', {
-    method: 'POST',
-    body: formData
+  // Cada escaneo tiene su propio estado: created, already_registered o error
+  const completadas = [];
+  const rechazadas = [];
+  const activosServidor = [];
+  respuesta.resultados.forEach((resultado, indice) => {
+    const operacion = lote[indice];
+    if (resultado.estado === 'error') {
+      rechazadas.push({ ...operacion, estado: ESTADO_RECHAZADA, error: resultado.error });
+    } else {
+      completadas.push(operacion.id);
+      activosServidor.push({ idOffline: operacion.data.id, activo: resultado.activo });
+    }
   });
   
-  if (!response.ok) {
-    throw new Error('Error sincronizando activo creado');
+  await eliminarOperaciones(completadas);
+  await actualizarOperaciones(rechazadas);
+  await reemplazarActivosSincronizados(activosServidor);
+  return true;
+}
+
+// Cambia la copia offline de cada activo por la que devolvió el servidor (con su id real)
+async function reemplazarActivosSincronizados(activosServidor) {
+  await conTransaccion([STORE_ACTIVOS], 'readwrite', tx => {
+    const store = tx.objectStore(STORE_ACTIVOS);
+    activosServidor.forEach(({ idOffline, activo }) => {
+      store.delete(idOffline);
+      if (activo && activo.id !== undefined) {
+        store.put(activo);
+      }
+    });
+  });
+}
+
+// Eliminaciones: una petición por operación; devuelve false si hay que reintentarla más tarde
+async function sincronizarOperacionSola(operacion) {
+  let respuesta;
+  try {
+    respuesta = await syncOperation(operacion);
+  } catch (error) {
+    console.warn('⚠️ SISEG PWA: Operación sin sincronizar, se reintentará:', error.message);
+    await marcarParaReintento([operacion], error.message);
+    return false;
   }
+  
+  if (respuesta.success || respuesta.error === 'Activo no encontrado') {
+    await eliminarOperaciones([operacion.id]);
+    return true;
+  }
+  if (respuesta.redirect) {
+    // Sesión vencida: se reintenta después de iniciar sesión
+    await marcarParaReintento([operacion], respuesta.error);
+    return false;
+  }
+  await actualizarOperaciones([{ ...operacion, estado: ESTADO_RECHAZADA, error: respuesta.error }]);
+  return true;
 }
 
-async function syncDeleteActivo(activoId) {
-  const formData = new FormData();
-  formData.append('activo_id', activoId);
+function calcularEspera(intentos) {
+  const espera = Math.min(SYNC_ESPERA_MAXIMA_MS, SYNC_ESPERA_BASE_MS * 2 ** (intentos - 1));
+  // Variación aleatoria para que varios dispositivos no reintenten al mismo tiempo
+  return Math.round(espera * (0.5 + Math.random() / 2));
+}
+
+async function marcarParaReintento(operaciones, mensaje) {
+  const ahora = Date.now();
+  await actualizarOperaciones(operaciones.map(operacion => {
+    const intentos = (operacion.intentos || 0) + 1;
+    return {
+      ...operacion,
+      estado: ESTADO_REINTENTO,
+      intentos: intentos,
+      proximoIntento: ahora + calcularEspera(intentos),
+      error: mensaje
+    };
+  }));
+}
+
+let temporizadorReintento = null;
+
+function programarReintento(esperaMs) {
+  // Background Sync vuelve a disparar 'sync' cuando hay conexión; el temporizador cubre el resto
+  if (self.registration && self.registration.sync) {
+    self.registration.sync.register('background-sync').catch(() => {});
+  }
+  clearTimeout(temporizadorReintento);
+  temporizadorReintento = setTimeout(syncPendingData, Math.max(esperaMs, 1000));
+}
+
+// Avisa a las páginas abiertas cuántas operaciones se enviaron y cuántas quedan
+async function notificarSincronizacion(enviadas, milisegundos) {
+  const pendientes = await contarOperaciones(ESTADO_PENDIENTE) + await contarOperaciones(ESTADO_REINTENTO);
+  const rechazadas = await contarOperaciones(ESTADO_RECHAZADA);
+  console.log(`✅ SISEG PWA: ${enviadas} operaciones sincronizadas en ${milisegundos} ms (${pendientes} pendientes, ${rechazadas} rechazadas)`);
+  if (!self.clients) {
+    return;
+  }
+  const clientes = await self.clients.matchAll();
+  clientes.forEach(cliente => cliente.postMessage({
+    type: 'SYNC_COMPLETADO',
+    enviadas: enviadas,
+    pendientes: pendientes,
+    rechazadas: rechazadas,
+    milisegundos: milisegundos
+  }));
+}
+
+// Envía una operación que no es alta; devuelve la respuesta JSON del servidor
+async function syncOperation(operation) {
+  const { type, data } = operation;
   
+  switch (type) {
+    case 'delete':
+      return syncDeleteActivo(data.id);
+    case 'deleteAll':
+      return syncDeleteAllActivos();
+    default:
+      return { success: false, error: 'Operación desconocida: ' + type };
+  }
+}
+
+async function syncDeleteActivo(activoId) {
   const response = await fetch('/eliminar_activo/', {
     method: 'POST',
-    body: formData
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ id: activoId })
   });
   
   if (!response.ok) {
     throw new Error('Error sincronizando activo eliminado');
   }
+  return response.json();
 }
 
 async function syncDeleteAllActivos() {
@@ -546,6 +1081,7 @@ async function syncDeleteAllActivos() {
   if (!response.ok) {
     throw new Error('Error sincronizando eliminación masiva');
   }
+  return response.json();
 }
 
 console.log('🚀 SISEG PWA: Service Worker v2.0.0 cargado con funcionalidad offline completa');
@@ -0,0 +1,1164 @@
+"""
+Pruebas de pagTickets
+Ejecutar con: python manage.py test pagTickets
+"""
+
+import base64
+import copy
+import datetime
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from cryptography.hazmat.primitives import padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .api_services import (
+    PALABRAS_TIPO_PRODUCTO, ClasificadorTipoProducto, MemoPrecios, SisegAPIService, cargar_tabla_tipos_producto,
+    siseg_api,
+)
+from .base_datos import CONN_MAX_AGE_DEFAULT, SEGUNDOS_ESPERA_BLOQUEO, configuracion_sqlite, ruta_base_datos
+from .depreciacion import POLITICAS_DEPRECIACION, MotorDepreciacion, calcular_depreciacion, meses_transcurridos
+from .formatos_qr import (
+    CLAVE_SISEG, FIRMA_SISEG, PATRONES_TEXTO_ESTRUCTURADO, derivar_clave_iv, desencriptar_siseg,
+    extraer_informacion_qr, parsear_texto_estructurado,
+)
+from .inventario import persistir_precios
+from .models import CodigoUbicacion, RegistroQR, TrabajoExportacion
+from .resumenes import CAMPOS_RESUMEN, DeltaResumen, calcular_resumenes, diferencias_resumenes, leer_resumenes
+from .trabajos_exportacion import SEGUNDOS_TRABAJO_ABANDONADO, ejecutar_trabajo, ruta_archivo, solicitar_exportacion
+from .ubicaciones import CODIGO_DEFAULT, ResolutorUbicaciones, resolutor_ubicaciones
+
+CAMPOS_PARSER = ('codigo', 'nombre', 'ubicacion', 'marca', 'modelo', 'no_serie', 'codigo_ubicacion')
+
+
+# ================================================================================================
+# 📝 TEXTO ESTRUCTURADO
+# ================================================================================================
+
+# Salida del parser anterior (búsqueda con find por cada etiqueta), generada antes del tokenizador de una pasada.
+# Cada caso: texto -> (codigo, nombre, ubicacion, marca, modelo, no_serie, codigo_ubicacion)
+CORPUS_TEXTO_ESTRUCTURADO = [
+    ('Activo: Escritorio en L Ubicación: 1er piso R.H. Marca: Techni mobili Modelo: Havano N. Serie: -.',
+     ('ESCENL', 'Escritorio en L', '1er piso R.H', 'Techni mobili', 'Havano', '-', 'R.H.')),
+    ('Activo: Laptop Dell Ubicación: Almacén Marca: Dell Modelo: Latitude 5520 N. Serie: ABC123',
+     ('LAPDEL', 'Laptop Dell', 'Almacén', 'Dell', 'Latitude 5520', 'ABC123', 'ALM')),
+    ('Activo: Monitor Marca: HP Modelo: P24 Serie: 5CD123',
+     ('MON', 'Monitor', 'Sin ubicación', 'HP', 'P24', '5CD123', 'ARC')),
+    ('Activo: Silla N. serie: 77 Serie: 88',
+     ('SIL', 'Silla', 'Sin ubicación', 'Sin marca', 'Sin modelo', '77 Serie: 88', 'ARC')),
+    ('Activo: Silla Serie: 88 N. serie: 77',
+     ('SIL', 'Silla', 'Sin ubicación', 'Sin marca', 'Sin modelo', '77', 'ARC')),
+    ('Activo: Impresora Número de serie: X9 Marca: Epson',
+     ('IMP', 'Impresora', 'Sin ubicación', 'Epson', 'Sin modelo', 'X9', 'ARC')),
+    ('Activo: Impresora Numero de serie: X9',
+     ('IMP', 'Impresora', 'Sin ubicación', 'Sin marca', 'Sin modelo', 'X9', 'ARC')),
+    ('Equipo: Switch Serial: SW-01 Location: SITE',
+     ('SWI', 'Switch', 'SITE', 'Sin marca', 'Sin modelo', 'SW-01', 'MON')),
+    ('Asset: Router Brand: Cisco Model: ISR4331 SN: FTX1',
+     ('ROU', 'Router', 'Sin ubicación', 'Cisco', 'ISR4331', 'FTX1', 'ARC')),
+    ('Item: Proyector Lugar: Sala de juntas Fabricante: Epson Tipo: PowerLite',
+     ('PRO', 'Proyector', 'Sala de juntas', 'Epson', 'PowerLite', 'Sin número de serie', 'SJ')),
+    ('Activo: Ubicación: Marca: Modelo: N. Serie:',
+     ('Activo: Ubicación: M...', 'Activo: Ubicación: M...', 'Sin ubicación', 'Sin marca', 'Sin modelo', 'Sin número de serie', 'ARC')),
+    ('Activo:   . Ubicación: ;; Marca: HP',
+     ('Activo:   . Ubicació...', 'Activo:   . Ubicació...', 'Sin ubicación', 'HP', 'Sin modelo', 'Sin número de serie', 'ARC')),
+    ('Ubicación: Dirección Marca: Lenovo',
+     ('Ubicación: Dirección...', 'Ubicación: Dirección...', 'Dirección', 'Lenovo', 'Sin modelo', 'Sin número de serie', 'DIR')),
+    ('marca: hp modelo: z2 serie: 1',
+     ('marca: hp modelo: z2...', 'marca: hp modelo: z2...', 'Sin ubicación', 'hp', 'z2', '1', 'ARC')),
+    ('ACTIVO: CPU UBICACIÓN: GERENCIA MARCA: DELL',
+     ('CPU', 'CPU', 'GERENCIA', 'DELL', 'Sin modelo', 'Sin número de serie', 'GER')),
+    ('Activo: Teclado Marca: Logitech Modelo: K120 Marca: Otro',
+     ('TEC', 'Teclado', 'Sin ubicación', 'Logitech', 'K120', 'Sin número de serie', 'ARC')),
+    ('Activo: 123 456 Ubicación: Ventas',
+     ('Activo: 123 456 Ubic...', '123 456', 'Ventas', 'Sin marca', 'Sin modelo', 'Sin número de serie', 'VEN 1')),
+    ('Activo: Mesa de trabajo grande Ubicación: 2do piso Monitoreo',
+     ('MESDETRA', 'Mesa de trabajo grande', '2do piso Monitoreo', 'Sin marca', 'Sin modelo', 'Sin número de serie', 'MON')),
+    ('Modelo: X Activo: Mouse',
+     ('MOU', 'Mouse', 'Sin ubicación', 'Sin marca', 'X', 'Sin número de serie', 'ARC')),
+    ('Activo: Cámara serie: A modelo: B serial: C',
+     ('CÁM', 'Cámara', 'Sin ubicación', 'Sin marca', 'B', 'A', 'ARC')),
+    ('Activo: Laptop Ubicacion: Almacen Marca: Apple Modelo: MacBook Air N. Serie: C02',
+     ('LAP', 'Laptop', 'Almacen', 'Apple', 'MacBook Air', 'C02', 'ALM')),
+    ('Activo: Disco sn: 1 Ubicación: Archivo',
+     ('DIS', 'Disco', 'Archivo', 'Sin marca', 'Sin modelo', '1', 'ARC')),
+    ('Activo: Laptop Dell Latitude Marca: Dell',
+     ('LAPDELLAT', 'Laptop Dell Latitude', 'Sin ubicación', 'Dell', 'Sin modelo', 'Sin número de serie', 'ARC')),
+    ('serie:',
+     ('serie:', 'serie:', 'Sin ubicación', 'Sin marca', 'Sin modelo', 'Sin número de serie', 'ARC')),
+    ('Activo: Escáner de código Ubicación: 1er piso Almacén. Marca: Zebra, Modelo: DS2208; N. Serie: S1:',
+     ('ESCDECÓD', 'Escáner de código', '1er piso Almacén', 'Zebra', 'DS2208', 'S1', 'ALM')),
+]
+
+
+def _valores_referencia(texto_qr):
+    """Campos extraídos con el algoritmo anterior (find por cada etiqueta); referencia para textos generados"""
+    resultado = {}
+    texto_busqueda = texto_qr.lower()
+    for campo, palabras_clave in PATRONES_TEXTO_ESTRUCTURADO.items():
+        for palabra_clave in palabras_clave:
+            inicio = texto_busqueda.find(palabra_clave)
+            if inicio == -1:
+                continue
+            inicio_valor = inicio + len(palabra_clave)
+            fin_valor = len(texto_qr)
+            for otro_campo, otras_palabras in PATRONES_TEXTO_ESTRUCTURADO.items():
+                if otro_campo != campo:
+                    for otra_palabra in otras_palabras:
+                        pos_siguiente = texto_busqueda.find(otra_palabra, inicio_valor)
+                        if pos_siguiente != -1 and pos_siguiente < fin_valor:
+                            fin_valor = pos_siguiente
+            valor = texto_qr[inicio_valor:fin_valor].strip().rstrip('.,;:').strip()
+            if valor:
+                resultado[campo] = valor
+            break
+    return resultado
+
+
+class TextoEstructuradoTests(TestCase):
+
+    def test_corpus_igual_al_parser_anterior(self):
+        for texto, esperado in CORPUS_TEXTO_ESTRUCTURADO:
+            with self.subTest(texto=texto):
+                resultado = parsear_texto_estructurado(texto)
+                self.assertEqual(tuple(resultado[campo] for campo in CAMPOS_PARSER), esperado)
+
+    def test_extraer_informacion_qr_usa_el_mismo_parser(self):
+        for texto, esperado in CORPUS_TEXTO_ESTRUCTURADO:
+            if ':' in texto and any(etiqueta in texto.lower() for etiqueta in ['activo:', 'ubicación:', 'marca:', 'modelo:', 'serie:']):
+                with self.subTest(texto=texto):
+                    self.assertEqual(tuple(extraer_informacion_qr(texto)[campo] for campo in CAMPOS_PARSER), esperado)
+
+    def test_etiquetas_traslapadas(self):
+        # "n. serie:" contiene "serie:"; la etiqueta de mayor prioridad gana aunque aparezca después
+        self.assertEqual(parsear_texto_estructurado('Activo: Silla Serie: 88 N. serie: 77')['no_serie'], '77')
+        self.assertEqual(parsear_texto_estructurado('Activo: Impresora Número de serie: X9')['no_serie'], 'X9')
+
+    def test_valores_vacios_usan_los_valores_por_defecto(self):
+        resultado = parsear_texto_estructurado('Activo: Ubicación: Marca: Modelo: N. Serie:')
+        self.assertEqual(resultado['ubicacion'], 'Sin ubicación')
+        self.assertEqual(resultado['marca'], 'Sin marca')
+        self.assertEqual(resultado['modelo'], 'Sin modelo')
+        self.assertEqual(resultado['no_serie'], 'Sin número de serie')
+        # Sin nombre se usa el inicio del texto como nombre
+        self.assertEqual(resultado['nombre'], 'Activo: Ubicación: M...')
+
+    def test_textos_generados_igual_al_algoritmo_anterior(self):
+        generador = random.Random(16)
+        piezas = [
+            'activo:', 'Activo:', 'ubicación:', 'Ubicacion:', 'marca:', 'MARCA:', 'modelo:', 'tipo:',
+            'n. serie:', 'serie:', 'serial:', 'número de serie:', 'sn:', 'asset:', 'lugar:',
+            ' ', ' Laptop', ' HP', ' 1er piso', '.', ',', ';', ':', ' -',
+        ]
+        for _ in range(3000):
+            texto = ''.join(generador.choice(piezas) for _ in range(generador.randint(1, 10)))
+            resultado = parsear_texto_estructurado(texto)
+            with self.subTest(texto=texto):
+                for campo, valor in _valores_referencia(texto).items():
+                    self.assertEqual(resultado[campo], valor)
+
+
+# ================================================================================================
+# 🔎 REGISTRO DE ESCANEOS (duplicados e idempotencia)
+# ================================================================================================
+
+def qr_activo(nombre='Laptop', ubicacion='Almacén', marca='Dell', modelo='Latitude 5520', no_serie='SN-1'):
+    return json.dumps({'nombre': nombre, 'ubicacion': ubicacion, 'marca': marca, 'modelo': modelo, 'no_serie': no_serie})
+
+
+class SesionAutenticadaMixin:
+    """Cliente con la sesión iniciada (las vistas de registro verifican session['autenticado'])"""
+
+    def setUp(self):
+        super().setUp()
+        session = self.client.session
+        session['autenticado'] = True
+        session.save()
+
+    def registrar(self, codigo_qr, **extra):
+        datos = {'codigo_qr': codigo_qr, **extra.pop('datos', {})}
+        return self.client.post('/registrar_qr/', json.dumps(datos), content_type='application/json', **extra).json()
+
+
+class RegistrarQRTests(SesionAutenticadaMixin, TestCase):
+
+    def test_mismo_activo_se_detecta_como_duplicado(self):
+        primero = self.registrar(qr_activo())
+        segundo = self.registrar(qr_activo())
+        self.assertTrue(primero['success'])
+        self.assertFalse(primero['already_registered'])
+        self.assertTrue(segundo['already_registered'])
+        self.assertEqual(segundo['activo']['id'], primero['activo']['id'])
+        self.assertEqual(RegistroQR.objects.count(), 1)
+
+    def test_duplicado_sin_distinguir_mayusculas_ni_espacios(self):
+        self.registrar(qr_activo())
+        respuesta = self.registrar(qr_activo(nombre='  LAPTOP ', ubicacion='almacén', marca='DELL'))
+        self.assertTrue(respuesta['already_registered'])
+
+    def test_otro_numero_de_serie_es_otro_activo(self):
+        self.registrar(qr_activo(no_serie='SN-1'))
+        respuesta = self.registrar(qr_activo(no_serie='SN-2'))
+        self.assertFalse(respuesta['already_registered'])
+        self.assertEqual(RegistroQR.objects.count(), 2)
+
+    def test_sin_numero_de_serie_coincide_con_el_registrado(self):
+        self.registrar(qr_activo(no_serie='SN-1'))
+        respuesta = self.registrar(qr_activo(no_serie=''))
+        self.assertTrue(respuesta['already_registered'])
+
+    def test_identidad_normalizada_se_guarda(self):
+        self.registrar(qr_activo(nombre=' Laptop ', marca='DELL'))
+        registro = RegistroQR.objects.get()
+        self.assertEqual(registro.nombre_normalizado, 'laptop')
+        self.assertEqual(registro.marca_normalizada, 'dell')
+        self.assertEqual(len(registro.huella_identidad), 40)
+
+    def test_reintento_con_la_misma_clave_devuelve_el_registro_original(self):
+        primero = self.registrar(qr_activo(), HTTP_IDEMPOTENCY_KEY='escaneo-1')
+        # Un reintento con otro contenido no crea nada: la clave identifica el escaneo
+        reintento = self.registrar(qr_activo(nombre='Otro'), HTTP_IDEMPOTENCY_KEY='escaneo-1')
+        self.assertTrue(reintento['repetido'])
+        self.assertFalse(reintento['already_registered'])
+        self.assertEqual(reintento['activo']['id'], primero['activo']['id'])
+        self.assertEqual(RegistroQR.objects.count(), 1)
+
+    def test_clave_de_idempotencia_en_el_cuerpo(self):
+        primero = self.registrar(qr_activo(), datos={'clave_idempotencia': 'escaneo-2'})
+        reintento = self.registrar(qr_activo(), datos={'clave_idempotencia': 'escaneo-2'})
+        self.assertTrue(reintento['repetido'])
+        self.assertEqual(reintento['activo']['id'], primero['activo']['id'])
+
+    def test_clave_de_idempotencia_invalida(self):
+        respuesta = self.registrar(qr_activo(), datos={'clave_idempotencia': 'x' * 65})
+        self.assertFalse(respuesta['success'])
+        self.assertEqual(RegistroQR.objects.count(), 0)
+
+    def test_sin_sesion_no_registra(self):
+        self.client.session.flush()
+        self.client.cookies.clear()
+        respuesta = self.registrar(qr_activo())
+        self.assertFalse(respuesta['success'])
+        self.assertEqual(RegistroQR.objects.count(), 0)
+
+
+# ================================================================================================
+# 🏷️ CLASIFICADOR DE TIPO DE PRODUCTO
+# ================================================================================================
+
+def _tipo_referencia(nombre, modelo=''):
+    """Clasificación tipo por tipo, como la hacía el servicio antes de compilar la tabla"""
+    texto = f"{nombre} {modelo}".lower()
+    for tipo, palabras in PALABRAS_TIPO_PRODUCTO:
+        if any(palabra in texto for palabra in palabras):
+            return tipo
+    return 'equipo'
+
+
+class ClasificadorTipoProductoTests(TestCase):
+
+    def test_tipos_base(self):
+        casos = [
+            ('Laptop', 'Latitude 5520', 'laptops'),
+            ('ThinkPad', 'T14', 'laptops'),
+            ('Equipo', 'OptiPlex 7090', 'desktop'),
+            ('Monitor', 'P2422H', 'monitor'),
+            ('Impresora', 'LaserJet Pro', 'impresora'),
+            ('Teléfono', 'IP 7841', 'telefono'),
+            ('Silla', 'Ergonómica', 'equipo'),
+            ('', '', 'equipo'),
+        ]
+        for nombre, modelo, esperado in casos:
+            with self.subTest(nombre=nombre, modelo=modelo):
+                self.assertEqual(siseg_api._determinar_tipo_producto(nombre.lower(), modelo.lower()), esperado)
+
+    def test_gana_el_tipo_de_mayor_prioridad(self):
+        # "pc" (desktop) aparece antes en el texto, pero laptops tiene mayor prioridad
+        self.assertEqual(siseg_api._determinar_tipo_producto('pc portátil', ''), 'laptops')
+        self.assertEqual(siseg_api._determinar_tipo_producto('monitor para pc', ''), 'desktop')
+        # Las palabras clave también se reconocen dentro de otras palabras
+        self.assertEqual(siseg_api._determinar_tipo_producto('xlaptop', ''), 'laptops')
+
+    def test_sin_acentos(self):
+        self.assertEqual(siseg_api._determinar_tipo_producto('portatil hp', ''), 'laptops')
+        self.assertEqual(siseg_api._determinar_tipo_producto('movil', ''), 'telefono')
+        self.assertEqual(siseg_api._determinar_tipo_producto('telefono', ''), 'telefono')
+
+    def test_sin_sinonimos_en_ingles_fuera_de_la_tabla(self):
+        for nombre in ['tower', 'screen', 'smartphone', 'cellphone']:
+            with self.subTest(nombre=nombre):
+                self.assertEqual(siseg_api._determinar_tipo_producto(nombre, ''), 'equipo')
+
+    def test_igual_que_la_clasificacion_tipo_por_tipo(self):
+        palabras = [palabra for _, lista in PALABRAS_TIPO_PRODUCTO for palabra in lista]
+        relleno = ['equipo', 'hp', 'dell', 'de', 'oficina', '24"', 'pro', 'x1']
+        generador = random.Random(7)
+        for _ in range(2000):
+            nombre = ' '.join(generador.choice(palabras + relleno) for _ in range(generador.randint(0, 4)))
+            modelo = ' '.join(generador.choice(relleno + palabras) for _ in range(generador.randint(0, 2)))
+            with self.subTest(nombre=nombre, modelo=modelo):
+                self.assertEqual(siseg_api._determinar_tipo_producto(nombre, modelo), _tipo_referencia(nombre, modelo))
+
+    def test_tabla_vacia_devuelve_el_tipo_default(self):
+        self.assertEqual(ClasificadorTipoProducto([]).clasificar('laptop'), 'equipo')
+
+    @override_settings(SISEG_PALABRAS_TIPO_PRODUCTO={'monitor': ['screen'], 'tableta': ['tablet', 'ipad']})
+    def test_extensiones_desde_settings(self):
+        clasificador = ClasificadorTipoProducto(cargar_tabla_tipos_producto())
+        self.assertEqual(clasificador.clasificar('screen 24'), 'monitor')
+        self.assertEqual(clasificador.clasificar('ipad air'), 'tableta')
+        # Los tipos nuevos quedan con la menor prioridad
+        self.assertEqual(clasificador.clasificar('tablet', 'teléfono'), 'telefono')
+        # La tabla base no se modifica
+        self.assertNotIn('screen', dict(PALABRAS_TIPO_PRODUCTO)['monitor'])
+
+
+# ================================================================================================
+# 💾 MEMO DE PRECIOS
+# ================================================================================================
+
+class MemoPreciosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_lru_desalojado_se_recupera_del_cache_de_django(self):
+        memo = MemoPrecios(60, maximo_entradas=2)
+        memo.guardar('a', {'precio': 1})
+        memo.guardar('b', {'precio': 2})
+        memo.obtener('a')  # "a" pasa a ser la más reciente
+        memo.guardar('c', {'precio': 3})
+        self.assertEqual(list(memo._entradas), ['a', 'c'])
+
+        self.assertEqual(memo.obtener('b'), {'precio': 2})
+        self.assertEqual(memo.estadisticas()['aciertos_cache'], 1)
+        # Al volver del caché de Django "b" entra al nivel local y desaloja a "a"
+        self.assertEqual(list(memo._entradas), ['c', 'b'])
+
+        cache.delete(MemoPrecios.PREFIJO + 'a')
+        self.assertIsNone(memo.obtener('a'))
+        self.assertEqual(memo.estadisticas()['fallos'], 1)
+
+    def test_limpiar_solo_vacia_el_nivel_local(self):
+        memo = MemoPrecios(60)
+        memo.guardar('a', {'precio': 1})
+        memo.limpiar()
+        self.assertEqual(memo.obtener('a'), {'precio': 1})
+        self.assertEqual(memo.estadisticas()['aciertos_memoria'], 0)
+        self.assertEqual(memo.estadisticas()['aciertos_cache'], 1)
+
+    def test_nueva_base_de_precios_invalida_lo_memorizado(self):
+        servicio = SisegAPIService()
+        producto = {'nombre': 'Laptop', 'marca': 'HP', 'modelo': 'ProBook'}
+        self.assertEqual(servicio.buscar_precio_rapido(producto)['precio_estimado'], 700)
+        self.assertEqual(servicio.buscar_precio_rapido(producto)['precio_estimado'], 700)
+        self.assertEqual(servicio.memo_precios.estadisticas()['aciertos_memoria'], 1)
+
+        base = copy.deepcopy(servicio.precio_database)
+        base['laptops']['hp'] = {'min': 500, 'max': 1500, 'promedio': 999}
+        version_anterior = servicio.version_precios
+        servicio.actualizar_base_precios(base)
+
+        self.assertNotEqual(servicio.version_precios, version_anterior)
+        # La entrada anterior sigue en el caché de Django, pero con la clave de otra versión
+        self.assertEqual(servicio.buscar_precio_rapido(producto)['precio_estimado'], 999)
+        self.assertEqual(servicio.memo_precios.estadisticas()['aciertos_cache'], 0)
+
+        # Volver a la base anterior recupera su versión y sus entradas del caché de Django
+        servicio.actualizar_base_precios(servicio._cargar_base_precios())
+        self.assertEqual(servicio.version_precios, version_anterior)
+        self.assertEqual(servicio.buscar_precio_rapido(producto)['precio_estimado'], 700)
+        self.assertEqual(servicio.memo_precios.estadisticas()['aciertos_cache'], 1)
+
+    def test_el_resultado_devuelto_es_una_copia(self):
+        servicio = SisegAPIService()
+        producto = {'nombre': 'Monitor', 'marca': 'Dell', 'modelo': ''}
+        servicio.buscar_precio_rapido(producto)['precio_estimado'] = 0
+        self.assertEqual(servicio.buscar_precio_rapido(producto)['precio_estimado'], 400)
+
+
+# ================================================================================================
+# 📋 REPORTE DE INVENTARIO
+# ================================================================================================
+
+class ReporteInventarioTests(SimpleTestCase):
+
+    def test_elementos_que_no_son_activos_se_omiten(self):
+        valido = {'id': 1, 'nombre': 'Laptop', 'marca': 'Dell', 'modelo': 'Latitude 5520'}
+        esperado = siseg_api.generar_reporte_inventario([valido])
+
+        reporte = siseg_api.generar_reporte_inventario(
+            [None, 'Laptop Dell', 42, ['Laptop'], valido, {'nombre': 5, 'marca': 'HP', 'modelo': ''}]
+        )
+
+        self.assertTrue(reporte['exito'], reporte.get('error'))
+        self.assertEqual([activo['id'] for activo in reporte['activos_detallados']], [1])
+        self.assertEqual(reporte['valor_total_estimado'], esperado['valor_total_estimado'])
+        self.assertEqual(reporte['activos_por_marca'].keys(), {'DELL'})
+
+
+# ================================================================================================
+# 💲 ACTUALIZACIÓN MASIVA DE PRECIOS
+# ================================================================================================
+
+class ActualizarPreciosMasivoTests(SesionAutenticadaMixin, TestCase):
+
+    def actualizar(self, datos):
+        return self.client.post('/api/actualizar-precios/', json.dumps(datos), content_type='application/json')
+
+    def test_sin_sesion_responde_401(self):
+        registro = RegistroQR.objects.create(codigo=qr_activo(), usuario='prueba', ubicacion='Almacén')
+        self.client.session.flush()
+        self.client.cookies.clear()
+        respuesta = self.actualizar({'activos': [{'id': registro.id, 'marca': 'Dell', 'modelo': 'Latitude'}], 'forzar': True})
+        self.assertEqual(respuesta.status_code, 401)
+        registro.refresh_from_db()
+        self.assertIsNone(registro.precio_actual)
+
+    def test_guarda_los_precios(self):
+        registro = RegistroQR.objects.create(codigo=qr_activo(), usuario='prueba', ubicacion='Almacén')
+        respuesta = self.actualizar({'activos': [{'id': str(registro.id), 'marca': 'Dell', 'modelo': 'Latitude'}]})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.json()['data']['resultados'][0]['actualizado'])
+        registro.refresh_from_db()
+        self.assertIsNotNone(registro.precio_actual)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.actualizar({'activos': [{'id': 'abc', 'marca': 'Dell', 'modelo': 'X'}]}).status_code, 400)
+        self.assertEqual(self.actualizar({'activos': [{'id': 1, 'marca': 'Dell', 'modelo': 'X'}], 'forzar': 'si'}).status_code, 400)
+
+
+# ================================================================================================
+# 🔄 SINCRONIZACIÓN SIN CONEXIÓN (lotes y cambios incrementales)
+# ================================================================================================
+
+class SincronizacionTests(SesionAutenticadaMixin, TestCase):
+
+    def enviar_lote(self, escaneos):
+        return self.client.post('/registrar_qr_lote/', json.dumps({'escaneos': escaneos}), content_type='application/json').json()
+
+    def cambios(self, desde=None, limite=None):
+        parametros = {}
+        if desde is not None:
+            parametros['desde'] = desde
+        if limite is not None:
+            parametros['limit'] = limite
+        respuesta = self.client.get('/cambios_activos/', parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_lote_reenviado_no_duplica(self):
+        escaneos = [
+            {'codigo_qr': qr_activo(no_serie='SN-1'), 'clave_idempotencia': 'lote-1'},
+            {'codigo_qr': qr_activo(no_serie='SN-2'), 'clave_idempotencia': 'lote-2'},
+            {'codigo_qr': qr_activo(no_serie='SN-1'), 'clave_idempotencia': 'lote-3'},
+            {'codigo_qr': '', 'clave_idempotencia': 'lote-4'},
+        ]
+        primero = self.enviar_lote(escaneos)
+        self.assertEqual([r['estado'] for r in primero['resultados']], ['created', 'created', 'already_registered', 'error'])
+        self.assertEqual((primero['creados'], primero['ya_registrados'], primero['errores']), (2, 1, 1))
+
+        # La PWA reenvía la cola completa tras perder la respuesta
+        # (los ya guardados responden igual que la primera vez, marcados como repetidos)
+        reenvio = self.enviar_lote(escaneos)
+        self.assertEqual([r['estado'] for r in reenvio['resultados']], ['created', 'created', 'already_registered', 'error'])
+        for original, repetido in zip(primero['resultados'][:2], reenvio['resultados'][:2]):
+            self.assertTrue(repetido.get('repetido'))
+            self.assertEqual(repetido['activo']['id'], original['activo']['id'])
+        self.assertEqual(RegistroQR.objects.count(), 2)
+
+    def test_cambios_incluyen_altas_y_lapidas(self):
+        self.registrar(qr_activo(no_serie='SN-1'))
+        self.registrar(qr_activo(no_serie='SN-2'))
+        inicial = self.cambios()
+        self.assertTrue(inicial['reiniciar'])
+        self.assertEqual(len(inicial['activos']), 2)
+        self.assertFalse(inicial['hay_mas'])
+
+        eliminado = RegistroQR.objects.get(numero_serie='SN-1').id
+        self.client.post('/eliminar_activo/', json.dumps({'id': eliminado}), content_type='application/json')
+        self.registrar(qr_activo(no_serie='SN-3'))
+
+        delta = self.cambios(desde=inicial['version'])
+        self.assertFalse(delta['reiniciar'])
+        self.assertEqual(delta['eliminados'], [eliminado])
+        self.assertEqual([a['no_serie'] for a in delta['activos']], ['SN-3'])
+        self.assertGreater(int(delta['version']), int(inicial['version']))
+
+        # Sin cambios nuevos la versión se mantiene
+        sin_cambios = self.cambios(desde=delta['version'])
+        self.assertEqual((sin_cambios['activos'], sin_cambios['eliminados']), ([], []))
+        self.assertEqual(sin_cambios['version'], delta['version'])
+
+    def test_eliminacion_masiva_pide_reiniciar(self):
+        self.registrar(qr_activo(no_serie='SN-1'))
+        version = self.cambios()['version']
+        self.client.post('/eliminar_todos_activos/')
+        self.registrar(qr_activo(no_serie='SN-2'))
+
+        delta = self.cambios(desde=version)
+        self.assertTrue(delta['reiniciar'])
+        self.assertEqual(delta['eliminados'], [])
+        self.assertEqual([a['no_serie'] for a in delta['activos']], ['SN-2'])
+
+    def test_version_desconocida_pide_reiniciar(self):
+        self.registrar(qr_activo())
+        self.assertTrue(self.cambios(desde=10 ** 9)['reiniciar'])
+
+    def test_cambios_por_paginas(self):
+        for numero in range(5):
+            self.registrar(qr_activo(no_serie=f'SN-{numero}'))
+        vistos = []
+        version = None
+        paginas = 0
+        while True:
+            pagina = self.cambios(desde=version, limite=2)
+            vistos += [a['no_serie'] for a in pagina['activos']]
+            version = pagina['version']
+            paginas += 1
+            if not pagina['hay_mas']:
+                break
+        self.assertEqual(vistos, [f'SN-{numero}' for numero in range(5)])
+        self.assertEqual(paginas, 3)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/cambios_activos/', {'desde': 'abc'}).status_code, 400)
+
+    def test_sin_sesion_responde_401(self):
+        self.registrar(qr_activo())
+        self.client.session.flush()
+        self.client.cookies.clear()
+        respuesta = self.client.get('/cambios_activos/')
+        self.assertEqual(respuesta.status_code, 401)
+        self.assertNotIn('activos', respuesta.json())
+
+
+# ================================================================================================
+# 📄 CONSULTA PAGINADA Y VISTAS ASÍNCRONAS
+# ================================================================================================
+
+class ActivosEscaneadosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ids = [
+            RegistroQR.objects.create(codigo=qr_activo(no_serie=f'SN-{numero}'), usuario='prueba', ubicacion='Almacén').id
+            for numero in range(7)
+        ]
+        # Registros con la misma fecha: el cursor debe desempatar por id
+        RegistroQR.objects.filter(id__in=ids[2:5]).update(fecha_registro=timezone.now())
+        cls.orden = list(RegistroQR.objects.order_by('-fecha_registro', '-id').values_list('id', flat=True))
+
+    async def obtener(self, **parametros):
+        return await self.async_client.get('/obtener_activos_escaneados/', parametros)
+
+    async def test_cursor_recorre_cada_registro_una_vez(self):
+        self.assertEqual(await RegistroQR.objects.values('fecha_registro').distinct().acount(), 5)
+        for limite in (1, 2, 3, 7, 50):
+            with self.subTest(limite=limite):
+                vistos = []
+                parametros = {'limit': limite}
+                while True:
+                    respuesta = await self.obtener(**parametros)
+                    self.assertEqual(respuesta.status_code, 200)
+                    pagina = respuesta.json()
+                    vistos += [activo['id'] for activo in pagina['activos']]
+                    if not pagina['hay_mas']:
+                        self.assertIsNone(pagina['siguiente'])
+                        break
+                    parametros = {'limit': limite, 'after': pagina['siguiente']}
+                self.assertEqual(vistos, self.orden)
+
+    async def test_sin_limite_devuelve_todo(self):
+        respuesta = await self.obtener()
+        self.assertEqual([activo['id'] for activo in respuesta.json()['activos']], self.orden)
+
+    async def test_cursor_invalido(self):
+        for cursor in ('no-es-un-cursor', 'bWFs', '%%%'):
+            with self.subTest(cursor=cursor):
+                respuesta = await self.obtener(limit=2, after=cursor)
+                self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual((await self.obtener(limit='x')).status_code, 400)
+
+    async def test_ndjson_en_streaming(self):
+        respuesta = await self.obtener(formato='ndjson')
+        self.assertTrue(respuesta.streaming)
+        contenido = b''.join([parte async for parte in respuesta.streaming_content])
+        activos = [json.loads(linea) for linea in contenido.decode('utf-8').splitlines()]
+        # Mismo contenido que la respuesta JSON completa
+        self.assertEqual(activos, (await self.obtener()).json()['activos'])
+
+    async def test_registrar_qr_con_cliente_asincrono(self):
+        session = SessionStore()
+        session['autenticado'] = True
+        await session.asave()
+        self.async_client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+        datos = json.dumps({'codigo_qr': qr_activo(no_serie='SN-NUEVO')})
+        primero = (await self.async_client.post('/registrar_qr/', datos, content_type='application/json')).json()
+        segundo = (await self.async_client.post('/registrar_qr/', datos, content_type='application/json')).json()
+        self.assertFalse(primero['already_registered'])
+        self.assertTrue(segundo['already_registered'])
+        self.assertEqual(await RegistroQR.objects.filter(numero_serie='SN-NUEVO').acount(), 1)
+
+        ultimos = (await self.async_client.get('/obtener_activos_escaneados/', {'limit': 1})).json()
+        self.assertEqual(ultimos['activos'][0]['id'], primero['activo']['id'])
+
+
+# ================================================================================================
+# 🗄️ PERFIL DE SQLITE (WAL y BEGIN IMMEDIATE)
+# ================================================================================================
+
+class ConfiguracionSQLiteTests(SimpleTestCase):
+
+    def test_configuracion_por_defecto(self):
+        with mock.patch.dict(os.environ, clear=True):
+            configuracion = configuracion_sqlite(Path('/datos/db.sqlite3'))
+        self.assertEqual(configuracion['NAME'], Path('/datos/db.sqlite3'))
+        self.assertEqual(configuracion['CONN_MAX_AGE'], CONN_MAX_AGE_DEFAULT)
+        self.assertEqual(configuracion['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertEqual(configuracion['OPTIONS']['timeout'], SEGUNDOS_ESPERA_BLOQUEO)
+        self.assertIn('PRAGMA journal_mode=WAL;', configuracion['OPTIONS']['init_command'])
+
+    def test_conexiones_no_persistentes_con_asgi(self):
+        with mock.patch.dict(os.environ, {'SISEG_SERVIDOR': 'asgi', 'SISEG_SQLITE_CONN_MAX_AGE': '60'}, clear=True):
+            self.assertEqual(configuracion_sqlite('db.sqlite3')['CONN_MAX_AGE'], 0)
+        with mock.patch.dict(os.environ, {'SISEG_SQLITE_CONN_MAX_AGE': '60'}, clear=True):
+            self.assertEqual(configuracion_sqlite('db.sqlite3')['CONN_MAX_AGE'], 60)
+
+    def test_ruta_base_datos(self):
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertEqual(ruta_base_datos('/app'), Path('/app/db.sqlite3'))
+        with mock.patch.dict(os.environ, {'RAILWAY_VOLUME_MOUNT_PATH': '/volumen'}, clear=True):
+            self.assertEqual(ruta_base_datos('/app'), Path('/volumen/db.sqlite3'))
+        with mock.patch.dict(os.environ, {'SISEG_SQLITE_PATH': '/otro/siseg.db', 'RAILWAY_VOLUME_MOUNT_PATH': '/volumen'}, clear=True):
+            self.assertEqual(ruta_base_datos('/app'), Path('/otro/siseg.db'))
+
+
+class EscritoresConcurrentesTests(SimpleTestCase):
+    """
+    Varios hilos, cada uno con su propia conexión al mismo archivo, leen y luego escriben
+    dentro de una transacción. Con BEGIN DEFERRED dos de ellas chocan al pasar de lectura a
+    escritura ("database is locked"); con IMMEDIATE esperan su turno y no se pierde ningún incremento.
+    """
+    HILOS = 8
+    INCREMENTOS = 25
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        with mock.patch.dict(os.environ, clear=True):
+            configuracion = configuracion_sqlite(Path(directorio.name) / 'concurrencia.sqlite3')
+        # Alias propio: las pruebas sin base de datos no permiten conexiones a 'default' desde otros hilos
+        self.conexiones = ConnectionHandler({'default': {}, 'concurrencia': configuracion})
+        self.addCleanup(self.conexiones.close_all)
+
+        with self.conexiones['concurrencia'].cursor() as cursor:
+            cursor.execute('CREATE TABLE contador (id INTEGER PRIMARY KEY, valor INTEGER NOT NULL)')
+            cursor.execute('INSERT INTO contador (id, valor) VALUES (1, 0)')
+
+    def incrementar(self, errores):
+        # Cada hilo obtiene su propia conexión del ConnectionHandler
+        conexion = self.conexiones['concurrencia']
+        try:
+            for _ in range(self.INCREMENTOS):
+                # Lo mismo que hace transaction.atomic() al abrir la transacción más externa
+                conexion.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+                try:
+                    with conexion.cursor() as cursor:
+                        cursor.execute('SELECT valor FROM contador WHERE id = 1')
+                        valor = cursor.fetchone()[0]
+                        cursor.execute('UPDATE contador SET valor = %s WHERE id = 1', [valor + 1])
+                    conexion.commit()
+                except Exception:
+                    conexion.rollback()
+                    raise
+                finally:
+                    conexion.set_autocommit(True)
+        except OperationalError as e:
+            errores.append(str(e))
+        finally:
+            conexion.close()
+
+    def test_escrituras_simultaneas_sin_bloqueos(self):
+        errores = []
+        hilos = [threading.Thread(target=self.incrementar, args=(errores,)) for _ in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        with self.conexiones['concurrencia'].cursor() as cursor:
+            cursor.execute('SELECT valor FROM contador WHERE id = 1')
+            self.assertEqual(cursor.fetchone()[0], self.HILOS * self.INCREMENTOS)
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+
+# ================================================================================================
+# 🔒 QR ENCRIPTADO DE SISEG
+# ================================================================================================
+
+# CryptoJS.AES.encrypt(JSON.stringify(payload), SISEG_SECRET_KEY) con la sal 0102030405060708;
+# generado con `openssl enc -aes-256-cbc -md md5` (mismo formato "Salted__" que CryptoJS)
+PAYLOAD_CRYPTOJS = {
+    'd': {'nombre': 'Laptop', 'ubicacion': 'Almacén', 'marca': 'Dell', 'modelo': 'Latitude 5520', 'no_serie': 'SN-CRYPTO'},
+    't': 1760000000000, 'a': 'SISEG', 'v': '1.0', 'p': True,
+}
+ENCRIPTADO_CRYPTOJS = (
+    'U2FsdGVkX18BAgMEBQYHCD6N3cHdpo/YuqEUiYpLRq1GOfDB61cp3XDdK8EAGeD36lAklwjm0IA6xpVbOOpTPHgkBSlPu9G5'
+    'qPlAK4dqu/dWuwS9LsJQLqBQ+cJh1xxheAdWLVRB2RCP8ZzMTYXfy+CT57qw9CYeLbEWAKEr9CJ0/arGiszow52kyu4600iL'
+    'vP3G6tQTX9PzfJw18nklwFFBeWFgcu9i7SCqJv7Z9reofcL60Tx927BHLiY2uA9U'
+)
+
+
+def encriptar_siseg(payload, clave=CLAVE_SISEG, sal=b'\x00SISEG\x00\x01'):
+    """Encripta como encriptarParaSISEG del navegador (AES-256-CBC, sal de 8 bytes, PKCS7)"""
+    llave, iv = derivar_clave_iv(clave.encode('utf-8'), sal)
+    relleno = padding.PKCS7(128).padder()
+    datos = relleno.update(json.dumps(payload).encode('utf-8')) + relleno.finalize()
+    cifrador = Cipher(algorithms.AES(llave), modes.CBC(iv)).encryptor()
+    return base64.b64encode(b'Salted__' + sal + cifrador.update(datos) + cifrador.finalize()).decode('ascii')
+
+
+class DesencriptarSisegTests(TestCase):
+
+    def test_texto_de_cryptojs(self):
+        self.assertEqual(desencriptar_siseg(ENCRIPTADO_CRYPTOJS), PAYLOAD_CRYPTOJS)
+        activo = extraer_informacion_qr(FIRMA_SISEG + ENCRIPTADO_CRYPTOJS)
+        self.assertEqual(activo['nombre'], 'Laptop')
+        self.assertEqual(activo['no_serie'], 'SN-CRYPTO')
+        self.assertEqual(activo['codigo'], FIRMA_SISEG + ENCRIPTADO_CRYPTOJS)
+
+    def test_ida_y_vuelta(self):
+        for datos in ({'nombre': 'Monitor', 'marca': 'LG'}, 'Activo: Impresora Marca: HP Serie: X1', {'nombre': 'ñ' * 100}):
+            with self.subTest(datos=datos):
+                payload = {'d': datos, 'a': 'SISEG', 'p': True}
+                self.assertEqual(desencriptar_siseg(encriptar_siseg(payload)), payload)
+        activo = extraer_informacion_qr(FIRMA_SISEG + encriptar_siseg({'d': 'Activo: Impresora Marca: HP Serie: X1', 'a': 'SISEG', 'p': True}))
+        self.assertEqual((activo['nombre'], activo['marca'], activo['no_serie']), ('Impresora', 'HP', 'X1'))
+
+    def test_clave_incorrecta(self):
+        with self.assertRaises(ValueError):
+            desencriptar_siseg(ENCRIPTADO_CRYPTOJS, clave='otra clave')
+
+    def test_relleno_invalido(self):
+        datos = bytearray(base64.b64decode(ENCRIPTADO_CRYPTOJS))
+        datos[-1] ^= 0xFF
+        with self.assertRaises(ValueError):
+            desencriptar_siseg(base64.b64encode(bytes(datos)).decode('ascii'))
+        # Sin la cabecera "Salted__"
+        with self.assertRaisesMessage(ValueError, 'Formato de encriptación no reconocido'):
+            desencriptar_siseg(base64.b64encode(b'x' * 48).decode('ascii'))
+
+    def test_expiracion(self):
+        ahora = int(time.time() * 1000)
+        with self.assertRaisesMessage(ValueError, 'QR expirado'):
+            desencriptar_siseg(encriptar_siseg({'d': 'x', 'a': 'SISEG', 'e': ahora - 60000}))
+        # Formato anterior (expiracion) y códigos vigentes o permanentes
+        with self.assertRaisesMessage(ValueError, 'QR expirado'):
+            desencriptar_siseg(encriptar_siseg({'data': 'x', 'app': 'SISEG', 'expiracion': ahora - 60000}))
+        self.assertEqual(desencriptar_siseg(encriptar_siseg({'d': 'x', 'a': 'SISEG', 'e': ahora + 60000}))['d'], 'x')
+        self.assertEqual(desencriptar_siseg(encriptar_siseg({'d': 'x', 'a': 'SISEG', 'p': True, 'e': ahora - 60000}))['d'], 'x')
+
+    def test_aplicacion_distinta(self):
+        for payload in ({'d': 'x', 'a': 'OTRA', 'p': True}, {'d': 'x', 'p': True}):
+            with self.subTest(payload=payload):
+                with self.assertRaisesMessage(ValueError, 'QR no autorizado para SISEG'):
+                    desencriptar_siseg(encriptar_siseg(payload))
+        self.assertEqual(desencriptar_siseg(encriptar_siseg({'data': 'x', 'app': 'SISEG', 'permanent': True}))['data'], 'x')
+
+    def test_sin_encriptar_se_lee_con_los_demas_formatos(self):
+        # La firma sin un texto encriptado válido: se lee como texto estructurado
+        activo = extraer_informacion_qr(FIRMA_SISEG + 'Activo: Laptop Marca: Dell Serie: SN-1')
+        self.assertEqual((activo['nombre'], activo['marca'], activo['no_serie']), ('Laptop', 'Dell', 'SN-1'))
+        # Encriptado con otra clave, expirado o de otra aplicación: tampoco se usa el payload
+        for encriptado in (
+            encriptar_siseg(PAYLOAD_CRYPTOJS, clave='otra clave'),
+            encriptar_siseg({**PAYLOAD_CRYPTOJS, 'a': 'OTRA'}),
+            encriptar_siseg({**PAYLOAD_CRYPTOJS, 'p': False, 'e': 1}),
+        ):
+            with self.subTest(encriptado=encriptado):
+                self.assertNotEqual(extraer_informacion_qr(FIRMA_SISEG + encriptado)['no_serie'], 'SN-CRYPTO')
+        # Sin firma: JSON directo
+        self.assertEqual(extraer_informacion_qr(json.dumps(PAYLOAD_CRYPTOJS['d']))['no_serie'], 'SN-CRYPTO')
+
+
+# ================================================================================================
+# 📉 DEPRECIACIÓN
+# ================================================================================================
+
+def fecha_local(*partes):
+    return timezone.make_aware(datetime.datetime(*partes))
+
+
+class CalculoDepreciacionTests(SimpleTestCase):
+
+    def calcular(self, base, politica, meses):
+        return tuple(str(valor) for valor in calcular_depreciacion(base, politica, meses))
+
+    def test_linea_recta(self):
+        # Base 1000, 5 años, residual 10 %: 180 por año
+        politica = POLITICAS_DEPRECIACION['desktop']
+        casos = [
+            (0, ('1000.00', '180.00')),
+            (6, ('910.00', '180.00')),  # Medio año
+            (12, ('820.00', '180.00')),
+            (30, ('550.00', '180.00')),
+            (59, ('115.00', '180.00')),
+            (60, ('100.00', '0.00')),  # Fin de la vida útil: valor residual
+            (120, ('100.00', '0.00')),
+        ]
+        for meses, esperado in casos:
+            with self.subTest(meses=meses):
+                self.assertEqual(self.calcular(1000, politica, meses), esperado)
+
+    def test_saldo_decreciente(self):
+        # Base 900, 3 años, doble saldo decreciente (tasa 2/3), residual 90
+        politica = POLITICAS_DEPRECIACION['laptops']
+        casos = [
+            (0, ('900.00', '600.00')),
+            (6, ('519.62', '600.00')),  # 900 * (1/3) ** 0.5
+            (12, ('300.00', '200.00')),
+            (24, ('100.00', '10.00')),  # La depreciación del año no baja del residual
+            (36, ('90.00', '0.00')),
+            (120, ('90.00', '0.00')),
+        ]
+        for meses, esperado in casos:
+            with self.subTest(meses=meses):
+                self.assertEqual(self.calcular(900, politica, meses), esperado)
+
+    def test_tasa_mayor_a_uno(self):
+        politica = {'metodo': 'saldo_decreciente', 'vida_util': 1, 'residual': 0.1, 'factor': 3}
+        self.assertEqual(self.calcular(500, politica, 6), ('50.00', '450.00'))
+
+    def test_meses_transcurridos(self):
+        self.assertEqual(meses_transcurridos(fecha_local(2025, 1, 31, 23), '2025-01'), 0)
+        self.assertEqual(meses_transcurridos(fecha_local(2025, 1, 15), '2025-07'), 6)
+        self.assertEqual(meses_transcurridos(fecha_local(2024, 11, 1), '2026-02'), 15)
+        # Alta posterior al periodo
+        self.assertEqual(meses_transcurridos(fecha_local(2025, 8, 1), '2025-07'), 0)
+
+
+class MotorDepreciacionTests(TestCase):
+
+    def crear(self, precio_compra=None, precio_actual=None, tipo_producto='desktop'):
+        registro = RegistroQR.objects.create(
+            codigo=qr_activo(no_serie=f'SN-{RegistroQR.objects.count()}'), usuario='prueba', ubicacion='Almacén',
+            precio_compra=precio_compra, precio_actual=precio_actual, tipo_producto=tipo_producto,
+        )
+        RegistroQR.objects.filter(id=registro.id).update(fecha_registro=fecha_local(2025, 1, 15, 12))
+        return registro.id
+
+    def test_guarda_los_valores(self):
+        linea_recta = self.crear(precio_compra=Decimal('1000'))
+        saldo = self.crear(precio_actual=Decimal('900'), tipo_producto='laptops')
+        sin_precio = self.crear()
+
+        resultado = MotorDepreciacion().actualizar(ahora=fecha_local(2025, 7, 10))
+        self.assertEqual((resultado['periodo'], resultado['revisados'], resultado['actualizados']), ('2025-07', 3, 3))
+
+        registro = RegistroQR.objects.get(id=linea_recta)
+        self.assertEqual((registro.valor_depreciado, registro.depreciacion_anual), (Decimal('910.00'), Decimal('180.00')))
+        self.assertEqual((registro.anos_vida_util, registro.periodo_depreciacion), (5, '2025-07'))
+        registro = RegistroQR.objects.get(id=saldo)
+        self.assertEqual(registro.valor_depreciado, Decimal('519.62'))
+        registro = RegistroQR.objects.get(id=sin_precio)
+        self.assertIsNone(registro.valor_depreciado)
+        self.assertEqual(registro.periodo_depreciacion, '2025-07')
+
+    def test_segunda_pasada_del_mismo_periodo_no_escribe(self):
+        for _ in range(3):
+            self.crear(precio_compra=Decimal('1000'))
+        motor = MotorDepreciacion()
+        motor.actualizar(ahora=fecha_local(2025, 7, 10))
+        modificados = list(RegistroQR.objects.order_by('id').values_list('fecha_actualizacion', flat=True))
+
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = motor.actualizar(ahora=fecha_local(2025, 7, 28), tamano_lote=2)
+        self.assertEqual((resultado['revisados'], resultado['actualizados']), (3, 0))
+        self.assertFalse([c for c in consultas.captured_queries if not c['sql'].upper().startswith('SELECT')])
+        self.assertEqual(list(RegistroQR.objects.order_by('id').values_list('fecha_actualizacion', flat=True)), modificados)
+
+    def test_cambio_de_periodo_o_de_precio(self):
+        primero = self.crear(precio_compra=Decimal('1000'))
+        self.crear(precio_compra=Decimal('1000'))
+        motor = MotorDepreciacion()
+        motor.actualizar(ahora=fecha_local(2025, 7, 10))
+
+        # Otro precio: sólo se recalcula ese registro
+        RegistroQR.objects.filter(id=primero).update(precio_compra=Decimal('2000'))
+        self.assertEqual(motor.actualizar(ahora=fecha_local(2025, 7, 20))['actualizados'], 1)
+        self.assertEqual(RegistroQR.objects.get(id=primero).valor_depreciado, Decimal('1820.00'))
+
+        # Mes nuevo: todos
+        self.assertEqual(motor.actualizar(ahora=fecha_local(2025, 8, 1))['actualizados'], 2)
+        # Otras políticas invalidan las huellas
+        politicas = {**POLITICAS_DEPRECIACION, 'desktop': {'metodo': 'linea_recta', 'vida_util': 10, 'residual': 0}}
+        self.assertEqual(MotorDepreciacion(politicas).actualizar(ahora=fecha_local(2025, 8, 2))['actualizados'], 2)
+        # forzar recalcula aunque nada haya cambiado
+        self.assertEqual(motor.actualizar(ahora=fecha_local(2025, 8, 2), forzar=True)['actualizados'], 2)
+
+
+# ================================================================================================
+# 📊 RESÚMENES DEL INVENTARIO (deltas contra reconstrucción)
+# ================================================================================================
+
+class ResumenesIncrementalesTests(SesionAutenticadaMixin, TestCase):
+    """Después de cada operación, los resúmenes mantenidos con deltas deben ser iguales a un GROUP BY desde cero"""
+
+    ACTIVOS = [
+        ('Laptop', 'Almacén', 'Dell', 'Latitude 5520'),
+        ('Laptop', 'Oficina 1', 'HP', 'EliteBook 840'),
+        ('Monitor', 'Almacén', 'LG', '24MK430'),
+        ('Impresora', 'Recepción', 'Canon', 'G3110'),
+        ('Silla', 'Oficina 1', '', ''),
+    ]
+
+    def assertResumenesConsistentes(self):
+        self.assertEqual(diferencias_resumenes(calcular_resumenes(), leer_resumenes()), [])
+
+    def registrar_activos(self, repeticiones=2):
+        for numero in range(repeticiones):
+            for nombre, ubicacion, marca, modelo in self.ACTIVOS:
+                self.registrar(qr_activo(nombre, ubicacion, marca, modelo, f'{nombre}-{numero}'))
+
+    def test_registro_individual_y_por_lote(self):
+        self.registrar_activos()
+        self.assertResumenesConsistentes()
+        escaneos = [qr_activo(nombre, ubicacion, marca, modelo, f'L-{nombre}') for nombre, ubicacion, marca, modelo in self.ACTIVOS]
+        self.client.post('/registrar_qr_lote/', json.dumps({'escaneos': escaneos + escaneos[:2]}), content_type='application/json')
+        self.assertEqual(leer_resumenes()[('tipo', 'laptops')][0], 6)
+        self.assertResumenesConsistentes()
+
+    def test_actualizacion_de_precios(self):
+        self.registrar_activos()
+        ids = list(RegistroQR.objects.order_by('id').values_list('id', flat=True))
+        precio = {'exito': True, 'precio_estimado': 1234.56, 'precio_min': 1000, 'precio_max': 1500.5, 'fuente': 'prueba'}
+        persistir_precios({registro_id: precio for registro_id in ids[::2]}, tamano_lote=3)
+        self.assertResumenesConsistentes()
+        # Segunda pasada forzada con otro precio (resta el precio guardado, no el de la tabla)
+        persistir_precios({registro_id: {**precio, 'precio_estimado': 10} for registro_id in ids[:4]}, tamano_lote=2, forzar=True)
+        self.assertResumenesConsistentes()
+
+    def test_cambio_de_marca_y_tipo(self):
+        self.registrar_activos()
+        registro = RegistroQR.objects.filter(tipo_producto='laptops').only('id', *CAMPOS_RESUMEN).first()
+        delta = DeltaResumen()
+        delta.restar(registro)
+        registro.marca_normalizada = 'lenovo'
+        registro.tipo_producto = 'desktop'
+        registro.codigo_ubicacion = 'NUEVA'
+        delta.sumar(registro)
+        registro.save(update_fields=['marca_normalizada', 'tipo_producto', 'codigo_ubicacion'])
+        delta.aplicar()
+        self.assertIn(('marca', 'lenovo'), leer_resumenes())
+        self.assertResumenesConsistentes()
+
+    def test_eliminaciones(self):
+        self.registrar_activos(repeticiones=1)
+        # El único activo de su grupo: el grupo desaparece
+        impresora = RegistroQR.objects.get(tipo_producto='impresora')
+        self.client.post('/eliminar_activo/', json.dumps({'id': impresora.id}), content_type='application/json')
+        self.assertNotIn(('tipo', 'impresora'), leer_resumenes())
+        self.assertResumenesConsistentes()
+
+        self.client.post('/eliminar_todos_activos/')
+        self.assertEqual(leer_resumenes(), {})
+        self.assertResumenesConsistentes()
+
+    def test_depreciacion(self):
+        self.registrar_activos()
+        RegistroQR.objects.filter(tipo_producto='laptops').update(precio_compra=Decimal('1000'))
+        MotorDepreciacion().actualizar()
+        self.assertResumenesConsistentes()
+        self.assertGreater(leer_resumenes()[('tipo', 'laptops')][4], 0)
+
+    def test_secuencia_aleatoria(self):
+        generador = random.Random(11)
+        for paso in range(60):
+            operacion = generador.random()
+            ids = list(RegistroQR.objects.values_list('id', flat=True))
+            if operacion < 0.5 or not ids:
+                nombre, ubicacion, marca, modelo = generador.choice(self.ACTIVOS)
+                self.registrar(qr_activo(nombre, ubicacion, marca, modelo, f'R-{paso}'))
+            elif operacion < 0.75:
+                precio = {'exito': True, 'precio_estimado': generador.randint(1, 3000), 'precio_min': 1, 'precio_max': 3000}
+                persistir_precios({generador.choice(ids): precio}, forzar=True)
+            else:
+                self.client.post('/eliminar_activo/', json.dumps({'id': generador.choice(ids)}), content_type='application/json')
+            self.assertResumenesConsistentes()
+
+
+# ================================================================================================
+# 📤 EXPORTACIONES EN SEGUNDO PLANO
+# ================================================================================================
+
+class TrabajosExportacionTests(TestCase):
+    """El hilo de exportaciones se reemplaza por una llamada directa a ejecutar_trabajo"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.executor = mock.Mock()
+        reemplazos = {
+            'pagTickets.trabajos_exportacion._executor': self.executor,
+            'pagTickets.trabajos_exportacion.DIRECTORIO_EXPORTACIONES': directorio.name,
+            # El hilo cierra su conexión al terminar; aquí comparte la de la prueba
+            'pagTickets.trabajos_exportacion.connection': mock.Mock(),
+        }
+        for objetivo, valor in reemplazos.items():
+            parche = mock.patch(objetivo, valor)
+            parche.start()
+            self.addCleanup(parche.stop)
+        for numero in range(3):
+            self.crear_activo(numero)
+
+    def crear_activo(self, numero):
+        return RegistroQR.objects.create(codigo=qr_activo(no_serie=f'EXP-{numero}'), usuario='prueba', ubicacion='Almacén')
+
+    def test_reutiliza_el_trabajo_mientras_el_inventario_no_cambia(self):
+        trabajo, reutilizado = solicitar_exportacion('csv')
+        self.assertFalse(reutilizado)
+        self.executor.submit.assert_called_once_with(ejecutar_trabajo, trabajo.id)
+
+        # Pendiente: otra solicitud espera el mismo trabajo
+        self.assertEqual(solicitar_exportacion('csv'), (trabajo, True))
+
+        ejecutar_trabajo(trabajo.id)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'completado')
+        with open(ruta_archivo(trabajo), encoding='utf-8') as archivo:
+            self.assertEqual(sum(1 for _ in archivo), 1 + 3)
+
+        # Completado: se reutiliza el archivo sin encolar otro trabajo
+        self.assertEqual(solicitar_exportacion('csv'), (trabajo, True))
+        self.assertEqual(self.executor.submit.call_count, 1)
+
+        # Un activo nuevo cambia la versión del inventario
+        self.crear_activo(99)
+        nuevo, reutilizado = solicitar_exportacion('csv')
+        self.assertFalse(reutilizado)
+        self.assertNotEqual(nuevo.version_datos, trabajo.version_datos)
+        self.assertEqual(self.executor.submit.call_count, 2)
+
+    def test_archivo_borrado_se_genera_de_nuevo(self):
+        trabajo, _ = solicitar_exportacion('csv')
+        ejecutar_trabajo(trabajo.id)
+        trabajo.refresh_from_db()
+        os.remove(ruta_archivo(trabajo))
+
+        nuevo, reutilizado = solicitar_exportacion('csv')
+        self.assertFalse(reutilizado)
+        self.assertNotEqual(nuevo.id, trabajo.id)
+
+    def test_trabajo_sin_latido_se_descarta_y_se_encola_otro(self):
+        abandonado, _ = solicitar_exportacion('csv')
+        # El proceso que lo generaba se detuvo: su último latido es más viejo que el límite
+        TrabajoExportacion.objects.filter(id=abandonado.id).update(
+            estado='en_proceso',
+            fecha_latido=timezone.now() - datetime.timedelta(seconds=SEGUNDOS_TRABAJO_ABANDONADO + 1)
+        )
+
+        nuevo, reutilizado = solicitar_exportacion('csv')
+
+        self.assertFalse(reutilizado)
+        self.assertNotEqual(nuevo.id, abandonado.id)
+        abandonado.refresh_from_db()
+        self.assertEqual(abandonado.estado, 'error')
+        self.assertIn('dejó de avanzar', abandonado.error)
+        self.assertEqual(self.executor.submit.call_count, 2)
+
+        ejecutar_trabajo(nuevo.id)
+        nuevo.refresh_from_db()
+        self.assertEqual(nuevo.estado, 'completado')
+
+    def test_trabajo_con_latido_reciente_se_reutiliza(self):
+        trabajo, _ = solicitar_exportacion('csv')
+        TrabajoExportacion.objects.filter(id=trabajo.id).update(
+            estado='en_proceso',
+            fecha_latido=timezone.now() - datetime.timedelta(seconds=SEGUNDOS_TRABAJO_ABANDONADO - 60)
+        )
+        self.assertEqual(solicitar_exportacion('csv'), (trabajo, True))
+
+    def test_trabajo_descartado_no_se_ejecuta_si_su_hilo_despierta_tarde(self):
+        trabajo, _ = solicitar_exportacion('csv')
+        TrabajoExportacion.objects.filter(id=trabajo.id).update(
+            fecha_latido=timezone.now() - datetime.timedelta(seconds=SEGUNDOS_TRABAJO_ABANDONADO + 1)
+        )
+        solicitar_exportacion('csv')
+
+        ejecutar_trabajo(trabajo.id)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'error')
+        self.assertEqual(trabajo.archivo, '')
+
+
+# ================================================================================================
+# 📍 CÓDIGOS DE UBICACIÓN
+# ================================================================================================
+
+class ResolutorUbicacionesTests(TestCase):
+
+    def setUp(self):
+        self.resolutor = ResolutorUbicaciones(segundos_recarga=3600)
+
+    def test_ignora_acentos_mayusculas_y_espacios(self):
+        for ubicacion in ['almacen', 'Almacén', '  ALMACÉN ', '1er  Piso\tAlmacén']:
+            with self.subTest(ubicacion=ubicacion):
+                self.assertEqual(self.resolutor.resolver(ubicacion), 'ALM')
+        self.assertEqual(self.resolutor.resolver('Administración'), 'ADMON')
+
+    def test_prefijo_por_palabras_completas(self):
+        self.assertEqual(self.resolutor.resolver('Almacén planta baja'), 'ALM')
+        self.assertEqual(self.resolutor.resolver('Sala de Juntas 2'), 'SJ')
+        # "almacenes" no empieza con la palabra "almacen"
+        self.assertEqual(self.resolutor.resolver('Almacenes'), CODIGO_DEFAULT)
+
+    def test_gana_el_prefijo_mas_largo(self):
+        CodigoUbicacion.objects.create(nombre='Almacén Norte', codigo='ALM-N')
+        self.assertEqual(self.resolutor.resolver('almacen norte anaquel 3'), 'ALM-N')
+        self.assertEqual(self.resolutor.resolver('almacen sur anaquel 3'), 'ALM')
+
+    def test_vacia_o_desconocida(self):
+        for ubicacion in [None, '', 'Bodega externa']:
+            with self.subTest(ubicacion=ubicacion):
+                self.assertEqual(self.resolutor.resolver(ubicacion), CODIGO_DEFAULT)
+
+    def test_la_base_de_datos_tiene_prioridad_sobre_los_valores_por_defecto(self):
+        CodigoUbicacion.objects.create(nombre='ALMACÉN', codigo='BOD')
+        self.assertEqual(self.resolutor.resolver('Almacén'), 'BOD')
+
+    def test_recargar_descarta_los_resultados_memorizados(self):
+        self.assertEqual(self.resolutor.resolver('Bodega externa'), CODIGO_DEFAULT)
+        CodigoUbicacion.objects.create(nombre='Bodega externa', codigo='BOD')
+        # La tabla sigue vigente: se responde con el resultado memorizado
+        self.assertEqual(self.resolutor.resolver('Bodega externa'), CODIGO_DEFAULT)
+
+        self.resolutor.invalidar()
+        self.assertEqual(self.resolutor.resolver('Bodega externa'), 'BOD')
+        self.assertEqual(self.resolutor.estadisticas()['entradas_memo'], 1)
+
+    def test_cambios_al_modelo_se_ven_de_inmediato(self):
+        self.assertEqual(resolutor_ubicaciones.resolver('Bodega externa'), CODIGO_DEFAULT)
+        codigo = CodigoUbicacion.objects.create(nombre='Bodega externa', codigo='BOD')
+        self.assertEqual(resolutor_ubicaciones.resolver('Bodega externa'), 'BOD')
+        codigo.delete()
+        self.assertEqual(resolutor_ubicaciones.resolver('Bodega externa'), CODIGO_DEFAULT)
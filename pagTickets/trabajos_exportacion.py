@@ -0,0 +1,167 @@
+"""
+Trabajos de exportación en segundo plano para SISEG
+Las exportaciones grandes se generan en un hilo local y se reutilizan mientras el inventario no cambie
+"""
+
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .exportacion import escribir_excel_activos, generar_csv_activos
+from .models import RegistroQR, TrabajoExportacion
+
+logger = logging.getLogger(__name__)
+
+# Carpeta donde se guardan los archivos generados
+DIRECTORIO_EXPORTACIONES = getattr(settings, 'EXPORTACIONES_DIR', os.path.join(settings.MEDIA_ROOT, 'exportaciones'))
+
+# Hilos dedicados a exportaciones (uno basta: las exportaciones se encolan)
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'EXPORTACIONES_MAX_WORKERS', 1),
+    thread_name_prefix='siseg-exportacion'
+)
+
+# Segundos sin avance tras los cuales un trabajo pendiente o en proceso se da por perdido: el hilo que
+# lo generaba vive en un solo proceso y desaparece si el proceso se reinicia o el worker se recicla
+SEGUNDOS_TRABAJO_ABANDONADO = getattr(settings, 'EXPORTACIONES_TIMEOUT_SEGUNDOS', 600)
+
+
+def calcular_version_datos():
+    """
+    Calcula la versión actual del inventario a partir del id máximo, el total de
+    registros y la última modificación. Si no cambia, el archivo anterior sigue vigente.
+    Los procesos masivos con bulk_update (precios, depreciación, rellenar_datos_activos)
+    asignan fecha_actualizacion a mano para que su cambio se refleje aquí.
+    """
+    resumen = RegistroQR.objects.aggregate(
+        id_maximo=Max('id'),
+        total=Count('id'),
+        ultima_modificacion=Max('fecha_actualizacion')
+    )
+    ultima = resumen['ultima_modificacion'].isoformat() if resumen['ultima_modificacion'] else ''
+    base = f"{resumen['id_maximo'] or 0}|{resumen['total']}|{ultima}"
+    return hashlib.sha1(base.encode('utf-8')).hexdigest(), resumen['total']
+
+
+def ruta_archivo(trabajo):
+    """Ruta absoluta del archivo generado por un trabajo"""
+    return os.path.join(DIRECTORIO_EXPORTACIONES, trabajo.archivo)
+
+
+def archivo_disponible(trabajo):
+    """Indica si el archivo de un trabajo completado todavía existe en disco"""
+    return bool(trabajo.archivo) and os.path.exists(ruta_archivo(trabajo))
+
+
+def descartar_abandonados(trabajos):
+    """Marca como error los trabajos pendientes o en proceso que dejaron de avanzar y devuelve cuántos"""
+    ahora = timezone.now()
+    limite = ahora - timedelta(seconds=SEGUNDOS_TRABAJO_ABANDONADO)
+    return trabajos.filter(estado__in=['pendiente', 'en_proceso']).filter(
+        Q(fecha_latido__lt=limite) | Q(fecha_latido__isnull=True, fecha_creacion__lt=limite)
+    ).update(
+        estado='error',
+        error='El trabajo dejó de avanzar (el proceso que lo generaba se detuvo), solicita una nueva exportación',
+        fecha_fin=ahora
+    )
+
+
+def solicitar_exportacion(formato='xlsx'):
+    """
+    Devuelve (trabajo, reutilizado) para la versión actual del inventario.
+    Reutiliza un archivo ya generado o un trabajo en curso; si no hay, encola uno nuevo.
+    Un trabajo en curso que dejó de avanzar se descarta y se encola otro en su lugar.
+    """
+    version, total = calcular_version_datos()
+
+    misma_version = TrabajoExportacion.objects.filter(formato=formato, version_datos=version)
+    descartar_abandonados(misma_version)
+    existentes = misma_version.filter(estado__in=['pendiente', 'en_proceso', 'completado'])
+    for trabajo in existentes:
+        if trabajo.estado != 'completado' or archivo_disponible(trabajo):
+            return trabajo, True
+
+    trabajo = TrabajoExportacion.objects.create(
+        formato=formato, version_datos=version, total=total, fecha_latido=timezone.now()
+    )
+    _executor.submit(ejecutar_trabajo, trabajo.id)
+    return trabajo, False
+
+
+def ejecutar_trabajo(trabajo_id):
+    """Genera el archivo de un trabajo de exportación (se ejecuta en el hilo de exportaciones)"""
+    # Importación local: los helpers de lectura de activos viven en las vistas
+    from .views import CAMPOS_ACTIVO, iterar_activos
+
+    close_old_connections()
+    try:
+        # Sólo un trabajo todavía pendiente: si esperó tanto que se dio por perdido, ya hay otro en su lugar
+        if not TrabajoExportacion.objects.filter(id=trabajo_id, estado='pendiente').update(
+            estado='en_proceso', fecha_latido=timezone.now()
+        ):
+            return
+        trabajo = TrabajoExportacion.objects.get(id=trabajo_id)
+
+        os.makedirs(DIRECTORIO_EXPORTACIONES, exist_ok=True)
+        nombre_archivo = f"activos_{trabajo.version_datos[:16]}.{trabajo.formato}"
+        ruta_final = os.path.join(DIRECTORIO_EXPORTACIONES, nombre_archivo)
+        ruta_temporal = f"{ruta_final}.{trabajo_id}.tmp"
+
+        def actualizar_progreso(filas):
+            TrabajoExportacion.objects.filter(id=trabajo_id).update(progreso=filas, fecha_latido=timezone.now())
+
+        filas = RegistroQR.objects.order_by('-fecha_registro', '-id').values(*CAMPOS_ACTIVO)
+        activos = iterar_activos(filas)
+
+        if trabajo.formato == 'csv':
+            escritas = 0
+            with open(ruta_temporal, 'w', encoding='utf-8', newline='') as archivo:
+                for linea in generar_csv_activos(activos):
+                    archivo.write(linea)
+                    escritas += 1
+                    if escritas % 500 == 0:
+                        actualizar_progreso(escritas - 1)
+            actualizar_progreso(max(escritas - 1, 0))
+        else:
+            escribir_excel_activos(activos, ruta_temporal, progreso=actualizar_progreso)
+
+        # Reemplazo atómico: una descarga nunca ve un archivo a medio escribir
+        os.replace(ruta_temporal, ruta_final)
+
+        TrabajoExportacion.objects.filter(id=trabajo_id).update(
+            estado='completado',
+            archivo=nombre_archivo,
+            fecha_fin=timezone.now()
+        )
+        _limpiar_archivos_anteriores(trabajo.formato, trabajo.version_datos)
+
+    except Exception as e:
+        logger.error(f"Error en trabajo de exportación {trabajo_id}: {e}")
+        TrabajoExportacion.objects.filter(id=trabajo_id).update(
+            estado='error',
+            error=str(e),
+            fecha_fin=timezone.now()
+        )
+    finally:
+        # Cada hilo tiene su propia conexión; cerrarla evita dejarla abierta entre trabajos
+        connection.close()
+
+
+def _limpiar_archivos_anteriores(formato, version_vigente):
+    """Elimina los archivos de versiones anteriores del mismo formato"""
+    anteriores = TrabajoExportacion.objects.filter(formato=formato, estado='completado').exclude(
+        version_datos=version_vigente
+    ).exclude(archivo='')
+    for trabajo in anteriores:
+        try:
+            os.remove(ruta_archivo(trabajo))
+        except FileNotFoundError:
+            pass
+    anteriores.update(archivo='')
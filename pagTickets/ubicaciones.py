@@ -0,0 +1,130 @@
+"""
+Resolución de códigos de ubicación para SISEG
+Tabla normalizada (sin acentos, minúsculas, espacios colapsados) -> código, armada con:
+1) los valores por defecto de este módulo, 2) settings.SISEG_CODIGOS_UBICACION y
+3) el modelo CodigoUbicacion, que se puede editar sin desplegar.
+"""
+
+import logging
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .api_services import quitar_acentos
+
+logger = logging.getLogger(__name__)
+
+# Código para ubicaciones vacías o desconocidas
+CODIGO_DEFAULT = "ARC"
+
+# Ubicaciones conocidas por código
+UBICACIONES_DEFAULT = {
+    "ADMON": ["administracion", "1er piso administracion"],
+    "ALM": ["almacen", "1er piso almacen"],
+    "CRED": ["credito y cobranza", "cuentas por pagar", "1er piso cuentas por pagar"],
+    "DIR": ["direccion", "2do piso direccion"],
+    "GER": ["gerencia", "gerencia general", "2do piso gerencia general"],
+    "GV": ["gerencia de ventas", "1er piso gerencia de ventas"],
+    "PROY": ["proyectos", "1er piso proyectos", "marketing", "1er piso marketing"],
+    "MON": ["monitoreo", "2do piso monitoreo", "site", "2do piso site", "video wall", "2do piso video wall"],
+    "R.H.": ["1er piso r.h"],
+    "SJ": ["sala de juntas", "2do piso sala juntas"],
+    "VEN 1": ["ventas", "1er piso ventas"],
+}
+
+# Segundos entre recargas de la tabla (para ver cambios hechos desde otros procesos)
+SEGUNDOS_RECARGA = getattr(settings, 'SISEG_UBICACIONES_RECARGA_SEGUNDOS', 60)
+
+
+def normalizar_ubicacion(texto):
+    """Minúsculas, sin acentos y con los espacios colapsados"""
+    return ' '.join(quitar_acentos(str(texto).lower()).split())
+
+
+class ResolutorUbicaciones:
+    """
+    Convierte el texto de ubicación en su código con una búsqueda en diccionario.
+    Las ubicaciones desconocidas se buscan por el prefijo conocido más largo
+    ("almacen planta baja" -> "almacen" -> ALM). Los resultados se memorizan (LRU).
+    """
+
+    def __init__(self, segundos_recarga=SEGUNDOS_RECARGA):
+        self.segundos_recarga = segundos_recarga
+        self.tabla = {}
+        self._cargada_en = None
+        self._lock = threading.Lock()
+        self._resolver_memo = lru_cache(maxsize=4096)(self._resolver)
+
+    def construir_tabla(self):
+        tabla = {}
+        fuentes = [UBICACIONES_DEFAULT, getattr(settings, 'SISEG_CODIGOS_UBICACION', {}) or {}]
+        for fuente in fuentes:
+            for codigo, nombres in fuente.items():
+                for nombre in nombres:
+                    tabla[normalizar_ubicacion(nombre)] = codigo
+
+        # Las filas de la base de datos tienen prioridad sobre los valores por defecto
+        try:
+            from .models import CodigoUbicacion
+            with transaction.atomic():
+                filas = list(CodigoUbicacion.objects.values_list('nombre', 'codigo'))
+        except DatabaseError as e:
+            # La tabla todavía no existe (p. ej. durante migraciones anteriores a su creación)
+            logger.debug(f"Códigos de ubicación sólo por defecto: {e}")
+            filas = []
+        for nombre, codigo in filas:
+            tabla[normalizar_ubicacion(nombre)] = codigo
+        return tabla
+
+    def recargar(self):
+        """Vuelve a construir la tabla y descarta los resultados memorizados"""
+        tabla = self.construir_tabla()
+        with self._lock:
+            self.tabla = tabla
+            self._cargada_en = time.monotonic()
+            self._resolver_memo.cache_clear()
+
+    def invalidar(self):
+        """La próxima búsqueda recargará la tabla"""
+        with self._lock:
+            self._cargada_en = None
+
+    def _vigente(self):
+        return self._cargada_en is not None and time.monotonic() - self._cargada_en < self.segundos_recarga
+
+    def resolver(self, ubicacion):
+        if not ubicacion:
+            return CODIGO_DEFAULT
+        if not self._vigente():
+            self.recargar()
+        return self._resolver_memo(ubicacion)
+
+    def _resolver(self, ubicacion):
+        normalizada = normalizar_ubicacion(ubicacion)
+        codigo = self.tabla.get(normalizada)
+        if codigo is not None:
+            return codigo
+
+        # Prefijo conocido más largo, cortando por palabras completas
+        palabras = normalizada.split(' ')
+        for fin in range(len(palabras) - 1, 0, -1):
+            codigo = self.tabla.get(' '.join(palabras[:fin]))
+            if codigo is not None:
+                return codigo
+        return CODIGO_DEFAULT
+
+    def estadisticas(self):
+        memo = self._resolver_memo.cache_info()
+        return {
+            'ubicaciones': len(self.tabla),
+            'aciertos_memo': memo.hits,
+            'fallos_memo': memo.misses,
+            'entradas_memo': memo.currsize,
+        }
+
+
+# Instancia global del resolutor
+resolutor_ubicaciones = ResolutorUbicaciones()
@@ -31,14 +31,24 @@ urlpatterns = [
     path('status/', views.quick_health, name='status_check'),
     # Ruta para registrar un código QR nuevo (recibe datos POST desde JavaScript)
     path('registrar_qr/', views.registrar_qr, name='registrar_qr'),
+    # Ruta para registrar varios códigos QR en una sola petición (escaneos en cola)
+    path('registrar_qr_lote/', views.registrar_qr_lote, name='registrar_qr_lote'),
     # Ruta para eliminar un activo
     path('eliminar_activo/', views.eliminar_activo, name='eliminar_activo'),
     # Ruta para obtener los últimos códigos registrados (devuelve JSON)
     path('ultimos_registros/', views.ultimos_registros, name='ultimos_registros'),
     # Ruta para obtener los activos escaneados (nueva funcionalidad)
     path('obtener_activos_escaneados/', views.obtener_activos_escaneados, name='obtener_activos_escaneados'),
+    # Ruta para obtener sólo los cambios desde la versión que tiene el cliente (sincronización de la PWA)
+    path('cambios_activos/', views.cambios_activos, name='cambios_activos'),
+    # Ruta con los eventos en vivo de altas y eliminaciones (Server-Sent Events, requiere ASGI)
+    path('eventos/', views.eventos_activos, name='eventos_activos'),
     # Ruta para exportar activos escaneados a Excel
     path('exportar_activos_excel/', views.exportar_activos_excel, name='exportar_activos_excel'),
+    # Rutas para exportaciones en segundo plano (crear trabajo, consultar progreso y descargar)
+    path('exportaciones/', views.crear_exportacion, name='crear_exportacion'),
+    path('exportaciones/<int:trabajo_id>/', views.estado_exportacion, name='estado_exportacion'),
+    path('exportaciones/<int:trabajo_id>/descargar/', views.descargar_exportacion, name='descargar_exportacion'),
     # Ruta para eliminar todos los activos
     path('eliminar_todos_activos/', views.eliminar_todos_activos, name='eliminar_todos_activos'),
     
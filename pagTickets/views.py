@@ -1,21 +1,45 @@
 #Esto es una prueba de codigo para verificar si esto aun funciona, la pagina debe funcionar a la perfeccion. Si no # Importa funciones necesarias de Django
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from django.contrib import messages
 from django.views.decorators.cache import never_cache
 from django.views.decorators.http import require_http_methods
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from asgiref.sync import sync_to_async
 import json
-from .models import RegistroQR
+import base64
+import binascii
+import time
+import logging
+from .models import RegistroQR, TrabajoExportacion, calcular_identidad_activo
 import os
 
-# Importar librerías para Excel
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+# Motor de exportación (Excel write_only, CSV y NDJSON en streaming)
+from .exportacion import (
+    CONTENT_TYPE_CSV, CONTENT_TYPE_EXCEL, CONTENT_TYPE_NDJSON,
+    excel_activos_temporal, generar_csv_activos, generar_ndjson_activos,
+)
+from .trabajos_exportacion import archivo_disponible, descartar_abandonados, ruta_archivo, solicitar_exportacion
+from .ubicaciones import resolutor_ubicaciones
+# Detección y lectura de los formatos de QR (JSON, texto estructurado, SISEG encriptado, etc.)
+from .formatos_qr import estadisticas_formatos, extraer_informacion_qr
+# Secuencia de cambios y lápidas para la sincronización incremental de la PWA
+from .cambios import asignar_secuencias, obtener_cambios, registrar_eliminaciones, registrar_reinicio, secuencia_actual
+# Canal de eventos en vivo (SSE) para las tablas de escaneos abiertas
+from .eventos import TIPOS_PUBLICOS, canal_eventos
+# Streaming sin acumular la respuesta en memoria cuando se sirve con ASGI
+from .asincrono import adaptar_streaming
+# Servicio de renderizado en procesos de qrweb (sólo para sus estadísticas)
+from qrweb.procesos_render import servicio_render
+from .resumenes import DeltaResumen, restar_registro, resumen_valor_inventario, sumar_registro, vaciar_resumenes
 import datetime
 
+logger = logging.getLogger(__name__)
+
 # Función helper para formatear fechas con zona horaria local
 def format_local_datetime(dt):
     """
@@ -33,60 +57,9 @@ def format_local_datetime(dt):
 def obtener_codigo_ubicacion(ubicacion):
     """
     Determina el código específico según la ubicación del activo
+    La tabla de ubicaciones vive en ubicaciones.py (valores por defecto, settings y base de datos)
     """
-    if not ubicacion:
-        return "ARC"
-    
-    # Convertir a minúsculas para comparación case-insensitive
-    ubicacion_lower = ubicacion.lower().strip()
-    
-    # Administración
-    if ubicacion_lower in ["administracion", "1er piso administracion"]:
-        return "ADMON"
-    
-    # Almacén
-    elif ubicacion_lower in ["almacen", "1er piso almacen"]:
-        return "ALM"
-    
-    # Crédito y cobranza
-    elif ubicacion_lower in ["credito y cobranza", "cuentas por pagar", "1er piso cuentas por pagar"]:
-        return "CRED"
-    
-    # Dirección
-    elif ubicacion_lower in ["direccion", "2do piso direccion"]:
-        return "DIR"
-    
-    # Gerencia
-    elif ubicacion_lower in ["gerencia", "gerencia general", "2do piso gerencia general"]:
-        return "GER"
-    
-    # Gerencia de ventas
-    elif ubicacion_lower in ["gerencia de ventas", "1er piso gerencia de ventas"]:
-        return "GV"
-    
-    # Proyectos y Marketing
-    elif ubicacion_lower in ["proyectos", "1er piso proyectos", "marketing", "1er piso marketing"]:
-        return "PROY"
-    
-    # Monitoreo, SITE, Video Wall
-    elif ubicacion_lower in ["monitoreo", "2do piso monitoreo", "site", "2do piso site", "video wall", "2do piso video wall"]:
-        return "MON"
-    
-    # Recursos Humanos
-    elif ubicacion_lower in ["1er piso r.h"]:
-        return "R.H."
-    
-    # Sala de juntas
-    elif ubicacion_lower in ["sala de juntas", "2do piso sala juntas"]:
-        return "SJ"
-    
-    # Ventas
-    elif ubicacion_lower in ["ventas", "1er piso ventas"]:
-        return "VEN 1"
-    
-    # Archivo (default)
-    else:
-        return "ARC"
+    return resolutor_ubicaciones.resolver(ubicacion)
 
 # Vista de login con código de acceso
 def login_view(request):
@@ -146,6 +119,10 @@ def verificar_autenticacion(request):
     """Función helper para verificar si el usuario está autenticado"""
     return request.session.get('autenticado', False)
 
+async def verificar_autenticacion_async(request):
+    """verificar_autenticacion para vistas asíncronas (lee la sesión sin bloquear el event loop)"""
+    return await request.session.aget('autenticado', False)
+
 def offline_view(request):
     """Vista para mostrar cuando no hay conexión"""
     return render(request, 'offline.html')
@@ -176,86 +153,88 @@ def index(request):
         if not verificar_autenticacion(request):
             return redirect('login')
     
-    # Obtiene los últimos activos escaneados desde RegistroQR
-    registros_qr = RegistroQR.objects.order_by('-fecha_registro')[:50]
-    
-    # Extraer información de activos desde los códigos QR
-    activos_escaneados = []
-    for registro in registros_qr:
-        try:
-            # Intentar parsear el código QR como JSON
-            qr_data = json.loads(registro.codigo)
-            activo_info = {
-                'codigo': qr_data.get('codigo', registro.codigo),
-                'nombre': qr_data.get('nombre', 'Activo sin nombre'),
-                'ubicacion': qr_data.get('ubicacion', 'Sin ubicación'),
-                'marca': qr_data.get('marca', 'Sin marca'),
-                'modelo': qr_data.get('modelo', 'Sin modelo'),
-                'no_serie': qr_data.get('no_serie', 'Sin número de serie'),
-                'fecha_registro': format_local_datetime(registro.fecha_registro)
-            }
-        except (json.JSONDecodeError, AttributeError):
-            # Si no es JSON válido, usar información básica
-            activo_info = {
-                'codigo': registro.codigo,
-                'nombre': registro.codigo,
-                'ubicacion': registro.ubicacion or 'Sin ubicación',
-                'marca': 'Sin marca',
-                'modelo': 'Sin modelo',
-                'no_serie': 'Sin número de serie',
-                'fecha_registro': format_local_datetime(registro.fecha_registro)
-            }
-        activos_escaneados.append(activo_info)
+    # Obtiene los últimos activos escaneados directamente de las columnas de RegistroQR
+    registros_qr = RegistroQR.objects.order_by('-fecha_registro').values(*CAMPOS_ACTIVO)[:50]
+    activos_escaneados = [activo_desde_columnas(fila) for fila in registros_qr]
     
     # Renderiza la página HTML y le pasa los activos como contexto
     return render(request, 'index.html', {'activos_escaneados': activos_escaneados})
 
 # Función para verificar si un activo ya existe con las mismas características
-def verificar_activo_existente(activo_info):
+async def verificar_activo_existente(activo_info):
     """
     Verifica si ya existe un activo registrado con las mismas características principales.
     Compara: nombre, ubicación, marca, modelo y número de serie.
+    Usa la huella de identidad persistida, por lo que es una sola búsqueda indexada (ORM asíncrono).
     """
     try:
-        # Obtener todos los registros para comparar
-        registros = RegistroQR.objects.all()
+        identidad = calcular_identidad_activo(activo_info)
+        candidatos = RegistroQR.objects.filter(huella_identidad=identidad['huella_identidad'])
+        
+        # El número de serie sólo se compara si ambos registros lo tienen
+        no_serie_nuevo = identidad['no_serie_normalizado']
+        if no_serie_nuevo and no_serie_nuevo != 'sin número de serie':
+            candidatos = candidatos.filter(
+                Q(no_serie_normalizado='') | Q(no_serie_normalizado=no_serie_nuevo)
+            )
         
-        for registro in registros:
-            try:
-                # Extraer información del registro existente
-                info_existente = extraer_informacion_qr(registro.codigo)
-                
-                # Comparar características principales
-                nombre_match = activo_info.get('nombre', '').strip().lower() == info_existente.get('nombre', '').strip().lower()
-                ubicacion_match = activo_info.get('ubicacion', '').strip().lower() == info_existente.get('ubicacion', '').strip().lower()
-                marca_match = activo_info.get('marca', '').strip().lower() == info_existente.get('marca', '').strip().lower()
-                modelo_match = activo_info.get('modelo', '').strip().lower() == info_existente.get('modelo', '').strip().lower()
-                
-                # Si el número de serie existe y no está vacío, también compararlo
-                no_serie_nuevo = activo_info.get('no_serie', '').strip()
-                no_serie_existente = info_existente.get('no_serie', '').strip()
-                no_serie_match = True  # Por defecto asumimos que coincide
-                
-                if no_serie_nuevo and no_serie_existente and no_serie_nuevo.lower() != 'sin número de serie':
-                    no_serie_match = no_serie_nuevo.lower() == no_serie_existente.lower()
-                
-                # Si todas las características principales coinciden, es el mismo activo
-                if nombre_match and ubicacion_match and marca_match and modelo_match and no_serie_match:
-                    return registro
-                    
-            except Exception:
-                continue  # Si hay error parseando un registro, continuar con el siguiente
-                
-        return None  # No se encontró ningún activo duplicado
+        return await candidatos.afirst()
         
     except Exception:
         return None  # En caso de error, no bloquear el registro
 
+# Largo máximo de la clave de idempotencia enviada por el cliente
+LARGO_CLAVE_IDEMPOTENCIA = 64
+
+# Función helper que lee la clave de idempotencia (cabecera Idempotency-Key o campo del JSON)
+def obtener_clave_idempotencia(request, data):
+    clave = request.headers.get('Idempotency-Key') or data.get('clave_idempotencia') or data.get('idempotency_key')
+    return validar_clave_idempotencia(clave)
+
+def validar_clave_idempotencia(clave):
+    """Devuelve la clave limpia, None si no se envió, o lanza ValueError si no es válida"""
+    if clave is None:
+        return None
+    if not isinstance(clave, str) or len(clave.strip()) > LARGO_CLAVE_IDEMPOTENCIA:
+        raise ValueError(f'La clave de idempotencia debe ser texto de hasta {LARGO_CLAVE_IDEMPOTENCIA} caracteres')
+    return clave.strip() or None
+
+# Función helper que busca el registro creado con una clave de idempotencia (una búsqueda indexada)
+async def registro_por_clave_idempotencia(clave):
+    if not clave:
+        return None
+    return await RegistroQR.objects.filter(clave_idempotencia=clave).values(*CAMPOS_ACTIVO).afirst()
+
+# Función helper con la respuesta original de un registro repetido con la misma clave
+def respuesta_registro_repetido(fila):
+    activo_info = activo_desde_columnas(fila)
+    return JsonResponse({
+        'success': True,
+        'already_registered': False,
+        'repetido': True,
+        'activo': activo_info,
+        'mensaje': f'Activo "{activo_info["nombre"]}" registrado correctamente'
+    })
+
+# Función helper que guarda un escaneo nuevo y suma el activo a los resúmenes
+# (síncrona: las transacciones no funcionan con el ORM asíncrono)
+def guardar_registro_nuevo(nuevo_registro, activo_info):
+    asignar_datos_extraidos(nuevo_registro, activo_info)
+    with transaction.atomic():
+        nuevo_registro.save()
+        # Sumar el activo a los resúmenes del inventario (por ubicación, marca y tipo)
+        sumar_registro(nuevo_registro)
+        
+        # Agregar ID y fecha al activo_info
+        activo_info['id'] = nuevo_registro.id
+        activo_info['fecha_registro'] = format_local_datetime(nuevo_registro.fecha_registro)
+        canal_eventos.publicar_al_confirmar('activo', activo_info, nuevo_registro.secuencia_cambio)
+
 # Función que guarda un nuevo código QR en la base de datos
 @csrf_exempt
-def registrar_qr(request):
+async def registrar_qr(request):
     # Verificar autenticación para operaciones críticas
-    if not verificar_autenticacion(request):
+    if not await verificar_autenticacion_async(request):
         return JsonResponse({
             'success': False,
             'error': 'No autenticado',
@@ -279,17 +258,22 @@ def registrar_qr(request):
             usuario = data.get('usuario', 'Usuario Web')
             ubicacion_scan = data.get('ubicacion', 'Escáner Web')
             
+            # Si la clave ya se usó (reintento del cliente), devolver el resultado original
+            clave_idempotencia = obtener_clave_idempotencia(request, data)
+            fila_repetida = await registro_por_clave_idempotencia(clave_idempotencia)
+            if fila_repetida:
+                return respuesta_registro_repetido(fila_repetida)
+            
             # Intenta parsear el QR como JSON para extraer información del activo
-            activo_info = extraer_informacion_qr(codigo_qr)
+            # (en un hilo: desencriptar y resolver la ubicación puede consultar la base de datos)
+            activo_info = await sync_to_async(extraer_informacion_qr)(codigo_qr)
             
             # Verificar si ya existe un activo con las mismas características
-            registro_existente = verificar_activo_existente(activo_info)
+            registro_existente = await verificar_activo_existente(activo_info)
             
             if registro_existente:
                 # Si ya existe, devolver información de que está registrado
-                activo_existente = extraer_informacion_qr(registro_existente.codigo)
-                activo_existente['id'] = registro_existente.id
-                activo_existente['fecha_registro'] = format_local_datetime(registro_existente.fecha_registro)
+                activo_existente = await sync_to_async(activo_desde_registro)(registro_existente)
                 return JsonResponse({
                     'success': True,
                     'already_registered': True,
@@ -297,17 +281,22 @@ def registrar_qr(request):
                     'mensaje': f'El activo "{activo_existente["nombre"]}" ya está registrado con estas características'
                 })
             
-            # Si no existe, crear nuevo registro
-            nuevo_registro = RegistroQR.objects.create(
+            # Si no existe, crear nuevo registro guardando los datos ya extraídos del QR
+            nuevo_registro = RegistroQR(
                 codigo=codigo_qr,
                 usuario=usuario,
                 ubicacion=ubicacion_scan,
-                notas=f"Activo registrado: {activo_info['nombre']}"
+                notas=f"Activo registrado: {activo_info['nombre']}",
+                clave_idempotencia=clave_idempotencia
             )
-            
-            # Agregar ID y fecha al activo_info
-            activo_info['id'] = nuevo_registro.id
-            activo_info['fecha_registro'] = format_local_datetime(nuevo_registro.fecha_registro)
+            try:
+                await sync_to_async(guardar_registro_nuevo)(nuevo_registro, activo_info)
+            except IntegrityError:
+                # Otra petición con la misma clave se guardó al mismo tiempo
+                fila_repetida = await registro_por_clave_idempotencia(clave_idempotencia)
+                if not fila_repetida:
+                    raise
+                return respuesta_registro_repetido(fila_repetida)
             
             return JsonResponse({
                 'success': True,
@@ -321,6 +310,211 @@ def registrar_qr(request):
     
     return JsonResponse({'success': False, 'error': 'Método no permitido'})
 
+# Máximo de escaneos por petición de registro en lote
+LIMITE_LOTE_ESCANEOS = 500
+
+# Función helper con la misma regla de número de serie que verificar_activo_existente
+def coincide_no_serie(no_serie_existente, no_serie_nuevo):
+    """El número de serie sólo se compara si el nuevo lo tiene"""
+    if not no_serie_nuevo or no_serie_nuevo == 'sin número de serie':
+        return True
+    return no_serie_existente in ('', no_serie_nuevo)
+
+# Función que registra varios códigos QR en una sola petición (barrido de una oficina)
+@csrf_exempt
+def registrar_qr_lote(request):
+    """
+    POST /registrar_qr_lote/
+    {"escaneos": ["texto QR", {"codigo_qr": "...", "usuario": "...", "ubicacion": "...",
+                                "clave_idempotencia": "..."}, ...],
+     "usuario": "...", "ubicacion": "..."}
+    
+    Los duplicados se buscan con una sola consulta (por huella de identidad) para todo el lote
+    y dentro del mismo lote; los nuevos se insertan con bulk_create en una transacción.
+    Devuelve un estado por escaneo, en el mismo orden: created, already_registered o error.
+    """
+    # Verificar autenticación para operaciones críticas
+    if not verificar_autenticacion(request):
+        return JsonResponse({
+            'success': False,
+            'error': 'No autenticado',
+            'redirect': '/login/'
+        })
+    
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'})
+    
+    try:
+        data = json.loads(request.body)
+        # Se acepta {"escaneos": [...]} o directamente la lista
+        if isinstance(data, list):
+            data = {'escaneos': data}
+        escaneos = data.get('escaneos')
+        if not isinstance(escaneos, list) or not escaneos:
+            return JsonResponse({'success': False, 'error': 'Se esperaba una lista de escaneos'})
+        if len(escaneos) > LIMITE_LOTE_ESCANEOS:
+            return JsonResponse({
+                'success': False,
+                'error': f'Máximo {LIMITE_LOTE_ESCANEOS} escaneos por lote'
+            })
+        
+        usuario_lote = data.get('usuario', 'Usuario Web')
+        ubicacion_lote = data.get('ubicacion', 'Escáner Web')
+        try:
+            resultados = procesar_lote_escaneos(escaneos, usuario_lote, ubicacion_lote)
+        except IntegrityError:
+            # Otra petición guardó al mismo tiempo alguna de las claves: repetir, ahora como reintentos
+            resultados = procesar_lote_escaneos(escaneos, usuario_lote, ubicacion_lote)
+        
+        totales = {'created': 0, 'already_registered': 0, 'error': 0}
+        for resultado in resultados:
+            totales[resultado['estado']] += 1
+        
+        return JsonResponse({
+            'success': True,
+            'resultados': resultados,
+            'creados': totales['created'],
+            'ya_registrados': totales['already_registered'],
+            'errores': totales['error'],
+        })
+    
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+# Función helper que clasifica e inserta un lote de escaneos; devuelve el resultado de cada uno
+def procesar_lote_escaneos(escaneos, usuario_lote, ubicacion_lote):
+    # 1) Validar cada escaneo (sin tocar la base de datos)
+    resultados = []
+    validos = []  # (indice, codigo_qr, usuario, ubicacion, clave)
+    for indice, escaneo in enumerate(escaneos):
+        try:
+            if isinstance(escaneo, dict):
+                codigo_qr = escaneo.get('codigo_qr') or escaneo.get('codigo')
+                usuario = escaneo.get('usuario', usuario_lote)
+                ubicacion_scan = escaneo.get('ubicacion', ubicacion_lote)
+                clave = validar_clave_idempotencia(escaneo.get('clave_idempotencia') or escaneo.get('idempotency_key'))
+            else:
+                codigo_qr, usuario, ubicacion_scan, clave = escaneo, usuario_lote, ubicacion_lote, None
+            
+            if not isinstance(codigo_qr, str) or codigo_qr.strip() == '':
+                raise ValueError('Código QR vacío o inválido')
+            resultados.append({'indice': indice, 'estado': 'created'})
+            validos.append((indice, codigo_qr, usuario, ubicacion_scan, clave))
+        except Exception as e:
+            resultados.append({'indice': indice, 'estado': 'error', 'error': str(e)})
+    
+    # 2) Reintentos: una consulta para todas las claves de idempotencia del lote
+    claves = {clave for *_, clave in validos if clave}
+    ya_guardados = {}
+    if claves:
+        for fila in RegistroQR.objects.filter(clave_idempotencia__in=claves).values(*CAMPOS_ACTIVO, 'clave_idempotencia'):
+            ya_guardados[fila['clave_idempotencia']] = fila
+    
+    preparados = []  # (indice, registro, activo_info)
+    primera_por_clave = {}  # clave -> índice del primer escaneo del lote con esa clave
+    repetidos_en_lote = []  # (indice, indice del escaneo original)
+    for indice, codigo_qr, usuario, ubicacion_scan, clave in validos:
+        if clave in ya_guardados:
+            activo_info = activo_desde_columnas(ya_guardados[clave])
+            resultados[indice].update({
+                'repetido': True,
+                'activo': activo_info,
+                'mensaje': f'Activo "{activo_info["nombre"]}" registrado correctamente'
+            })
+            continue
+        if clave in primera_por_clave:
+            repetidos_en_lote.append((indice, primera_por_clave[clave]))
+            continue
+        if clave:
+            primera_por_clave[clave] = indice
+        
+        try:
+            activo_info = extraer_informacion_qr(codigo_qr)
+            registro = RegistroQR(
+                codigo=codigo_qr,
+                usuario=usuario,
+                ubicacion=ubicacion_scan,
+                notas=f"Activo registrado: {activo_info['nombre']}",
+                clave_idempotencia=clave
+            )
+            asignar_datos_extraidos(registro, activo_info)
+            preparados.append((indice, registro, activo_info))
+        except Exception as e:
+            resultados[indice] = {'indice': indice, 'estado': 'error', 'error': str(e)}
+    
+    # 3) Una consulta para todos los posibles duplicados ya guardados (el más reciente primero)
+    existentes = {}
+    huellas = {registro.huella_identidad for _, registro, _ in preparados}
+    if huellas:
+        filas = RegistroQR.objects.filter(huella_identidad__in=huellas).order_by('-fecha_registro', '-id').values(
+            *CAMPOS_ACTIVO, 'huella_identidad', 'no_serie_normalizado'
+        )
+        for fila in filas:
+            existentes.setdefault(fila['huella_identidad'], []).append(fila)
+    
+    # 4) Clasificar: duplicado en la base de datos, duplicado dentro del lote o nuevo
+    nuevos = []
+    nuevos_por_huella = {}  # huella -> registros nuevos del lote (el más reciente primero)
+    duplicados_en_lote = []  # (indice, registro nuevo con el que coincide)
+    for indice, registro, activo_info in preparados:
+        huella, no_serie = registro.huella_identidad, registro.no_serie_normalizado
+        previo = next(
+            (nuevo for nuevo in nuevos_por_huella.get(huella, []) if coincide_no_serie(nuevo.no_serie_normalizado, no_serie)),
+            None
+        )
+        if previo is not None:
+            duplicados_en_lote.append((indice, previo))
+            continue
+        fila = next(
+            (fila for fila in existentes.get(huella, []) if coincide_no_serie(fila['no_serie_normalizado'], no_serie)),
+            None
+        )
+        if fila is not None:
+            activo_existente = activo_desde_columnas(fila)
+            resultados[indice] = {
+                'indice': indice,
+                'estado': 'already_registered',
+                'activo': activo_existente,
+                'mensaje': f'El activo "{activo_existente["nombre"]}" ya está registrado con estas características'
+            }
+            continue
+        nuevos.append((indice, registro, activo_info))
+        nuevos_por_huella.setdefault(huella, []).insert(0, registro)
+    
+    # 5) Insertar los nuevos y actualizar los resúmenes en una sola transacción
+    if nuevos:
+        delta = DeltaResumen()
+        with transaction.atomic():
+            registros_nuevos = [registro for _, registro, _ in nuevos]
+            # bulk_create no llama a save(): los números de la secuencia de cambios se asignan aquí
+            asignar_secuencias(registros_nuevos)
+            RegistroQR.objects.bulk_create(registros_nuevos)
+            for _, registro, _ in nuevos:
+                delta.sumar(registro)
+            delta.aplicar()
+    
+    activos_nuevos = {}
+    for indice, registro, activo_info in nuevos:
+        activo_info['id'] = registro.id
+        activo_info['fecha_registro'] = format_local_datetime(registro.fecha_registro)
+        activos_nuevos[id(registro)] = activo_info
+        canal_eventos.publicar_al_confirmar('activo', activo_info, registro.secuencia_cambio)
+        resultados[indice]['activo'] = activo_info
+        resultados[indice]['mensaje'] = f'Activo "{activo_info["nombre"]}" registrado correctamente'
+    for indice, previo in duplicados_en_lote:
+        activo_existente = activos_nuevos[id(previo)]
+        resultados[indice] = {
+            'indice': indice,
+            'estado': 'already_registered',
+            'activo': activo_existente,
+            'mensaje': f'El activo "{activo_existente["nombre"]}" se registró en este mismo lote'
+        }
+    # Misma clave repetida dentro del lote: mismo resultado que el primer escaneo
+    for indice, indice_original in repetidos_en_lote:
+        resultados[indice] = {**resultados[indice_original], 'indice': indice, 'repetido': True}
+    
+    return resultados
+
 # Función para eliminar un activo
 @csrf_exempt
 def eliminar_activo(request):
@@ -342,10 +536,15 @@ def eliminar_activo(request):
             
             # Buscar y eliminar el registro
             registro = RegistroQR.objects.get(id=activo_id)
-            activo_info = extraer_informacion_qr(registro.codigo)
-            nombre_activo = activo_info['nombre']
+            nombre_activo = activo_desde_registro(registro)['nombre']
             
-            registro.delete()
+            registro_id = registro.id
+            with transaction.atomic():
+                restar_registro(registro)
+                # Lápida para que los clientes sincronizados quiten el activo de su copia
+                secuencia = registrar_eliminaciones([registro_id])
+                registro.delete()
+                canal_eventos.publicar_al_confirmar('activo_eliminado', {'id': registro_id}, secuencia)
             
             return JsonResponse({
                 'success': True,
@@ -359,189 +558,251 @@ def eliminar_activo(request):
     
     return JsonResponse({'success': False, 'error': 'Método no permitido'})
 
-# Función auxiliar para extraer información del QR
-def extraer_informacion_qr(codigo_qr):
+# Tamaño máximo de página y de bloque para la lectura de activos
+LIMITE_MAXIMO_PAGINA = 1000
+TAMANO_BLOQUE_ITERADOR = 2000
+
+# Columnas de RegistroQR necesarias para construir la información de un activo
+CAMPOS_ACTIVO = (
+    'id', 'codigo', 'codigo_activo', 'nombre_activo', 'ubicacion_activo', 'marca', 'modelo',
+    'numero_serie', 'codigo_ubicacion', 'fecha_registro', 'datos_extraidos',
+)
+
+# Función helper que extrae las especificaciones adicionales de un QR en formato JSON
+def extraer_especificaciones(codigo_qr):
     """
-    Extrae información del código QR soportando múltiples formatos:
-    - JSON: {"codigo": "ACT001", "nombre": "Laptop", ...}
-    - Formato de texto estructurado: "Activo: Escritorio en L Ubicación: 1er piso R.H. Marca: Techni mobili Modelo: Havano N. Serie: -."
-    - Texto simple separado por |: ACT001|Laptop Dell|Oficina 1|Dell|Latitude|SN123456
-    - Texto simple: cualquier código
+    Devuelve las llaves del JSON que no forman parte de los campos estándar del activo
     """
+    texto = codigo_qr.strip()
+    if not (texto.startswith('{') and texto.endswith('}')):
+        return {}
     try:
-        # Intento 1: Parsear como JSON
-        if codigo_qr.strip().startswith('{') and codigo_qr.strip().endswith('}'):
-            qr_data = json.loads(codigo_qr)
-            ubicacion = qr_data.get('ubicacion', qr_data.get('location', 'Sin ubicación'))
-            return {
-                'codigo': qr_data.get('codigo', qr_data.get('code', codigo_qr)),
-                'nombre': qr_data.get('nombre', qr_data.get('activo', qr_data.get('asset', 'Activo sin nombre'))),
-                'ubicacion': ubicacion,
-                'marca': qr_data.get('marca', qr_data.get('brand', 'Sin marca')),
-                'modelo': qr_data.get('modelo', qr_data.get('model', 'Sin modelo')),
-                'no_serie': qr_data.get('no_serie', qr_data.get('serial', qr_data.get('serie', 'Sin número de serie'))),
-                'codigo_ubicacion': obtener_codigo_ubicacion(ubicacion)
-            }
-        
-        # Intento 2: Formato de texto estructurado (el formato que mencionas)
-        elif any(palabra in codigo_qr.lower() for palabra in ['activo:', 'ubicación:', 'marca:', 'modelo:', 'serie:']):
-            return parsear_texto_estructurado(codigo_qr)
-        
-        # Intento 3: Parsear como texto separado por |
-        elif '|' in codigo_qr:
-            partes = codigo_qr.split('|')
-            ubicacion = partes[2].strip() if len(partes) > 2 else 'Sin ubicación'
-            return {
-                'codigo': partes[0].strip() if len(partes) > 0 else codigo_qr,
-                'nombre': partes[1].strip() if len(partes) > 1 else 'Activo sin nombre',
-                'ubicacion': ubicacion,
-                'marca': partes[3].strip() if len(partes) > 3 else 'Sin marca',
-                'modelo': partes[4].strip() if len(partes) > 4 else 'Sin modelo',
-                'no_serie': partes[5].strip() if len(partes) > 5 else 'Sin número de serie',
-                'codigo_ubicacion': obtener_codigo_ubicacion(ubicacion)
-            }
-        
-        # Intento 4: Buscar patrones conocidos en el texto
-        else:
-            # Buscar patrones como "ACT001 - Laptop Dell" o similares
-            nombre_detectado = codigo_qr
-            codigo_detectado = codigo_qr
-            
-            # Si contiene guión, probablemente sea código - nombre
-            if ' - ' in codigo_qr:
-                partes_guion = codigo_qr.split(' - ', 1)
-                codigo_detectado = partes_guion[0].strip()
-                nombre_detectado = partes_guion[1].strip()
-            
-            return {
-                'codigo': codigo_detectado,
-                'nombre': nombre_detectado,
-                'ubicacion': 'Sin ubicación',
-                'marca': 'Sin marca',
-                'modelo': 'Sin modelo',
-                'no_serie': 'Sin número de serie',
-                'codigo_ubicacion': obtener_codigo_ubicacion('Sin ubicación')
-            }
-            
-    except Exception:
-        # Si todo falla, usar el código QR tal como está
-        return {
-            'codigo': codigo_qr,
-            'nombre': codigo_qr,
-            'ubicacion': 'Sin ubicación',
-            'marca': 'Sin marca',
-            'modelo': 'Sin modelo',
-            'no_serie': 'Sin número de serie',
-            'codigo_ubicacion': obtener_codigo_ubicacion('Sin ubicación')
-        }
+        qr_data = json.loads(texto)
+    except (json.JSONDecodeError, ValueError):
+        return {}
+    if not isinstance(qr_data, dict):
+        return {}
+    campos_estandar = {
+        'codigo', 'code', 'nombre', 'activo', 'asset', 'ubicacion', 'location',
+        'marca', 'brand', 'modelo', 'model', 'no_serie', 'serial', 'serie',
+    }
+    return {llave: valor for llave, valor in qr_data.items() if llave not in campos_estandar}
+
+# Función helper que guarda en el registro los datos extraídos del QR (parse-once)
+def asignar_datos_extraidos(registro, activo_info):
+    tipo_producto = siseg_api._determinar_tipo_producto(
+        str(activo_info.get('nombre', '')).lower(),
+        str(activo_info.get('modelo', '')).lower()
+    )
+    registro.asignar_datos_activo(
+        activo_info,
+        tipo_producto=tipo_producto,
+        especificaciones=extraer_especificaciones(registro.codigo)
+    )
 
-def parsear_texto_estructurado(texto_qr):
+# Función helper que construye la información de un activo desde una fila de .values()
+def activo_desde_columnas(fila):
     """
-    Parsea texto estructurado como:
-    "Activo: Escritorio en L Ubicación: 1er piso R.H. Marca: Techni mobili Modelo: Havano N. Serie: -."
+    Usa las columnas persistidas; sólo los registros antiguos aún no rellenados
+    (ver comando rellenar_datos_activos) vuelven a parsear el código QR.
     """
-    # Inicializar valores por defecto
-    resultado = {
-        'codigo': texto_qr[:20] + '...' if len(texto_qr) > 20 else texto_qr,  # Usar parte del texto como código
-        'nombre': 'Activo sin nombre',
-        'ubicacion': 'Sin ubicación',
-        'marca': 'Sin marca',
-        'modelo': 'Sin modelo',
-        'no_serie': 'Sin número de serie'
-    }
-    
-    try:
-        # Convertir texto a minúsculas para búsqueda, pero mantener original para extraer valores
-        texto_busqueda = texto_qr.lower()
-        
-        # Patrones de búsqueda (en orden de prioridad)
-        patrones = {
-            'nombre': ['activo:', 'asset:', 'equipo:', 'item:'],
-            'ubicacion': ['ubicación:', 'ubicacion:', 'location:', 'lugar:'],
-            'marca': ['marca:', 'brand:', 'fabricante:'],
-            'modelo': ['modelo:', 'model:', 'tipo:'],
-            'no_serie': ['n. serie:', 'serie:', 'serial:', 'número de serie:', 'numero de serie:', 'sn:']
-        }
-        
-        for campo, palabras_clave in patrones.items():
-            for palabra_clave in palabras_clave:
-                if palabra_clave in texto_busqueda:
-                    # Encontrar la posición de la palabra clave
-                    inicio = texto_busqueda.find(palabra_clave)
-                    if inicio != -1:
-                        # Buscar el inicio del valor (después de la palabra clave)
-                        inicio_valor = inicio + len(palabra_clave)
-                        
-                        # Buscar el final del valor (hasta la siguiente palabra clave o final del texto)
-                        fin_valor = len(texto_qr)
-                        
-                        # Buscar la siguiente palabra clave para determinar el fin
-                        for otros_campos, otras_palabras in patrones.items():
-                            if otros_campos != campo:
-                                for otra_palabra in otras_palabras:
-                                    pos_siguiente = texto_busqueda.find(otra_palabra, inicio_valor)
-                                    if pos_siguiente != -1 and pos_siguiente < fin_valor:
-                                        fin_valor = pos_siguiente
-                        
-                        # Extraer el valor y limpiarlo
-                        valor = texto_qr[inicio_valor:fin_valor].strip()
-                        
-                        # Limpiar caracteres innecesarios al final
-                        valor = valor.rstrip('.,;:').strip()
-                        
-                        if valor:
-                            resultado[campo] = valor
-                        break
-        
-        # Si no se encontró nombre, usar la primera parte como nombre
-        if resultado['nombre'] == 'Activo sin nombre' and resultado['codigo']:
-            resultado['nombre'] = resultado['codigo']
-        
-        # Generar un código más limpio si es posible
-        if resultado['nombre'] != 'Activo sin nombre':
-            # Tomar las primeras palabras del nombre como código
-            palabras_nombre = resultado['nombre'].split()[:3]
-            codigo_generado = ''.join(palabra[:3].upper() for palabra in palabras_nombre if palabra.isalpha())
-            if len(codigo_generado) >= 3:
-                resultado['codigo'] = codigo_generado
-        
-        # Agregar código de ubicación
-        resultado['codigo_ubicacion'] = obtener_codigo_ubicacion(resultado['ubicacion'])
-        
-        return resultado
-        
-    except Exception:
-        # Si hay error en el parsing, devolver el texto original como nombre
-        return {
-            'codigo': texto_qr[:20] + '...' if len(texto_qr) > 20 else texto_qr,
-            'nombre': texto_qr,
-            'ubicacion': 'Sin ubicación',
-            'marca': 'Sin marca',
-            'modelo': 'Sin modelo',
-            'no_serie': 'Sin número de serie',
-            'codigo_ubicacion': obtener_codigo_ubicacion('Sin ubicación')
+    if fila['datos_extraidos']:
+        activo_info = {
+            'codigo': fila['codigo_activo'],
+            'nombre': fila['nombre_activo'],
+            'ubicacion': fila['ubicacion_activo'],
+            'marca': fila['marca'],
+            'modelo': fila['modelo'],
+            'no_serie': fila['numero_serie'],
+            'codigo_ubicacion': fila['codigo_ubicacion'],
         }
+    else:
+        activo_info = extraer_informacion_qr(fila['codigo'])
+    activo_info['id'] = fila['id']
+    activo_info['fecha_registro'] = format_local_datetime(fila['fecha_registro'])
+    return activo_info
+
+# Función helper para vistas asíncronas que convierte en un hilo las filas ya leídas con el ORM asíncrono
+# (las filas antiguas sin datos extraídos vuelven a parsear el QR, lo que puede consultar la base de datos)
+@sync_to_async
+def activos_desde_filas(filas):
+    return [activo_desde_columnas(fila) for fila in filas]
+
+# Función helper que recorre un queryset .values() por bloques, sin cargarlo completo en memoria
+def iterar_activos(filas):
+    for fila in filas.iterator(chunk_size=TAMANO_BLOQUE_ITERADOR):
+        yield activo_desde_columnas(fila)
+
+# Función helper equivalente a activo_desde_columnas para una instancia de RegistroQR
+def activo_desde_registro(registro):
+    return activo_desde_columnas({campo: getattr(registro, campo) for campo in CAMPOS_ACTIVO})
+
+# Funciones helper para el cursor de paginación (fecha_registro, id)
+def codificar_cursor(fecha_registro, registro_id):
+    valor = f"{fecha_registro.isoformat()}|{registro_id}"
+    return base64.urlsafe_b64encode(valor.encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(cursor):
+    """Devuelve (fecha_registro, id) o lanza ValueError si el cursor no es válido"""
+    try:
+        valor = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        fecha_texto, id_texto = valor.rsplit('|', 1)
+        return datetime.datetime.fromisoformat(fecha_texto), int(id_texto)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValueError('Cursor inválido')
 
 # Función para obtener los activos escaneados (para actualizar la tabla en tiempo real)
-def obtener_activos_escaneados(request):
+async def obtener_activos_escaneados(request):
+    """
+    Devuelve los activos escaneados, del más reciente al más antiguo.
+    
+    Parámetros GET opcionales:
+    - limit: tamaño de página (máximo LIMITE_MAXIMO_PAGINA); activa la paginación por cursor
+    - after: cursor 'siguiente' devuelto por la página anterior
+    - formato=ndjson: transmite un activo JSON por línea sin cargar la tabla en memoria
+    Sin parámetros devuelve la lista completa como antes.
+    """
     try:
-        # Obtiene todos los registros QR
-        registros = RegistroQR.objects.order_by('-fecha_registro')
-        
-        # Convierte los registros a formato de activos usando la función de extracción mejorada
-        activos_data = []
-        for registro in registros:
-            activo_info = extraer_informacion_qr(registro.codigo)
-            # Agregar ID del registro y fecha de registro
-            activo_info['id'] = registro.id
-            activo_info['fecha_registro'] = format_local_datetime(registro.fecha_registro)
-            activos_data.append(activo_info)
+        registros = RegistroQR.objects.order_by('-fecha_registro', '-id')
+        
+        # Paginación por llave (keyset): sólo registros posteriores al cursor
+        cursor = request.GET.get('after')
+        if cursor:
+            try:
+                fecha_cursor, id_cursor = decodificar_cursor(cursor)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            registros = registros.filter(
+                Q(fecha_registro__lt=fecha_cursor) | Q(fecha_registro=fecha_cursor, id__lt=id_cursor)
+            )
+        
+        limite = None
+        if request.GET.get('limit'):
+            try:
+                limite = min(max(int(request.GET['limit']), 1), LIMITE_MAXIMO_PAGINA)
+            except ValueError:
+                return JsonResponse({'error': 'limit debe ser un número entero'}, status=400)
+        
+        filas = registros.values(*CAMPOS_ACTIVO)
+        
+        # Modo streaming NDJSON: memoria constante sin importar el tamaño de la tabla
+        if request.GET.get('formato') == 'ndjson':
+            if limite is not None:
+                filas = filas[:limite]
+            
+            return adaptar_streaming(
+                request,
+                StreamingHttpResponse(generar_ndjson_activos(iterar_activos(filas)), content_type=CONTENT_TYPE_NDJSON)
+            )
+        
+        # Modo paginado: se pide un registro extra para saber si hay más páginas
+        if limite is not None:
+            pagina = [fila async for fila in filas[:limite + 1]]
+            hay_mas = len(pagina) > limite
+            pagina = pagina[:limite]
+            siguiente = None
+            if hay_mas:
+                ultima = pagina[-1]
+                siguiente = codificar_cursor(ultima['fecha_registro'], ultima['id'])
+            return JsonResponse({
+                'activos': await activos_desde_filas(pagina),
+                'siguiente': siguiente,
+                'hay_mas': hay_mas
+            })
+        
+        # Sin límite: lista completa (compatibilidad con la página principal)
+        activos_data = await activos_desde_filas([fila async for fila in filas])
         
         return JsonResponse({'activos': activos_data})
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+# Función para obtener los cambios del inventario desde una versión (sincronización incremental de la PWA)
+def cambios_activos(request):
+    """
+    GET /cambios_activos/?desde=<version>&limit=N
+    
+    Devuelve los activos creados o modificados y los ids eliminados después de `desde`, en orden.
+    Sin `desde` (o si el cliente debe partir de cero tras una eliminación masiva) responde con
+    reiniciar=true y todos los activos actuales, por páginas. El cliente guarda `version`
+    y la envía en la siguiente petición; con hay_mas=true debe pedir de inmediato la siguiente página.
+    """
+    # Verificar autenticación: la respuesta incluye los códigos QR de todo el inventario
+    if not verificar_autenticacion(request):
+        return JsonResponse({
+            'success': False,
+            'error': 'No autenticado',
+            'redirect': '/login/'
+        }, status=401)
+    
+    try:
+        desde = request.GET.get('desde')
+        try:
+            desde = int(desde) if desde not in (None, '') else None
+            limite = min(max(int(request.GET.get('limit', LIMITE_MAXIMO_PAGINA)), 1), LIMITE_MAXIMO_PAGINA)
+        except ValueError:
+            return JsonResponse({'error': 'desde y limit deben ser números enteros'}, status=400)
+        
+        cambios = obtener_cambios(desde, limite, CAMPOS_ACTIVO)
+        return JsonResponse({
+            'version': str(cambios['version']),
+            'reiniciar': cambios['reiniciar'],
+            'activos': [activo_desde_columnas(fila) for fila in cambios['altas']],
+            'eliminados': cambios['eliminados'],
+            'hay_mas': cambios['hay_mas'],
+        })
+    
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+# Función helper con los eventos que un cliente se perdió desde Last-Event-ID (su última secuencia)
+def eventos_desde_secuencia(desde):
+    cambios = obtener_cambios(desde, LIMITE_MAXIMO_PAGINA, CAMPOS_ACTIVO)
+    if cambios['reiniciar'] or cambios['hay_mas']:
+        # Demasiados cambios para enviarlos como eventos: el cliente vuelve a cargar su tabla
+        return [{'tipo': 'recargar', 'datos': {}, 'id': secuencia_actual()}]
+    # Los eliminados no pueden estar entre las altas (sus filas ya no existen)
+    eventos = [{'tipo': 'activo_eliminado', 'datos': {'id': registro_id}, 'id': None} for registro_id in cambios['eliminados']]
+    eventos += [{'tipo': 'activo', 'datos': activo_desde_columnas(fila), 'id': None} for fila in cambios['altas']]
+    if eventos:
+        eventos[-1]['id'] = cambios['version']
+    return eventos
+
+# Función que transmite en vivo las altas y eliminaciones de activos (Server-Sent Events)
+@require_http_methods(["GET"])
+async def eventos_activos(request):
+    """
+    GET /eventos/ (text/event-stream, requiere el servidor ASGI: pagTickets.asgi)
+    
+    Eventos: activo (alta), activo_eliminado ({"id": ...}), activos_reiniciados, codigo_qr
+    (escaneos de /qr/) y recargar (el cliente debe volver a cargar su tabla completa).
+    Sin sesión sólo se envían codigo_qr y activos_reiniciados. Al reconectar, el navegador envía
+    Last-Event-ID (la secuencia de cambios del último evento) y se reenvía lo que se perdió.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Bajo WSGI la respuesta sin fin ocuparía un worker completo: el cliente sigue consultando
+        return JsonResponse({'success': False, 'error': 'Eventos en vivo no disponibles en este servidor'}, status=503)
+    
+    autenticado = await request.session.aget('autenticado', False)
+    tipos = None if autenticado else TIPOS_PUBLICOS
+    # Primero la suscripción y luego los cambios perdidos, para no dejar huecos entre ambos
+    cola = canal_eventos.conectar()
+    try:
+        iniciales = []
+        ultimo_id = request.headers.get('Last-Event-ID', '')
+        if autenticado and ultimo_id.isdigit():
+            iniciales = await sync_to_async(eventos_desde_secuencia)(int(ultimo_id))
+    except Exception:
+        canal_eventos.desconectar(cola)
+        raise
+    
+    response = StreamingHttpResponse(canal_eventos.transmitir(cola, tipos, iniciales), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Evita que un proxy (nginx) acumule los eventos antes de enviarlos
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 # Función para exportar activos escaneados a Excel
 def exportar_activos_excel(request):
     # Verificar autenticación para operaciones críticas
@@ -553,100 +814,150 @@ def exportar_activos_excel(request):
         })
     
     try:
-        # Crear un nuevo libro de Excel
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Activos Escaneados"
-        
-        # Configurar estilos
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="DC2626", end_color="DC2626", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        border = Border(left=Side(style='thin'), right=Side(style='thin'), 
-                       top=Side(style='thin'), bottom=Side(style='thin'))
-        
-        # Encabezados
-        headers = ['Código QR', 'Activo', 'Ubicación', 'Marca', 'Modelo', 'No. de Serie', 'Fecha de Registro']
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = border
-        
-        # Obtener todos los registros y convertirlos a activos
-        registros = RegistroQR.objects.order_by('-fecha_registro')
-        
-        # Agregar datos
-        row = 2
-        for registro in registros:
-            # Usar la función de extracción mejorada
-            activo_info = extraer_informacion_qr(registro.codigo)
-            
-            # Combinar código QR con código de ubicación
-            codigo_completo = activo_info['codigo']
-            if activo_info.get('codigo_ubicacion'):
-                codigo_completo += f" ({activo_info['codigo_ubicacion']})"
-            
-            ws.cell(row=row, column=1, value=codigo_completo).border = border
-            ws.cell(row=row, column=2, value=activo_info['nombre']).border = border
-            ws.cell(row=row, column=3, value=activo_info['ubicacion']).border = border
-            ws.cell(row=row, column=4, value=activo_info['marca']).border = border
-            ws.cell(row=row, column=5, value=activo_info['modelo']).border = border
-            ws.cell(row=row, column=6, value=activo_info['no_serie']).border = border
-            ws.cell(row=row, column=7, value=format_local_datetime(registro.fecha_registro)).border = border
-            row += 1
-        
-        # Ajustar ancho de columnas
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].width = 20
-        
-        # Crear respuesta HTTP
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="activos_escaneados_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
-        
-        # Guardar el archivo en la respuesta
-        wb.save(response)
-        return response
+        formato = request.GET.get('formato', 'xlsx').lower()
+        marca_tiempo = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        # Los registros se leen por bloques directamente de sus columnas
+        filas = RegistroQR.objects.order_by('-fecha_registro', '-id').values(*CAMPOS_ACTIVO)
+        activos = iterar_activos(filas)
+        
+        # Formatos de streaming para exportaciones muy grandes
+        if formato in ('csv', 'ndjson'):
+            if formato == 'csv':
+                response = StreamingHttpResponse(generar_csv_activos(activos), content_type=CONTENT_TYPE_CSV)
+            else:
+                response = StreamingHttpResponse(generar_ndjson_activos(activos), content_type=CONTENT_TYPE_NDJSON)
+            response['Content-Disposition'] = f'attachment; filename="activos_escaneados_{marca_tiempo}.{formato}"'
+            return adaptar_streaming(request, response)
+        
+        # Excel en modo write_only escrito a un archivo temporal
+        archivo = excel_activos_temporal(activos)
+        return adaptar_streaming(request, FileResponse(
+            archivo,
+            as_attachment=True,
+            filename=f'activos_escaneados_{marca_tiempo}.xlsx',
+            content_type=CONTENT_TYPE_EXCEL
+        ))
         
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+# ============================================
+# EXPORTACIONES EN SEGUNDO PLANO
+# ============================================
+
+# Función helper que describe el estado de un trabajo de exportación
+def estado_trabajo_exportacion(trabajo, reutilizado=False):
+    porcentaje = 100 if trabajo.estado == 'completado' else (
+        round(trabajo.progreso * 100 / trabajo.total, 1) if trabajo.total else 0
+    )
+    return {
+        'id': trabajo.id,
+        'formato': trabajo.formato,
+        'estado': trabajo.estado,
+        'progreso': trabajo.progreso,
+        'total': trabajo.total,
+        'porcentaje': porcentaje,
+        'reutilizado': reutilizado,
+        'error': trabajo.error,
+        'url_estado': f'/exportaciones/{trabajo.id}/',
+        'url_descarga': f'/exportaciones/{trabajo.id}/descargar/' if trabajo.estado == 'completado' else None
+    }
+
+@csrf_exempt
+def crear_exportacion(request):
+    """
+    Crea (o reutiliza) un trabajo de exportación en segundo plano
+    
+    POST /exportaciones/
+    Body: {"formato": "xlsx"}  (xlsx o csv)
+    """
+    if not verificar_autenticacion(request):
+        return JsonResponse({
+            'success': False,
+            'error': 'No autenticado',
+            'redirect': '/login/'
+        })
+    
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+    
+    try:
+        data = json.loads(request.body) if request.body else {}
+        formato = str(data.get('formato', 'xlsx')).lower()
+        if formato not in ('xlsx', 'csv'):
+            return JsonResponse({'success': False, 'error': 'Formato no soportado'}, status=400)
+        
+        trabajo, reutilizado = solicitar_exportacion(formato)
+        return JsonResponse({
+            'success': True,
+            'trabajo': estado_trabajo_exportacion(trabajo, reutilizado)
+        }, status=200 if reutilizado else 202)
+        
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+def estado_exportacion(request, trabajo_id):
+    """
+    Devuelve el progreso de un trabajo de exportación
+    
+    GET /exportaciones/<id>/
+    """
+    if not verificar_autenticacion(request):
+        return JsonResponse({
+            'success': False,
+            'error': 'No autenticado',
+            'redirect': '/login/'
+        })
+    
+    # Un trabajo que dejó de avanzar se informa como error para que el cliente solicite otro
+    descartar_abandonados(TrabajoExportacion.objects.filter(id=trabajo_id))
+    try:
+        trabajo = TrabajoExportacion.objects.get(id=trabajo_id)
+    except TrabajoExportacion.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Trabajo no encontrado'}, status=404)
+    
+    return JsonResponse({'success': True, 'trabajo': estado_trabajo_exportacion(trabajo)})
+
+def descargar_exportacion(request, trabajo_id):
+    """
+    Descarga el archivo generado por un trabajo de exportación completado
+    
+    GET /exportaciones/<id>/descargar/
+    """
+    if not verificar_autenticacion(request):
+        return JsonResponse({
+            'success': False,
+            'error': 'No autenticado',
+            'redirect': '/login/'
+        })
+    
+    try:
+        trabajo = TrabajoExportacion.objects.get(id=trabajo_id)
+    except TrabajoExportacion.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Trabajo no encontrado'}, status=404)
+    
+    if trabajo.estado != 'completado':
+        return JsonResponse({'success': False, 'error': 'La exportación aún no está lista'}, status=409)
+    if not archivo_disponible(trabajo):
+        return JsonResponse({'success': False, 'error': 'El archivo ya no está disponible, solicita una nueva exportación'}, status=410)
+    
+    marca_tiempo = timezone.localtime(trabajo.fecha_fin).strftime("%Y%m%d_%H%M%S")
+    return adaptar_streaming(request, FileResponse(
+        open(ruta_archivo(trabajo), 'rb'),
+        as_attachment=True,
+        filename=f'activos_escaneados_{marca_tiempo}.{trabajo.formato}',
+        content_type=CONTENT_TYPE_EXCEL if trabajo.formato == 'xlsx' else CONTENT_TYPE_CSV
+    ))
+
 # Vista para obtener los últimos registros (API JSON)
-def ultimos_registros(request):
+async def ultimos_registros(request):
     """Vista que devuelve los últimos registros QR en formato JSON"""
     try:
-        registros = RegistroQR.objects.order_by('-fecha_registro')[:10]
-        datos = []
-        
-        for registro in registros:
-            try:
-                # Intentar parsear como JSON
-                qr_data = json.loads(registro.codigo)
-                datos.append({
-                    'id': registro.id,
-                    'codigo': qr_data.get('codigo', registro.codigo),
-                    'nombre': qr_data.get('nombre', 'Sin nombre'),
-                    'ubicacion': qr_data.get('ubicacion', 'Sin ubicación'),
-                    'marca': qr_data.get('marca', 'Sin marca'),
-                    'modelo': qr_data.get('modelo', 'Sin modelo'),
-                    'no_serie': qr_data.get('no_serie', 'Sin número de serie'),
-                    'fecha_registro': format_local_datetime(registro.fecha_registro)
-                })
-            except (json.JSONDecodeError, AttributeError):
-                # Si no es JSON, usar el código tal como está
-                datos.append({
-                    'id': registro.id,
-                    'codigo': registro.codigo,
-                    'nombre': registro.codigo,
-                    'ubicacion': 'Sin ubicación',
-                    'marca': 'Sin marca',
-                    'modelo': 'Sin modelo',
-                    'no_serie': 'Sin número de serie',
-                    'fecha_registro': format_local_datetime(registro.fecha_registro)
-                })
+        registros = RegistroQR.objects.order_by('-fecha_registro').values(*CAMPOS_ACTIVO)[:10]
+        datos = await activos_desde_filas([fila async for fila in registros])
         
         return JsonResponse({'registros': datos})
     
@@ -671,7 +982,11 @@ def eliminar_todos_activos(request):
             total_qr_registros = RegistroQR.objects.count()
             
             # Eliminar todos los registros QR de pagTickets
-            RegistroQR.objects.all().delete()
+            with transaction.atomic():
+                RegistroQR.objects.all().delete()
+                vaciar_resumenes()
+                secuencia = registrar_reinicio()
+                canal_eventos.publicar_al_confirmar('activos_reiniciados', {}, secuencia)
             
             # Eliminar todos los registros QR de qrweb (si existen)
             try:
@@ -682,7 +997,7 @@ def eliminar_todos_activos(request):
             except ImportError:
                 total_eliminados = total_qr_registros
             
-            print(f"🗑️ ELIMINACIÓN MASIVA: {total_eliminados} activos eliminados por el usuario")
+            logger.warning(f"🗑️ ELIMINACIÓN MASIVA: {total_eliminados} activos eliminados por el usuario")
             
             return JsonResponse({
                 'success': True,
@@ -691,7 +1006,7 @@ def eliminar_todos_activos(request):
             })
             
         except Exception as e:
-            print(f"❌ Error al eliminar todos los activos: {e}")
+            logger.exception(f"❌ Error al eliminar todos los activos: {e}")
             return JsonResponse({
                 'success': False,
                 'message': f'Error al eliminar activos: {str(e)}'
@@ -776,6 +1091,7 @@ def pwa_offline_fallback(request):
 # ================================================================================================
 
 from .api_services import siseg_api
+from .inventario import TAMANO_LOTE_PRECIOS, persistir_precios
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -902,35 +1218,13 @@ def generar_reporte_inventario_api(request):
         activos = data.get('activos', [])
         
         if not activos:
-            # Si no se envían activos, usar todos los registros de la base de datos
-            registros = RegistroQR.objects.all()
-            activos = []
-            
-            for registro in registros:
-                activo_data = {}
-                try:
-                    # Intentar parsear los datos del QR
-                    qr_data = registro.datos_qr.split('|')
-                    if len(qr_data) >= 4:
-                        activo_data = {
-                            'nombre': qr_data[0],
-                            'marca': qr_data[3] if len(qr_data) > 3 else 'Sin marca',
-                            'modelo': qr_data[1] if len(qr_data) > 1 else 'Sin modelo'
-                        }
-                    else:
-                        activo_data = {
-                            'nombre': registro.datos_qr,
-                            'marca': 'Sin marca',
-                            'modelo': 'Sin modelo'
-                        }
-                except:
-                    activo_data = {
-                        'nombre': registro.datos_qr,
-                        'marca': 'Sin marca',
-                        'modelo': 'Sin modelo'
-                    }
-                
-                activos.append(activo_data)
+            # Si no se envían activos, resumir todo el inventario con agregados en la base de datos
+            reporte = resumen_valor_inventario()
+            return JsonResponse({
+                'success': True,
+                'data': reporte,
+                'mensaje': f"Reporte generado para {reporte['total_activos']} activos"
+            })
         
         # Generar reporte
         reporte = siseg_api.generar_reporte_inventario(activos)
@@ -999,6 +1293,10 @@ def verificar_estado_apis_view(request):
                 'catalogos': True,
                 'reportes': True
             },
+            'cache_precios': siseg_api.estadisticas_cache_precios(),
+            'formatos_qr': estadisticas_formatos(),
+            'eventos': canal_eventos.estadisticas(),
+            'render_procesos': servicio_render.estadisticas(),
             'timestamp': timezone.now().isoformat(),
             'version': 'Railway v1.0'
         }
@@ -1016,20 +1314,39 @@ def verificar_estado_apis_view(request):
             'success': False
         }, status=500)
 
+# Función helper que convierte el id de un activo enviado por el cliente
+def convertir_id_activo(valor):
+    """Id entero a partir de un número o un texto ("12"); lanza ValueError si no es un entero"""
+    if isinstance(valor, bool) or (isinstance(valor, float) and not valor.is_integer()):
+        raise ValueError(valor)
+    return int(valor)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def actualizar_precios_masivo(request):
     """
     Vista para actualizar precios de múltiples activos en lote
+    Los precios se guardan en RegistroQR en bloques de `lote` registros por transacción;
+    los activos con precio vigente se omiten salvo que se envíe "forzar": true
     
     POST /api/actualizar-precios/
     Body: {
         "activos": [
             {"id": 1, "marca": "Dell", "modelo": "Latitude 5520"},
             {"id": 2, "marca": "HP", "modelo": "EliteBook 840"}
-        ]
+        ],
+        "lote": 500 (opcional),
+        "forzar": false (opcional)
     }
     """
+    # Verificar autenticación: la vista guarda precios en RegistroQR
+    if not verificar_autenticacion(request):
+        return JsonResponse({
+            'success': False,
+            'error': 'No autenticado',
+            'redirect': '/login/'
+        }, status=401)
+    
     try:
         data = json.loads(request.body)
         activos = data.get('activos', [])
@@ -1039,15 +1356,46 @@ def actualizar_precios_masivo(request):
                 'error': 'Lista de activos es requerida',
                 'success': False
             }, status=400)
+        if not isinstance(activos, list) or not all(isinstance(activo, dict) for activo in activos):
+            return JsonResponse({
+                'error': 'activos debe ser una lista de objetos',
+                'success': False
+            }, status=400)
         
+        # Los ids pueden llegar como número o como texto ("12"); sin id sólo se consulta el precio
+        ids_activos = []
+        for indice, activo in enumerate(activos):
+            try:
+                ids_activos.append(None if activo.get('id') is None else convertir_id_activo(activo['id']))
+            except (TypeError, ValueError):
+                return JsonResponse({
+                    'error': f'id inválido en el activo {indice}: {activo["id"]!r}',
+                    'success': False
+                }, status=400)
+        
+        try:
+            tamano_lote = min(max(int(data.get('lote') or TAMANO_LOTE_PRECIOS), 1), 5000)
+        except (TypeError, ValueError):
+            return JsonResponse({
+                'error': 'El parámetro lote debe ser un número',
+                'success': False
+            }, status=400)
+        forzar = data.get('forzar', False)
+        if not isinstance(forzar, bool):
+            return JsonResponse({
+                'error': 'El parámetro forzar debe ser true o false',
+                'success': False
+            }, status=400)
+        
+        inicio = time.monotonic()
         resultados = []
         errores = []
+        precios_por_id = {}
         
-        for activo in activos:
+        for activo, activo_id in zip(activos, ids_activos):
             try:
                 marca = activo.get('marca', '').strip()
                 modelo = activo.get('modelo', '').strip()
-                activo_id = activo.get('id')
                 
                 if not marca or not modelo:
                     errores.append({
@@ -1068,10 +1416,11 @@ def actualizar_precios_masivo(request):
                     'marca': marca,
                     'modelo': modelo,
                     'precio_info': precio_info,
-                    'actualizado': True
                 }
                 
                 resultados.append(resultado)
+                if precio_info.get('exito') and activo_id is not None:
+                    precios_por_id[activo_id] = precio_info
                 
             except Exception as e:
                 errores.append({
@@ -1079,15 +1428,37 @@ def actualizar_precios_masivo(request):
                     'error': str(e)
                 })
         
+        # Guardar en la base de datos los precios calculados
+        guardado = persistir_precios(precios_por_id, tamano_lote=tamano_lote, forzar=forzar)
+        for resultado in resultados:
+            activo_id = resultado['id']
+            # Actualizado sólo si el precio quedó guardado en el registro
+            resultado['persistido'] = resultado['actualizado'] = activo_id in guardado['persistidos']
+            if activo_id is None:
+                resultado['omitido'] = 'sin id'
+            elif activo_id not in precios_por_id:
+                resultado['omitido'] = 'precio no encontrado'
+            elif activo_id in guardado['vigentes']:
+                resultado['omitido'] = 'precio vigente'
+            elif activo_id not in guardado['persistidos']:
+                resultado['omitido'] = 'activo no encontrado'
+        
+        segundos = time.monotonic() - inicio
+        total_persistidos = len(guardado['persistidos'])
+        
         return JsonResponse({
             'success': True,
             'data': {
                 'resultados': resultados,
                 'errores': errores,
                 'total_procesados': len(resultados),
-                'total_errores': len(errores)
+                'total_errores': len(errores),
+                'total_persistidos': total_persistidos,
+                'total_vigentes': len(guardado['vigentes']),
+                'segundos': round(segundos, 3),
+                'filas_por_segundo': round(len(resultados) / segundos, 1) if segundos > 0 else 0
             },
-            'mensaje': f'Procesados {len(resultados)} activos, {len(errores)} errores'
+            'mensaje': f'Procesados {len(resultados)} activos, {total_persistidos} guardados, {len(errores)} errores'
         })
         
     except json.JSONDecodeError:
@@ -1106,42 +1477,20 @@ def actualizar_precios_masivo(request):
 def dashboard_precios(request):
     """
     Vista para mostrar dashboard con información de precios del inventario
+    Los totales por categoría, marca y ubicación se calculan en la base de datos y se guardan en caché
     """
+    # Verificar autenticación
+    if not verificar_autenticacion(request):
+        return redirect('login')
+    
     try:
-        # Obtener todos los registros
-        registros = RegistroQR.objects.all()
-        activos = []
-        
-        for registro in registros:
-            try:
-                # Intentar parsear los datos del QR
-                qr_data = registro.datos_qr.split('|')
-                if len(qr_data) >= 4:
-                    activo_data = {
-                        'id': registro.id,
-                        'nombre': qr_data[0],
-                        'marca': qr_data[3] if len(qr_data) > 3 else 'Sin marca',
-                        'modelo': qr_data[1] if len(qr_data) > 1 else 'Sin modelo',
-                        'ubicacion': qr_data[2] if len(qr_data) > 2 else 'Sin ubicación',
-                        'fecha_registro': registro.fecha_escaneado
-                    }
-                else:
-                    activo_data = {
-                        'id': registro.id,
-                        'nombre': registro.datos_qr,
-                        'marca': 'Sin marca',
-                        'modelo': 'Sin modelo',
-                        'ubicacion': 'Sin ubicación',
-                        'fecha_registro': registro.fecha_escaneado
-                    }
-                    
-                activos.append(activo_data)
-                
-            except:
-                continue
+        reporte = resumen_valor_inventario()
         
-        # Generar reporte de inventario
-        reporte = siseg_api.generar_reporte_inventario(activos) if activos else {}
+        # Últimos activos con su precio guardado (sólo una página, no todo el inventario)
+        activos = RegistroQR.objects.order_by('-fecha_registro', '-id').values(
+            'id', 'nombre_activo', 'marca', 'modelo', 'ubicacion_activo', 'tipo_producto',
+            'precio_actual', 'valor_depreciado', 'fecha_registro'
+        )[:50]
         
         # Verificar estado de APIs (simulado para Railway)
         estado_apis = {
@@ -1151,6 +1500,7 @@ def dashboard_precios(request):
                 'catalogos': True,
                 'reportes': True
             },
+            'cache_precios': siseg_api.estadisticas_cache_precios(),
             'timestamp': timezone.now().isoformat(),
             'version': 'Railway v1.0'
         }
@@ -1159,7 +1509,7 @@ def dashboard_precios(request):
             'activos': activos,
             'reporte': reporte,
             'estado_apis': estado_apis,
-            'total_activos': len(activos),
+            'total_activos': reporte['total_activos'],
             'titulo': 'Dashboard de Precios - SISEG'
         }
         
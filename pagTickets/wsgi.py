@@ -18,3 +18,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pagTickets.settings_railway')
 
 # Crea la aplicación WSGI que servirá tu proyecto Django
 application = get_wsgi_application()
+
+# Arranca los procesos de renderizado de qrweb (ya con qrcode y barcode importados) antes de la primera imagen
+from qrweb.procesos_render import servicio_render  # noqa: E402
+servicio_render.iniciar()
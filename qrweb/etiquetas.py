@@ -0,0 +1,252 @@
+# Generación de etiquetas en lote (ZIP de PNG, hojas PNG en mosaico o PDF imprimible)
+import io
+import zlib
+import zipfile
+from collections import deque
+
+from PIL import Image, ImageDraw, ImageFont
+
+from .render import (
+    QR_TAMANO_DEFAULT, QR_CORRECCION_DEFAULT,
+    renderizar_etiqueta_png, resolver_formato_barcode,
+)
+from .render_cache import cache_renderizado, clave_render
+from .procesos_render import servicio_render
+
+# Límite de etiquetas por solicitud
+MAXIMO_ETIQUETAS = 5000
+
+# Hoja tamaño carta a 150 dpi y su tamaño en puntos PDF
+ANCHO_HOJA_PX = 1275
+ALTO_HOJA_PX = 1650
+ANCHO_HOJA_PT = 612
+ALTO_HOJA_PT = 792
+MARGEN_HOJA_PX = 45
+
+
+def clave_etiqueta(tipo, texto, formato_barcode):
+    """Misma clave que usan las vistas individuales, para compartir el caché de imágenes"""
+    if tipo == 'barcode':
+        formato_barcode, texto = resolver_formato_barcode(texto, formato_barcode)
+        return clave_render('barcode', texto, formato_barcode)
+    return clave_render('qr', texto, 'png', QR_TAMANO_DEFAULT, QR_CORRECCION_DEFAULT)
+
+
+def png_etiqueta_fallida(mensaje):
+    """Imagen que ocupa el lugar de una etiqueta que no se pudo generar (hojas y PDF)"""
+    imagen = Image.new('L', (300, 300), 255)
+    dibujo = ImageDraw.Draw(imagen)
+    fuente = ImageFont.load_default()
+    dibujo.rectangle((4, 4, 295, 295), outline=0, width=3)
+    dibujo.text((20, 130), 'ETIQUETA NO GENERADA', fill=0, font=fuente)
+    dibujo.text((20, 150), mensaje[:45], fill=0, font=fuente)
+    buffer = io.BytesIO()
+    imagen.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def renderizar_en_paralelo(etiquetas, ventana=None):
+    """
+    Genera (etiqueta, png) en el mismo orden de entrada. Sólo hay `ventana` imágenes
+    en vuelo a la vez, así la memoria queda acotada sin importar el tamaño del lote.
+
+    La respuesta ya se está transmitiendo cuando se genera cada imagen: si una falla (tiempo agotado,
+    proceso caído, texto inválido) se entrega su etiqueta con la llave 'error' y una imagen de reemplazo,
+    y el archivo se cierra completo.
+    """
+    # La ventana por defecto deja lugar en la cola del servicio para las imágenes individuales de los escáneres
+    ventana = ventana or servicio_render.procesos * 2
+    pendientes = deque()
+
+    def fallida(etiqueta, error):
+        mensaje = str(error) or type(error).__name__
+        return {**etiqueta, 'error': mensaje}, png_etiqueta_fallida(mensaje)
+
+    def resultado(elemento):
+        etiqueta, clave, valor = elemento
+        if isinstance(valor, bytes):
+            return etiqueta, valor
+        if isinstance(valor, Exception):
+            return fallida(etiqueta, valor)
+        try:
+            png = servicio_render.resultado(valor)
+        except Exception as e:
+            return fallida(etiqueta, e)
+        cache_renderizado.guardar(clave, png)
+        return etiqueta, png
+
+    for etiqueta in etiquetas:
+        try:
+            clave = clave_etiqueta(etiqueta['tipo'], etiqueta['texto'], etiqueta['formato'])
+            png = cache_renderizado.obtener(clave)
+            if png is None:
+                # Si la cola está llena el lote espera (la respuesta ya empezó a transmitirse)
+                png = servicio_render.enviar(
+                    renderizar_etiqueta_png, etiqueta['tipo'], etiqueta['texto'], etiqueta['formato'], esperar=True
+                )
+        except Exception as e:
+            # El pool no se pudo recrear: la etiqueta se entrega como fallida y el lote sigue
+            clave, png = None, e
+        pendientes.append((etiqueta, clave, png))
+        if len(pendientes) >= ventana:
+            yield resultado(pendientes.popleft())
+
+    while pendientes:
+        yield resultado(pendientes.popleft())
+
+
+def _agrupar(iterable, tamano):
+    grupo = []
+    for elemento in iterable:
+        grupo.append(elemento)
+        if len(grupo) == tamano:
+            yield grupo
+            grupo = []
+    if grupo:
+        yield grupo
+
+
+def componer_hoja(etiquetas_png, columnas, filas):
+    """Coloca las etiquetas en una hoja en mosaico con su leyenda debajo"""
+    hoja = Image.new('L', (ANCHO_HOJA_PX, ALTO_HOJA_PX), 255)
+    dibujo = ImageDraw.Draw(hoja)
+    fuente = ImageFont.load_default()
+
+    ancho_celda = (ANCHO_HOJA_PX - 2 * MARGEN_HOJA_PX) // columnas
+    alto_celda = (ALTO_HOJA_PX - 2 * MARGEN_HOJA_PX) // filas
+    alto_leyenda = 16
+
+    for indice, (etiqueta, png) in enumerate(etiquetas_png):
+        x = MARGEN_HOJA_PX + (indice % columnas) * ancho_celda
+        y = MARGEN_HOJA_PX + (indice // columnas) * alto_celda
+
+        imagen = Image.open(io.BytesIO(png)).convert('L')
+        imagen.thumbnail((ancho_celda - 10, alto_celda - alto_leyenda - 10))
+        hoja.paste(imagen, (x + (ancho_celda - imagen.width) // 2, y + 5))
+
+        leyenda = (etiqueta.get('leyenda') or etiqueta['texto'])[:40]
+        dibujo.text((x + 5, y + alto_celda - alto_leyenda - 2), leyenda, fill=0, font=fuente)
+
+    return hoja
+
+
+class _SalidaStreaming:
+    """Archivo de sólo escritura que acumula bytes hasta que el generador los entrega"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _nombre_seguro(texto):
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in texto)[:40] or 'etiqueta'
+
+
+def generar_zip_png(etiquetas):
+    """ZIP con un PNG por etiqueta, entregado a medida que se genera cada imagen"""
+    salida = _SalidaStreaming()
+    # La salida no es seekable: zipfile escribe descriptores de datos en lugar de retroceder
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as archivo_zip:
+        for numero, (etiqueta, png) in enumerate(renderizar_en_paralelo(etiquetas), 1):
+            nombre = f"{numero:05d}_{_nombre_seguro(etiqueta['texto'])}"
+            if 'error' in etiqueta:
+                # Una entrada de texto con el motivo en lugar de la imagen
+                archivo_zip.writestr(f"{nombre}_ERROR.txt", f"{etiqueta['texto']}\n{etiqueta['error']}\n")
+            else:
+                archivo_zip.writestr(f"{nombre}.png", png)
+            yield salida.vaciar()
+    yield salida.vaciar()
+
+
+def generar_zip_hojas(etiquetas, columnas, filas):
+    """ZIP con hojas PNG en mosaico, entregado hoja por hoja"""
+    salida = _SalidaStreaming()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as archivo_zip:
+        paginas = _agrupar(renderizar_en_paralelo(etiquetas), columnas * filas)
+        for numero, pagina in enumerate(paginas, 1):
+            buffer = io.BytesIO()
+            componer_hoja(pagina, columnas, filas).save(buffer, format='PNG', optimize=True)
+            archivo_zip.writestr(f"hoja_{numero:03d}.png", buffer.getvalue())
+            yield salida.vaciar()
+    yield salida.vaciar()
+
+
+class EscritorPDF:
+    """
+    Escritor mínimo de PDF en streaming: cada hoja se emite en cuanto está lista
+    y la tabla xref se escribe al final con los desplazamientos acumulados.
+    Objeto 1 = catálogo, objeto 2 = árbol de páginas.
+    """
+
+    def __init__(self):
+        self.posicion = 0
+        self.desplazamientos = {}
+        self.paginas = []
+        self.siguiente_objeto = 3
+
+    def _emitir(self, datos):
+        self.posicion += len(datos)
+        return datos
+
+    def _objeto(self, numero, cuerpo):
+        self.desplazamientos[numero] = self.posicion
+        return self._emitir(f"{numero} 0 obj\n".encode('ascii') + cuerpo + b"\nendobj\n")
+
+    def inicio(self):
+        return self._emitir(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def pagina(self, hoja):
+        imagen_id, contenido_id, pagina_id = range(self.siguiente_objeto, self.siguiente_objeto + 3)
+        self.siguiente_objeto += 3
+        self.paginas.append(pagina_id)
+
+        pixeles = zlib.compress(hoja.convert('L').tobytes())
+        imagen = (
+            f"<< /Type /XObject /Subtype /Image /Width {hoja.width} /Height {hoja.height} "
+            f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode /Length {len(pixeles)} >>\nstream\n"
+        ).encode('ascii') + pixeles + b"\nendstream"
+        dibujo = f"q {ANCHO_HOJA_PT} 0 0 {ALTO_HOJA_PT} 0 0 cm /Im0 Do Q".encode('ascii')
+        contenido = f"<< /Length {len(dibujo)} >>\nstream\n".encode('ascii') + dibujo + b"\nendstream"
+        pagina = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {ANCHO_HOJA_PT} {ALTO_HOJA_PT}] "
+            f"/Resources << /XObject << /Im0 {imagen_id} 0 R >> >> /Contents {contenido_id} 0 R >>"
+        ).encode('ascii')
+
+        return (
+            self._objeto(imagen_id, imagen)
+            + self._objeto(contenido_id, contenido)
+            + self._objeto(pagina_id, pagina)
+        )
+
+    def fin(self):
+        hijos = ' '.join(f"{pagina} 0 R" for pagina in self.paginas)
+        datos = self._objeto(2, f"<< /Type /Pages /Kids [{hijos}] /Count {len(self.paginas)} >>".encode('ascii'))
+        datos += self._objeto(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        inicio_xref = self.posicion
+        total = self.siguiente_objeto
+        lineas = [f"xref\n0 {total}\n", "0000000000 65535 f \n"]
+        for numero in range(1, total):
+            lineas.append(f"{self.desplazamientos[numero]:010d} 00000 n \n")
+        lineas.append(f"trailer\n<< /Size {total} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n")
+        return datos + self._emitir(''.join(lineas).encode('ascii'))
+
+
+def generar_pdf(etiquetas, columnas, filas):
+    """PDF imprimible con una hoja en mosaico por página, entregado página por página"""
+    escritor = EscritorPDF()
+    yield escritor.inicio()
+    for pagina in _agrupar(renderizar_en_paralelo(etiquetas), columnas * filas):
+        yield escritor.pagina(componer_hoja(pagina, columnas, filas))
+    yield escritor.fin()
@@ -0,0 +1,219 @@
+# Servicio de renderizado en procesos: las imágenes QR y de códigos de barras se generan fuera de los workers web
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .render import BARCODE_AVAILABLE, QR_AVAILABLE, renderizar_barcode_png, renderizar_qr_png
+
+# Procesos de renderizado, trabajos en espera antes de responder 503 y segundos máximos por imagen
+PROCESOS_DEFAULT = max(1, min(4, os.cpu_count() or 1))
+TIMEOUT_DEFAULT = 10
+# Tiempos agotados seguidos que reinician los procesos: un trabajo que se rindió por tiempo
+# sigue corriendo en su proceso y ocupando su lugar en la cola hasta terminar
+AGOTADOS_PARA_REINICIAR_DEFAULT = 3
+
+
+class RenderNoDisponible(Exception):
+    """La imagen no se pudo generar a tiempo; la vista responde 503 con Retry-After"""
+    segundos_reintento = 1
+
+
+class ServicioSaturado(RenderNoDisponible):
+    """La cola de trabajos está llena"""
+
+
+class TiempoRenderAgotado(RenderNoDisponible):
+    """El trabajo tardó más que el tiempo máximo por imagen"""
+
+
+def _precalentar():
+    """Inicializador de cada proceso: deja importadas las librerías y cargados los plugins de PIL"""
+    if QR_AVAILABLE:
+        renderizar_qr_png('SISEG', tamano=1)
+    if BARCODE_AVAILABLE:
+        renderizar_barcode_png('0', 'code128')
+
+
+def _listo():
+    return os.getpid()
+
+
+def _contexto_procesos():
+    """
+    forkserver cuando existe (Linux, macOS): cada proceso nace de un servidor que ya importó qrweb.render,
+    sin copiar los hilos del worker web. En Windows, spawn.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context('forkserver')
+        contexto.set_forkserver_preload(['qrweb.render'])
+        return contexto
+    return multiprocessing.get_context('spawn')
+
+
+class ServicioRender:
+    """
+    Pool de procesos con una cola acotada. Cada trabajo cuenta desde que se envía hasta que termina
+    (también si su petición ya se rindió por tiempo), así la cola refleja la carga real de los procesos.
+    Tras `agotados_para_reiniciar` tiempos agotados seguidos los procesos se terminan: los trabajos
+    colgados fallan, liberan su lugar y el siguiente trabajo crea procesos nuevos.
+    """
+
+    def __init__(self, procesos=PROCESOS_DEFAULT, cola_maxima=None, timeout=TIMEOUT_DEFAULT,
+                 agotados_para_reiniciar=AGOTADOS_PARA_REINICIAR_DEFAULT):
+        self.procesos = procesos
+        self.cola_maxima = cola_maxima or procesos * 8
+        self.timeout = timeout
+        self.agotados_para_reiniciar = agotados_para_reiniciar
+        self._pool = None
+        self._pendientes = 0
+        self._agotados_seguidos = 0
+        self._condicion = threading.Condition()
+        self.completados = 0
+        self.rechazados = 0
+        self.agotados = 0
+        self.reinicios = 0
+
+    def _obtener_pool(self):
+        with self._condicion:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.procesos, mp_context=_contexto_procesos(), initializer=_precalentar
+                )
+                # Arrancar todos los procesos de una vez, sin esperar a que terminen de precalentarse
+                for _ in range(self.procesos):
+                    self._pool.submit(_listo)
+            return self._pool
+
+    def iniciar(self):
+        """Crea los procesos antes de la primera imagen (si no, se crean con ella)"""
+        self._obtener_pool()
+
+    def _reemplazar_pool(self, pool_roto):
+        # Un proceso terminó de forma inesperada (p. ej. sin memoria): el pool ya no acepta trabajos
+        with self._condicion:
+            if self._pool is pool_roto:
+                self._pool = None
+        pool_roto.shutdown(wait=False, cancel_futures=True)
+
+    def _reiniciar_pool(self, pool):
+        """Termina los procesos de `pool`; los trabajos que seguían corriendo fallan con BrokenProcessPool"""
+        with self._condicion:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self.reinicios += 1
+        # ProcessPoolExecutor no expone sus procesos (terminate_workers existe desde Python 3.14)
+        procesos = list((getattr(pool, '_processes', None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for proceso in procesos:
+            proceso.terminate()
+
+    def _registrar_agotado(self):
+        with self._condicion:
+            self.agotados += 1
+            self._agotados_seguidos += 1
+            if self._agotados_seguidos < self.agotados_para_reiniciar:
+                return
+            self._agotados_seguidos = 0
+            pool = self._pool
+        if pool is not None:
+            self._reiniciar_pool(pool)
+
+    def _registrar_respuesta(self):
+        with self._condicion:
+            self._agotados_seguidos = 0
+
+    def saturado(self):
+        with self._condicion:
+            return self._pendientes >= self.cola_maxima
+
+    def enviar(self, funcion, *args, esperar=False):
+        """
+        Encola funcion(*args) y devuelve su Future. Con la cola llena lanza ServicioSaturado,
+        o con `esperar` se bloquea hasta que haya lugar (lotes que ya empezaron a transmitirse).
+        """
+        with self._condicion:
+            while self._pendientes >= self.cola_maxima:
+                if not esperar:
+                    self.rechazados += 1
+                    raise ServicioSaturado(f'Hay {self._pendientes} imágenes en espera, intenta de nuevo')
+                self._condicion.wait()
+            self._pendientes += 1
+
+        try:
+            pool = self._obtener_pool()
+            try:
+                futuro = pool.submit(funcion, *args)
+            except BrokenProcessPool:
+                self._reemplazar_pool(pool)
+                futuro = self._obtener_pool().submit(funcion, *args)
+        except BaseException:
+            self._terminar()
+            raise
+        futuro.add_done_callback(self._terminado)
+        return futuro
+
+    def _terminado(self, futuro):
+        self._terminar(completado=not futuro.cancelled() and futuro.exception() is None)
+
+    def _terminar(self, completado=False):
+        with self._condicion:
+            self._pendientes -= 1
+            if completado:
+                self.completados += 1
+            self._condicion.notify()
+
+    def resultado(self, futuro):
+        """Espera el resultado de un trabajo hasta el tiempo máximo por imagen"""
+        try:
+            datos = futuro.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            # Si todavía no empezó se descarta; si ya corre, termina en su proceso y libera su lugar
+            futuro.cancel()
+            self._registrar_agotado()
+            raise TiempoRenderAgotado(f'La imagen tardó más de {self.timeout:g} segundos')
+        self._registrar_respuesta()
+        return datos
+
+    def renderizar(self, funcion, *args):
+        """Genera una imagen en el pool (vistas síncronas)"""
+        return self.resultado(self.enviar(funcion, *args))
+
+    async def renderizar_async(self, funcion, *args):
+        """Genera una imagen en el pool sin bloquear el event loop (vistas asíncronas)"""
+        futuro = self.enviar(funcion, *args)
+        try:
+            # Al agotarse el tiempo wait_for cancela el futuro (y el trabajo, si todavía no empezó)
+            datos = await asyncio.wait_for(asyncio.wrap_future(futuro), self.timeout)
+        except asyncio.TimeoutError:
+            self._registrar_agotado()
+            raise TiempoRenderAgotado(f'La imagen tardó más de {self.timeout:g} segundos')
+        self._registrar_respuesta()
+        return datos
+
+    def estadisticas(self):
+        with self._condicion:
+            return {
+                'procesos': self.procesos,
+                'pendientes': self._pendientes,
+                'cola_maxima': self.cola_maxima,
+                'completados': self.completados,
+                'rechazados': self.rechazados,
+                'agotados': self.agotados,
+                'reinicios': self.reinicios,
+            }
+
+
+# Instancia global del servicio de renderizado
+servicio_render = ServicioRender(
+    procesos=getattr(settings, 'QRWEB_RENDER_PROCESOS', PROCESOS_DEFAULT),
+    cola_maxima=getattr(settings, 'QRWEB_RENDER_COLA_MAXIMA', None),
+    timeout=getattr(settings, 'QRWEB_RENDER_TIMEOUT_SEGUNDOS', TIMEOUT_DEFAULT),
+    agotados_para_reiniciar=getattr(settings, 'QRWEB_RENDER_AGOTADOS_PARA_REINICIAR', AGOTADOS_PARA_REINICIAR_DEFAULT),
+)
@@ -0,0 +1,91 @@
+# Funciones que generan las imágenes PNG de códigos QR y códigos de barras
+import io  # Para manejar streams de datos
+
+# Importar librerías para generar códigos QR y códigos de barras
+try:
+    import qrcode  # Para generar códigos QR
+    import qrcode.image.pil  # Para imágenes PIL
+    QR_AVAILABLE = True
+except ImportError:
+    QR_AVAILABLE = False
+
+try:
+    from barcode import Code128, Code39, EAN13  # Para generar códigos de barras
+    from barcode.writer import ImageWriter  # Para escribir imágenes de códigos de barras
+    BARCODE_AVAILABLE = True
+except ImportError:
+    BARCODE_AVAILABLE = False
+
+# Valores por defecto de los códigos QR generados
+QR_TAMANO_DEFAULT = 10
+QR_BORDE_DEFAULT = 4
+QR_CORRECCION_DEFAULT = 'L'
+
+# Niveles de corrección de errores válidos para códigos QR
+NIVELES_CORRECCION = ('L', 'M', 'Q', 'H')
+
+
+# Función que genera un código QR como bytes PNG
+def renderizar_qr_png(texto, tamano=QR_TAMANO_DEFAULT, correccion=QR_CORRECCION_DEFAULT, borde=QR_BORDE_DEFAULT):
+    niveles = {
+        'L': qrcode.constants.ERROR_CORRECT_L,
+        'M': qrcode.constants.ERROR_CORRECT_M,
+        'Q': qrcode.constants.ERROR_CORRECT_Q,
+        'H': qrcode.constants.ERROR_CORRECT_H,
+    }
+
+    # Crear el código QR
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=niveles[correccion],
+        box_size=tamano,
+        border=borde,
+    )
+    qr.add_data(texto)
+    qr.make(fit=True)
+
+    # Crear imagen del QR
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    # Convertir a bytes
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+# Función que normaliza el formato de código de barras y el código a generar
+def resolver_formato_barcode(codigo, formato):
+    """Devuelve (formato, codigo) válidos; EAN13 inválido usa un código por defecto"""
+    formato = (formato or 'code128').lower()
+    if formato not in ('code128', 'code39', 'ean13'):
+        formato = 'code128'  # Por defecto
+    if formato == 'ean13':
+        # EAN13 requiere exactamente 12 dígitos (el 13º es checksum)
+        if len(codigo) != 12 or not codigo.isdigit():
+            codigo = '123456789012'  # Código por defecto válido
+    return formato, codigo
+
+
+# Función que genera un código de barras como bytes PNG (formato ya resuelto)
+def renderizar_barcode_png(codigo, formato):
+    clases = {
+        'code128': Code128,
+        'code39': Code39,
+        'ean13': EAN13,
+    }
+
+    # Crear el código de barras
+    barcode_obj = clases[formato](codigo, writer=ImageWriter())
+
+    # Convertir a bytes
+    buffer = io.BytesIO()
+    barcode_obj.write(buffer)
+    return buffer.getvalue()
+
+
+# Función que genera la imagen PNG de una etiqueta (se usa también desde procesos del pool)
+def renderizar_etiqueta_png(tipo, texto, formato_barcode='code128'):
+    if tipo == 'barcode':
+        formato_barcode, texto = resolver_formato_barcode(texto, formato_barcode)
+        return renderizar_barcode_png(texto, formato_barcode)
+    return renderizar_qr_png(texto)
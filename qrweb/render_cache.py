@@ -0,0 +1,124 @@
+# Caché de imágenes renderizadas (QR y códigos de barras) direccionada por contenido
+import hashlib
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+# Presupuesto de memoria del caché local (bytes) y alias opcional del caché de Django
+LIMITE_BYTES_DEFAULT = 32 * 1024 * 1024
+PREFIJO_CACHE_DJANGO = 'qrweb:render:'
+
+
+# Función que calcula la clave de contenido de una imagen renderizada
+def clave_render(tipo, texto, formato, tamano='', correccion=''):
+    """
+    La clave es el SHA-256 de todos los parámetros que afectan a la imagen,
+    por lo que también sirve como ETag fuerte.
+    """
+    base = '\x1f'.join([str(tipo), str(texto), str(formato), str(tamano), str(correccion)])
+    return hashlib.sha256(base.encode('utf-8')).hexdigest()
+
+
+# Clase que guarda imágenes PNG en memoria con desalojo LRU y límite de bytes
+class CacheRenderizado:
+    def __init__(self, limite_bytes=LIMITE_BYTES_DEFAULT, alias_django=None):
+        self.limite_bytes = limite_bytes
+        self.alias_django = alias_django
+        self._entradas = OrderedDict()
+        self._bytes_usados = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _cache_django(self):
+        return caches[self.alias_django] if self.alias_django else None
+
+    def obtener(self, clave):
+        """Devuelve los bytes guardados o None"""
+        with self._lock:
+            datos = self._entradas.get(clave)
+            if datos is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return datos
+
+        # Segundo nivel: caché de Django compartido entre procesos
+        cache_django = self._cache_django()
+        if cache_django is not None:
+            datos = cache_django.get(PREFIJO_CACHE_DJANGO + clave)
+            if datos is not None:
+                self._guardar_local(clave, datos)
+                with self._lock:
+                    self.aciertos += 1
+                return datos
+
+        with self._lock:
+            self.fallos += 1
+        return None
+
+    def guardar(self, clave, datos):
+        self._guardar_local(clave, datos)
+        cache_django = self._cache_django()
+        if cache_django is not None:
+            # Las imágenes son inmutables para una clave dada: sin expiración
+            cache_django.set(PREFIJO_CACHE_DJANGO + clave, datos, timeout=None)
+
+    def _guardar_local(self, clave, datos):
+        # Una imagen más grande que todo el presupuesto no se guarda localmente
+        if len(datos) > self.limite_bytes:
+            return
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes_usados -= len(anterior)
+            self._entradas[clave] = datos
+            self._bytes_usados += len(datos)
+            # Desalojar las entradas menos usadas hasta respetar el presupuesto
+            while self._bytes_usados > self.limite_bytes:
+                _, desalojado = self._entradas.popitem(last=False)
+                self._bytes_usados -= len(desalojado)
+
+    def obtener_o_renderizar(self, clave, renderizar):
+        """Devuelve la imagen del caché o la genera con `renderizar()` y la guarda"""
+        datos = self.obtener(clave)
+        if datos is None:
+            datos = renderizar()
+            self.guardar(clave, datos)
+        return datos
+
+    async def obtener_o_renderizar_async(self, clave, renderizar):
+        """
+        obtener_o_renderizar para vistas asíncronas: `renderizar()` devuelve un awaitable
+        (servicio_render.renderizar_async); el caché de Django, si hay alias, se consulta con sync_to_async
+        """
+        if self.alias_django:
+            datos = await sync_to_async(self.obtener)(clave)
+        else:
+            datos = self.obtener(clave)
+        if datos is None:
+            datos = await renderizar()
+            if self.alias_django:
+                await sync_to_async(self.guardar)(clave, datos)
+            else:
+                self.guardar(clave, datos)
+        return datos
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'entradas': len(self._entradas),
+                'bytes_usados': self._bytes_usados,
+                'limite_bytes': self.limite_bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+            }
+
+
+# Instancia global del caché de renderizado
+cache_renderizado = CacheRenderizado(
+    limite_bytes=getattr(settings, 'QRWEB_RENDER_CACHE_BYTES', LIMITE_BYTES_DEFAULT),
+    alias_django=getattr(settings, 'QRWEB_RENDER_CACHE_ALIAS', None)
+)
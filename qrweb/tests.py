@@ -0,0 +1,194 @@
+"""
+Pruebas de qrweb
+Ejecutar con: python manage.py test qrweb
+"""
+
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .procesos_render import ServicioRender, ServicioSaturado, TiempoRenderAgotado
+from .render import QR_CORRECCION_DEFAULT, QR_TAMANO_DEFAULT
+from .render_cache import CacheRenderizado, clave_render
+
+
+# Funciones de render de prueba: se ejecutan en los procesos del servicio (deben poder importarse)
+def renderizar_prueba(texto):
+    return f'PNG:{texto}'.encode()
+
+
+def dormir(segundos):
+    time.sleep(segundos)
+    return b'PNG:tarde'
+
+
+def terminar_proceso():
+    os._exit(1)
+
+
+def esperar(condicion, segundos=10):
+    limite = time.monotonic() + segundos
+    while not condicion():
+        if time.monotonic() > limite:
+            raise AssertionError('La condición no se cumplió a tiempo')
+        time.sleep(0.05)
+
+
+# ================================================================================================
+# ⚙️ SERVICIO DE RENDERIZADO EN PROCESOS
+# ================================================================================================
+
+class ServicioRenderTests(SimpleTestCase):
+
+    def crear_servicio(self, **opciones):
+        servicio = ServicioRender(procesos=1, **opciones)
+        self.addCleanup(lambda: servicio._pool and servicio._pool.shutdown(cancel_futures=True))
+        return servicio
+
+    def test_renderiza_en_el_proceso(self):
+        servicio = self.crear_servicio()
+        self.assertEqual(servicio.renderizar(renderizar_prueba, 'hola'), b'PNG:hola')
+        esperar(lambda: servicio.estadisticas()['completados'] >= 1)
+        self.assertEqual(servicio.estadisticas()['pendientes'], 0)
+
+    def test_cola_llena_responde_503_con_retry_after(self):
+        servicio = self.crear_servicio(cola_maxima=1, timeout=5)
+        ocupado = servicio.enviar(dormir, 1)
+        self.assertTrue(servicio.saturado())
+        with self.assertRaises(ServicioSaturado):
+            servicio.enviar(renderizar_prueba, 'sin lugar')
+
+        with mock.patch('qrweb.views.servicio_render', servicio):
+            response = self.client.get('/qr/generar_qr_imagen/', {'texto': 'cola llena'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(servicio.estadisticas()['rechazados'], 2)
+        # Al terminar el trabajo en curso vuelve a aceptar imágenes
+        self.assertEqual(servicio.resultado(ocupado), b'PNG:tarde')
+        self.assertFalse(servicio.saturado())
+
+    def test_tiempo_agotado_responde_503_y_conserva_el_lugar_hasta_terminar(self):
+        servicio = self.crear_servicio(timeout=0.3)
+        servicio.iniciar()
+        esperar(lambda: servicio.estadisticas()['pendientes'] == 0)
+
+        with self.assertRaises(TiempoRenderAgotado):
+            servicio.renderizar(dormir, 1)
+        # El trabajo sigue corriendo en su proceso y ocupa su lugar en la cola
+        self.assertEqual(servicio.estadisticas()['pendientes'], 1)
+
+        # La vista responde 503: su imagen espera detrás del trabajo colgado
+        with mock.patch('qrweb.views.servicio_render', servicio):
+            response = self.client.get('/qr/generar_qr_imagen/', {'texto': 'tiempo agotado'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+        esperar(lambda: servicio.estadisticas()['pendientes'] == 0)
+        self.assertEqual(servicio.estadisticas()['agotados'], 2)
+        self.assertEqual(servicio.estadisticas()['reinicios'], 0)
+
+    def test_reinicia_los_procesos_tras_tiempos_agotados_seguidos(self):
+        servicio = self.crear_servicio(timeout=0.2, agotados_para_reiniciar=2)
+        for _ in range(2):
+            with self.assertRaises(TiempoRenderAgotado):
+                servicio.renderizar(dormir, 60)
+
+        # Los trabajos colgados fallan al terminar los procesos y liberan su lugar
+        self.assertEqual(servicio.estadisticas()['reinicios'], 1)
+        esperar(lambda: servicio.estadisticas()['pendientes'] == 0)
+        # La siguiente imagen crea procesos nuevos (con tiempo para que arranquen)
+        servicio.timeout = 10
+        self.assertEqual(servicio.renderizar(renderizar_prueba, 'nuevo pool'), b'PNG:nuevo pool')
+
+    def test_una_respuesta_a_tiempo_reinicia_la_cuenta_de_agotados(self):
+        servicio = self.crear_servicio(timeout=0.3, agotados_para_reiniciar=2)
+        servicio.iniciar()
+        esperar(lambda: servicio.estadisticas()['pendientes'] == 0)
+        with self.assertRaises(TiempoRenderAgotado):
+            servicio.renderizar(dormir, 0.5)
+        esperar(lambda: servicio.estadisticas()['pendientes'] == 0)
+        self.assertEqual(servicio.renderizar(renderizar_prueba, 'a tiempo'), b'PNG:a tiempo')
+        with self.assertRaises(TiempoRenderAgotado):
+            servicio.renderizar(dormir, 0.5)
+        self.assertEqual(servicio.estadisticas()['reinicios'], 0)
+
+    def test_se_recupera_de_un_pool_roto(self):
+        servicio = self.crear_servicio()
+        with self.assertRaises(BrokenProcessPool):
+            servicio.renderizar(terminar_proceso)
+
+        self.assertEqual(servicio.renderizar(renderizar_prueba, 'después'), 'PNG:después'.encode())
+        esperar(lambda: servicio.estadisticas()['pendientes'] == 0)
+
+
+# ================================================================================================
+# 🖼️ CACHÉ DE IMÁGENES Y ETAG
+# ================================================================================================
+
+class CacheRenderizadoTests(SimpleTestCase):
+
+    def test_desaloja_la_menos_usada_al_pasar_el_limite(self):
+        cache = CacheRenderizado(limite_bytes=10)
+        cache.guardar('a', b'aaaa')
+        cache.guardar('b', b'bbbb')
+        self.assertEqual(cache.obtener('a'), b'aaaa')  # "a" pasa a ser la más reciente
+
+        cache.guardar('c', b'cccc')
+
+        self.assertIsNone(cache.obtener('b'))
+        self.assertEqual(cache.obtener('a'), b'aaaa')
+        self.assertEqual(cache.obtener('c'), b'cccc')
+        self.assertEqual(cache.estadisticas()['entradas'], 2)
+        self.assertEqual(cache.estadisticas()['bytes_usados'], 8)
+
+    def test_imagen_mayor_que_el_limite_no_se_guarda(self):
+        cache = CacheRenderizado(limite_bytes=10)
+        cache.guardar('a', b'aaaa')
+        cache.guardar('grande', b'x' * 11)
+        self.assertIsNone(cache.obtener('grande'))
+        self.assertEqual(cache.obtener('a'), b'aaaa')
+
+
+class EtagImagenesTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = CacheRenderizado()
+        self.servicio = mock.Mock()
+        self.servicio.renderizar_async = mock.AsyncMock(return_value=b'PNG:qr')
+        # Caché vacío y render simulado: cada imagen generada queda registrada en renderizar_async
+        reemplazos = {'qrweb.views.cache_renderizado': self.cache, 'qrweb.views.servicio_render': self.servicio}
+        for objetivo, valor in reemplazos.items():
+            parche = mock.patch(objetivo, valor)
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def test_etag_es_la_clave_de_contenido(self):
+        response = self.client.get('/qr/generar_qr_imagen/', {'texto': 'SISEG-1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'PNG:qr')
+        clave = clave_render('qr', 'SISEG-1', 'png', QR_TAMANO_DEFAULT, QR_CORRECCION_DEFAULT)
+        self.assertEqual(response['ETag'], f'"{clave}"')
+
+    def test_if_none_match_responde_304_sin_renderizar_ni_consultar_el_cache(self):
+        etag = self.client.get('/qr/generar_qr_imagen/', {'texto': 'SISEG-2'})['ETag']
+        consultas = self.cache.estadisticas()
+
+        for encabezado in (etag, f'W/"otra", {etag}'):
+            with self.subTest(if_none_match=encabezado):
+                response = self.client.get(
+                    '/qr/generar_qr_imagen/', {'texto': 'SISEG-2'}, HTTP_IF_NONE_MATCH=encabezado
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+        self.servicio.renderizar_async.assert_awaited_once()
+        self.assertEqual(self.cache.estadisticas(), consultas)
+
+    def test_otro_etag_devuelve_la_imagen(self):
+        response = self.client.get('/qr/generar_qr_imagen/', {'texto': 'SISEG-3'}, HTTP_IF_NONE_MATCH='"viejo"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'PNG:qr')
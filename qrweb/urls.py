@@ -22,4 +22,7 @@ urlpatterns = [
     # APIs para generar códigos en base64 (para mostrar en web)
     path('generar_qr_base64/', views.generar_qr_base64, name='generar_qr_base64'),
     path('generar_barcode_base64/', views.generar_barcode_base64, name='generar_barcode_base64'),
+    
+    # API para generar etiquetas en lote (ZIP de PNG, hojas en mosaico o PDF)
+    path('etiquetas/', views.generar_etiquetas_lote, name='generar_etiquetas_lote'),
 ]
@@ -1,26 +1,57 @@
 # Importa funciones necesarias de Django
 from django.shortcuts import render  # Para mostrar páginas HTML
-from django.http import JsonResponse, HttpResponse  # Para enviar respuestas en formato JSON y HTTP
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse  # Para enviar respuestas en formato JSON y HTTP
 from django.views.decorators.csrf import csrf_exempt  # Para permitir peticiones POST sin token CSRF
 import json  # Para trabajar con datos JSON
-import io  # Para manejar streams de datos
 import base64  # Para codificar imágenes en base64
 from .models import QRRegistro  # Importa el modelo QRRegistro desde models.py
 
-# Importar librerías para generar códigos QR y códigos de barras
-try:
-    import qrcode  # Para generar códigos QR
-    import qrcode.image.pil  # Para imágenes PIL
-    QR_AVAILABLE = True
-except ImportError:
-    QR_AVAILABLE = False
+# Generadores de imágenes y caché de imágenes renderizadas
+from .render import (
+    QR_AVAILABLE, BARCODE_AVAILABLE, QR_TAMANO_DEFAULT, QR_CORRECCION_DEFAULT, NIVELES_CORRECCION,
+    renderizar_qr_png, renderizar_barcode_png, resolver_formato_barcode,
+)
+from .render_cache import cache_renderizado, clave_render
+from .procesos_render import RenderNoDisponible, ServicioSaturado, servicio_render
+from .etiquetas import MAXIMO_ETIQUETAS, generar_pdf, generar_zip_hojas, generar_zip_png
+# Canal de eventos en vivo: los escáneres abiertos reciben cada código registrado
+from pagTickets.eventos import canal_eventos
+# Streaming sin acumular la respuesta en memoria cuando se sirve con ASGI
+from pagTickets.asincrono import adaptar_streaming
 
-try:
-    from barcode import Code128, Code39, EAN13  # Para generar códigos de barras
-    from barcode.writer import ImageWriter  # Para escribir imágenes de códigos de barras
-    BARCODE_AVAILABLE = True
-except ImportError:
-    BARCODE_AVAILABLE = False
+# Las imágenes dependen sólo de sus parámetros: se pueden cachear indefinidamente
+CACHE_CONTROL_INMUTABLE = 'public, max-age=31536000, immutable'
+
+# Función helper que valida los parámetros opcionales de un código QR
+def parametros_qr(tamano, correccion):
+    """Devuelve (tamano, correccion) o lanza ValueError si no son válidos"""
+    tamano = int(tamano) if tamano not in (None, '') else QR_TAMANO_DEFAULT
+    correccion = (correccion or QR_CORRECCION_DEFAULT).upper()
+    if not 1 <= tamano <= 40:
+        raise ValueError('El tamaño debe estar entre 1 y 40')
+    if correccion not in NIVELES_CORRECCION:
+        raise ValueError('Corrección de errores inválida (L, M, Q o H)')
+    return tamano, correccion
+
+# Función helper que responde 503 cuando el servicio de renderizado está saturado o tardó demasiado
+def respuesta_render_no_disponible(error):
+    response = JsonResponse({'error': str(error)}, status=503)
+    response['Retry-After'] = str(error.segundos_reintento)
+    return response
+
+# Función helper que responde una imagen PNG cacheada con ETag fuerte
+# (la imagen se genera en el servicio de renderizado, sin bloquear el event loop)
+async def respuesta_png(request, clave, renderizar, nombre_archivo):
+    etag = f'"{clave}"'
+    # Si el navegador ya tiene esta imagen no hace falta ni buscarla en el caché
+    if etag in [valor.strip() for valor in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(await cache_renderizado.obtener_o_renderizar_async(clave, renderizar), content_type='image/png')
+        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    response['ETag'] = etag
+    response['Cache-Control'] = CACHE_CONTROL_INMUTABLE
+    return response
 
 # Función principal que muestra la página de inicio con los códigos QR y códigos de barras
 def qr_home(request):
@@ -48,7 +79,7 @@ def barcode_scanner(request):
 # Decorador que permite recibir peticiones POST sin validación CSRF
 @csrf_exempt
 # Función que guarda un nuevo código QR en la base de datos
-def registrar_qr(request):
+async def registrar_qr(request):
     # Verifica si la petición es de tipo POST (envío de datos)
     if request.method == 'POST':
         try:
@@ -61,13 +92,14 @@ def registrar_qr(request):
             modelo_activo = data.get('modelo_activo', '')
             
             # Crea un nuevo registro en la base de datos con el código QR
-            registro = QRRegistro.objects.create(
+            registro = await QRRegistro.objects.acreate(
                 codigo=codigo,
                 tipo_codigo='QR',
                 nombre_activo=nombre_activo,
                 marca_activo=marca_activo,
                 modelo_activo=modelo_activo
             )
+            await canal_eventos.publicar_async('codigo_qr', registro_a_diccionario(registro))
             # Devuelve una respuesta JSON exitosa con el código registrado
             return JsonResponse({
                 'status': 'ok', 
@@ -84,7 +116,7 @@ def registrar_qr(request):
 # Decorador que permite recibir peticiones POST sin validación CSRF
 @csrf_exempt
 # Función que guarda un nuevo código de barras en la base de datos
-def registrar_barcode(request):
+async def registrar_barcode(request):
     # Verifica si la petición es de tipo POST (envío de datos)
     if request.method == 'POST':
         try:
@@ -98,7 +130,7 @@ def registrar_barcode(request):
             modelo_activo = data.get('modelo_activo', '')
             
             # Crea un nuevo registro en la base de datos con el código de barras
-            registro = QRRegistro.objects.create(
+            registro = await QRRegistro.objects.acreate(
                 codigo=codigo,
                 tipo_codigo='BARCODE',
                 formato_barcode=formato,
@@ -106,6 +138,7 @@ def registrar_barcode(request):
                 marca_activo=marca_activo,
                 modelo_activo=modelo_activo
             )
+            await canal_eventos.publicar_async('codigo_qr', registro_a_diccionario(registro))
             # Devuelve una respuesta JSON exitosa con el código registrado
             return JsonResponse({
                 'status': 'ok', 
@@ -120,62 +153,57 @@ def registrar_barcode(request):
     # Si no es una petición POST, devuelve un error
     return JsonResponse({'status': 'error', 'message': 'Método no permitido'})
 
+# Función helper que convierte un registro a un diccionario con código y fecha formateada
+# (mismo formato en ultimos_registros y en los eventos en vivo)
+def registro_a_diccionario(r):
+    return {
+        'id': r.id,
+        'codigo': r.codigo, 
+        'fecha': r.fecha.strftime('%Y-%m-%d %H:%M:%S'),
+        'tipo': r.tipo_codigo,
+        'nombre_activo': r.nombre_activo or '',
+        'marca_activo': r.marca_activo or '',
+        'modelo_activo': r.modelo_activo or '',
+        'formato_barcode': r.formato_barcode or ''
+    }
+
 # Función que devuelve los últimos códigos QR registrados en formato JSON
-def ultimos_registros(request):
+async def ultimos_registros(request):
     # Obtiene los últimos 20 registros ordenados por fecha
     registros = QRRegistro.objects.order_by('-fecha')[:20]
     # Convierte cada registro a un diccionario con código y fecha formateada
-    data = [
-        {
-            'codigo': r.codigo, 
-            'fecha': r.fecha.strftime('%Y-%m-%d %H:%M:%S'),
-            'tipo': r.tipo_codigo,
-            'nombre_activo': r.nombre_activo or '',
-            'marca_activo': r.marca_activo or '',
-            'modelo_activo': r.modelo_activo or '',
-            'formato_barcode': r.formato_barcode or ''
-        }
-        for r in registros  # Recorre cada registro y crea un diccionario
-    ]
+    data = [registro_a_diccionario(r) async for r in registros]
     # Devuelve los datos en formato JSON
     return JsonResponse({'registros': data})
 
 # Función para generar código QR como imagen
-def generar_qr_imagen(request):
+async def generar_qr_imagen(request):
     if not QR_AVAILABLE:
         return JsonResponse({'error': 'Librería QR no disponible'}, status=500)
     
     texto = request.GET.get('texto', 'SISEG - Sistema de Gestión de Activos')
     
     try:
-        # Crear el código QR
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(texto)
-        qr.make(fit=True)
-        
-        # Crear imagen del QR
-        img = qr.make_image(fill_color="black", back_color="white")
+        tamano, correccion = parametros_qr(request.GET.get('tamano'), request.GET.get('correccion'))
+        clave = clave_render('qr', texto, 'png', tamano, correccion)
         
-        # Convertir a bytes
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        # Devolver imagen como respuesta HTTP
-        response = HttpResponse(buffer.getvalue(), content_type='image/png')
-        response['Content-Disposition'] = f'attachment; filename="qr_{texto[:20]}.png"'
-        return response
+        # Devolver imagen como respuesta HTTP (desde el caché si ya se generó)
+        return await respuesta_png(
+            request,
+            clave,
+            lambda: servicio_render.renderizar_async(renderizar_qr_png, texto, tamano, correccion),
+            f'qr_{texto[:20]}.png'
+        )
         
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except RenderNoDisponible as e:
+        return respuesta_render_no_disponible(e)
     except Exception as e:
         return JsonResponse({'error': f'Error generando QR: {str(e)}'}, status=500)
 
 # Función para generar código de barras como imagen
-def generar_barcode_imagen(request):
+async def generar_barcode_imagen(request):
     if not BARCODE_AVAILABLE:
         return JsonResponse({'error': 'Librería de códigos de barras no disponible'}, status=500)
     
@@ -184,36 +212,24 @@ def generar_barcode_imagen(request):
     
     try:
         # Seleccionar el formato de código de barras
-        if formato == 'code128':
-            barcode_class = Code128
-        elif formato == 'code39':
-            barcode_class = Code39
-        elif formato == 'ean13':
-            barcode_class = EAN13
-            # EAN13 requiere exactamente 12 dígitos (el 13º es checksum)
-            if len(codigo) != 12 or not codigo.isdigit():
-                codigo = '123456789012'  # Código por defecto válido
-        else:
-            barcode_class = Code128  # Por defecto
-        
-        # Crear el código de barras
-        barcode_obj = barcode_class(codigo, writer=ImageWriter())
-        
-        # Convertir a bytes
-        buffer = io.BytesIO()
-        barcode_obj.write(buffer)
-        buffer.seek(0)
+        formato_barcode, codigo = resolver_formato_barcode(codigo, formato)
+        clave = clave_render('barcode', codigo, formato_barcode)
         
-        # Devolver imagen como respuesta HTTP
-        response = HttpResponse(buffer.getvalue(), content_type='image/png')
-        response['Content-Disposition'] = f'attachment; filename="barcode_{formato}_{codigo}.png"'
-        return response
+        # Devolver imagen como respuesta HTTP (desde el caché si ya se generó)
+        return await respuesta_png(
+            request,
+            clave,
+            lambda: servicio_render.renderizar_async(renderizar_barcode_png, codigo, formato_barcode),
+            f'barcode_{formato}_{codigo}.png'
+        )
         
+    except RenderNoDisponible as e:
+        return respuesta_render_no_disponible(e)
     except Exception as e:
         return JsonResponse({'error': f'Error generando código de barras: {str(e)}'}, status=500)
 
 # Función para generar código QR en base64 para mostrar en web
-def generar_qr_base64(request):
+async def generar_qr_base64(request):
     if not QR_AVAILABLE:
         return JsonResponse({'error': 'Librería QR no disponible'}, status=500)
     
@@ -221,24 +237,16 @@ def generar_qr_base64(request):
         try:
             data = json.loads(request.body)
             texto = data.get('texto', 'SISEG')
+            tamano, correccion = parametros_qr(data.get('tamano'), data.get('correccion'))
             
-            # Crear el código QR
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
+            # Obtener la imagen del caché o generarla
+            clave = clave_render('qr', texto, 'png', tamano, correccion)
+            imagen = await cache_renderizado.obtener_o_renderizar_async(
+                clave, lambda: servicio_render.renderizar_async(renderizar_qr_png, texto, tamano, correccion)
             )
-            qr.add_data(texto)
-            qr.make(fit=True)
-            
-            # Crear imagen del QR
-            img = qr.make_image(fill_color="black", back_color="white")
             
             # Convertir a base64
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            img_base64 = base64.b64encode(buffer.getvalue()).decode()
+            img_base64 = base64.b64encode(imagen).decode()
             
             return JsonResponse({
                 'status': 'ok',
@@ -246,13 +254,17 @@ def generar_qr_base64(request):
                 'texto': texto
             })
             
+        except ValueError as e:
+            return JsonResponse({'error': f'Error: {str(e)}'}, status=400)
+        except RenderNoDisponible as e:
+            return respuesta_render_no_disponible(e)
         except Exception as e:
             return JsonResponse({'error': f'Error: {str(e)}'}, status=500)
     
     return JsonResponse({'error': 'Método no permitido'}, status=405)
 
 # Función para generar código de barras en base64 para mostrar en web
-def generar_barcode_base64(request):
+async def generar_barcode_base64(request):
     if not BARCODE_AVAILABLE:
         return JsonResponse({'error': 'Librería de códigos de barras no disponible'}, status=500)
     
@@ -263,25 +275,16 @@ def generar_barcode_base64(request):
             formato = data.get('formato', 'code128').lower()
             
             # Seleccionar el formato de código de barras
-            if formato == 'code128':
-                barcode_class = Code128
-            elif formato == 'code39':
-                barcode_class = Code39
-            elif formato == 'ean13':
-                barcode_class = EAN13
-                # EAN13 requiere exactamente 12 dígitos
-                if len(codigo) != 12 or not codigo.isdigit():
-                    codigo = '123456789012'
-            else:
-                barcode_class = Code128
+            formato_barcode, codigo = resolver_formato_barcode(codigo, formato)
             
-            # Crear el código de barras
-            barcode_obj = barcode_class(codigo, writer=ImageWriter())
+            # Obtener la imagen del caché o generarla
+            clave = clave_render('barcode', codigo, formato_barcode)
+            imagen = await cache_renderizado.obtener_o_renderizar_async(
+                clave, lambda: servicio_render.renderizar_async(renderizar_barcode_png, codigo, formato_barcode)
+            )
             
             # Convertir a base64
-            buffer = io.BytesIO()
-            barcode_obj.write(buffer)
-            img_base64 = base64.b64encode(buffer.getvalue()).decode()
+            img_base64 = base64.b64encode(imagen).decode()
             
             return JsonResponse({
                 'status': 'ok',
@@ -290,7 +293,110 @@ def generar_barcode_base64(request):
                 'formato': formato.upper()
             })
             
+        except RenderNoDisponible as e:
+            return respuesta_render_no_disponible(e)
         except Exception as e:
             return JsonResponse({'error': f'Error: {str(e)}'}, status=500)
     
     return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+# Función helper que arma la lista de etiquetas a partir de un filtro sobre la base de datos
+def etiquetas_desde_filtro(filtro, tipo, formato, limite):
+    origen = filtro.get('origen', 'activos')
+    
+    if origen == 'registros':
+        # Registros de la app qrweb (QR o códigos de barras)
+        registros = QRRegistro.objects.order_by('-fecha')
+        if filtro.get('tipo_codigo'):
+            registros = registros.filter(tipo_codigo=filtro['tipo_codigo'].upper())
+        for r in registros.values('codigo', 'tipo_codigo', 'formato_barcode', 'nombre_activo')[:limite].iterator():
+            yield {
+                'texto': r['codigo'],
+                'tipo': 'barcode' if r['tipo_codigo'] == 'BARCODE' else 'qr',
+                'formato': (r['formato_barcode'] or formato).lower(),
+                'leyenda': r['nombre_activo'] or r['codigo']
+            }
+        return
+    
+    # Activos de la app principal: la etiqueta codifica el QR original del activo
+    from pagTickets.models import RegistroQR
+    registros = RegistroQR.objects.order_by('-fecha_registro', '-id')
+    if filtro.get('codigo_ubicacion'):
+        registros = registros.filter(codigo_ubicacion=filtro['codigo_ubicacion'])
+    if filtro.get('ids'):
+        registros = registros.filter(id__in=filtro['ids'])
+    for r in registros.values('codigo', 'nombre_activo', 'codigo_activo')[:limite].iterator():
+        yield {
+            'texto': r['codigo'],
+            'tipo': tipo,
+            'formato': formato,
+            'leyenda': r['nombre_activo'] or r['codigo_activo'] or r['codigo']
+        }
+
+# Vista para generar etiquetas en lote (ZIP de PNG, hojas PNG o PDF)
+@csrf_exempt
+def generar_etiquetas_lote(request):
+    """
+    POST /qr/etiquetas/
+    Body: {
+        "codigos": ["ACT001", "ACT002"]                 (o bien)
+        "filtro": {"origen": "activos", "codigo_ubicacion": "ALM"},
+        "tipo": "qr" | "barcode",
+        "formato_barcode": "code128",
+        "salida": "zip" | "hojas" | "pdf",
+        "columnas": 4, "filas": 6
+    }
+    La respuesta se transmite a medida que se generan las imágenes u hojas.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    
+    tipo = str(data.get('tipo', 'qr')).lower()
+    formato = str(data.get('formato_barcode', 'code128')).lower()
+    salida = str(data.get('salida', 'zip')).lower()
+    
+    if tipo not in ('qr', 'barcode') or salida not in ('zip', 'hojas', 'pdf'):
+        return JsonResponse({'error': 'Tipo o salida no soportados'}, status=400)
+    if (tipo == 'qr' and not QR_AVAILABLE) or (tipo == 'barcode' and not BARCODE_AVAILABLE):
+        return JsonResponse({'error': 'Librería de generación no disponible'}, status=500)
+    
+    try:
+        columnas = min(max(int(data.get('columnas', 4)), 1), 10)
+        filas = min(max(int(data.get('filas', 6)), 1), 15)
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'columnas y filas deben ser números enteros'}, status=400)
+    
+    codigos = data.get('codigos')
+    if codigos is not None and (
+        not isinstance(codigos, list)
+        or not all(isinstance(codigo, (str, int)) and not isinstance(codigo, bool) for codigo in codigos)
+    ):
+        return JsonResponse({'error': 'codigos debe ser una lista de textos o números'}, status=400)
+    if codigos:
+        if len(codigos) > MAXIMO_ETIQUETAS:
+            return JsonResponse({'error': f'Máximo {MAXIMO_ETIQUETAS} etiquetas por solicitud'}, status=400)
+        etiquetas = ({'texto': str(codigo), 'tipo': tipo, 'formato': formato} for codigo in codigos)
+    elif isinstance(data.get('filtro'), dict):
+        etiquetas = etiquetas_desde_filtro(data['filtro'], tipo, formato, MAXIMO_ETIQUETAS)
+    else:
+        return JsonResponse({'error': 'Se requiere una lista de códigos o un filtro'}, status=400)
+    
+    # Un lote nuevo espera a que haya lugar en la cola; si ya está llena se rechaza antes de empezar
+    if servicio_render.saturado():
+        return respuesta_render_no_disponible(ServicioSaturado('El servicio de renderizado está ocupado, intenta de nuevo'))
+    
+    if salida == 'pdf':
+        response = StreamingHttpResponse(generar_pdf(etiquetas, columnas, filas), content_type='application/pdf')
+        response['Content-Disposition'] = 'attachment; filename="etiquetas.pdf"'
+    elif salida == 'hojas':
+        response = StreamingHttpResponse(generar_zip_hojas(etiquetas, columnas, filas), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="etiquetas_hojas.zip"'
+    else:
+        response = StreamingHttpResponse(generar_zip_png(etiquetas), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="etiquetas.zip"'
+    return adaptar_streaming(request, response)
@@ -4,5 +4,20 @@ echo "🚀 SISEG Production Starting..."
 export DJANGO_SETTINGS_MODULE=pagTickets.settings_railway
 export PYTHONPATH=/app
 
+# Perfil del servidor (SISEG_SERVIDOR):
+#   wsgi (por defecto) - workers síncronos: una exportación o un render lento ocupa un worker completo
+#   asgi               - workers de uvicorn: vistas asíncronas, streaming sin bloquear y eventos en vivo (/eventos/)
+# Con más de un worker ASGI, SISEG_EVENTOS_REDIS_URL reparte los eventos en vivo entre ellos
+WORKERS="${WEB_CONCURRENCY:-2}"
+
+# La base de datos vive en un archivo (SISEG_SQLITE_PATH o el volumen de Railway): aplicar migraciones pendientes
+echo "🗄️ Applying migrations..."
+python manage.py migrate --noinput
+
+if [ "${SISEG_SERVIDOR:-wsgi}" = "asgi" ]; then
+    echo "📊 Starting Production Gunicorn (ASGI, uvicorn workers)..."
+    exec gunicorn pagTickets.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:$PORT --workers $WORKERS --timeout 120 --log-level info --access-logfile - --error-logfile -
+fi
+
 echo "📊 Starting Production Gunicorn..."
-exec gunicorn pagTickets.wsgi:application --bind 0.0.0.0:$PORT --workers 2 --timeout 120 --log-level info --access-logfile - --error-logfile -
+exec gunicorn pagTickets.wsgi:application --bind 0.0.0.0:$PORT --workers $WORKERS --timeout 120 --log-level info --access-logfile - --error-logfile -
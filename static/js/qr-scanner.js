@@ -93,6 +93,7 @@ let zoomMax = 10.0;        // Zoom máximo permitido por el hardware
 let zoomTimeout = null;    // Control de debounce para zoom fluido
 let zoomPendiente = null;  // Valor de zoom pendiente de aplicar
 let flashActivo = false;   // Estado del flash/linterna para códigos en ambientes oscuros
+let eventosEnVivo = false; // Conexión a /eventos/ activa: la lista se actualiza sin volver a pedir la página
 
 // Función para manejar emojis de forma segura
 function setEmojiContent(element, content) {
@@ -625,7 +626,10 @@ function registrarCodigo(codigo) {
         
         resultDiv.style.display = 'block';
         // ACTUALIZACIÓN DE AUDITORÍA: Refrescar lista para mostrar el nuevo registro
-        actualizarRegistros();
+        // (con eventos en vivo el registro llega por /eventos/ y no hace falta pedir la página)
+        if (!eventosEnVivo) {
+            actualizarRegistros();
+        }
     })
     .catch(error => {
         // ERROR DE CONEXIÓN: No se pudo comunicar con el servidor seguro
@@ -698,6 +702,61 @@ function actualizarRegistros() {
     });
 }
 
+// Máximo de registros visibles en la lista de auditoría (igual que la vista)
+const MAXIMO_REGISTROS_LISTA = 20;
+
+// Función para recibir en vivo los códigos registrados por cualquier scanner
+// ======================================================================
+// AUDITORÍA EN VIVO: /eventos/ (Server-Sent Events) envía cada código registrado en el
+// momento en que se guarda; la lista se actualiza sin volver a descargar ni parsear la página.
+// Si el servidor no ofrece eventos (p. ej. sin ASGI) se sigue usando actualizarRegistros().
+function conectarEventosEnVivo() {
+    if (!window.EventSource) {
+        return;
+    }
+    const fuente = new EventSource('/eventos/');
+    fuente.onopen = () => {
+        eventosEnVivo = true;
+        console.log('📡 Auditoría en vivo conectada');
+    };
+    fuente.onerror = () => {
+        // El navegador reconecta solo; CLOSED significa que el servidor no ofrece eventos
+        eventosEnVivo = false;
+        if (fuente.readyState === EventSource.CLOSED) {
+            console.log('📡 Auditoría en vivo no disponible, se usa la actualización por página');
+        }
+    };
+    fuente.addEventListener('codigo_qr', event => agregarRegistroLista(JSON.parse(event.data)));
+    fuente.addEventListener('activos_reiniciados', () => {
+        const lista = document.getElementById('lista-registros');
+        if (lista) {
+            lista.innerHTML = '<li>No hay registros de códigos QR aún.</li>';
+        }
+    });
+    fuente.addEventListener('recargar', actualizarRegistros);
+}
+
+// Agrega al inicio de la lista un registro recibido en vivo (texto plano, sin interpretar HTML)
+function agregarRegistroLista(registro) {
+    const lista = document.getElementById('lista-registros');
+    if (!lista) {
+        return;
+    }
+    // Quitar el mensaje de lista vacía
+    if (lista.children.length === 1 && !lista.querySelector('b')) {
+        lista.innerHTML = '';
+    }
+    const elemento = document.createElement('li');
+    const codigo = document.createElement('b');
+    codigo.textContent = registro.codigo;
+    elemento.appendChild(codigo);
+    elemento.appendChild(document.createTextNode(' - ' + registro.fecha));
+    lista.insertBefore(elemento, lista.firstChild);
+    while (lista.children.length > MAXIMO_REGISTROS_LISTA) {
+        lista.removeChild(lista.lastChild);
+    }
+}
+
 // Inicialización segura del sistema al cargar la página
 // ====================================================
 // CONFIGURACIÓN INICIAL DE SEGURIDAD: Asegurar que todos los elementos
@@ -710,6 +769,9 @@ document.addEventListener('DOMContentLoaded', function() {
         setEmojiContent(initBtn, '📹 INICIAR SCANNER QR');
     }
     
+    // AUDITORÍA EN VIVO: recibir los registros de todos los scanners conectados
+    conectarEventosEnVivo();
+    
     console.log('🔒 Sistema de seguridad SISEG QR inicializado correctamente');
 });
 